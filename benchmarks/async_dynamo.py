@@ -0,0 +1,90 @@
+"""
+Compares sequential Dynamo DB calls with the same calls overlapped through
+common.async_dynamo, for the requests that touch many items: reading the latest
+version of many resources and writing many resources in BatchWriteItem chunks.
+moto answers in-process, so a network round trip is simulated by sleeping in a
+botocore hook before every request is sent.
+
+    python -m benchmarks.async_dynamo
+"""
+
+import statistics
+import time
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from moto import mock_dynamodb2
+
+from benchmarks import support
+from resource_api.common.async_dynamo import AsyncDynamoDB, chunks, gather, run
+from resource_api.common.constants import Constants
+
+ROUND_TRIP_MS = [0, 5, 20]
+IDENTIFIERS = 50
+BULK_RESOURCES = 200
+REPEAT = 5
+
+
+class RoundTrip:
+    """Delays every request of a client as if it travelled to Dynamo DB and back"""
+
+    def __init__(self, client):
+        self.seconds = 0.0
+        client.meta.events.register('before-send.dynamodb', self.delay)
+
+    def delay(self, **kwargs):
+        time.sleep(self.seconds)
+
+
+def query_latest(client, identifier):
+    return client.query(TableName=support.TABLE_NAME,
+                        KeyConditionExpression=Key('identifier').eq(identifier),
+                        ScanIndexForward=False, Limit=1)
+
+
+async def query_latest_async(async_dynamodb, identifier):
+    return await async_dynamodb.query(KeyConditionExpression=Key('identifier').eq(identifier),
+                                      ScanIndexForward=False, Limit=1)
+
+
+def write_sequentially(client, resources):
+    for _chunk in chunks(resources, Constants.ddb_batch_write_max_items()):
+        client.batch_write_item(RequestItems={support.TABLE_NAME: [{'PutRequest': {'Item': _resource}}
+                                                                   for _resource in _chunk]})
+
+
+def run_benchmark():
+    support.configure_environment()
+    print('%14s %14s %14s %14s %10s' % ('round trip ms', 'operation', 'sequential ms', 'async ms', 'speedup'))
+    with mock_dynamodb2():
+        dynamodb = boto3.resource('dynamodb', region_name=support.REGION)
+        table = support.create_table(dynamodb)
+        client = dynamodb.meta.client
+        identifiers = []
+        for _ in range(IDENTIFIERS):
+            _resource = support.generate_resource()
+            identifiers.append(_resource['identifier'])
+            table.put_item(Item=_resource)
+        async_dynamodb = AsyncDynamoDB(client, support.TABLE_NAME)
+        round_trip = RoundTrip(client)
+
+        for round_trip_ms in ROUND_TRIP_MS:
+            round_trip.seconds = round_trip_ms / 1000.0
+            _operations = [
+                ('fetch %d' % IDENTIFIERS,
+                 lambda: [query_latest(client, _identifier) for _identifier in identifiers],
+                 lambda: run(gather(*[query_latest_async(async_dynamodb, _identifier)
+                                      for _identifier in identifiers]))),
+                ('insert %d' % BULK_RESOURCES,
+                 lambda: write_sequentially(client, [support.generate_resource() for _ in range(BULK_RESOURCES)]),
+                 lambda: run(async_dynamodb.batch_put([support.generate_resource() for _ in range(BULK_RESOURCES)])))
+            ]
+            for _name, _sequential, _async in _operations:
+                _sequential_ms = statistics.median(support.measure(_sequential, REPEAT))
+                _async_ms = statistics.median(support.measure(_async, REPEAT))
+                print('%14d %14s %14.1f %14.1f %9.1fx' % (round_trip_ms, _name, _sequential_ms, _async_ms,
+                                                         _sequential_ms / _async_ms))
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,100 @@
+"""
+Compares keeping fileSet and entityDescription in the table with offloading them to the
+blob bucket, for resources of several sizes modified with small changes outside them: the
+size of a version item, the write units a modification consumes, the bytes the bucket holds
+afterwards, and how long modifying and fetching take, the latter with the blob cache cold,
+as in a new container, and warm. moto does not account consumed capacity, so units are
+derived from item sizes as in benchmarks/delta_versions.py.
+
+    python -m benchmarks.blob_offload
+"""
+
+import copy
+import os
+import statistics
+
+import boto3
+from moto import mock_dynamodb2, mock_s3
+
+from benchmarks import support
+from benchmarks.delta_versions import CapacityMeter
+from resource_api.common.blobs import BlobStore
+from resource_api.common.versions import latest_item
+
+SIZES_KB = [8, 32, 128]
+MODIFICATIONS = 10
+MIN_BYTES = 4096
+REPEAT = 5
+BUCKET = 'benchmark-blobs'
+
+
+def fetch_event(identifier):
+    return {
+        'httpMethod': 'GET',
+        'pathParameters': {'identifier': identifier},
+        'queryStringParameters': None
+    }
+
+
+def modify(request_handler, resource, version):
+    """Writes a version changing the status only"""
+    _resource = copy.deepcopy(resource)
+    _resource['modifiedDate'] = support.modified_date(version)
+    _resource['status'] = 'Published' if version % 2 else 'New'
+    request_handler.modify_resource(_resource)
+
+
+def bucket_kb(s3):
+    return sum(_object['Size'] for _object in s3.list_objects_v2(Bucket=BUCKET).get('Contents', [])) / 1024.0
+
+
+def measure(size_kb, offload):
+    from resource_api.fetch_resource.main.RequestHandler import RequestHandler as FetchRequestHandler
+    from resource_api.modify_resource.main.RequestHandler import RequestHandler as ModifyRequestHandler
+    with mock_dynamodb2(), mock_s3():
+        dynamodb = support.connect()
+        table = support.create_table(dynamodb)
+        s3 = boto3.client('s3', region_name=support.REGION)
+        s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={'LocationConstraint': support.REGION})
+        blob_store = BlobStore(s3, BUCKET, MIN_BYTES) if offload else None
+        resource = support.generate_resource(contributors=support.contributors_for_size(size_kb))
+        identifier = resource['identifier']
+        item = resource if blob_store is None else blob_store.offload(resource)
+        table.put_item(Item=item)
+        table.put_item(Item=latest_item(item))
+
+        modify_handler = ModifyRequestHandler(dynamodb, blob_store=blob_store)
+        meter = CapacityMeter(dynamodb.meta.client)
+        modify_latencies = []
+        for version in range(1, MODIFICATIONS + 1):
+            modify_latencies.extend(support.measure(lambda: modify(modify_handler, resource, version), 1))
+        version_kb = support.item_size(table.get_item(Key={
+            'identifier': identifier, 'modifiedDate': support.modified_date(MODIFICATIONS)})['Item']) / 1024.0
+
+        event = fetch_event(identifier)
+        cold = []
+        for _ in range(REPEAT):
+            fetch_handler = FetchRequestHandler(dynamodb, blob_store=None if blob_store is None else BlobStore(
+                s3, BUCKET, MIN_BYTES))
+            cold.extend(support.measure(lambda: fetch_handler.handler(event, None), 1))
+        warm = support.measure(lambda: fetch_handler.handler(event, None), REPEAT)
+        print('%6d %8s %12.1f %12.2f %12.1f %10.2f %12.2f %12.2f' % (
+            size_kb, 'offload' if offload else 'inline', version_kb, meter.write_units / float(MODIFICATIONS),
+            bucket_kb(s3), statistics.median(modify_latencies), statistics.median(cold), statistics.median(warm)))
+
+
+def run():
+    support.configure_environment()
+    # moto does not decode the aws-chunked uploads botocore sends by default.
+    os.environ['AWS_REQUEST_CHECKSUM_CALCULATION'] = 'when_required'
+    print('%d modifications of the status of one resource, attributes of %d bytes or more offloaded'
+          % (MODIFICATIONS, MIN_BYTES))
+    print('%6s %8s %12s %12s %12s %10s %12s %12s' % ('KB', 'scheme', 'version KB', 'write/mod', 'bucket KB',
+                                                    'modify ms', 'cold ms', 'warm ms'))
+    for size_kb in SIZES_KB:
+        for offload in (False, True):
+            measure(size_kb, offload)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,50 @@
+"""
+Compares inserting resources one request at a time with one bulk request
+written through BatchWriteItem.
+
+    python -m benchmarks.bulk_insert
+"""
+
+import http
+import time
+
+import simplejson as json
+from moto import mock_dynamodb2
+
+from benchmarks import support
+
+RECORDS = [100, 1000, 5000]
+
+
+def insert_one_by_one(request_handler, resources):
+    for resource in resources:
+        result = request_handler.handler({'httpMethod': 'POST', 'body': json.dumps(resource)}, None)
+        assert result['statusCode'] == http.HTTPStatus.CREATED
+
+
+def insert_bulk(request_handler, resources):
+    result = request_handler.handler({'httpMethod': 'POST', 'body': json.dumps(resources)}, None)
+    assert result['statusCode'] == http.HTTPStatus.CREATED
+
+
+def run():
+    support.configure_environment()
+    from resource_api.insert_resource.main.RequestHandler import RequestHandler
+
+    print('%8s %8s %12s %12s %10s' % ('records', 'mode', 'seconds', 'records/s', 'requests'))
+    for records in RECORDS:
+        resources = [support.generate_resource() for _ in range(records)]
+        for mode, insert, requests in (('single', insert_one_by_one, records),
+                                       ('bulk', insert_bulk, 1)):
+            with mock_dynamodb2():
+                dynamodb = support.connect()
+                support.create_table(dynamodb)
+                request_handler = RequestHandler(dynamodb)
+                start = time.perf_counter()
+                insert(request_handler, resources)
+                elapsed = time.perf_counter() - start
+            print('%8d %8s %12.2f %12.0f %10d' % (records, mode, elapsed, records / elapsed, requests))
+
+
+if __name__ == '__main__':
+    run()
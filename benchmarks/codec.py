@@ -0,0 +1,37 @@
+"""
+Compares simplejson with the codec that encodes with orjson, as the functions have it installed,
+on resources as they come from Dynamo DB, with every number a Decimal.
+
+    python -m benchmarks.codec
+"""
+
+import statistics
+
+import simplejson as json
+
+from benchmarks import support
+from resource_api.common import codec
+
+TARGET_SIZES_KB = [10, 100, 350]
+REPEAT = 50
+
+
+def run():
+    print('encoder: %s' % codec.encoder())
+    print('%8s %16s %16s %16s %16s' % ('size KB', 'simplejson dumps', 'codec dumps', 'simplejson loads',
+                                       'codec loads'))
+    for size_kb in TARGET_SIZES_KB:
+        _text = json.dumps(support.generate_resource_of_size(size_kb))
+        _resource = json.loads(_text, use_decimal=True)
+        assert codec.loads(codec.dumps(_resource)) == _resource
+
+        print('%8.0f %16.3f %16.3f %16.3f %16.3f' % (
+            len(_text) / 1024.0,
+            statistics.median(support.measure(lambda: json.dumps(_resource), REPEAT)),
+            statistics.median(support.measure(lambda: codec.dumps(_resource), REPEAT)),
+            statistics.median(support.measure(lambda: json.loads(_text, use_decimal=True), REPEAT)),
+            statistics.median(support.measure(lambda: codec.loads(_text), REPEAT))))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,112 @@
+"""
+Measures the cold start of every handler in fresh interpreters: the time to
+import its app module, the first invocation, which creates the Dynamo DB
+connection, and a warm invocation. The cold start adds boto3 to the first
+invocation when the app module did not import it. The slowest imports come
+from -X importtime.
+
+    python -m benchmarks.cold_start
+
+Only the standard library may be imported at module level, or the child
+processes would measure it as part of the app import.
+"""
+
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 10
+SLOWEST_IMPORTS = 5
+START_MARKER = '--- importing app ---'
+END_MARKER = '--- app imported ---'
+
+HANDLERS = {
+    'fetch_resource': {'httpMethod': 'GET',
+                       'pathParameters': {'identifier': 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'}},
+    'insert_resource': {'httpMethod': 'POST',
+                        'body': json.dumps({'identifier': 'ebf20333-35a5-4a06-9c58-68ea688a9a8b',
+                                            'modifiedDate': '2020-01-01T00:00:00+00:00',
+                                            'owner': 'benchmark@unit.no'})},
+    'modify_resource': {'httpMethod': 'PUT',
+                        'pathParameters': {'identifier': 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'},
+                        'body': json.dumps({'identifier': 'ebf20333-35a5-4a06-9c58-68ea688a9a8b',
+                                            'modifiedDate': '2020-01-01T00:00:00+00:00'})},
+    'batch_fetch_resource': {'httpMethod': 'POST',
+                             'body': json.dumps({'identifiers': ['ebf20333-35a5-4a06-9c58-68ea688a9a8b']})},
+    'resource_router': {'httpMethod': 'GET', 'resource': '/{identifier}',
+                        'pathParameters': {'identifier': 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'}}
+}
+
+
+def child(name):
+    """Runs in a fresh interpreter and prints the measurements as JSON"""
+    sys.stderr.write(START_MARKER + '\n')
+    sys.stderr.flush()
+    _start = time.perf_counter()
+    app = __import__('resource_api.%s.app' % name, fromlist=['handler'])
+    _imported = time.perf_counter()
+    sys.stderr.write(END_MARKER + '\n')
+    sys.stderr.flush()
+
+    # moto imports boto3 itself, so a deferred import of boto3 is timed here, outside the first
+    # invocation. The table is created through a separate session to leave the default one cold.
+    _deferred = time.perf_counter()
+    import boto3
+    _deferred = time.perf_counter() - _deferred
+    from moto import mock_dynamodb2
+    from benchmarks import support
+    support.configure_environment()
+    with mock_dynamodb2():
+        support.create_table(boto3.session.Session().resource('dynamodb', region_name=support.REGION))
+        with contextlib.redirect_stdout(io.StringIO()):
+            _first = support.measure(lambda: app.handler(dict(HANDLERS[name]), None), 1)[0]
+            _warm = statistics.median(support.measure(lambda: app.handler(dict(HANDLERS[name]), None), 5))
+    print(json.dumps({'import': (_imported - _start) * 1000.0, 'deferred': _deferred * 1000.0, 'first': _first,
+                      'warm': _warm}))
+
+
+def slowest_imports(stderr):
+    """Returns the packages the app import pulled in with the largest cumulative import time"""
+    _imports = []
+    for _line in stderr.split(START_MARKER)[-1].split(END_MARKER)[0].splitlines():
+        if not _line.startswith('import time:') or 'cumulative' in _line:
+            continue
+        _self, _cumulative, _module = _line[len('import time:'):].split('|')
+        _module = _module.strip()
+        if '.' not in _module and _module != 'resource_api':
+            _imports.append((int(_cumulative) / 1000.0, _module))
+    return sorted(_imports, reverse=True)[:SLOWEST_IMPORTS]
+
+
+def run():
+    _root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print('%22s %10s %10s %10s %10s  %s' % ('handler', 'import ms', 'first ms', 'cold ms', 'warm ms',
+                                            'slowest imports (ms)'))
+    for name in HANDLERS:
+        _results = []
+        _stderr = ''
+        for _ in range(RUNS):
+            _process = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'benchmarks.cold_start', name],
+                                      cwd=_root, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                      universal_newlines=True, check=True)
+            _results.append(json.loads(_process.stdout.strip().splitlines()[-1]))
+            _stderr = _process.stderr
+        print('%22s %10.1f %10.1f %10.1f %10.2f  %s' % (
+            name,
+            statistics.median(_result['import'] for _result in _results),
+            statistics.median(_result['first'] for _result in _results),
+            statistics.median(_result['import'] + _result['deferred'] + _result['first'] for _result in _results),
+            statistics.median(_result['warm'] for _result in _results),
+            ', '.join('%s %.1f' % (_module, _milliseconds) for _milliseconds, _module in slowest_imports(_stderr))))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        child(sys.argv[1])
+    else:
+        run()
@@ -0,0 +1,62 @@
+"""
+Measures the CPU cost and the bytes saved by compressing response bodies: a
+single resource of several sizes and a history of versions, with gzip levels
+and Brotli qualities. Sizes include the base64 encoding API Gateway needs.
+
+    python -m benchmarks.compression
+"""
+
+import base64
+import gzip
+import statistics
+
+from benchmarks import support
+from resource_api.common import codec
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+TARGET_SIZES_KB = [10, 100, 350]
+HISTORY_VERSIONS = 50
+REPEAT = 20
+GZIP_LEVELS = [1, 6, 9]
+BROTLI_QUALITIES = [1, 4, 6]
+
+
+def codings():
+    _codings = [('gzip -%d' % _level, lambda data, level=_level: gzip.compress(data, compresslevel=level, mtime=0))
+                for _level in GZIP_LEVELS]
+    if brotli is not None:
+        _codings += [('br q%d' % _quality, lambda data, quality=_quality: brotli.compress(data, quality=quality))
+                     for _quality in BROTLI_QUALITIES]
+    return _codings
+
+
+def bodies():
+    for size_kb in TARGET_SIZES_KB:
+        _resource = support.generate_resource_of_size(size_kb)
+        yield '%d KB resource' % size_kb, codec.dumps({'Items': [_resource], 'Count': 1})
+    _identifier = support.generate_resource()['identifier']
+    _history = [support.generate_resource(_identifier, version, 20) for version in range(HISTORY_VERSIONS)]
+    yield '%d versions' % HISTORY_VERSIONS, codec.dumps({'Items': _history, 'Count': len(_history)})
+
+
+def run():
+    if brotli is None:
+        print('Brotli is not installed, only gzip is measured')
+    print('%18s %10s %12s %12s %10s %10s' % ('body', 'coding', 'bytes', 'base64', 'saved', 'ms'))
+    for name, body in bodies():
+        _data = body.encode('utf-8')
+        print('%18s %10s %12d %12s %10s %10s' % (name, 'identity', len(_data), '-', '-', '-'))
+        for coding, compress in codings():
+            _compressed = compress(_data)
+            _encoded = len(base64.b64encode(_compressed))
+            _latency = statistics.median(support.measure(lambda: compress(_data), REPEAT))
+            print('%18s %10s %12d %12d %9.1f%% %10.3f' % ('', coding, len(_compressed), _encoded,
+                                                          100.0 * (1 - _encoded / float(len(_data))), _latency))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,116 @@
+"""
+Compares storing every version in full with delta encoded versions, for a resource
+modified many times with small changes: the bytes its versions take up, the write and
+read units a modification consumes, and how long reading its whole history and one page
+of old versions takes. moto does not account consumed capacity, so units are derived
+from the size of the items every request sends or receives, the way Dynamo DB charges
+them: 1 KB per write unit, twice that in a transaction, and 4 KB per consistent read unit.
+
+    python -m benchmarks.delta_versions
+"""
+
+import copy
+import math
+import statistics
+
+import simplejson as json
+from moto import mock_dynamodb2
+
+from benchmarks import support
+from resource_api.common.deltas import DeltaEncoding
+from resource_api.common.versions import latest_item
+from resource_api.common.wire import dumps_item
+
+SIZES_KB = [4, 16]
+MODIFICATIONS = 50
+SCHEMES = [('full', None), ('delta 5', DeltaEncoding(5)), ('delta 20', DeltaEncoding(20))]
+REPEAT = 3
+
+
+class CapacityMeter:
+    """Estimates the capacity units the requests of a client consume from the size of their items"""
+
+    def __init__(self, client):
+        self.write_units = 0
+        self.read_units = 0
+        client.meta.events.register('before-call.dynamodb', self.before_call)
+        client.meta.events.register('after-call.dynamodb', self.after_call)
+
+    @staticmethod
+    def units(item, unit_bytes):
+        return max(1, math.ceil(len(dumps_item(item)) / float(unit_bytes)))
+
+    def before_call(self, params, model, **kwargs):
+        _request = json.loads(params['body'])
+        if model.name == 'TransactWriteItems':
+            self.write_units += sum(2 * self.units(_item['Put']['Item'], 1024)
+                                    for _item in _request['TransactItems'] if 'Put' in _item)
+        elif model.name == 'PutItem':
+            self.write_units += self.units(_request['Item'], 1024)
+
+    def after_call(self, http_response, model, **kwargs):
+        _response = json.loads(http_response.content)
+        if model.name == 'GetItem' and 'Item' in _response:
+            self.read_units += self.units(_response['Item'], 4096)
+
+
+def history_event(identifier, query_string_parameters):
+    return {
+        'httpMethod': 'GET',
+        'resource': '/{identifier}/versions' if 'pageSize' in query_string_parameters else '/{identifier}',
+        'pathParameters': {'identifier': identifier},
+        'queryStringParameters': query_string_parameters
+    }
+
+
+def modify(request_handler, resource, version):
+    """Writes a version changing the status and title only"""
+    _resource = copy.deepcopy(resource)
+    _resource['modifiedDate'] = support.modified_date(version)
+    _resource['status'] = 'Published' if version % 2 else 'New'
+    _resource['entityDescription']['titles']['en'] = 'Benchmark resource version %d' % version
+    request_handler.modify_resource(_resource)
+
+
+def measure(size_kb, name, delta_encoding):
+    from resource_api.fetch_resource.main.RequestHandler import RequestHandler as FetchRequestHandler
+    from resource_api.modify_resource.main.RequestHandler import RequestHandler as ModifyRequestHandler
+    with mock_dynamodb2():
+        dynamodb = support.connect()
+        table = support.create_table(dynamodb)
+        resource = support.generate_resource(contributors=support.contributors_for_size(size_kb))
+        identifier = resource['identifier']
+        table.put_item(Item=resource)
+        table.put_item(Item=latest_item(resource))
+        modify_handler = ModifyRequestHandler(dynamodb, None, delta_encoding)
+        meter = CapacityMeter(dynamodb.meta.client)
+        modify_latencies = []
+        for version in range(1, MODIFICATIONS + 1):
+            modify_latencies.extend(support.measure(lambda: modify(modify_handler, resource, version), 1))
+
+        versions = table.scan()['Items']
+        storage_kb = sum(support.item_size(_item) for _item in versions if _item['modifiedDate'] >= '0') / 1024.0
+        fetch_handler = FetchRequestHandler(dynamodb)
+        history = history_event(identifier, {'history': 'true'})
+        fields = history_event(identifier, {'history': 'true', 'fields': 'status'})
+        page = history_event(identifier, {'pageSize': '10', 'modifiedTo': support.modified_date(MODIFICATIONS // 2)})
+        print('%6d %10s %12.1f %12.2f %12.2f %10.2f %12.2f %12.2f %10.2f' % (
+            size_kb, name, storage_kb, meter.write_units / float(MODIFICATIONS),
+            meter.read_units / float(MODIFICATIONS), statistics.median(modify_latencies),
+            statistics.median(support.measure(lambda: fetch_handler.handler(history, None), REPEAT)),
+            statistics.median(support.measure(lambda: fetch_handler.handler(fields, None), REPEAT)),
+            statistics.median(support.measure(lambda: fetch_handler.handler(page, None), REPEAT))))
+
+
+def run():
+    support.configure_environment()
+    print('%d modifications of the status and title of one resource' % MODIFICATIONS)
+    print('%6s %10s %12s %12s %12s %10s %12s %12s %10s' % ('KB', 'scheme', 'storage KB', 'write/mod', 'read/mod',
+                                                          'modify ms', 'history ms', 'fields ms', 'page ms'))
+    for size_kb in SIZES_KB:
+        for name, delta_encoding in SCHEMES:
+            measure(size_kb, name, delta_encoding)
+
+
+if __name__ == '__main__':
+    run()
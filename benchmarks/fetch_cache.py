@@ -0,0 +1,69 @@
+"""
+Measures latest-version fetch latency through the warm-container cache at
+several hit ratios.
+
+    python -m benchmarks.fetch_cache
+"""
+
+import contextlib
+import io
+import random
+import statistics
+
+from moto import mock_dynamodb2
+
+from benchmarks import support
+
+HIT_RATIOS = [0.0, 0.5, 0.9, 0.99]
+HOT_RESOURCES = 20
+REQUESTS = 1000
+
+
+def fetch_event(identifier):
+    return {'httpMethod': 'GET', 'pathParameters': {'identifier': identifier}}
+
+
+def run():
+    support.configure_environment()
+    from resource_api.common.cache import LRUCache
+    from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+
+    print('%10s %12s %10s %10s %10s' % ('hit ratio', 'measured', 'p50 ms', 'p95 ms', 'mean ms'))
+    with mock_dynamodb2():
+        dynamodb = support.connect()
+        table = support.create_table(dynamodb)
+        hot = [support.generate_resource(contributors=50)['identifier'] for _ in range(HOT_RESOURCES)]
+        resources = [support.generate_resource(identifier, contributors=50) for identifier in hot]
+        cold = []
+        for _ in range(REQUESTS):
+            resource = support.generate_resource(contributors=50)
+            resources.append(resource)
+            cold.append(resource['identifier'])
+        with table.batch_writer() as batch:
+            for resource in resources:
+                batch.put_item(Item=resource)
+
+        for hit_ratio in HIT_RATIOS:
+            request_handler = RequestHandler(dynamodb, LRUCache(64 * 1024 * 1024, 300))
+            randomizer = random.Random(1)
+            cold_identifiers = iter(cold)
+            latencies = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                for identifier in hot:
+                    request_handler.handler(fetch_event(identifier), None)
+                hits_before = request_handler.cache.statistics()['hits']
+                for _ in range(REQUESTS):
+                    if randomizer.random() < hit_ratio:
+                        event = fetch_event(randomizer.choice(hot))
+                    else:
+                        event = fetch_event(next(cold_identifiers))
+                    latencies.extend(support.measure(lambda: request_handler.handler(event, None), 1))
+            measured = (request_handler.cache.statistics()['hits'] - hits_before) / float(REQUESTS)
+            print('%10.2f %12.2f %10.3f %10.3f %10.3f' % (hit_ratio, measured,
+                                                         support.percentile(latencies, 0.5),
+                                                         support.percentile(latencies, 0.95),
+                                                         statistics.mean(latencies)))
+
+
+if __name__ == '__main__':
+    run()
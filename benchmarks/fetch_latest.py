@@ -0,0 +1,58 @@
+"""
+Compares the default latest-version fetch, by GetItem of the latest item and by the
+query resources without one fall back to, against the full history fetch as the
+number of versions of a resource grows.
+
+    python -m benchmarks.fetch_latest
+"""
+
+import http
+import statistics
+
+import simplejson as json
+from moto import mock_dynamodb2
+
+from benchmarks import support
+from resource_api.common.versions import latest_item
+
+VERSIONS = [1, 10, 100, 500]
+REPEAT = 20
+
+
+def fetch_event(identifier, history):
+    _event = {
+        'httpMethod': 'GET',
+        'pathParameters': {'identifier': identifier}
+    }
+    if history:
+        _event['queryStringParameters'] = {'history': 'true'}
+    return _event
+
+
+def run():
+    support.configure_environment()
+    from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+
+    print('%8s %8s %12s %12s %12s' % ('versions', 'mode', 'read units', 'median ms', 'body bytes'))
+    for versions in VERSIONS:
+        with mock_dynamodb2():
+            dynamodb = support.connect()
+            table = support.create_table(dynamodb)
+            identifier = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+            support.seed_versions(table, identifier, versions)
+            request_handler = RequestHandler(dynamodb)
+
+            for mode, history in (('query', False), ('get item', False), ('history', True)):
+                if mode == 'get item':
+                    table.put_item(Item=latest_item(support.generate_resource(identifier, versions - 1)))
+                event = fetch_event(identifier, history)
+                result = request_handler.handler(event, None)
+                assert result['statusCode'] == http.HTTPStatus.OK
+                items = json.loads(result['body'])['Items']
+                latencies = support.measure(lambda: request_handler.handler(event, None), REPEAT)
+                print('%8d %8s %12.1f %12.2f %12d' % (versions, mode, support.estimate_read_units(items),
+                                                      statistics.median(latencies), len(result['body'])))
+
+
+if __name__ == '__main__':
+    run()
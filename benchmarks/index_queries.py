@@ -0,0 +1,109 @@
+"""
+Compares listing the latest version of every resource of one owner by a query of the
+latestByOwner index against the scan with a filter a listing needs without it, as the
+table grows. A scan reads every version of every resource of every owner, and is charged
+for them all whatever it filters out; the index holds latest items only, so a query reads
+the page it returns. moto does not account consumed capacity, so units are derived from
+item sizes as in benchmarks/fetch_latest.py.
+
+    python -m benchmarks.index_queries
+"""
+
+import statistics
+
+from boto3.dynamodb.conditions import Attr
+from moto import mock_dynamodb2
+
+from benchmarks import support
+from resource_api.common.versions import latest_item
+from tools.create_indexes import attribute_definitions, global_secondary_indexes
+
+RESOURCES = [100, 500, 2500]
+VERSIONS = 3
+OWNERS = 20
+PAGE_SIZE = 25
+REPEAT = 5
+
+
+def create_table(dynamodb):
+    """Creates the resource table with the indexes of the listings"""
+    _throughput = {'ReadCapacityUnits': 1, 'WriteCapacityUnits': 1}
+    return dynamodb.create_table(TableName=support.TABLE_NAME,
+                                 KeySchema=[{'AttributeName': 'identifier', 'KeyType': 'HASH'},
+                                            {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                                 AttributeDefinitions=[
+                                     {'AttributeName': 'identifier', 'AttributeType': 'S'},
+                                     {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}
+                                 ] + attribute_definitions(),
+                                 GlobalSecondaryIndexes=global_secondary_indexes(_throughput),
+                                 ProvisionedThroughput=_throughput)
+
+
+def seed(table, resources):
+    """Writes the versions and the latest item of every resource, owned in turn by each owner"""
+    with table.batch_writer() as batch:
+        for index in range(resources):
+            resource = None
+            for version in range(VERSIONS):
+                resource = support.generate_resource(None if resource is None else resource['identifier'],
+                                                     version, contributors=1)
+                resource['owner'] = 'owner-%d@unit.no' % (index % OWNERS)
+                batch.put_item(Item=resource)
+            batch.put_item(Item=latest_item(resource))
+
+
+def scan_owner(table, owner):
+    """Lists the latest versions of an owner by scanning the table, returning them and the items read"""
+    _found = []
+    _read = []
+    _arguments = {}
+    while True:
+        _page = table.scan(**_arguments)
+        _read.extend(_page['Items'])
+        _found.extend(_item for _item in _page['Items']
+                      if _item.get('owner') == owner and 'latestModifiedDate' in _item)
+        if 'LastEvaluatedKey' not in _page:
+            return _found, _read
+        _arguments['ExclusiveStartKey'] = _page['LastEvaluatedKey']
+
+
+def scan_owner_filtered(table, owner):
+    """Lists the latest versions of an owner by a scan with a filter, which is charged for every item it reads"""
+    _found = []
+    _arguments = {'FilterExpression': Attr('owner').eq(owner) & Attr('latestModifiedDate').exists()}
+    while True:
+        _page = table.scan(**_arguments)
+        _found.extend(_page['Items'])
+        if 'LastEvaluatedKey' not in _page:
+            return _found
+        _arguments['ExclusiveStartKey'] = _page['LastEvaluatedKey']
+
+
+def run():
+    support.configure_environment()
+    from resource_api.list_resources.main.RequestHandler import RequestHandler
+
+    print('%d versions of each resource, %d owners, pages of %d' % (VERSIONS, OWNERS, PAGE_SIZE))
+    print('%10s %8s %12s %12s %12s' % ('resources', 'mode', 'items read', 'read units', 'median ms'))
+    for resources in RESOURCES:
+        with mock_dynamodb2():
+            dynamodb = support.connect()
+            table = create_table(dynamodb)
+            seed(table, resources)
+            owner = 'owner-0@unit.no'
+
+            _, read = scan_owner(table, owner)
+            latencies = support.measure(lambda: scan_owner_filtered(table, owner), REPEAT)
+            print('%10d %8s %12d %12.1f %12.2f' % (resources, 'scan', len(read), support.estimate_read_units(read),
+                                                   statistics.median(latencies)))
+
+            request_handler = RequestHandler(dynamodb)
+            items, _ = request_handler.list_resources('latestByOwner', 'owner', owner, PAGE_SIZE)
+            latencies = support.measure(lambda: request_handler.list_resources('latestByOwner', 'owner', owner,
+                                                                               PAGE_SIZE), REPEAT)
+            print('%10d %8s %12d %12.1f %12.2f' % (resources, 'query', len(items), support.estimate_read_units(items),
+                                                   statistics.median(latencies)))
+
+
+if __name__ == '__main__':
+    run()
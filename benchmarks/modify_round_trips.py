@@ -0,0 +1,88 @@
+"""
+Compares the previous query-then-put modification with the transactional
+write against the latest item, as the history of the resource grows.
+
+    python -m benchmarks.modify_round_trips
+"""
+
+import math
+import statistics
+
+from boto3.dynamodb.conditions import Key
+from moto import mock_dynamodb2
+
+from benchmarks import support
+
+VERSIONS = [1, 10, 100, 500]
+REPEAT = 10
+
+
+def estimate_write_units(item, transactional=False):
+    """Estimates write capacity units: 1 KB per unit, doubled inside transactions"""
+    _units = max(1, math.ceil(support.item_size(item) / 1024.0))
+    return _units * 2 if transactional else _units
+
+
+def query_then_put(table, resource):
+    """The modification as it was done before the latest item existed"""
+    ddb_response = table.query(KeyConditionExpression=Key('identifier').eq(resource['identifier']))
+    if len(ddb_response['Items']) == 0:
+        raise ValueError('not found')
+    table.put_item(Item=resource)
+    return ddb_response['Items']
+
+
+class CallCounter:
+
+    def __init__(self, client):
+        self.calls = 0
+        client.meta.events.register('before-call.dynamodb', self.count)
+
+    def count(self, **kwargs):
+        self.calls += 1
+
+
+def run():
+    support.configure_environment()
+    from resource_api.modify_resource.main.RequestHandler import RequestHandler
+
+    print('%8s %14s %12s %12s %12s' % ('versions', 'mode', 'round trips', 'capacity', 'median ms'))
+    for versions in VERSIONS:
+        with mock_dynamodb2():
+            dynamodb = support.connect()
+            table = support.create_table(dynamodb)
+            identifier = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+            support.seed_versions(table, identifier, versions)
+            request_handler = RequestHandler(dynamodb)
+            counter = CallCounter(dynamodb.meta.client)
+            next_version = [versions]
+
+            def next_resource():
+                next_version[0] += 1
+                return support.generate_resource(identifier, next_version[0])
+
+            # The first transactional modification creates the latest item; measure steady state.
+            request_handler.modify_resource(next_resource())
+
+            counter.calls = 0
+            resource = next_resource()
+            read_items = query_then_put(table, resource)
+            legacy_calls = counter.calls
+            legacy_capacity = support.estimate_read_units(read_items) + estimate_write_units(resource)
+            legacy_latencies = support.measure(lambda: query_then_put(table, next_resource()), REPEAT)
+
+            counter.calls = 0
+            resource = next_resource()
+            request_handler.modify_resource(resource)
+            calls = counter.calls
+            capacity = estimate_write_units(resource, True) * 2
+            latencies = support.measure(lambda: request_handler.modify_resource(next_resource()), REPEAT)
+
+            print('%8d %14s %12d %12.1f %12.2f' % (versions, 'query-then-put', legacy_calls, legacy_capacity,
+                                                    statistics.median(legacy_latencies)))
+            print('%8d %14s %12d %12.1f %12.2f' % (versions, 'transaction', calls, capacity,
+                                                    statistics.median(latencies)))
+
+
+if __name__ == '__main__':
+    run()
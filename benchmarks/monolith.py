@@ -0,0 +1,89 @@
+"""
+Simulates the share of requests that hit a cold start under the mixed traffic of
+the API, once with a function per operation and once with every operation served
+by the single resource router of monolith mode. Requests arrive as a Poisson
+process; a container serves one request at a time, the most recently used idle
+container takes the next one, and a container idle for longer than
+IDLE_SECONDS is reclaimed.
+
+    python -m benchmarks.monolith
+
+The time of a cold start itself is measured by benchmarks.cold_start, which
+includes the resource router.
+"""
+
+import random
+
+# Share of requests per function, and how long a warm invocation of it takes.
+MIX = {'fetch_resource': 0.80, 'batch_fetch_resource': 0.05, 'modify_resource': 0.10, 'insert_resource': 0.05}
+WARM_SECONDS = {'fetch_resource': 0.02, 'batch_fetch_resource': 0.05, 'modify_resource': 0.04,
+                'insert_resource': 0.03}
+COLD_START_SECONDS = 0.8
+IDLE_SECONDS = 600
+RATES_PER_MINUTE = [0.1, 0.5, 2, 10, 60]
+SIMULATED_SECONDS = 7 * 24 * 3600
+SEED = 2020
+
+
+class Pool:
+    """The containers of one function"""
+
+    def __init__(self):
+        self.free_at = []
+
+    def invoke(self, now, seconds):
+        """Serves a request arriving at now and returns True if it needed a cold start"""
+        self.free_at = [_free_at for _free_at in self.free_at if now - _free_at <= IDLE_SECONDS]
+        _idle = [_index for _index, _free_at in enumerate(self.free_at) if _free_at <= now]
+        if _idle:
+            _index = max(_idle, key=lambda _index: self.free_at[_index])
+            self.free_at[_index] = now + seconds
+            return False
+        self.free_at.append(now + COLD_START_SECONDS + seconds)
+        return True
+
+
+def requests(rate_per_minute, rng):
+    """Yields the arrival time and function of every request"""
+    _names = list(MIX)
+    _weights = [MIX[_name] for _name in _names]
+    _now = rng.expovariate(rate_per_minute / 60.0)
+    while _now < SIMULATED_SECONDS:
+        yield _now, rng.choices(_names, _weights)[0]
+        _now += rng.expovariate(rate_per_minute / 60.0)
+
+
+def simulate(rate_per_minute):
+    """Returns the cold starts per function with separate functions and with the router, and the requests"""
+    _separate = {_name: Pool() for _name in MIX}
+    _router = Pool()
+    _total = {_name: 0 for _name in MIX}
+    _separate_cold = {_name: 0 for _name in MIX}
+    _router_cold = {_name: 0 for _name in MIX}
+    for _now, _name in requests(rate_per_minute, random.Random(SEED)):
+        _total[_name] += 1
+        _separate_cold[_name] += _separate[_name].invoke(_now, WARM_SECONDS[_name])
+        _router_cold[_name] += _router.invoke(_now, WARM_SECONDS[_name])
+    return _separate_cold, _router_cold, _total
+
+
+def percentage(count, total):
+    return 100.0 * count / total if total else 0.0
+
+
+def run():
+    print('%10s %10s %12s %12s  %s' % ('req/min', 'requests', 'separate %', 'monolith %',
+                                       'cold % per function, separate / monolith'))
+    for rate_per_minute in RATES_PER_MINUTE:
+        _separate_cold, _router_cold, _total = simulate(rate_per_minute)
+        _requests = sum(_total.values())
+        print('%10.1f %10d %12.2f %12.2f  %s' % (
+            rate_per_minute, _requests,
+            percentage(sum(_separate_cold.values()), _requests),
+            percentage(sum(_router_cold.values()), _requests),
+            ', '.join('%s %.1f / %.1f' % (_name, percentage(_separate_cold[_name], _total[_name]),
+                                          percentage(_router_cold[_name], _total[_name])) for _name in MIX)))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,90 @@
+"""
+Measures the cost of reading the whole history of a resource before and after the
+compaction job keeps only its newest versions, as the history grows, and what stamping
+the expiry of the superseded version adds to a modification.
+
+    python -m benchmarks.retention
+"""
+
+import itertools
+import statistics
+from datetime import timedelta
+
+import simplejson as json
+from moto import mock_dynamodb2
+
+from benchmarks import support
+from resource_api.common.retention import Retention
+from tools.compact_versions import compact
+
+VERSIONS = [10, 100, 500]
+MAX_COUNT = 10
+REPEAT = 10
+
+
+def history_event(identifier):
+    return {
+        'httpMethod': 'GET',
+        'pathParameters': {'identifier': identifier},
+        'queryStringParameters': {'history': 'true'}
+    }
+
+
+class CallCounter:
+    """Counts the Dynamo DB requests a client sends"""
+
+    def __init__(self, client):
+        self.calls = 0
+        client.meta.events.register('before-send.dynamodb', self.count)
+
+    def count(self, **kwargs):
+        self.calls += 1
+
+
+def measure_history():
+    from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+    print('%8s %8s %8s %12s %12s' % ('versions', 'stage', 'items', 'read units', 'median ms'))
+    for versions in VERSIONS:
+        with mock_dynamodb2():
+            dynamodb = support.connect()
+            table = support.create_table(dynamodb)
+            identifier = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+            support.seed_versions(table, identifier, versions)
+            request_handler = RequestHandler(dynamodb)
+            event = history_event(identifier)
+            for stage in ('before', 'after'):
+                if stage == 'after':
+                    compact(dynamodb, support.TABLE_NAME, Retention(max_count=MAX_COUNT))
+                items = json.loads(request_handler.handler(event, None)['body'])['Items']
+                latencies = support.measure(lambda: request_handler.handler(event, None), REPEAT)
+                print('%8d %8s %8d %12.1f %12.2f' % (versions, stage, len(items), support.estimate_read_units(items),
+                                                     statistics.median(latencies)))
+
+
+def measure_modify():
+    from resource_api.modify_resource.main.RequestHandler import RequestHandler
+    print('%14s %12s %12s' % ('retention', 'median ms', 'calls'))
+    with mock_dynamodb2():
+        dynamodb = support.connect()
+        table = support.create_table(dynamodb)
+        identifier = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+        support.seed_versions(table, identifier, 1)
+        counter = CallCounter(dynamodb.meta.client)
+        version = itertools.count(1)
+        for name, retention in (('none', None), ('max age 30d', Retention(max_age=timedelta(days=30)))):
+            request_handler = RequestHandler(dynamodb, retention)
+            request_handler.modify_resource(support.generate_resource(identifier, next(version)))
+            counter.calls = 0
+            latencies = support.measure(
+                lambda: request_handler.modify_resource(support.generate_resource(identifier, next(version))), REPEAT)
+            print('%14s %12.2f %12.1f' % (name, statistics.median(latencies), counter.calls / float(REPEAT)))
+
+
+def run():
+    support.configure_environment()
+    measure_history()
+    measure_modify()
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,298 @@
+"""
+Load test of the fetch, insert and modify handlers. Each scenario drives the
+handler of a function through its app module, as Lambda does, with generated
+resources of several sizes and version history depths, and reports latency
+percentiles, sequential throughput and the peak memory Python allocated while
+handling a request.
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --endpoint http://localhost:8000 --json results.json
+    python -m benchmarks.suite --compare master HEAD
+
+The table lives in moto unless --endpoint points at DynamoDB Local. --compare
+runs this suite against the code of two git revisions, checked out in temporary
+worktrees, and fails when a scenario got slower than --threshold allows. Either
+revision may be WORKTREE, the uncommitted tree.
+
+moto itself takes time that grows with item size, about a second per query of
+a 256 KB item, which hides the handlers at large sizes. Measure those against
+DynamoDB Local.
+"""
+
+import argparse
+import contextlib
+import http
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+import simplejson as json
+
+from benchmarks import support
+
+SIZES_KB = [2, 32]
+VERSIONS = [1, 25]
+REPEAT = 20
+WARMUP = 3
+MEMORY_REPEAT = 5
+THRESHOLD = 0.15
+WORKTREE = 'WORKTREE'
+ACCEPT_ENCODING = 'gzip, br'
+
+# The environment of the functions in template.yaml.
+ENVIRONMENT = {
+    'ALLOWED_ORIGIN': '*',
+    'CACHE_MAX_AGE': '0',
+    'FETCH_CACHE_TTL_SECONDS': '0',
+    'DDB_FAST_PATH': 'true',
+    'COMPRESSION_MIN_BYTES': '1024'
+}
+
+
+def fetch_latest_event(identifier, _):
+    return {'httpMethod': 'GET', 'resource': '/{identifier}', 'path': '/' + identifier,
+            'pathParameters': {'identifier': identifier}, 'headers': {'Accept-Encoding': ACCEPT_ENCODING}}
+
+
+def fetch_versions_event(identifier, _):
+    return {'httpMethod': 'GET', 'resource': '/{identifier}/versions', 'path': '/%s/versions' % identifier,
+            'pathParameters': {'identifier': identifier}, 'queryStringParameters': {'pageSize': '10'},
+            'headers': {'Accept-Encoding': ACCEPT_ENCODING}}
+
+
+def insert_event(_, state):
+    _resource = support.generate_resource(contributors=state['contributors'])
+    return {'httpMethod': 'POST', 'resource': '/', 'path': '/', 'body': json.dumps(_resource)}
+
+
+def modify_put_event(identifier, state):
+    state['version'] += 1
+    _resource = support.generate_resource(identifier, state['version'], state['contributors'])
+    return {'httpMethod': 'PUT', 'resource': '/{identifier}', 'path': '/' + identifier,
+            'pathParameters': {'identifier': identifier}, 'body': json.dumps(_resource)}
+
+
+def modify_patch_event(identifier, state):
+    state['version'] += 1
+    _patch = [{'op': 'replace', 'path': '/status', 'value': 'Revision %d' % state['version']}]
+    return {'httpMethod': 'PATCH', 'resource': '/{identifier}', 'path': '/' + identifier,
+            'pathParameters': {'identifier': identifier}, 'body': json.dumps(_patch),
+            'headers': {'Content-Type': 'application/json-patch+json', 'Accept-Encoding': ACCEPT_ENCODING}}
+
+
+# Name, app module, event factory, expected status and whether the history depth matters.
+SCENARIOS = [
+    ('fetch_latest', 'fetch_resource', fetch_latest_event, http.HTTPStatus.OK, True),
+    ('fetch_versions', 'fetch_resource', fetch_versions_event, http.HTTPStatus.OK, True),
+    ('insert', 'insert_resource', insert_event, http.HTTPStatus.CREATED, False),
+    ('modify_put', 'modify_resource', modify_put_event, http.HTTPStatus.OK, True),
+    ('modify_patch', 'modify_resource', modify_patch_event, http.HTTPStatus.OK, True)
+]
+
+
+@contextlib.contextmanager
+def backend(endpoint):
+    """Yields a Dynamo DB Service Resource with an empty resource table, in moto or at endpoint"""
+    if endpoint:
+        import boto3
+        # Picked up by every client botocore creates, including those of the handlers.
+        os.environ['AWS_ENDPOINT_URL_DYNAMODB'] = endpoint
+        dynamodb = boto3.session.Session().resource('dynamodb', region_name=support.REGION, endpoint_url=endpoint)
+        table = support.create_table(dynamodb)
+        table.wait_until_exists()
+        try:
+            yield dynamodb
+        finally:
+            table.delete()
+    else:
+        from moto import mock_dynamodb2
+        with mock_dynamodb2():
+            dynamodb = support.connect()
+            support.create_table(dynamodb)
+            yield dynamodb
+
+
+def peak_memory_kb(handler, events):
+    """Returns the median of the peak memory Python allocated while handling each event"""
+    _peaks = []
+    for _event in events:
+        tracemalloc.start()
+        try:
+            handler(_event, None)
+            _peaks.append(tracemalloc.get_traced_memory()[1] / 1024.0)
+        finally:
+            tracemalloc.stop()
+    return statistics.median(_peaks)
+
+
+def run_scenario(scenario, size_kb, versions, endpoint, repeat):
+    """Seeds a resource with the given history and returns the measurements of one scenario"""
+    _name, _module, _event, _status, _ = scenario
+    _result = {'scenario': _name, 'size_kb': size_kb, 'versions': versions}
+    with backend(endpoint) as dynamodb:
+        # A fresh import is a fresh container, whichever way the revision keeps its connections.
+        for _loaded in [_loaded for _loaded in sys.modules if _loaded.split('.')[0] == 'resource_api']:
+            del sys.modules[_loaded]
+        from resource_api.modify_resource import app as modify_app
+        _handler = __import__('resource_api.%s.app' % _module, fromlist=['handler']).handler
+        _identifier = str(uuid.uuid4())
+        _state = {'contributors': support.contributors_for_size(size_kb), 'version': versions}
+        support.seed_versions(dynamodb.Table(support.TABLE_NAME), _identifier, versions, _state['contributors'])
+        # Gives the resource its latest item, as every resource modified since it was introduced has.
+        modify_app.handler(modify_put_event(_identifier, _state), None)
+
+        _first = _handler(_event(_identifier, _state), None)
+        if _first['statusCode'] != _status:
+            _result['error'] = 'status %s: %s' % (_first['statusCode'], _first['body'][:200])
+            return _result
+
+        for _ in range(WARMUP):
+            _handler(_event(_identifier, _state), None)
+        _events = iter([_event(_identifier, _state) for _ in range(repeat)])
+        _latencies = support.measure(lambda: _handler(next(_events), None), repeat)
+        _result['p50'] = support.percentile(_latencies, 0.50)
+        _result['p95'] = support.percentile(_latencies, 0.95)
+        _result['p99'] = support.percentile(_latencies, 0.99)
+        _result['throughput'] = 1000.0 * len(_latencies) / sum(_latencies)
+        _result['peak_kb'] = peak_memory_kb(_handler, [_event(_identifier, _state) for _ in range(MEMORY_REPEAT)])
+    return _result
+
+
+def revision():
+    """Returns the git revision of the code under test, marked dirty if it has uncommitted changes"""
+    try:
+        _commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], stdout=subprocess.PIPE,
+                                 universal_newlines=True, check=True).stdout.strip()
+        _dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no', 'resource_api'],
+                                stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return _commit + ('-dirty' if _dirty else '')
+
+
+def run_suite(sizes, versions, endpoint, repeat, names):
+    """Runs every selected scenario and returns the results"""
+    support.configure_environment()
+    os.environ.update(ENVIRONMENT)
+    _results = []
+    for scenario in SCENARIOS:
+        if names and scenario[0] not in names:
+            continue
+        for size_kb in sizes:
+            for depth in (versions if scenario[4] else versions[:1]):
+                # What handlers print goes to CloudWatch Logs in Lambda, not to this report.
+                with open(os.devnull, 'w') as _null, contextlib.redirect_stdout(_null):
+                    _results.append(run_scenario(scenario, size_kb, depth, endpoint, repeat))
+                print_result(_results[-1])
+    return {'revision': revision(), 'backend': endpoint or 'moto', 'repeat': repeat, 'results': _results}
+
+
+def print_header():
+    print('%15s %8s %9s %10s %10s %10s %10s %10s' % ('scenario', 'size KB', 'versions', 'p50 ms', 'p95 ms',
+                                                     'p99 ms', 'req/s', 'peak KB'))
+
+
+def print_result(result):
+    if 'error' in result:
+        print('%15s %8d %9d  %s' % (result['scenario'], result['size_kb'], result['versions'], result['error']))
+        return
+    print('%15s %8d %9d %10.2f %10.2f %10.2f %10.1f %10.0f' % (
+        result['scenario'], result['size_kb'], result['versions'], result['p50'], result['p95'], result['p99'],
+        result['throughput'], result['peak_kb']))
+
+
+def run_revision(rev, arguments, output):
+    """Runs the suite of this tree against the code of a git revision and returns its results"""
+    _root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _command = [sys.executable, '-m', 'benchmarks.suite', '--json', output] + arguments
+    if rev == WORKTREE:
+        subprocess.run(_command, cwd=_root, check=True)
+    else:
+        _directory = tempfile.mkdtemp(prefix='benchmark-')
+        shutil.rmtree(_directory)
+        subprocess.run(['git', 'worktree', 'add', '--detach', _directory, rev], cwd=_root, check=True,
+                       stdout=subprocess.DEVNULL)
+        try:
+            # The revision may predate this suite or its support module.
+            shutil.copytree(os.path.join(_root, 'benchmarks'), os.path.join(_directory, 'benchmarks'),
+                            dirs_exist_ok=True, ignore=shutil.ignore_patterns('__pycache__'))
+            subprocess.run(_command, cwd=_directory, check=True)
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', _directory], cwd=_root, check=True)
+    with open(output) as _file:
+        return json.load(_file)
+
+
+def compare(base, head, threshold):
+    """Prints the change of p50 and p95 per scenario and returns the scenarios slower than threshold"""
+    _base = {(_result['scenario'], _result['size_kb'], _result['versions']): _result for _result in base['results']}
+    _regressions = []
+    print('%s (%s) -> %s (%s)' % (base['revision'], base['backend'], head['revision'], head['backend']))
+    print('%15s %8s %9s %12s %12s %12s %12s' % ('scenario', 'size KB', 'versions', 'base p50', 'head p50',
+                                                'p50 change', 'p95 change'))
+    for _result in head['results']:
+        _key = (_result['scenario'], _result['size_kb'], _result['versions'])
+        _before = _base.get(_key)
+        if _before is None or 'error' in _before or 'error' in _result:
+            print('%15s %8d %9d  %s' % (_key + ((_result.get('error') or (_before or {}).get('error')
+                                                  or 'not in base'),)))
+            continue
+        _p50 = _result['p50'] / _before['p50'] - 1.0
+        _p95 = _result['p95'] / _before['p95'] - 1.0
+        _regressed = _p50 > threshold and _p95 > threshold
+        if _regressed:
+            _regressions.append(_key)
+        print('%15s %8d %9d %12.2f %12.2f %+11.1f%% %+11.1f%%%s' % (
+            _key + (_before['p50'], _result['p50'], _p50 * 100.0, _p95 * 100.0, '  REGRESSION' if _regressed else '')))
+    return _regressions
+
+
+def main():
+    _parser = argparse.ArgumentParser(description='Load test of the resource handlers')
+    _parser.add_argument('--sizes', default=','.join(str(_size) for _size in SIZES_KB),
+                         help='comma separated resource sizes in KB')
+    _parser.add_argument('--versions', default=','.join(str(_depth) for _depth in VERSIONS),
+                         help='comma separated version history depths')
+    _parser.add_argument('--repeat', type=int, default=REPEAT, help='measured requests per scenario')
+    _parser.add_argument('--scenarios', default='', help='comma separated scenarios, all by default')
+    _parser.add_argument('--endpoint', default='', help='DynamoDB Local endpoint, moto by default')
+    _parser.add_argument('--json', default='', help='file to write the results to')
+    _parser.add_argument('--compare', nargs='+', metavar='REVISION',
+                         help='base revision and head revision, %s by default' % WORKTREE)
+    _parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                         help='relative slowdown of both p50 and p95 counted as a regression')
+    _arguments = _parser.parse_args()
+
+    if _arguments.compare:
+        _passed = ['--sizes', _arguments.sizes, '--versions', _arguments.versions, '--repeat', str(_arguments.repeat),
+                   '--scenarios', _arguments.scenarios, '--endpoint', _arguments.endpoint]
+        _base, _head = (_arguments.compare + [WORKTREE])[:2]
+        with tempfile.TemporaryDirectory() as _directory:
+            _base_results = run_revision(_base, _passed, os.path.join(_directory, 'base.json'))
+            _head_results = run_revision(_head, _passed, os.path.join(_directory, 'head.json'))
+        _regressions = compare(_base_results, _head_results, _arguments.threshold)
+        if _arguments.json:
+            with open(_arguments.json, 'w') as _file:
+                json.dump({'base': _base_results, 'head': _head_results}, _file, indent=2)
+        sys.exit(1 if _regressions else 0)
+
+    print_header()
+    _start = time.perf_counter()
+    _results = run_suite([int(_size) for _size in _arguments.sizes.split(',')],
+                         [int(_depth) for _depth in _arguments.versions.split(',')],
+                         _arguments.endpoint, _arguments.repeat,
+                         [_name for _name in _arguments.scenarios.split(',') if _name])
+    _results['seconds'] = time.perf_counter() - _start
+    if _arguments.json:
+        with open(_arguments.json, 'w') as _file:
+            json.dump(_results, _file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Shared helpers for the benchmarks, which run the handlers against moto"""
+
+import math
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import simplejson as json
+
+REGION = 'eu-west-1'
+TABLE_NAME = 'benchmark'
+
+
+def configure_environment():
+    """Sets the environment variables the handlers and moto expect"""
+    os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+    os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+    os.environ['AWS_SECURITY_TOKEN'] = 'testing'
+    os.environ['AWS_SESSION_TOKEN'] = 'testing'
+    os.environ['REGION'] = REGION
+    os.environ['TABLE_NAME'] = TABLE_NAME
+
+
+def create_table(dynamodb):
+    """Creates the resource table with the same key schema as production"""
+    return dynamodb.create_table(TableName=TABLE_NAME,
+                                 KeySchema=[{'AttributeName': 'identifier', 'KeyType': 'HASH'},
+                                            {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                                 AttributeDefinitions=[
+                                     {'AttributeName': 'identifier', 'AttributeType': 'S'},
+                                     {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+                                 ProvisionedThroughput={'ReadCapacityUnits': 1,
+                                                        'WriteCapacityUnits': 1})
+
+
+def connect():
+    """Returns a Dynamo DB Service Resource for the benchmark region"""
+    return boto3.resource('dynamodb', region_name=REGION)
+
+
+def modified_date(version):
+    """Returns an RFC3339 modified date that sorts by version number"""
+    _date = datetime(2020, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=version)
+    return _date.isoformat()
+
+
+def generate_resource(identifier=None, version=0, contributors=5):
+    """Generates a resource shaped like production data, growing with the number of contributors"""
+    _created_date = modified_date(0)
+    return {
+        'identifier': identifier or str(uuid.uuid4()),
+        'createdDate': _created_date,
+        'modifiedDate': modified_date(version),
+        'owner': 'benchmark@unit.no',
+        'status': 'New',
+        'type': 'Publication',
+        'entityDescription': {
+            'type': 'JournalArticle',
+            'titles': {'en': 'Benchmark resource version %d' % version},
+            'date': {'year': '2020'},
+            'contributors': [{'name': 'Contributor %d' % index,
+                              'nameType': 'Personal',
+                              'sequence': index} for index in range(contributors)]
+        },
+        'fileSet': {
+            'files': [{'identifier': str(uuid.uuid4()),
+                       'name': 'file-%d.pdf' % index,
+                       'size': 1024 * index} for index in range(contributors)]
+        }
+    }
+
+
+def generate_resource_of_size(size_kb):
+    """Generates a resource of about the given size in KB, grown by its contributors and files"""
+    return generate_resource(contributors=contributors_for_size(size_kb))
+
+
+def contributors_for_size(size_kb):
+    """Returns the number of contributors that makes a generated resource about size_kb KB"""
+    _contributors = 1
+    while item_size(generate_resource(contributors=_contributors)) < size_kb * 1024:
+        _contributors *= 2
+    _low, _high = _contributors // 2, _contributors
+    while _low < _high:
+        _middle = (_low + _high) // 2
+        if item_size(generate_resource(contributors=_middle)) < size_kb * 1024:
+            _low = _middle + 1
+        else:
+            _high = _middle
+    return _low
+
+
+def seed_versions(table, identifier, versions, contributors=5):
+    """Writes the given number of versions of one resource"""
+    with table.batch_writer() as batch:
+        for version in range(versions):
+            batch.put_item(Item=generate_resource(identifier, version, contributors))
+
+
+def item_size(item):
+    """Approximates the Dynamo DB item size in bytes"""
+    return len(json.dumps(item).encode('utf-8'))
+
+
+def estimate_read_units(items):
+    """
+    Estimates eventually consistent read capacity units for a query returning the
+    given items. moto does not account consumed capacity, so it is derived from
+    item sizes the way Dynamo DB does: 4 KB per unit, halved for eventual consistency.
+    """
+    _total_size = sum(item_size(item) for item in items)
+    return max(1, math.ceil(_total_size / 4096.0)) / 2.0
+
+
+def measure(function, repeat):
+    """Calls function repeat times and returns the latencies in milliseconds"""
+    _latencies = []
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        function()
+        _latencies.append((time.perf_counter() - _start) * 1000.0)
+    return _latencies
+
+
+def percentile(latencies, fraction):
+    """Returns the nearest-rank percentile of the latencies"""
+    _ordered = sorted(latencies)
+    _index = max(0, int(math.ceil(fraction * len(_ordered))) - 1)
+    return _ordered[_index]
@@ -0,0 +1,46 @@
+"""
+Compares serializing items returned by Dynamo DB to response JSON through the
+Service Resource, which deserializes every attribute into Python values before
+simplejson encodes them, with the single-pass wire format converter used with
+the low-level client. Parsing the HTTP response is the same for both and is
+not measured.
+
+    python -m benchmarks.wire_json
+"""
+
+import statistics
+
+import simplejson as json
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from benchmarks import support
+from resource_api.common import wire
+
+TARGET_SIZES_KB = [10, 100, 350]
+REPEAT = 50
+
+
+def through_resource(wire_item):
+    _deserializer = TypeDeserializer()
+    return json.dumps({_name: _deserializer.deserialize(_value) for _name, _value in wire_item.items()})
+
+
+def run():
+    _serializer = TypeSerializer()
+    print('%8s %14s %14s %10s' % ('size KB', 'resource ms', 'wire ms', 'speedup'))
+    for size_kb in TARGET_SIZES_KB:
+        _resource = json.loads(json.dumps(support.generate_resource_of_size(size_kb)), use_decimal=True)
+        _wire_item = {_name: _serializer.serialize(_value) for _name, _value in _resource.items()}
+        assert wire.dumps_item(_wire_item) == through_resource(_wire_item)
+
+        _resource_latencies = support.measure(lambda: through_resource(_wire_item), REPEAT)
+        _wire_latencies = support.measure(lambda: wire.dumps_item(_wire_item), REPEAT)
+        print('%8.0f %14.3f %14.3f %9.1fx' % (support.item_size(_resource) / 1024.0,
+                                              statistics.median(_resource_latencies),
+                                              statistics.median(_wire_latencies),
+                                              statistics.median(_resource_latencies) /
+                                              statistics.median(_wire_latencies)))
+
+
+if __name__ == '__main__':
+    run()
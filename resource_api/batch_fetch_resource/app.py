@@ -0,0 +1,31 @@
+import http
+import os
+
+from resource_api.common import lifecycle, metrics
+from resource_api.common.blobs import BlobStore
+from resource_api.common.constants import Constants
+from resource_api.common.helpers import response, decode_event
+
+from resource_api.batch_fetch_resource.main.RequestHandler import RequestHandler
+
+
+def build_request_handler():
+    """Returns the request handler, built once per container"""
+    return RequestHandler(lifecycle.dynamodb(), lifecycle.client(), BlobStore.from_environment(os.environ, lifecycle.s3))
+
+
+@metrics.instrumented
+def handler(event, context):
+    """
+    Handler method for batch fetch resource function.
+    """
+    event = decode_event(event)
+    if event is None or Constants.event_body() not in event or Constants.event_http_method() not in event:
+        return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
+
+    try:
+        request_handler = lifecycle.instance(__name__, build_request_handler)
+    except Exception as e:
+        return response(http.HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+    return request_handler.handler(event, context)
+
@@ -0,0 +1,155 @@
+import asyncio
+import http
+import os
+
+from resource_api.common.async_dynamo import AsyncDynamoDB, gather, run
+from resource_api.common.http_constants import HttpConstants
+from resource_api.common.constants import Constants
+from resource_api.common.codec import dumps, loads
+from resource_api.common.deltas import is_delta, reconstruct
+from resource_api.common.helpers import response
+from resource_api.common.versions import latest_key, resource_from_latest_item
+from resource_api.common.wire import WireItem, from_wire_item, to_wire_item
+
+
+class RequestHandler:
+
+    def __init__(self, dynamodb=None, client=None, blob_store=None):
+
+        self.dynamodb = dynamodb
+        self.blob_store = blob_store
+
+        self.table_name = os.environ.get(Constants.env_var_table_name())
+        if self.table_name is None:
+            raise ValueError('Environment variable %s is not set' % Constants.env_var_table_name())
+        # Service resources are not thread safe, but their client is. The resource's client
+        # keeps the (de)serialization of Python types, so items come back as from a Table.
+        # A low-level client leaves items in wire format, which is serialized directly.
+        self.wire_format = client is not None
+        self.client = client if client is not None else self.dynamodb.meta.client
+        self.async_dynamodb = AsyncDynamoDB(self.client, self.table_name, Constants.batch_fetch_max_workers())
+
+    def __resource(self, item):
+        if self.wire_format:
+            return WireItem(item)
+        return item
+
+    async def __retrieve_latest_resource(self, uuid):
+        """
+        Queries the newest version of a resource that has no latest item. When it is delta
+        encoded, older versions are read, newest first, until its chain is complete; a version
+        whose chain is incomplete is left out.
+        """
+        _query = {
+            'KeyConditionExpression': '#identifier = :identifier',
+            'ExpressionAttributeNames': {'#identifier': Constants.ddb_field_identifier()},
+            'ExpressionAttributeValues': {':identifier': {'S': uuid} if self.wire_format else uuid},
+            'ScanIndexForward': False,
+            'Limit': 1
+        }
+        _ddb_response = await self.async_dynamodb.query(**_query)
+        _items = _ddb_response[Constants.ddb_response_attribute_name_items()]
+        if len(_items) == 0:
+            return None
+        _newest = from_wire_item(_items[0]) if self.wire_format else _items[0]
+        if not is_delta(_newest):
+            return self.__resource(_items[0])
+
+        _modified_date = _newest[Constants.ddb_field_modified_date()]
+        _chain = [_newest]
+        _query['Limit'] = Constants.delta_chain_page_size()
+        while _modified_date not in reconstruct(_chain):
+            _last_evaluated_key = _ddb_response.get(Constants.ddb_response_attribute_name_last_evaluated_key())
+            if _last_evaluated_key is None:
+                return None
+            _query['ExclusiveStartKey'] = _last_evaluated_key
+            _ddb_response = await self.async_dynamodb.query(**_query)
+            _chain.extend(from_wire_item(_item) if self.wire_format else _item
+                          for _item in _ddb_response[Constants.ddb_response_attribute_name_items()])
+        _version = reconstruct(_chain)[_modified_date]
+        return self.__resource(to_wire_item(_version) if self.wire_format else _version)
+
+    async def __rehydrate(self, resource):
+        """Loads the offloaded attributes of a resource back from the blob store on a worker thread"""
+        if self.blob_store is None or resource is None or Constants.ddb_field_offloaded() not in resource:
+            return resource
+        _item = from_wire_item(resource.item) if isinstance(resource, WireItem) else resource
+        return await asyncio.get_running_loop().run_in_executor(self.async_dynamodb.executor,
+                                                                self.blob_store.rehydrate, _item)
+
+    async def __retrieve_latest_items(self, identifiers):
+        """
+        Reads the latest items of the identifiers with BatchGetItem, a round trip per 100
+        identifiers, and returns the versions they hold by identifier. Identifiers without
+        one, and keys left unprocessed, are looked up with a query each. Offloaded attributes
+        are loaded back concurrently.
+        """
+        _keys = [latest_key(_identifier) for _identifier in identifiers]
+        if self.wire_format:
+            _keys = [to_wire_item(_key) for _key in _keys]
+        _found, _ = await self.async_dynamodb.batch_get(_keys)
+
+        _resources = {}
+        for _item in _found:
+            _identifier = _item[Constants.ddb_field_identifier()]
+            if self.wire_format:
+                _identifier = _identifier['S']
+            _resources[_identifier] = self.__resource(resource_from_latest_item(_item))
+        _missing = [_identifier for _identifier in identifiers if _identifier not in _resources]
+        _queried = await gather(*[self.__retrieve_latest_resource(_identifier) for _identifier in _missing])
+        _resources.update(zip(_missing, _queried))
+        if self.blob_store is not None:
+            _resources = dict(zip(_resources, await gather(*[self.__rehydrate(_resource)
+                                                             for _resource in _resources.values()])))
+        return _resources
+
+    def retrieve_resources(self, identifiers):
+        """
+        Looks up the latest version of every identifier and returns the found resources
+        in request order along with the identifiers not found.
+        """
+        _resources = run(self.__retrieve_latest_items(identifiers))
+
+        _items = []
+        _not_found = []
+        for _identifier in identifiers:
+            _item = _resources.get(_identifier)
+            if _item is None:
+                _not_found.append(_identifier)
+            else:
+                _items.append(_item)
+        return _items, _not_found
+
+    @staticmethod
+    def __parse_identifiers(body):
+        if not isinstance(body, dict):
+            raise ValueError(Constants.error_invalid_identifiers())
+        _identifiers = body.get(Constants.event_body_identifiers())
+        if not isinstance(_identifiers, list) or len(_identifiers) == 0 \
+                or len(_identifiers) > Constants.batch_fetch_max_identifiers() \
+                or not all(isinstance(_identifier, str) and _identifier for _identifier in _identifiers):
+            raise ValueError(Constants.error_invalid_identifiers())
+        # Duplicates would only cost extra reads.
+        return list(dict.fromkeys(_identifiers))
+
+    def handler(self, event, context):
+        """
+        Request handler method for batch fetch resource function.
+        """
+        if event is None or event.get(Constants.event_body()) is None:
+            return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
+
+        try:
+            _body = loads(event[Constants.event_body()])
+            _identifiers = self.__parse_identifiers(_body)
+        except ValueError as e:
+            return response(http.HTTPStatus.BAD_REQUEST, str(e))
+
+        if event.get(Constants.event_http_method()) == HttpConstants.http_method_post():
+            _items, _not_found = self.retrieve_resources(_identifiers)
+            return response(http.HTTPStatus.OK, dumps({
+                Constants.ddb_response_attribute_name_items(): _items,
+                Constants.ddb_response_attribute_name_count(): len(_items),
+                Constants.response_attribute_name_not_found(): _not_found
+            }), event=event)
+        return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
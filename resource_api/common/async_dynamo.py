@@ -0,0 +1,136 @@
+"""
+Awaitable Dynamo DB operations for requests that touch more than one item. The calls
+run on a thread pool against one client; boto3 clients are thread safe and share
+their connection pool, so the round trips of one request overlap. Lambda calls the
+handlers synchronously, and they wait for their coroutines with run.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from .constants import Constants
+
+_loop = None
+
+
+def run(awaitable):
+    """Runs a coroutine to completion on the container's event loop, which is kept between invocations"""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(awaitable)
+
+
+async def gather(*awaitables):
+    """
+    Returns the results of awaitables run concurrently. Unlike asyncio.gather it is a
+    coroutine, which binds to the loop of run instead of the loop current when called.
+    """
+    return await asyncio.gather(*awaitables)
+
+
+def chunks(items, size):
+    """Splits a list into lists of at most size items"""
+    return [items[_start:_start + size] for _start in range(0, len(items), size)]
+
+
+class AsyncDynamoDB:
+    """
+    Provides awaitable operations on one table. Items are in the format of the client:
+    Python values with the client of a Service Resource, wire format with a low-level
+    client.
+    """
+
+    def __init__(self, client, table_name, max_workers=None):
+        self.client = client
+        self.table_name = table_name
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or Constants.ddb_max_pool_connections(),
+                                           thread_name_prefix='dynamodb')
+
+    async def call(self, operation, **kwargs):
+        """Calls a client operation, such as query, on the thread pool and returns its response"""
+        _loop = asyncio.get_running_loop()
+        return await _loop.run_in_executor(self.executor, functools.partial(getattr(self.client, operation),
+                                                                            **kwargs))
+
+    async def get_item(self, key, **kwargs):
+        """Returns the item with the given key, or None if there is none"""
+        _ddb_response = await self.call('get_item', TableName=self.table_name, Key=key, **kwargs)
+        return _ddb_response.get('Item')
+
+    async def query(self, **kwargs):
+        """Returns the response of one query of the table"""
+        return await self.call('query', TableName=self.table_name, **kwargs)
+
+    async def query_all(self, **kwargs):
+        """Returns the items of every page of a query, following LastEvaluatedKey"""
+        _items = []
+        while True:
+            _ddb_response = await self.query(**kwargs)
+            _items.extend(_ddb_response[Constants.ddb_response_attribute_name_items()])
+            _last_evaluated_key = _ddb_response.get(Constants.ddb_response_attribute_name_last_evaluated_key())
+            if _last_evaluated_key is None:
+                return _items
+            kwargs['ExclusiveStartKey'] = _last_evaluated_key
+
+    async def put_item(self, item, **kwargs):
+        """Writes one item and returns the response"""
+        return await self.call('put_item', TableName=self.table_name, Item=item, **kwargs)
+
+    async def __batch_get_chunk(self, keys, kwargs):
+        _request = dict(kwargs, Keys=keys)
+        _items = []
+        for _attempt in range(Constants.ddb_batch_max_attempts()):
+            if _attempt > 0:
+                await asyncio.sleep(Constants.ddb_batch_backoff_seconds() * 2 ** (_attempt - 1))
+            _ddb_response = await self.call('batch_get_item', RequestItems={self.table_name: _request})
+            _items.extend(_ddb_response.get('Responses', {}).get(self.table_name, []))
+            _request = _ddb_response.get('UnprocessedKeys', {}).get(self.table_name)
+            if not _request:
+                return _items, []
+        return _items, _request['Keys']
+
+    async def batch_get(self, keys, **kwargs):
+        """
+        Reads the items with the given keys with concurrent BatchGetItem calls of up to 100
+        keys each, retrying unprocessed keys with exponential backoff. Returns the items
+        found, in no particular order, and the keys still unprocessed after the last attempt.
+        """
+        _results = await asyncio.gather(*[self.__batch_get_chunk(_chunk, kwargs) for _chunk in chunks(
+            keys, Constants.ddb_batch_get_max_keys())])
+        _items = []
+        _unprocessed = []
+        for _chunk_items, _chunk_unprocessed in _results:
+            _items.extend(_chunk_items)
+            _unprocessed.extend(_chunk_unprocessed)
+        return _items, _unprocessed
+
+    async def __batch_write_chunk(self, requests):
+        for _attempt in range(Constants.ddb_batch_max_attempts()):
+            if _attempt > 0:
+                await asyncio.sleep(Constants.ddb_batch_backoff_seconds() * 2 ** (_attempt - 1))
+            _ddb_response = await self.call('batch_write_item', RequestItems={self.table_name: requests})
+            requests = _ddb_response.get(Constants.ddb_response_attribute_name_unprocessed_items(),
+                                         {}).get(self.table_name)
+            if not requests:
+                return []
+        return requests
+
+    async def __batch_write(self, requests):
+        _results = await asyncio.gather(*[self.__batch_write_chunk(_chunk) for _chunk in chunks(
+            requests, Constants.ddb_batch_write_max_items())])
+        return [_request for _unprocessed in _results for _request in _unprocessed]
+
+    async def batch_put(self, items):
+        """
+        Writes items with concurrent BatchWriteItem calls of up to 25 items each, retrying
+        unprocessed items with exponential backoff. Returns the items still unprocessed.
+        """
+        _unprocessed = await self.__batch_write([{'PutRequest': {'Item': _item}} for _item in items])
+        return [_request['PutRequest']['Item'] for _request in _unprocessed]
+
+    async def batch_delete(self, keys):
+        """Deletes the items with the given keys the way batch_put writes, and returns the keys still unprocessed"""
+        _unprocessed = await self.__batch_write([{'DeleteRequest': {'Key': _key}} for _key in keys])
+        return [_request['DeleteRequest']['Key'] for _request in _unprocessed]
@@ -0,0 +1,161 @@
+"""
+Offloading of large attributes to an S3 compatible object store. Dynamo DB limits items to
+400 KB and charges a write unit per KB, and every version copies the whole resource again.
+An attribute such as fileSet or entityDescription whose JSON reaches a minimum size is
+stored as an object named by the SHA-256 of its content instead, and its item keeps only
+the object key in the offloaded map. Versions that leave the attribute unchanged share the
+object, which is written once. Objects never change once written, so they are cached
+without expiry.
+"""
+
+import gzip
+import hashlib
+
+import simplejson
+from botocore.exceptions import ClientError
+
+from .cache import LRUCache
+from .codec import loads
+from .constants import Constants
+from .helpers import project, projected_fields
+from .wire import WireItem, from_wire_item
+
+
+def canonical(value):
+    """Returns the JSON of a value with sorted keys and no whitespace, equal for equal values"""
+    return simplejson.dumps(value, sort_keys=True, separators=(',', ':'), use_decimal=True)
+
+
+class BlobStore:
+    """Offloads the large attributes of resources to a bucket and loads them back"""
+
+    def __init__(self, s3, bucket, min_bytes=Constants.blob_default_min_bytes(), prefix=Constants.blob_key_prefix(),
+                 cache_max_bytes=Constants.blob_cache_max_bytes()):
+        self.s3 = s3
+        self.bucket = bucket
+        self.min_bytes = min_bytes
+        self.prefix = prefix
+        # Keyed by object key, holding the JSON of the attribute, so every load returns a new value.
+        self.cache = LRUCache(cache_max_bytes, float('inf'))
+
+    @staticmethod
+    def lambda_config():
+        """
+        Returns a botocore Config for the S3 client in Lambda. Objects are far larger than
+        Dynamo DB items, so it waits longer for a response than DynamoDB.lambda_config.
+        """
+        from botocore.config import Config
+        return Config(max_pool_connections=Constants.ddb_max_pool_connections(),
+                      connect_timeout=Constants.blob_connect_timeout_seconds(),
+                      read_timeout=Constants.blob_read_timeout_seconds(),
+                      tcp_keepalive=True,
+                      retries={'mode': Constants.ddb_retry_mode(),
+                               'total_max_attempts': Constants.ddb_max_attempts()})
+
+    @staticmethod
+    def from_environment(environment, s3_factory):
+        """
+        Returns the store of the bucket set by BLOB_BUCKET, with the S3 client s3_factory
+        builds, or None when it is not set and no attribute is offloaded
+        """
+        _bucket = environment.get(Constants.env_var_blob_bucket())
+        if not _bucket:
+            return None
+        _min_bytes = int(environment.get(Constants.env_var_blob_min_bytes()) or Constants.blob_default_min_bytes())
+        return BlobStore(s3_factory(), _bucket, _min_bytes)
+
+    def key(self, document):
+        """Returns the object key of an attribute, given its canonical JSON"""
+        return self.prefix + hashlib.sha256(document.encode('utf-8')).hexdigest()
+
+    def __exists(self, key):
+        try:
+            self.s3.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response['Error'].get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+                raise
+            return False
+
+    def store(self, value):
+        """Writes an attribute to the bucket, unless an object with its content is already there, and returns its key"""
+        _document = canonical(value)
+        _key = self.key(_document)
+        if self.cache.get(_key) is None and not self.__exists(_key):
+            self.s3.put_object(Bucket=self.bucket, Key=_key, ContentType='application/json', ContentEncoding='gzip',
+                               Body=gzip.compress(_document.encode('utf-8'), Constants.compression_gzip_level()))
+        self.cache.put(_key, _document, len(_document))
+        return _key
+
+    def load(self, key):
+        """Returns the attribute stored under an object key"""
+        _document = self.cache.get(key)
+        if _document is None:
+            _body = self.s3.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+            _document = gzip.decompress(_body).decode('utf-8')
+            self.cache.put(key, _document, len(_document))
+        return loads(_document)
+
+    def offload(self, resource):
+        """
+        Returns the item to write for a resource, with every offloadable attribute that reaches
+        the minimum size stored in the bucket and replaced by its key in the offloaded map. An
+        offloaded map sent by the client is dropped, as it would point at other content.
+        """
+        _item = dict(resource)
+        _item.pop(Constants.ddb_field_offloaded(), None)
+        _offloaded = {}
+        for _name in Constants.blob_offloaded_fields():
+            if _name in _item and len(canonical(_item[_name])) >= self.min_bytes:
+                _offloaded[_name] = self.store(_item.pop(_name))
+        if _offloaded:
+            _item[Constants.ddb_field_offloaded()] = _offloaded
+        return _item
+
+    def rehydrate(self, item, names=None):
+        """
+        Returns an item with its offloaded attributes loaded back in place of the offloaded
+        map. Given names, only the offloaded attributes among them are loaded.
+        """
+        _item = dict(item)
+        for _name, _key in (_item.pop(Constants.ddb_field_offloaded(), None) or {}).items():
+            if names is None or _name in names:
+                _item[_name] = self.load(_key)
+        return _item
+
+    def link(self, item, names=None):
+        """
+        Returns an item whose offloaded map holds presigned URLs of its offloaded attributes
+        instead of their keys. Given names, only the offloaded attributes among them are linked.
+        """
+        _item = dict(item)
+        _item[Constants.ddb_field_offloaded()] = {
+            _name: self.s3.generate_presigned_url('get_object', Params={'Bucket': self.bucket, 'Key': _key},
+                                                  ExpiresIn=Constants.blob_url_expiry_seconds())
+            for _name, _key in (_item.get(Constants.ddb_field_offloaded()) or {}).items()
+            if names is None or _name in names}
+        return _item
+
+
+def rehydrate_items(blob_store, items, projected=None, link=False):
+    """
+    Loads the offloaded attributes of items read from the table back from the blob store,
+    only those the query arguments of projection select when given. With link, they are
+    left out and the offloaded map holds presigned URLs to them instead.
+    """
+    if blob_store is None or not any(Constants.ddb_field_offloaded() in _item for _item in items):
+        return items
+    _fields = None if projected is None else projected_fields(projected)
+    _items = []
+    for _item in items:
+        if Constants.ddb_field_offloaded() not in _item:
+            _items.append(_item)
+            continue
+        _item = from_wire_item(_item.item) if isinstance(_item, WireItem) else _item
+        if link:
+            _items.append(blob_store.link(_item, _fields))
+        elif projected is None:
+            _items.append(blob_store.rehydrate(_item))
+        else:
+            _items.append(project(blob_store.rehydrate(_item, _fields), projected))
+    return _items
@@ -0,0 +1,80 @@
+"""Bounded in-process cache for reuse across invocations of a warm Lambda container"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Least recently used cache bounded by the total size of its values, whose
+    entries expire after a fixed time to live.
+    """
+
+    def __init__(self, max_bytes, ttl_seconds, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the value cached for key, or None if it is missing or expired"""
+        with self._lock:
+            _entry = self._entries.get(key)
+            if _entry is not None and _entry[0] <= self.clock():
+                self._remove(key)
+                _entry = None
+            if _entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _entry[1]
+
+    def put(self, key, value, size):
+        """Caches value under key, evicting least recently used entries to stay within max_bytes"""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self.clock() + self.ttl_seconds, value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _oldest = next(iter(self._entries))
+                self._remove(_oldest)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Removes key from the cache"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Removes every entry and resets the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def statistics(self):
+        """Returns the counters of the cache"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self.size
+        }
+
+    def _remove(self, key):
+        _entry = self._entries.pop(key)
+        self.size -= _entry[2]
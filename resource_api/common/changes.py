@@ -0,0 +1,107 @@
+"""
+Change notifications from the Dynamo DB stream of the resource table. Every write of a
+resource replaces its latest item, so the records of latest items are the changes of the
+resources, one per version, and the records of the versions written alongside them are
+skipped. The records of one resource within a batch are coalesced into one notification of
+its newest version, naming the top level attributes that differ from the version before
+the batch, so consumers learn what changed without fetching the resource or its history.
+Offloaded attributes are compared by object key, which names their content.
+"""
+
+from .constants import Constants
+from .versions import is_latest_item
+from .wire import from_wire, from_wire_item
+
+_MISSING = object()
+
+
+def content(image):
+    """
+    Returns the attributes of a latest item image that are content of the resource, as
+    Python values, with each offloaded attribute given by its object key
+    """
+    _content = {_name: from_wire(_value) for _name, _value in image.items()
+                if _name not in Constants.change_ignored_fields()}
+    _offloaded = image.get(Constants.ddb_field_offloaded())
+    if _offloaded is not None:
+        _content.update(from_wire(_offloaded))
+    return _content
+
+
+def changed_fields(old_image, new_image):
+    """
+    Returns the sorted names of the top level attributes added, removed or changed between
+    two latest item images. Without an old image, as for a new resource, every attribute is.
+    """
+    _old = content(old_image or {})
+    _new = content(new_image)
+    return sorted(_name for _name in set(_old) | set(_new) if _old.get(_name, _MISSING) != _new.get(_name, _MISSING))
+
+
+class Change:
+    """The records of the latest item of one resource within a batch"""
+
+    def __init__(self, identifier, sequence_number, old_image):
+        self.identifier = identifier
+        # Lambda retries a batch from the first record of a change whose notification failed.
+        self.sequence_number = sequence_number
+        self.old_image = old_image
+        self.new_image = None
+
+    def notification(self):
+        """
+        Returns the notification of the change: the identifier, the modified date of the
+        newest version and of the version before the batch, and the changed attributes. None
+        when the records leave the resource as it was.
+        """
+        _modified_date = from_wire(self.new_image[Constants.ddb_field_latest_modified_date()])
+        _previous = None
+        if self.old_image is not None:
+            _previous = from_wire(self.old_image[Constants.ddb_field_latest_modified_date()])
+        _changed = changed_fields(self.old_image, self.new_image)
+        if not _changed and _previous == _modified_date:
+            return None
+        return {
+            Constants.ddb_field_identifier(): self.identifier,
+            Constants.ddb_field_modified_date(): _modified_date,
+            Constants.change_attribute_previous_modified_date(): _previous,
+            Constants.change_attribute_changed_fields(): _changed
+        }
+
+
+def lambda_config():
+    """
+    Returns a botocore Config for the SNS client in Lambda. A PublishBatch that times out is
+    retried with the whole stream batch, notifying its changes twice, so it waits longer and
+    retries more, adaptively under throttling, than DynamoDB.lambda_config.
+    """
+    from botocore.config import Config
+    return Config(connect_timeout=Constants.sns_connect_timeout_seconds(),
+                  read_timeout=Constants.sns_read_timeout_seconds(),
+                  tcp_keepalive=True,
+                  retries={'mode': 'adaptive', 'total_max_attempts': Constants.sns_max_attempts()})
+
+
+def coalesce(records):
+    """
+    Returns the changes the records of a stream batch make, one per resource in the order of
+    its first record. Only inserted and modified latest items count, so the versions and the
+    removals of expired versions are skipped. The stream must carry new and old images.
+    """
+    _changes = {}
+    for _record in records:
+        if _record.get(Constants.stream_event_name()) not in (Constants.stream_event_insert(),
+                                                              Constants.stream_event_modify()):
+            continue
+        _stream_record = _record[Constants.stream_dynamodb()]
+        _keys = from_wire_item(_stream_record[Constants.stream_keys()])
+        if not is_latest_item(_keys):
+            continue
+        _identifier = _keys[Constants.ddb_field_identifier()]
+        _change = _changes.get(_identifier)
+        if _change is None:
+            _change = Change(_identifier, _stream_record[Constants.stream_sequence_number()],
+                             _stream_record.get(Constants.stream_old_image()))
+            _changes[_identifier] = _change
+        _change.new_image = _stream_record[Constants.stream_new_image()]
+    return list(_changes.values())
@@ -0,0 +1,65 @@
+"""
+JSON encoding and decoding of request and response bodies. Encoding uses orjson,
+which requirements.txt installs with every function, and falls back to simplejson
+for anything orjson can not encode exactly.
+"""
+
+from decimal import Decimal
+
+import simplejson
+# JSONDecodeError is what loads raises.
+from simplejson import JSONDecodeError, RawJSON
+
+from . import metrics
+
+# Always installed with the functions; the guard only keeps the codec usable in a checkout without it.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson 3.9 and later can embed pre-encoded JSON, which keeps every digit of a Decimal.
+_FRAGMENT = getattr(orjson, 'Fragment', None)
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        if _FRAGMENT is not None:
+            return _FRAGMENT(str(value))
+        if value == value.to_integral_value():
+            return int(value)
+        raise TypeError('%s can not be encoded exactly by orjson' % type(value).__name__)
+    if isinstance(value, RawJSON) and _FRAGMENT is not None:
+        return _FRAGMENT(value.encoded_json)
+    raise TypeError('%s can not be encoded exactly by orjson' % type(value).__name__)
+
+
+def encoder():
+    """Returns the name of the library encoding with dumps"""
+    return 'simplejson' if orjson is None else 'orjson'
+
+
+def dumps(value):
+    """
+    Returns value as a JSON string. Decimals keep their exact value. With orjson the
+    output is compact and not limited to ASCII.
+    """
+    with metrics.timer(metrics.METRIC_SERIALIZE):
+        if orjson is not None:
+            try:
+                return orjson.dumps(value, default=_default).decode('utf-8')
+            except TypeError:
+                # Numbers beyond 64 bits, non-integral Decimals without orjson.Fragment and
+                # values simplejson knows how to encode, such as RawJSON.
+                pass
+        return simplejson.dumps(value)
+
+
+def loads(text):
+    """
+    Returns the value of a JSON string, with numbers that are not integers as Decimals,
+    which Dynamo DB accepts. simplejson parses them exactly; orjson would round them to
+    floats first.
+    """
+    with metrics.timer(metrics.METRIC_PARSE):
+        return simplejson.loads(text, use_decimal=True)
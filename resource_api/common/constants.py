@@ -34,6 +34,211 @@ class Constants:
         """Returns the key for the identifier element of an event"""
         return 'identifier'
 
+    @staticmethod
+    def event_query_string_parameters():
+        """Returns the key for the query string parameters element of an event"""
+        return 'queryStringParameters'
+
+    @staticmethod
+    def event_path_parameter_owner():
+        """Returns the key for the owner element of the path parameters of a listing by owner"""
+        return 'owner'
+
+    @staticmethod
+    def event_path_parameter_status():
+        """Returns the key for the status element of the path parameters of a listing by status"""
+        return 'status'
+
+    @staticmethod
+    def event_query_parameter_history():
+        """Returns the key for the query parameter requesting the full version history"""
+        return 'history'
+
+    @staticmethod
+    def event_query_parameter_page_size():
+        """Returns the key for the query parameter holding the page size of a version listing"""
+        return 'pageSize'
+
+    @staticmethod
+    def event_query_parameter_cursor():
+        """Returns the key for the query parameter holding the cursor of a version listing"""
+        return 'cursor'
+
+    @staticmethod
+    def event_query_parameter_modified_from():
+        """Returns the key for the query parameter holding the lower modified date bound"""
+        return 'from'
+
+    @staticmethod
+    def event_query_parameter_modified_to():
+        """Returns the key for the query parameter holding the upper modified date bound"""
+        return 'to'
+
+    @staticmethod
+    def event_query_parameter_fields():
+        """Returns the key for the query parameter listing the fields to return"""
+        return 'fields'
+
+    @staticmethod
+    def projection_max_fields():
+        """Returns the maximum number of fields in a projection"""
+        return 20
+
+    @staticmethod
+    def event_resource():
+        """Returns the key for the resource path template element of an event"""
+        return 'resource'
+
+    @staticmethod
+    def event_path():
+        """Returns the key for the path element of an event"""
+        return 'path'
+
+    @staticmethod
+    def resource_path_versions():
+        """Returns the path suffix of the version listing of a resource"""
+        return '/versions'
+
+    @staticmethod
+    def resource_path_root():
+        """Returns the resource path template of inserts"""
+        return '/'
+
+    @staticmethod
+    def resource_path_bulk():
+        """Returns the resource path template of bulk inserts"""
+        return '/bulk'
+
+    @staticmethod
+    def resource_path_batch():
+        """Returns the resource path template of batch fetches"""
+        return '/batch'
+
+    @staticmethod
+    def resource_path_identifier():
+        """Returns the resource path template of a single resource"""
+        return '/{identifier}'
+
+    @staticmethod
+    def resource_path_identifier_versions():
+        """Returns the resource path template of the version listing of a resource"""
+        return '/{identifier}/versions'
+
+    @staticmethod
+    def resource_path_owner():
+        """Returns the resource path template of the listing of the latest versions by owner"""
+        return '/owner/{owner}'
+
+    @staticmethod
+    def resource_path_status():
+        """Returns the resource path template of the listing of the latest versions by status"""
+        return '/status/{status}'
+
+    @staticmethod
+    def versions_default_page_size():
+        """Returns the default number of versions in one page of a version listing"""
+        return 25
+
+    @staticmethod
+    def versions_max_page_size():
+        """Returns the maximum number of versions in one page of a version listing"""
+        return 100
+
+    @staticmethod
+    def list_default_page_size():
+        """Returns the default number of resources in one page of a listing by owner or status"""
+        return 25
+
+    @staticmethod
+    def list_max_page_size():
+        """Returns the maximum number of resources in one page of a listing by owner or status"""
+        return 100
+
+    @staticmethod
+    def response_attribute_name_cursor():
+        """Returns the key holding the cursor of the next page in a listing response"""
+        return 'Cursor'
+
+    @staticmethod
+    def event_body_identifiers():
+        """Returns the key for the list of identifiers in the body of a batch event"""
+        return 'identifiers'
+
+    @staticmethod
+    def batch_fetch_max_identifiers():
+        """Returns the maximum number of identifiers in one batch fetch"""
+        return 200
+
+    @staticmethod
+    def batch_fetch_max_workers():
+        """Returns the number of concurrent Dynamo DB lookups in one batch fetch"""
+        return 16
+
+    @staticmethod
+    def response_attribute_name_not_found():
+        """Returns the key listing identifiers that were not found in a batch response"""
+        return 'NotFound'
+
+    @staticmethod
+    def event_headers():
+        """Returns the key for the headers element of an event"""
+        return 'headers'
+
+    @staticmethod
+    def ddb_batch_write_max_items():
+        """Returns the maximum number of items in one Dynamo DB BatchWriteItem call"""
+        return 25
+
+    @staticmethod
+    def ddb_batch_get_max_keys():
+        """Returns the maximum number of keys in one Dynamo DB BatchGetItem call"""
+        return 100
+
+    @staticmethod
+    def ddb_batch_max_attempts():
+        """Returns the number of attempts at writing or reading unprocessed batch items"""
+        return 5
+
+    @staticmethod
+    def ddb_batch_backoff_seconds():
+        """Returns the base delay of the exponential backoff between batch attempts"""
+        return 0.05
+
+    @staticmethod
+    def ddb_max_pool_connections():
+        """Returns the size of the connection pool, enough for every batch fetch worker"""
+        return 16
+
+    @staticmethod
+    def ddb_connect_timeout_seconds():
+        """Returns the time to wait for a connection to Dynamo DB"""
+        return 1
+
+    @staticmethod
+    def ddb_read_timeout_seconds():
+        """Returns the time to wait for a Dynamo DB response, well within the function timeout"""
+        return 2
+
+    @staticmethod
+    def ddb_max_attempts():
+        """Returns the number of attempts of a Dynamo DB call, including the first"""
+        return 3
+
+    @staticmethod
+    def ddb_retry_mode():
+        """Returns the botocore retry mode"""
+        return 'standard'
+
+    @staticmethod
+    def response_attribute_name_results():
+        """Returns the key holding the per-item results of a bulk response"""
+        return 'Results'
+
+    @staticmethod
+    def response_attribute_name_error():
+        """Returns the key holding the error message of a per-item result"""
+        return 'error'
+
     @staticmethod
     def event_identifier():
         """Returns the key for the identifier element of an event"""
@@ -54,6 +259,16 @@ class Constants:
         """Returns the headers key for Response objects"""
         return 'headers'
 
+    @staticmethod
+    def response_is_base64_encoded():
+        """Returns the key telling whether the body of Response objects is base64 encoded"""
+        return 'isBase64Encoded'
+
+    @staticmethod
+    def event_is_base64_encoded():
+        """Returns the key telling whether the body of the event is base64 encoded"""
+        return 'isBase64Encoded'
+
     @staticmethod
     def ddb():
         """Returns AWS service name for Dynamo DB"""
@@ -69,6 +284,36 @@ class Constants:
         """Returns the Count key for a Dynamo DB response"""
         return 'Count'
 
+    @staticmethod
+    def ddb_response_attribute_name_last_evaluated_key():
+        """Returns the LastEvaluatedKey key for a Dynamo DB response"""
+        return 'LastEvaluatedKey'
+
+    @staticmethod
+    def ddb_response_attribute_name_unprocessed_items():
+        """Returns the UnprocessedItems key for a Dynamo DB batch write response"""
+        return 'UnprocessedItems'
+
+    @staticmethod
+    def ddb_error_transaction_canceled():
+        """Returns the error code of a cancelled Dynamo DB transaction"""
+        return 'TransactionCanceledException'
+
+    @staticmethod
+    def ddb_error_conditional_check_failed():
+        """Returns the cancellation reason code of a failed condition in a Dynamo DB transaction"""
+        return 'ConditionalCheckFailed'
+
+    @staticmethod
+    def ddb_error_conditional_check_failed_exception():
+        """Returns the error code of a failed condition in a single item Dynamo DB write"""
+        return 'ConditionalCheckFailedException'
+
+    @staticmethod
+    def ddb_error_validation():
+        """Returns the error code of a request Dynamo DB rejects as invalid"""
+        return 'ValidationException'
+
     @staticmethod
     def ddb_field_identifier():
         """Returns the NVA field name for identifier"""
@@ -79,6 +324,70 @@ class Constants:
         """Returns the NVA field name for modified date"""
         return 'modifiedDate'
 
+    @staticmethod
+    def ddb_field_latest_modified_date():
+        """Returns the field name holding the modified date of the version a latest item copies"""
+        return 'latestModifiedDate'
+
+    @staticmethod
+    def ddb_latest_version_sort_key():
+        """
+        Returns the modifiedDate sort key of the item holding the latest version of a resource.
+        It sorts before every RFC3339 date, so descending queries still see the newest version first.
+        """
+        return '#LATEST'
+
+    @staticmethod
+    def ddb_version_sort_key_lower_bound():
+        """Returns the lowest modifiedDate of a version, which excludes the latest item from queries"""
+        return '0'
+
+    @staticmethod
+    def ddb_field_expires_at():
+        """Returns the field name of the Dynamo DB time to live of superseded versions, in epoch seconds"""
+        return 'expiresAt'
+
+    @staticmethod
+    def ddb_field_version_base():
+        """Returns the field name of a delta encoded version holding the modified date of the version it applies to"""
+        return 'versionBase'
+
+    @staticmethod
+    def ddb_field_version_delta():
+        """Returns the field name of a delta encoded version holding its JSON Patch operations"""
+        return 'versionDelta'
+
+    @staticmethod
+    def ddb_field_delta_depth():
+        """Returns the field name of a latest item counting the delta encoded versions since the last full one"""
+        return 'deltaDepth'
+
+    @staticmethod
+    def ddb_index_owner():
+        """
+        Returns the name of the global secondary index of latest items by owner, sorted by the
+        modified date of their version. Versions have no latestModifiedDate and stay out of it.
+        """
+        return 'latestByOwner'
+
+    @staticmethod
+    def ddb_index_status():
+        """
+        Returns the name of the global secondary index of latest items by status, sorted by the
+        modified date of their version. Versions have no latestModifiedDate and stay out of it.
+        """
+        return 'latestByStatus'
+
+    @staticmethod
+    def ddb_field_owner():
+        """Returns the NVA field name for owner"""
+        return 'owner'
+
+    @staticmethod
+    def ddb_field_status():
+        """Returns the NVA field name for status"""
+        return 'status'
+
     @staticmethod
     def ddb_field_created_date():
         """Returns the NVA field name for created date"""
@@ -89,11 +398,318 @@ class Constants:
         """Returns the NVA field name for entity description"""
         return 'entityDescription'
 
+    @staticmethod
+    def ddb_field_file_set():
+        """Returns the NVA field name for file set"""
+        return 'fileSet'
+
+    @staticmethod
+    def ddb_field_offloaded():
+        """Returns the field name mapping the attributes of an item offloaded to the blob bucket to their object keys"""
+        return 'offloaded'
+
     @staticmethod
     def error_insufficient_parameters():
         """Returns the NVA error text for insufficient parameters"""
         return 'Insufficient parameters'
 
+    @staticmethod
+    def error_invalid_page_size():
+        """Returns the NVA error text for an invalid page size"""
+        return 'Invalid page size'
+
+    @staticmethod
+    def error_invalid_cursor():
+        """Returns the NVA error text for an invalid cursor"""
+        return 'Invalid cursor'
+
+    @staticmethod
+    def error_invalid_identifiers():
+        """Returns the NVA error text for an invalid list of identifiers"""
+        return 'Expected a list of at most %d identifiers' % Constants.batch_fetch_max_identifiers()
+
+    @staticmethod
+    def error_invalid_resource():
+        """Returns the NVA error text for a resource without identifier and modified date"""
+        return 'Resource must be an object with identifier and modifiedDate'
+
+    @staticmethod
+    def error_duplicate_resource():
+        """Returns the NVA error text for a resource repeated within one bulk request"""
+        return 'Duplicate identifier and modifiedDate in request'
+
+    @staticmethod
+    def error_unprocessed_resource():
+        """Returns the NVA error text for a resource Dynamo DB did not process"""
+        return 'Resource was not processed by Dynamo DB, retry later'
+
+    @staticmethod
+    def error_precondition_failed():
+        """Returns the NVA error text for a modification based on an outdated version"""
+        return 'Resource has been modified since the version given in If-Match'
+
+    @staticmethod
+    def env_var_compression_min_bytes():
+        """Returns the key name for the environment variable with the smallest body size to compress"""
+        return 'COMPRESSION_MIN_BYTES'
+
+    @staticmethod
+    def compression_default_min_bytes():
+        """Returns the smallest body size to compress when COMPRESSION_MIN_BYTES is not set"""
+        return 1024
+
+    @staticmethod
+    def compression_gzip_level():
+        """Returns the gzip compression level, a trade of CPU time for bytes, see benchmarks/compression.py"""
+        return 1
+
+    @staticmethod
+    def compression_brotli_quality():
+        """Returns the Brotli quality, a trade of CPU time for bytes, see benchmarks/compression.py"""
+        return 1
+
+    @staticmethod
+    def env_var_cache_max_age():
+        """Returns the key name for the environment variable with the Cache-Control max-age of fetches"""
+        return 'CACHE_MAX_AGE'
+
+    @staticmethod
+    def cache_default_max_age():
+        """Returns the default Cache-Control max-age of fetches, in seconds; 0 makes caches revalidate"""
+        return 0
+
+    @staticmethod
+    def env_var_ddb_fast_path():
+        """Returns the key name for the environment variable making reads use the low-level Dynamo DB client"""
+        return 'DDB_FAST_PATH'
+
+    @staticmethod
+    def env_var_fetch_cache_ttl_seconds():
+        """Returns the key name for the environment variable enabling the fetch cache with a time to live"""
+        return 'FETCH_CACHE_TTL_SECONDS'
+
+    @staticmethod
+    def env_var_fetch_cache_max_bytes():
+        """Returns the key name for the environment variable bounding the size of the fetch cache"""
+        return 'FETCH_CACHE_MAX_BYTES'
+
+    @staticmethod
+    def fetch_cache_default_max_bytes():
+        """Returns the default size bound of the fetch cache, in bytes"""
+        return 16 * 1024 * 1024
+
+    @staticmethod
+    def error_invalid_fields():
+        """Returns the NVA error text for an invalid list of fields"""
+        return 'Invalid fields, expected at most %d comma separated attribute paths' % Constants.projection_max_fields()
+
+    @staticmethod
+    def error_unsupported_operation():
+        """Returns the NVA error text for a method and path no resource operation handles"""
+        return 'No resource operation for %s %s'
+
+    @staticmethod
+    def error_patch_conflict():
+        """Returns the NVA error text for a patch whose tests or target paths do not hold"""
+        return 'Patch could not be applied to the latest version of the resource'
+
+    @staticmethod
+    def env_var_versions_max_age_days():
+        """Returns the key name for the environment variable with the days superseded versions are kept"""
+        return 'VERSIONS_MAX_AGE_DAYS'
+
+    @staticmethod
+    def env_var_versions_max_count():
+        """Returns the key name for the environment variable with the number of versions kept per resource"""
+        return 'VERSIONS_MAX_COUNT'
+
+    @staticmethod
+    def env_var_versions_snapshot_interval():
+        """Returns the key name for the environment variable with how often a delta encoded version is stored in full"""
+        return 'VERSIONS_SNAPSHOT_INTERVAL'
+
+    @staticmethod
+    def delta_chain_page_size():
+        """Returns the number of versions read at a time back to the full version delta encoded ones apply to"""
+        return 25
+
+    @staticmethod
+    def env_var_blob_bucket():
+        """Returns the key name for the environment variable with the bucket large attributes are offloaded to"""
+        return 'BLOB_BUCKET'
+
+    @staticmethod
+    def env_var_blob_min_bytes():
+        """Returns the key name for the environment variable with the smallest attribute size to offload"""
+        return 'BLOB_MIN_BYTES'
+
+    @staticmethod
+    def env_var_blob_endpoint_url():
+        """Returns the key name for the environment variable with the endpoint of an S3 compatible blob store"""
+        return 'BLOB_ENDPOINT_URL'
+
+    @staticmethod
+    def blob_default_min_bytes():
+        """Returns the smallest attribute size to offload without BLOB_MIN_BYTES, see benchmarks/blob_offload.py"""
+        return 32 * 1024
+
+    @staticmethod
+    def blob_offloaded_fields():
+        """Returns the names of the attributes that are offloaded to the blob bucket when large"""
+        return Constants.ddb_field_entity_description(), Constants.ddb_field_file_set()
+
+    @staticmethod
+    def blob_key_prefix():
+        """Returns the prefix of the object keys of offloaded attributes"""
+        return 'blobs/'
+
+    @staticmethod
+    def blob_cache_max_bytes():
+        """Returns the size bound of the in-process cache of offloaded attributes, in bytes"""
+        return 16 * 1024 * 1024
+
+    @staticmethod
+    def blob_connect_timeout_seconds():
+        """Returns the time to wait for a connection to the blob store"""
+        return 2
+
+    @staticmethod
+    def blob_read_timeout_seconds():
+        """Returns the time to wait for a blob store response, long enough to stream an object of several MB"""
+        return 10
+
+    @staticmethod
+    def blob_url_expiry_seconds():
+        """Returns how long the presigned URLs of offloaded attributes are valid"""
+        return 900
+
+    @staticmethod
+    def event_query_parameter_blobs():
+        """Returns the key for the query parameter that, set to link, returns offloaded attributes as URLs"""
+        return 'blobs'
+
+    @staticmethod
+    def blobs_link():
+        """Returns the value of the blobs query parameter that returns offloaded attributes as presigned URLs"""
+        return 'link'
+
+    @staticmethod
+    def supersede_max_attempts():
+        """Returns the number of times a modification is retried when another one supersedes the same version"""
+        return 3
+
+    @staticmethod
+    def env_var_change_topic_arn():
+        """Returns the key name for the environment variable with the topic change notifications are published to"""
+        return 'CHANGE_TOPIC_ARN'
+
+    @staticmethod
+    def stream_records():
+        """Returns the key for the records of a Dynamo DB Streams event"""
+        return 'Records'
+
+    @staticmethod
+    def stream_event_name():
+        """Returns the key for the kind of change of a stream record"""
+        return 'eventName'
+
+    @staticmethod
+    def stream_event_insert():
+        """Returns the event name of a stream record of a new item"""
+        return 'INSERT'
+
+    @staticmethod
+    def stream_event_modify():
+        """Returns the event name of a stream record of a replaced item"""
+        return 'MODIFY'
+
+    @staticmethod
+    def stream_dynamodb():
+        """Returns the key for the change of a stream record"""
+        return 'dynamodb'
+
+    @staticmethod
+    def stream_keys():
+        """Returns the key for the primary key of the item of a stream record"""
+        return 'Keys'
+
+    @staticmethod
+    def stream_new_image():
+        """Returns the key for the item after the change of a stream record"""
+        return 'NewImage'
+
+    @staticmethod
+    def stream_old_image():
+        """Returns the key for the item before the change of a stream record"""
+        return 'OldImage'
+
+    @staticmethod
+    def stream_sequence_number():
+        """Returns the key for the sequence number of a stream record"""
+        return 'SequenceNumber'
+
+    @staticmethod
+    def response_attribute_name_batch_item_failures():
+        """Returns the key for the records Lambda retries in the response to a stream event"""
+        return 'batchItemFailures'
+
+    @staticmethod
+    def response_attribute_name_item_identifier():
+        """Returns the key for the sequence number of a record Lambda retries from"""
+        return 'itemIdentifier'
+
+    @staticmethod
+    def change_attribute_previous_modified_date():
+        """Returns the key for the modified date of the version a change notification supersedes"""
+        return 'previousModifiedDate'
+
+    @staticmethod
+    def change_attribute_changed_fields():
+        """Returns the key for the top level attributes a change notification reports changed"""
+        return 'changedFields'
+
+    @staticmethod
+    def change_ignored_fields():
+        """Returns the attributes of latest items that are bookkeeping rather than content of the resource"""
+        return [Constants.ddb_field_identifier(), Constants.ddb_field_modified_date(),
+                Constants.ddb_field_latest_modified_date(), Constants.ddb_field_delta_depth(),
+                Constants.ddb_field_expires_at(), Constants.ddb_field_offloaded()]
+
+    @staticmethod
+    def sns_publish_batch_max_entries():
+        """Returns the maximum number of messages SNS publishes in one PublishBatch"""
+        return 10
+
+    @staticmethod
+    def sns_connect_timeout_seconds():
+        """Returns the time to wait for a connection to SNS"""
+        return 2
+
+    @staticmethod
+    def sns_read_timeout_seconds():
+        """Returns the time to wait for an SNS response, long enough for a throttled PublishBatch to a FIFO topic"""
+        return 10
+
+    @staticmethod
+    def sns_max_attempts():
+        """Returns the number of attempts of an SNS call, including the first"""
+        return 5
+
+    @staticmethod
+    def env_var_metrics_enabled():
+        """Returns the key name for the environment variable making handlers log metrics of every request"""
+        return 'METRICS_ENABLED'
+
+    @staticmethod
+    def env_var_metrics_namespace():
+        """Returns the key name for the environment variable with the CloudWatch namespace of the metrics"""
+        return 'METRICS_NAMESPACE'
+
+    @staticmethod
+    def metrics_default_namespace():
+        """Returns the CloudWatch namespace of the metrics when METRICS_NAMESPACE is not set"""
+        return 'NVA/ResourceApi'
+
     @staticmethod
     def env_var_allowed_origin():
         """Returns the key name for allowed origin environment variable"""
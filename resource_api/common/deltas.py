@@ -0,0 +1,167 @@
+"""
+Delta encoding of versions. Instead of a full copy, a version may be stored as the JSON
+Patch (RFC 6902) operations turning the version before it into it, with every so many
+versions stored in full again, so reading any version applies a bounded number of deltas.
+A delta encoded version keeps its key, the modified date of the version it applies to and
+its operations as one JSON string. The latest item always holds its version in full, and
+counts the delta encoded versions since the last full one.
+"""
+
+import copy
+
+from .codec import dumps, loads
+from .constants import Constants
+
+_OPERATION_ADD = 'add'
+_OPERATION_REPLACE = 'replace'
+_OPERATION_REMOVE = 'remove'
+# Attributes of a stored version that are not part of the document a delta applies to.
+_NOT_CONTENT = (Constants.ddb_field_modified_date(), Constants.ddb_field_expires_at(),
+                Constants.ddb_field_version_base(), Constants.ddb_field_version_delta(),
+                Constants.ddb_field_delta_depth())
+
+
+class DeltaEncoding:
+    """Stores versions as deltas, with one in every snapshot_interval stored in full"""
+
+    def __init__(self, snapshot_interval):
+        self.snapshot_interval = snapshot_interval
+
+    @staticmethod
+    def from_environment(environment):
+        """
+        Returns the delta encoding set by VERSIONS_SNAPSHOT_INTERVAL, or None when it is
+        below 2 and every version is stored in full
+        """
+        _snapshot_interval = int(environment.get(Constants.env_var_versions_snapshot_interval()) or 0)
+        if _snapshot_interval < 2:
+            return None
+        return DeltaEncoding(_snapshot_interval)
+
+    def depth(self, latest, modified_date):
+        """
+        Returns the number of delta encoded versions since the last full one a new version
+        with the given modified date makes, given the latest item it supersedes, or 0 when it
+        is stored in full. Versions that do not come after the one they supersede are stored
+        in full, so deltas always apply forward in modified date order.
+        """
+        if latest is None or modified_date <= latest[Constants.ddb_field_latest_modified_date()]:
+            return 0
+        _depth = int(latest.get(Constants.ddb_field_delta_depth(), 0)) + 1
+        return 0 if _depth >= self.snapshot_interval else _depth
+
+
+def _escape(name):
+    return name.replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(segment):
+    return segment.replace('~1', '/').replace('~0', '~')
+
+
+def _diff(old, new, pointer, operations):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for _name, _value in old.items():
+            if _name not in new:
+                operations.append({'op': _OPERATION_REMOVE, 'path': pointer + '/' + _escape(_name)})
+            else:
+                _diff(_value, new[_name], pointer + '/' + _escape(_name), operations)
+        for _name, _value in new.items():
+            if _name not in old:
+                operations.append({'op': _OPERATION_ADD, 'path': pointer + '/' + _escape(_name), 'value': _value})
+    elif isinstance(old, list) and isinstance(new, list):
+        _common = min(len(old), len(new))
+        for _index in range(_common):
+            _diff(old[_index], new[_index], '%s/%d' % (pointer, _index), operations)
+        # Removed from the end, so the indexes of the elements still to remove hold.
+        for _index in range(len(old) - 1, _common - 1, -1):
+            operations.append({'op': _OPERATION_REMOVE, 'path': '%s/%d' % (pointer, _index)})
+        for _value in new[_common:]:
+            operations.append({'op': _OPERATION_ADD, 'path': pointer + '/-', 'value': _value})
+    elif isinstance(old, bool) != isinstance(new, bool) or old != new:
+        operations.append({'op': _OPERATION_REPLACE, 'path': pointer, 'value': new})
+
+
+def diff(old, new):
+    """
+    Returns the JSON Patch operations turning one document into another. Lists are compared
+    element by element, so appending to a list adds only the new elements.
+    """
+    _operations = []
+    _diff(old, new, '', _operations)
+    return _operations
+
+
+def patch(document, operations):
+    """Returns a copy of a document with the add, replace and remove operations of diff applied"""
+    _document = copy.deepcopy(document)
+    for _operation in operations:
+        _segments = [_unescape(_segment) for _segment in _operation['path'].split('/')[1:]]
+        if not _segments:
+            _document = copy.deepcopy(_operation['value'])
+            continue
+        _parent = _document
+        for _segment in _segments[:-1]:
+            _parent = _parent[int(_segment)] if isinstance(_parent, list) else _parent[_segment]
+        _last = _segments[-1]
+        _op = _operation['op']
+        if isinstance(_parent, list):
+            if _op == _OPERATION_ADD and _last == '-':
+                _parent.append(copy.deepcopy(_operation['value']))
+            elif _op == _OPERATION_ADD:
+                _parent.insert(int(_last), copy.deepcopy(_operation['value']))
+            elif _op == _OPERATION_REMOVE:
+                del _parent[int(_last)]
+            else:
+                _parent[int(_last)] = copy.deepcopy(_operation['value'])
+        elif _op == _OPERATION_REMOVE:
+            del _parent[_last]
+        else:
+            _parent[_last] = copy.deepcopy(_operation['value'])
+    return _document
+
+
+def _content(version):
+    return {_name: _value for _name, _value in version.items() if _name not in _NOT_CONTENT}
+
+
+def is_delta(item):
+    """Tells whether a version item is delta encoded rather than a full copy"""
+    return Constants.ddb_field_version_base() in item
+
+
+def delta_item(version, previous):
+    """Returns the delta encoded item of a version, given the full version before it"""
+    return {
+        Constants.ddb_field_identifier(): version[Constants.ddb_field_identifier()],
+        Constants.ddb_field_modified_date(): version[Constants.ddb_field_modified_date()],
+        Constants.ddb_field_version_base(): previous[Constants.ddb_field_modified_date()],
+        Constants.ddb_field_version_delta(): dumps(diff(_content(previous), _content(version)))
+    }
+
+
+def version_from_delta(previous, item):
+    """Returns the version a delta encoded item holds, given the full version it applies to"""
+    _version = patch(_content(previous), loads(item[Constants.ddb_field_version_delta()]))
+    _version[Constants.ddb_field_modified_date()] = item[Constants.ddb_field_modified_date()]
+    if Constants.ddb_field_expires_at() in item:
+        _version[Constants.ddb_field_expires_at()] = item[Constants.ddb_field_expires_at()]
+    return _version
+
+
+def reconstruct(items):
+    """
+    Returns the versions of one resource held by the given version items, full or delta
+    encoded, by modified date. A delta encoded version is left out unless the version it
+    applies to is among the items too, directly or through other delta encoded ones.
+    """
+    _versions = {}
+    for _item in sorted(items, key=lambda _item: _item[Constants.ddb_field_modified_date()]):
+        if not is_delta(_item):
+            _versions[_item[Constants.ddb_field_modified_date()]] = _item
+            continue
+        # Looked up by date, as a version written out of order may sit between a delta and its base.
+        _base = _versions.get(_item[Constants.ddb_field_version_base()])
+        if _base is not None:
+            _versions[_item[Constants.ddb_field_modified_date()]] = version_from_delta(_base, _item)
+    return _versions
@@ -1,12 +1,14 @@
 """Module to provide simple, consistent access to AWS Dynamo DB"""
 
-import boto3
-from boto3 import Session
+import os
+import re
 
 from .constants import Constants
 
-_SESSION = Session()
-_REGIONS = _SESSION.get_available_regions(Constants.ddb())
+# Matches region names such as eu-west-1, us-gov-west-1 and cn-northwest-1. Checking the
+# name instead of asking botocore for the available regions avoids building a session and
+# loading its endpoint data at import time, on every cold start.
+_REGION_PATTERN = re.compile(r'^[a-z]{2}(-gov|-iso[a-z]?)?-[a-z]+-\d{1,2}$')
 
 
 class DynamoDB:
@@ -16,12 +18,43 @@ class DynamoDB:
     def _validate_region(region):
         """Validates the region input for DynamoDB"""
 
-        if region in _REGIONS:
+        if isinstance(region, str) and _REGION_PATTERN.match(region):
             _region = region
         else:
             raise ValueError('Region "%s" is invalid' % region)
         return _region
 
-    def connect(self, region):
-        """Returns a Dynamo DB Service Resource in a valid region"""
-        return boto3.resource(Constants.ddb(), self._validate_region(region))
+    def connect(self, region, config=None):
+        """Returns a Dynamo DB Service Resource in a valid region, with an optional botocore Config"""
+        _region = self._validate_region(region)
+        import boto3
+        return boto3.resource(Constants.ddb(), _region, config=config)
+
+    def connect_client(self, region, config=None):
+        """
+        Returns a low-level Dynamo DB client in a valid region. Unlike the Service Resource
+        it does not (de)serialize items, which stay in wire format.
+        """
+        _region = self._validate_region(region)
+        import boto3
+        return boto3.client(Constants.ddb(), _region, config=config)
+
+    @staticmethod
+    def lambda_config():
+        """
+        Returns a botocore Config for Lambda: a pool large enough for concurrent reads,
+        TCP keep-alive for connections idle between invocations, timeouts that fail fast
+        within the function timeout and the standard retry mode.
+        """
+        from botocore.config import Config
+        return Config(max_pool_connections=Constants.ddb_max_pool_connections(),
+                      connect_timeout=Constants.ddb_connect_timeout_seconds(),
+                      read_timeout=Constants.ddb_read_timeout_seconds(),
+                      tcp_keepalive=True,
+                      retries={'mode': Constants.ddb_retry_mode(),
+                               'total_max_attempts': Constants.ddb_max_attempts()})
+
+    @staticmethod
+    def fast_path_enabled():
+        """Tells whether reads should go through the low-level client, see connect_client"""
+        return os.environ.get(Constants.env_var_ddb_fast_path(), '').lower() == 'true'
@@ -1,19 +1,329 @@
 """Helper methods"""
 
+import base64
+import binascii
+import gzip
+import io
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+import simplejson as json
+
+from . import metrics
+from .codec import dumps
 from .constants import Constants
 from .http_constants import HttpConstants
 from os import environ
 
+# Always installed with the functions; without it, as in a bare checkout, responses are only gzipped.
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
-def response(status_code, body):
-    """Formulates a response with status code and body"""
-    headers = dict()
+
+def response(status_code, body, extra_headers=None, event=None):
+    """
+    Formulates a response with status code, body and optional extra headers. Given the
+    request event, bodies of at least COMPRESSION_MIN_BYTES are compressed with the
+    content coding its Accept-Encoding prefers, and base64 encoded.
+    """
+    headers = dict(extra_headers or {})
     if environ.get(Constants.env_var_allowed_origin()) is not None:
         headers[HttpConstants.http_header_access_control_allow_origin()] = environ.get(
             Constants.env_var_allowed_origin())
+        # Lets browsers on other origins read the validators they send back in If-Match and If-None-Match.
+        headers[HttpConstants.http_header_access_control_expose_headers()] = '%s,%s' % (
+            HttpConstants.http_header_etag(), HttpConstants.http_header_last_modified())
 
-    return {
+    _response = {
         Constants.response_status_code(): status_code,
         Constants.response_body(): body,
         Constants.response_headers(): headers
     }
+    if event is not None:
+        headers[HttpConstants.http_header_vary()] = HttpConstants.http_header_accept_encoding()
+        _coding = accepted_encoding(header(event, HttpConstants.http_header_accept_encoding()))
+        if _coding is not None and body:
+            _data = body.encode('utf-8')
+            if len(_data) >= compression_min_bytes():
+                with metrics.timer(metrics.METRIC_COMPRESS):
+                    _encoded = base64.b64encode(compress(_data, _coding)).decode('ascii')
+                # Base64 adds a third, which can outweigh what compression saved.
+                if len(_encoded) < len(_data):
+                    _response[Constants.response_body()] = _encoded
+                    _response[Constants.response_is_base64_encoded()] = True
+                    headers[HttpConstants.http_header_content_encoding()] = _coding
+    return _response
+
+
+def compression_min_bytes():
+    """Returns the smallest body size in bytes to compress"""
+    try:
+        return int(environ.get(Constants.env_var_compression_min_bytes(), Constants.compression_default_min_bytes()))
+    except ValueError:
+        return Constants.compression_default_min_bytes()
+
+
+def accepted_encoding(accept_encoding):
+    """
+    Returns the content coding to compress with for an Accept-Encoding header: br when
+    Brotli is installed and accepted at least as much as gzip, else gzip if accepted,
+    else None.
+    """
+    _qualities = {}
+    for _part in (accept_encoding or '').split(','):
+        _coding, _, _parameters = _part.partition(';')
+        _coding = _coding.strip().lower()
+        _quality = 1.0
+        for _parameter in _parameters.split(';'):
+            _name, _, _value = _parameter.partition('=')
+            if _name.strip().lower() == 'q':
+                try:
+                    _quality = float(_value)
+                except ValueError:
+                    _quality = 0.0
+        if _coding:
+            _qualities[_coding] = _quality
+    _any = _qualities.get('*', 0.0)
+    _gzip = _qualities.get(HttpConstants.content_coding_gzip(), _any)
+    _br = _qualities.get(HttpConstants.content_coding_br(), _any) if brotli is not None else 0.0
+    if _br > 0 and _br >= _gzip:
+        return HttpConstants.content_coding_br()
+    if _gzip > 0:
+        return HttpConstants.content_coding_gzip()
+    return None
+
+
+def compress(data, coding):
+    """Compresses bytes with the content coding br or gzip"""
+    if coding == HttpConstants.content_coding_br():
+        return brotli.compress(data, quality=Constants.compression_brotli_quality())
+    return gzip.compress(data, compresslevel=Constants.compression_gzip_level(), mtime=0)
+
+
+def decode_event(event):
+    """
+    Returns the event with its body decoded if API Gateway base64 encoded it, which it
+    does with every request body when binary media types are enabled for compression.
+    """
+    if not isinstance(event, dict) or not event.get(Constants.event_is_base64_encoded()) \
+            or not isinstance(event.get(Constants.event_body()), str):
+        return event
+    _event = dict(event)
+    _event[Constants.event_body()] = base64.b64decode(event[Constants.event_body()]).decode('utf-8')
+    _event[Constants.event_is_base64_encoded()] = False
+    return _event
+
+
+def header(event, name):
+    """Returns the value of a request header, matching the name case-insensitively"""
+    _headers = event.get(Constants.event_headers()) or {}
+    _name = name.lower()
+    for _key, _value in _headers.items():
+        if _key.lower() == _name:
+            return _value
+    return None
+
+
+def etag(modified_date):
+    """Returns the entity tag of the version of a resource with the given modified date"""
+    return '"%s"' % modified_date
+
+
+def parse_etags(header_value):
+    """
+    Returns the modified dates named by an If-Match style header, or None for '*'.
+    Weak tags are left out, as If-Match only matches strong tags.
+    """
+    if header_value.strip() == '*':
+        return None
+    _modified_dates = []
+    for _tag in header_value.split(','):
+        _tag = _tag.strip()
+        if len(_tag) >= 2 and _tag.startswith('"') and _tag.endswith('"'):
+            _modified_dates.append(_tag[1:-1])
+    return _modified_dates
+
+
+def etag_matches_any(header_value, modified_date):
+    """Tells whether an If-None-Match style header names the version, comparing tags weakly"""
+    if header_value.strip() == '*':
+        return True
+    for _tag in header_value.split(','):
+        _tag = _tag.strip()
+        if _tag.startswith('W/'):
+            _tag = _tag[2:]
+        if _tag == etag(modified_date):
+            return True
+    return False
+
+
+_RFC3339 = re.compile(r'^(\d{4}-\d{2}-\d{2})[Tt](\d{2}:\d{2}:\d{2})(\.\d+)?([Zz]|[+-]\d{2}:\d{2})$')
+
+
+def parse_rfc3339(value):
+    """Parses an RFC3339 date as used in modifiedDate, or returns None if it is not one"""
+    _match = _RFC3339.match(value or '')
+    if _match is None:
+        return None
+    _date, _time, _fraction, _offset = _match.groups()
+    _fraction = (_fraction or '.0')[1:7].ljust(6, '0')
+    _offset = '+00:00' if _offset in ('Z', 'z') else _offset
+    try:
+        return datetime.fromisoformat('%sT%s.%s%s' % (_date, _time, _fraction, _offset))
+    except ValueError:
+        return None
+
+
+def http_date(value):
+    """Formats a datetime as an HTTP date"""
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def parse_http_date(value):
+    """Parses an HTTP date, or returns None if it is not one"""
+    try:
+        _parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if _parsed is None:
+        return None
+    if _parsed.tzinfo is None:
+        _parsed = _parsed.replace(tzinfo=timezone.utc)
+    return _parsed
+
+
+_FIELD_SEGMENT = re.compile(r'^[A-Za-z0-9_-]+$')
+_MISSING = object()
+
+
+def projection(fields):
+    """
+    Turns a comma separated list of attribute paths, such as 'status,entityDescription.titles',
+    into ProjectionExpression and ExpressionAttributeNames query arguments. The key attributes
+    are always included.
+    """
+    _paths = [Constants.ddb_field_identifier(), Constants.ddb_field_modified_date()]
+    for _field in fields.split(','):
+        _field = _field.strip()
+        if _field and _field not in _paths:
+            _paths.append(_field)
+    if len(_paths) > Constants.projection_max_fields() + 2:
+        raise ValueError(Constants.error_invalid_fields())
+    # Dynamo DB rejects overlapping paths, and the parent already holds the nested one.
+    _paths = [_path for _path in _paths
+              if not any(_path.startswith(_parent + '.') for _parent in _paths)]
+
+    _names = {}
+    _placeholders = {}
+    _expressions = []
+    for _path in _paths:
+        _segments = _path.split('.')
+        if not all(_FIELD_SEGMENT.match(_segment) for _segment in _segments):
+            raise ValueError(Constants.error_invalid_fields())
+        _expression = []
+        for _segment in _segments:
+            if _segment not in _placeholders:
+                _placeholders[_segment] = '#f%d' % len(_placeholders)
+                _names[_placeholders[_segment]] = _segment
+            _expression.append(_placeholders[_segment])
+        _expressions.append('.'.join(_expression))
+    return {
+        'ProjectionExpression': ', '.join(_expressions),
+        'ExpressionAttributeNames': _names
+    }
+
+
+def project(item, projected):
+    """
+    Returns the attributes of an item that the query arguments of projection select, for
+    items that could not be projected by Dynamo DB
+    """
+    _names = projected['ExpressionAttributeNames']
+    _projected = {}
+    for _expression in projected['ProjectionExpression'].split(', '):
+        _segments = [_names[_placeholder] for _placeholder in _expression.split('.')]
+        _value = item
+        for _segment in _segments:
+            _value = _value.get(_segment, _MISSING) if isinstance(_value, dict) else _MISSING
+        if _value is _MISSING:
+            continue
+        _target = _projected
+        for _segment in _segments[:-1]:
+            _target = _target.setdefault(_segment, {})
+        _target[_segments[-1]] = _value
+    return _projected
+
+
+def extend_projection(projected, *fields):
+    """Returns the query arguments of a projection with the given top-level fields added, or none without one"""
+    if projected is None:
+        return {}
+    _names = dict(projected['ExpressionAttributeNames'])
+    _expressions = projected['ProjectionExpression'].split(', ')
+    for _field in fields:
+        if not any(_names.get(_expression) == _field for _expression in _expressions):
+            _names['#' + _field] = _field
+            _expressions.append('#' + _field)
+    return {
+        'ProjectionExpression': ', '.join(_expressions),
+        'ExpressionAttributeNames': _names
+    }
+
+
+def projected_fields(projected):
+    """Returns the top-level attributes the query arguments of projection select"""
+    _names = projected['ExpressionAttributeNames']
+    return {_names[_expression.split('.')[0]] for _expression in projected['ProjectionExpression'].split(', ')}
+
+
+def parse_page_size(page_size, default, maximum):
+    """Returns the page size given as a query parameter, default when it is not given"""
+    if page_size is None:
+        return default
+    try:
+        _page_size = int(page_size)
+    except ValueError:
+        raise ValueError(Constants.error_invalid_page_size())
+    if _page_size < 1 or _page_size > maximum:
+        raise ValueError(Constants.error_invalid_page_size())
+    return _page_size
+
+
+def encode_cursor(last_evaluated_key):
+    """Encodes a Dynamo DB LastEvaluatedKey as an opaque, URL safe cursor"""
+    if last_evaluated_key is None:
+        return None
+    _serialized = json.dumps(last_evaluated_key, sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(_serialized).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decodes a cursor made by encode_cursor back into an ExclusiveStartKey"""
+    try:
+        _last_evaluated_key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError(Constants.error_invalid_cursor())
+    if not isinstance(_last_evaluated_key, dict):
+        raise ValueError(Constants.error_invalid_cursor())
+    return _last_evaluated_key
+
+
+def serialize_page(items, cursor):
+    """
+    Serializes a page of items one item at a time, so the encoder never holds
+    more than a single item's intermediate representation.
+    """
+    _buffer = io.StringIO()
+    _buffer.write('{"%s": [' % Constants.ddb_response_attribute_name_items())
+    _count = 0
+    for _item in items:
+        if _count > 0:
+            _buffer.write(', ')
+        _buffer.write(dumps(_item))
+        _count += 1
+    _buffer.write('], "%s": %d, "%s": %s}' % (Constants.ddb_response_attribute_name_count(), _count,
+                                              Constants.response_attribute_name_cursor(), dumps(cursor)))
+    return _buffer.getvalue()
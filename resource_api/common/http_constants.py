@@ -19,7 +19,82 @@ class HttpConstants:
         """Returns the HTTP method name PUT"""
         return 'PUT'
 
+    @staticmethod
+    def http_method_patch():
+        """Returns the HTTP method name PATCH"""
+        return 'PATCH'
+
     @staticmethod
     def http_header_access_control_allow_origin():
         """Returns the string for CORS header Access-Control-Allow-Origin"""
         return 'Access-Control-Allow-Origin'
+
+    @staticmethod
+    def http_header_access_control_expose_headers():
+        """Returns the string for CORS header Access-Control-Expose-Headers"""
+        return 'Access-Control-Expose-Headers'
+
+    @staticmethod
+    def http_header_content_type():
+        """Returns the string for header Content-Type"""
+        return 'Content-Type'
+
+    @staticmethod
+    def media_type_ndjson():
+        """Returns the media type of newline delimited JSON"""
+        return 'application/x-ndjson'
+
+    @staticmethod
+    def http_header_etag():
+        """Returns the string for header ETag"""
+        return 'ETag'
+
+    @staticmethod
+    def http_header_if_match():
+        """Returns the string for header If-Match"""
+        return 'If-Match'
+
+    @staticmethod
+    def http_header_if_none_match():
+        """Returns the string for header If-None-Match"""
+        return 'If-None-Match'
+
+    @staticmethod
+    def http_header_if_modified_since():
+        """Returns the string for header If-Modified-Since"""
+        return 'If-Modified-Since'
+
+    @staticmethod
+    def http_header_last_modified():
+        """Returns the string for header Last-Modified"""
+        return 'Last-Modified'
+
+    @staticmethod
+    def http_header_cache_control():
+        """Returns the string for header Cache-Control"""
+        return 'Cache-Control'
+
+    @staticmethod
+    def http_header_accept_encoding():
+        """Returns the string for header Accept-Encoding"""
+        return 'Accept-Encoding'
+
+    @staticmethod
+    def http_header_content_encoding():
+        """Returns the string for header Content-Encoding"""
+        return 'Content-Encoding'
+
+    @staticmethod
+    def http_header_vary():
+        """Returns the string for header Vary"""
+        return 'Vary'
+
+    @staticmethod
+    def content_coding_gzip():
+        """Returns the string for content coding gzip"""
+        return 'gzip'
+
+    @staticmethod
+    def content_coding_br():
+        """Returns the string for content coding br (Brotli)"""
+        return 'br'
@@ -0,0 +1,229 @@
+"""Translation of JSON Patch (RFC 6902) documents into Dynamo DB update expressions"""
+
+import copy
+
+from .constants import Constants
+from .versions import Conflict
+
+_OPERATION_ADD = 'add'
+_OPERATION_REPLACE = 'replace'
+_OPERATION_REMOVE = 'remove'
+_OPERATION_TEST = 'test'
+_MISSING = object()
+_PROTECTED_FIELDS = (Constants.ddb_field_identifier(), Constants.ddb_field_modified_date(),
+                     Constants.ddb_field_latest_modified_date(), Constants.ddb_field_created_date(),
+                     Constants.ddb_field_delta_depth(), Constants.ddb_field_version_base(),
+                     Constants.ddb_field_version_delta(), Constants.ddb_field_offloaded(),
+                     Constants.ddb_field_expires_at())
+
+
+class UpdateBuilder:
+    """Collects SET and REMOVE actions and conditions with their placeholders"""
+
+    def __init__(self):
+        self.set_actions = []
+        self.remove_actions = []
+        self.conditions = []
+        self.names = {}
+        self.values = {}
+        self._placeholders = {}
+
+    def name(self, segment):
+        """Returns the placeholder of an attribute name"""
+        if segment not in self._placeholders:
+            self._placeholders[segment] = '#p%d' % len(self._placeholders)
+            self.names[self._placeholders[segment]] = segment
+        return self._placeholders[segment]
+
+    def value(self, value):
+        """Returns a new placeholder for a value"""
+        _placeholder = ':v%d' % len(self.values)
+        self.values[_placeholder] = value
+        return _placeholder
+
+    def path(self, segments):
+        """Returns the document path of the given segments"""
+        _path = self.name(segments[0])
+        for _segment in segments[1:]:
+            if isinstance(_segment, int):
+                _path += '[%d]' % _segment
+            else:
+                _path += '.' + self.name(_segment)
+        return _path
+
+    def arguments(self):
+        """Returns the UpdateExpression related arguments of an UpdateItem call"""
+        _clauses = []
+        if self.set_actions:
+            _clauses.append('SET ' + ', '.join(self.set_actions))
+        if self.remove_actions:
+            _clauses.append('REMOVE ' + ', '.join(self.remove_actions))
+        _arguments = {
+            'UpdateExpression': ' '.join(_clauses),
+            'ExpressionAttributeNames': self.names
+        }
+        if self.conditions:
+            _arguments['ConditionExpression'] = ' AND '.join(self.conditions)
+        if self.values:
+            _arguments['ExpressionAttributeValues'] = self.values
+        return _arguments
+
+
+def parse_pointer(pointer):
+    """
+    Splits a JSON pointer into path segments. Numeric segments address list elements
+    and a final '-' the end of a list, which is returned as None.
+    """
+    if not isinstance(pointer, str) or not pointer.startswith('/'):
+        raise ValueError('Invalid JSON pointer %s' % pointer)
+    _segments = []
+    for _segment in pointer[1:].split('/'):
+        _segment = _segment.replace('~1', '/').replace('~0', '~')
+        if _segment == '':
+            raise ValueError('Invalid JSON pointer %s' % pointer)
+        if _segment.isdigit() and _segments:
+            _segments.append(int(_segment))
+        elif _segment == '-' and _segments:
+            _segments.append(None)
+        else:
+            _segments.append(_segment)
+    if None in _segments[:-1]:
+        raise ValueError('Invalid JSON pointer %s' % pointer)
+    if _segments[0] in _PROTECTED_FIELDS:
+        raise ValueError('%s can not be patched' % _segments[0])
+    return _segments
+
+
+def parse_operation(operation):
+    """Returns the op, path segments and value of a JSON Patch operation, raising ValueError when it is invalid"""
+    if not isinstance(operation, dict):
+        raise ValueError('Invalid JSON Patch operation')
+    _op = operation.get('op')
+    _segments = parse_pointer(operation.get('path'))
+    if _op not in (_OPERATION_ADD, _OPERATION_REPLACE, _OPERATION_REMOVE, _OPERATION_TEST):
+        raise ValueError('Unsupported JSON Patch operation %s' % _op)
+    if _op in (_OPERATION_ADD, _OPERATION_REPLACE, _OPERATION_TEST) and 'value' not in operation:
+        raise ValueError('JSON Patch operation %s needs a value' % _op)
+    if _segments[-1] is None and _op != _OPERATION_ADD:
+        raise ValueError('JSON Patch operation %s can not address the end of a list' % _op)
+    return _op, _segments, operation.get('value')
+
+
+def _inserts(op, segments):
+    """Tells whether an operation adds at a list index, which inserts"""
+    return op == _OPERATION_ADD and isinstance(segments[-1], int)
+
+
+def apply_operation(builder, operation):
+    """Adds one JSON Patch operation to the builder"""
+    _op, _segments, _value = parse_operation(operation)
+    if _inserts(_op, _segments):
+        raise ValueError('JSON Patch operation add at a list index needs the document it inserts into')
+
+    if _op == _OPERATION_ADD and _segments[-1] is None:
+        _list = builder.path(_segments[:-1])
+        builder.set_actions.append('%s = list_append(%s, %s)' % (_list, _list, builder.value([_value])))
+    elif _op == _OPERATION_ADD:
+        builder.set_actions.append('%s = %s' % (builder.path(_segments), builder.value(_value)))
+    elif _op == _OPERATION_REPLACE:
+        _path = builder.path(_segments)
+        builder.conditions.append('attribute_exists(%s)' % _path)
+        builder.set_actions.append('%s = %s' % (_path, builder.value(_value)))
+    elif _op == _OPERATION_REMOVE:
+        _path = builder.path(_segments)
+        builder.conditions.append('attribute_exists(%s)' % _path)
+        builder.remove_actions.append(_path)
+    else:
+        builder.conditions.append('%s = %s' % (builder.path(_segments), builder.value(_value)))
+
+
+def _parse_operations(operations):
+    if not isinstance(operations, list) or len(operations) == 0:
+        raise ValueError('Expected a JSON Patch document')
+    return [parse_operation(_operation) for _operation in operations]
+
+
+def update_builder(operations, document=None):
+    """
+    Returns an UpdateBuilder holding every operation of a JSON Patch document. Dynamo DB can
+    only replace list elements, so a top level attribute an add at a list index inserts into
+    is set whole to its patched value instead, conditioned on its value in the document the
+    patch is applied to, which must then be given.
+    """
+    _operations = _parse_operations(operations)
+    _inserted = {_segments[0] for _op, _segments, _ in _operations if _inserts(_op, _segments)}
+    if _inserted and document is None:
+        raise ValueError('JSON Patch operation add at a list index needs the document it inserts into')
+    _builder = UpdateBuilder()
+    for _operation, (_, _segments, _) in zip(operations, _operations):
+        if _segments[0] not in _inserted:
+            apply_operation(_builder, _operation)
+    if _inserted:
+        _patched = apply(document, operations)
+        for _field in sorted(_inserted):
+            _name = _builder.name(_field)
+            if _field in document:
+                _builder.conditions.append('%s = %s' % (_name, _builder.value(document[_field])))
+            else:
+                _builder.conditions.append('attribute_not_exists(%s)' % _name)
+            if _field in _patched:
+                _builder.set_actions.append('%s = %s' % (_name, _builder.value(_patched[_field])))
+            else:
+                _builder.remove_actions.append(_name)
+    return _builder
+
+
+def _resolve(document, segments):
+    """Returns the value at the path of the given segments, or _MISSING"""
+    _value = document
+    for _segment in segments:
+        if isinstance(_value, dict) and isinstance(_segment, str):
+            _value = _value.get(_segment, _MISSING)
+        elif isinstance(_value, list) and isinstance(_segment, int) and _segment < len(_value):
+            _value = _value[_segment]
+        else:
+            return _MISSING
+    return _value
+
+
+def apply(document, operations):
+    """
+    Returns a copy of a document with a JSON Patch applied the way the update expression of
+    update_builder applies it to an item: tests and the targets of replace and remove are
+    checked against the document as it was, raising Conflict when one does not hold, adding
+    at a list index inserts, and adding beyond the end of a list appends. Paths Dynamo DB
+    would reject raise ValueError.
+    """
+    _operations = _parse_operations(operations)
+    for _op, _segments, _value in _operations:
+        _current = _resolve(document, _segments)
+        if _op in (_OPERATION_REPLACE, _OPERATION_REMOVE) and _current is _MISSING:
+            raise Conflict(Constants.error_patch_conflict())
+        if _op == _OPERATION_TEST and (_current is _MISSING or _current != _value):
+            raise Conflict(Constants.error_patch_conflict())
+
+    _document = copy.deepcopy(document)
+    for _op, _segments, _value in _operations:
+        if _op == _OPERATION_TEST:
+            continue
+        _parent = _resolve(_document, _segments[:-1])
+        _last = _segments[-1]
+        if _op == _OPERATION_REMOVE and _resolve(_parent, [_last]) is _MISSING:
+            raise Conflict(Constants.error_patch_conflict())
+        if isinstance(_parent, list) and (_last is None or isinstance(_last, int)):
+            if _op == _OPERATION_REMOVE:
+                del _parent[_last]
+            elif _op == _OPERATION_REPLACE:
+                _parent[_last] = copy.deepcopy(_value)
+            elif _last is None or _last >= len(_parent):
+                _parent.append(copy.deepcopy(_value))
+            else:
+                _parent.insert(_last, copy.deepcopy(_value))
+        elif isinstance(_parent, dict) and isinstance(_last, str):
+            if _op == _OPERATION_REMOVE:
+                del _parent[_last]
+            else:
+                _parent[_last] = copy.deepcopy(_value)
+        else:
+            raise ValueError('The document path %s is invalid' % '/'.join(str(_segment) for _segment in _segments))
+    return _document
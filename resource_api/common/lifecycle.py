@@ -0,0 +1,63 @@
+"""
+Objects built once per Lambda container and reused by its warm invocations: the
+Dynamo DB, S3 and SNS connections and the request handlers with their Table objects
+"""
+
+import os
+
+from . import metrics
+from .constants import Constants
+from .dynamo import DynamoDB
+
+_instances = {}
+
+
+def instance(key, factory):
+    """
+    Returns the object built by factory for key, calling factory on first use only.
+    Exceptions are raised to the caller and nothing is kept, so the next call tries again.
+    """
+    if key not in _instances:
+        _instances[key] = factory()
+    return _instances[key]
+
+
+def _instrumented_resource(resource):
+    metrics.instrument(resource.meta.client)
+    return resource
+
+
+def dynamodb():
+    """Returns the container's Dynamo DB Service Resource"""
+    return instance('dynamodb', lambda: _instrumented_resource(DynamoDB().connect(
+        os.environ[Constants.env_var_region()], DynamoDB.lambda_config())))
+
+
+def client():
+    """Returns the container's low-level Dynamo DB client, or None when the fast path is not enabled"""
+    if not DynamoDB.fast_path_enabled():
+        return None
+    return instance('client', lambda: metrics.instrument(DynamoDB().connect_client(
+        os.environ[Constants.env_var_region()], DynamoDB.lambda_config())))
+
+
+def s3():
+    """Returns the container's S3 client, for the bucket large attributes are offloaded to"""
+    import boto3
+    from .blobs import BlobStore
+    return instance('s3', lambda: boto3.client(
+        's3', region_name=os.environ[Constants.env_var_region()],
+        endpoint_url=os.environ.get(Constants.env_var_blob_endpoint_url()) or None, config=BlobStore.lambda_config()))
+
+
+def sns():
+    """Returns the container's SNS client, for the topic change notifications are published to"""
+    import boto3
+    from .changes import lambda_config
+    return instance('sns', lambda: boto3.client('sns', region_name=os.environ[Constants.env_var_region()],
+                                                config=lambda_config()))
+
+
+def reset():
+    """Forgets every object built, so the next invocation builds them again. Used by tests."""
+    _instances.clear()
@@ -0,0 +1,208 @@
+"""
+Per request instrumentation. With METRICS_ENABLED set to true, every invocation of
+an instrumented handler writes one line of CloudWatch Embedded Metric Format to the
+log: the time spent parsing, in Dynamo DB and serializing, the capacity Dynamo DB
+consumed, the payload sizes, whether the container was cold and, for fetches, whether
+the read cache was hit.
+"""
+
+import contextlib
+import functools
+import os
+import threading
+import time
+
+import simplejson
+
+from .constants import Constants
+
+METRIC_DURATION = 'Duration'
+METRIC_PARSE = 'Parse'
+METRIC_DYNAMODB = 'DynamoDB'
+METRIC_SERIALIZE = 'Serialize'
+METRIC_COMPRESS = 'Compress'
+METRIC_DYNAMODB_CALLS = 'DynamoDBCalls'
+METRIC_CONSUMED_READ_CAPACITY = 'ConsumedReadCapacityUnits'
+METRIC_CONSUMED_WRITE_CAPACITY = 'ConsumedWriteCapacityUnits'
+METRIC_REQUEST_BYTES = 'RequestBytes'
+METRIC_RESPONSE_BYTES = 'ResponseBytes'
+METRIC_COLD_START = 'ColdStart'
+METRIC_CACHE_HITS = 'CacheHits'
+METRIC_CACHE_MISSES = 'CacheMisses'
+
+_UNITS = {
+    METRIC_DURATION: 'Milliseconds',
+    METRIC_PARSE: 'Milliseconds',
+    METRIC_DYNAMODB: 'Milliseconds',
+    METRIC_SERIALIZE: 'Milliseconds',
+    METRIC_COMPRESS: 'Milliseconds',
+    METRIC_DYNAMODB_CALLS: 'Count',
+    METRIC_CONSUMED_READ_CAPACITY: 'Count',
+    METRIC_CONSUMED_WRITE_CAPACITY: 'Count',
+    METRIC_REQUEST_BYTES: 'Bytes',
+    METRIC_RESPONSE_BYTES: 'Bytes',
+    METRIC_COLD_START: 'Count',
+    METRIC_CACHE_HITS: 'Count',
+    METRIC_CACHE_MISSES: 'Count'
+}
+_TIMINGS = (METRIC_PARSE, METRIC_DYNAMODB, METRIC_SERIALIZE, METRIC_COMPRESS)
+
+# Operations that accept ReturnConsumedCapacity, and which of them consume read capacity.
+_CAPACITY_OPERATIONS = frozenset(['GetItem', 'PutItem', 'UpdateItem', 'DeleteItem', 'Query', 'Scan', 'BatchGetItem',
+                                  'BatchWriteItem', 'TransactGetItems', 'TransactWriteItems'])
+_READ_OPERATIONS = frozenset(['GetItem', 'Query', 'Scan', 'BatchGetItem', 'TransactGetItems'])
+_CONTEXT_START = 'metrics_start'
+
+_lock = threading.Lock()
+_recorder = None
+_cold = True
+
+
+class Recorder:
+    """Accumulates the measurements of one request, also from threads the request started"""
+
+    def __init__(self):
+        self.values = {_name: 0.0 for _name in _TIMINGS}
+        self.values[METRIC_DYNAMODB_CALLS] = 0
+        self.values[METRIC_CONSUMED_READ_CAPACITY] = 0.0
+        self.values[METRIC_CONSUMED_WRITE_CAPACITY] = 0.0
+
+    def add(self, name, value):
+        """Adds value to the metric name"""
+        with _lock:
+            self.values[name] = self.values.get(name, 0) + value
+
+
+def enabled():
+    """Tells whether instrumented handlers write metrics"""
+    return os.environ.get(Constants.env_var_metrics_enabled(), '').lower() == 'true'
+
+
+@contextlib.contextmanager
+def timer(name):
+    """Adds the time spent in the block to the metric name of the current request"""
+    _start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current = _recorder
+        if _current is not None:
+            _current.add(name, (time.perf_counter() - _start) * 1000.0)
+
+
+def count(name, value=1):
+    """Adds value to the metric name of the current request"""
+    _current = _recorder
+    if _current is not None:
+        _current.add(name, value)
+
+
+def consumed_capacity(operation, parsed):
+    """Returns the read and the write capacity units reported in a parsed Dynamo DB response"""
+    _consumed = parsed.get('ConsumedCapacity')
+    if _consumed is None:
+        return 0.0, 0.0
+    if isinstance(_consumed, dict):
+        _consumed = [_consumed]
+    _read = 0.0
+    _write = 0.0
+    for _capacity in _consumed:
+        if 'ReadCapacityUnits' in _capacity or 'WriteCapacityUnits' in _capacity:
+            _read += float(_capacity.get('ReadCapacityUnits', 0))
+            _write += float(_capacity.get('WriteCapacityUnits', 0))
+        elif operation in _READ_OPERATIONS:
+            _read += float(_capacity.get('CapacityUnits', 0))
+        else:
+            _write += float(_capacity.get('CapacityUnits', 0))
+    return _read, _write
+
+
+def _provide_client_params(params, model, context, **kwargs):
+    if _recorder is None:
+        return
+    context[_CONTEXT_START] = time.perf_counter()
+    if model.name in _CAPACITY_OPERATIONS:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def _after_call(context, model=None, parsed=None, **kwargs):
+    _current = _recorder
+    if _current is None or _CONTEXT_START not in context:
+        return
+    _current.add(METRIC_DYNAMODB, (time.perf_counter() - context.pop(_CONTEXT_START)) * 1000.0)
+    _current.add(METRIC_DYNAMODB_CALLS, 1)
+    if model is not None and parsed is not None:
+        _read, _write = consumed_capacity(model.name, parsed)
+        _current.add(METRIC_CONSUMED_READ_CAPACITY, _read)
+        _current.add(METRIC_CONSUMED_WRITE_CAPACITY, _write)
+
+
+def instrument(client):
+    """
+    Registers the hooks timing the calls of a Dynamo DB client and asking for the
+    capacity they consume. The hooks do nothing outside instrumented handlers.
+    """
+    client.meta.events.register('provide-client-params.dynamodb', _provide_client_params)
+    client.meta.events.register('after-call.dynamodb', _after_call)
+    client.meta.events.register('after-call-error.dynamodb', _after_call)
+    return client
+
+
+def _body_size(container):
+    _body = container.get(Constants.event_body()) if isinstance(container, dict) else None
+    return len(_body) if isinstance(_body, str) else 0
+
+
+def emit(function_name, values, event, context, result, cold):
+    """Writes the metrics of one request as a line of Embedded Metric Format"""
+    _values = dict(values)
+    _values[METRIC_REQUEST_BYTES] = _body_size(event)
+    _values[METRIC_RESPONSE_BYTES] = _body_size(result)
+    _values[METRIC_COLD_START] = 1 if cold else 0
+    _line = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': os.environ.get(Constants.env_var_metrics_namespace(),
+                                            Constants.metrics_default_namespace()),
+                'Dimensions': [['Function']],
+                'Metrics': [{'Name': _name, 'Unit': _UNITS[_name]} for _name in _values]
+            }]
+        },
+        'Function': function_name,
+        'RequestId': getattr(context, 'aws_request_id', None),
+        'HttpMethod': event.get(Constants.event_http_method()) if isinstance(event, dict) else None,
+        'StatusCode': int(result[Constants.response_status_code()])
+        if isinstance(result, dict) and Constants.response_status_code() in result else None
+    }
+    _line.update({_name: round(_value, 3) for _name, _value in _values.items()})
+    print(simplejson.dumps(_line))
+
+
+def instrumented(handler):
+    """
+    Decorates the handler of a function, named after its package, to write the
+    metrics of every invocation. A handler that raises is logged with no status code.
+    """
+    _function_name = handler.__module__.split('.')[-2]
+
+    @functools.wraps(handler)
+    def _handler(event, context):
+        global _cold, _recorder
+        _was_cold = _cold
+        _cold = False
+        if not enabled():
+            return handler(event, context)
+
+        _recorder = Recorder()
+        _result = None
+        _start = time.perf_counter()
+        try:
+            _result = handler(event, context)
+            return _result
+        finally:
+            _values = _recorder.values
+            _values[METRIC_DURATION] = (time.perf_counter() - _start) * 1000.0
+            _recorder = None
+            emit(_function_name, _values, event, context, _result, _was_cold)
+    return _handler
@@ -0,0 +1,72 @@
+"""
+Retention of superseded versions. A version is superseded when a newer one replaces it
+as the latest; the newest version of a resource is always kept. Versions superseded
+longer than a maximum age, and versions beyond a maximum count per resource, are
+removed: by Dynamo DB's time to live, which deletes items at no write cost once the
+modification superseding them stamps their expiry, and by the offline compaction job in
+tools.compact_versions for whatever that leaves behind.
+"""
+
+import time
+from datetime import timedelta
+
+from .constants import Constants
+from .helpers import parse_rfc3339
+
+
+class Retention:
+    """Keeps at most max_count versions per resource, and superseded versions for max_age"""
+
+    def __init__(self, max_age=None, max_count=None):
+        self.max_age = max_age
+        self.max_count = max_count
+
+    @staticmethod
+    def from_environment(environment):
+        """
+        Returns the retention set by VERSIONS_MAX_AGE_DAYS and VERSIONS_MAX_COUNT, or None
+        when neither is a positive number and every version is kept
+        """
+        _max_age_days = float(environment.get(Constants.env_var_versions_max_age_days()) or 0)
+        _max_count = int(environment.get(Constants.env_var_versions_max_count()) or 0)
+        if _max_age_days <= 0 and _max_count <= 0:
+            return None
+        return Retention(timedelta(days=_max_age_days) if _max_age_days > 0 else None,
+                         _max_count if _max_count > 0 else None)
+
+    def expires_at(self, superseded_at):
+        """Returns the time to live attribute value, in epoch seconds, of a version superseded at the given time"""
+        return int(superseded_at + self.max_age.total_seconds())
+
+    def superseded(self, modified_dates, now=None):
+        """
+        Returns the modified dates, given newest first, of the versions of one resource that
+        are past retention. A version counts as superseded from the modified date of the
+        version after it.
+        """
+        _now = time.time() if now is None else now
+        _expired = []
+        for _index, _modified_date in enumerate(modified_dates):
+            if _index == 0:
+                continue
+            if self.max_count is not None and _index >= self.max_count:
+                _expired.append(_modified_date)
+                continue
+            _superseded_at = parse_rfc3339(modified_dates[_index - 1])
+            if self.max_age is not None and _superseded_at is not None \
+                    and self.expires_at(_superseded_at.timestamp()) <= _now:
+                _expired.append(_modified_date)
+        return _expired
+
+
+def is_expired(item, now=None):
+    """Tells whether the time to live of an item has passed, which Dynamo DB may not have acted on yet"""
+    _expires_at = item.get(Constants.ddb_field_expires_at())
+    return _expires_at is not None and int(_expires_at) <= (time.time() if now is None else now)
+
+
+def not_expired_filter(now=None):
+    """Returns the filter condition leaving out versions whose time to live has passed"""
+    from boto3.dynamodb.conditions import Attr
+    _expires_at = Attr(Constants.ddb_field_expires_at())
+    return _expires_at.not_exists() | _expires_at.gt(int(time.time() if now is None else now))
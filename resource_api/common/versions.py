@@ -0,0 +1,84 @@
+"""
+Helpers for the latest item of a resource. Next to its versions, every resource has one item
+keyed by a fixed sort key that holds a copy of the newest version, so writes can condition on
+the resource's existence and current state without reading its history.
+"""
+
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from .constants import Constants
+
+
+class PreconditionFailed(Exception):
+    """Raised when a write is conditioned on a version that is no longer the latest"""
+
+
+class Conflict(Exception):
+    """Raised when a change does not apply to the latest version of a resource"""
+
+
+def latest_key(identifier):
+    """Returns the primary key of the latest item of a resource"""
+    return {
+        Constants.ddb_field_identifier(): identifier,
+        Constants.ddb_field_modified_date(): Constants.ddb_latest_version_sort_key()
+    }
+
+
+def latest_item(resource):
+    """Returns the latest item for the given version of a resource, which never expires"""
+    _item = dict(resource)
+    _item.pop(Constants.ddb_field_expires_at(), None)
+    _item[Constants.ddb_field_latest_modified_date()] = resource[Constants.ddb_field_modified_date()]
+    _item[Constants.ddb_field_modified_date()] = Constants.ddb_latest_version_sort_key()
+    return _item
+
+
+def resource_from_latest_item(item):
+    """
+    Returns the version of a resource copied into a latest item. Only keys are renamed or
+    dropped, so it works on wire format items as well.
+    """
+    _resource = dict(item)
+    _resource.pop(Constants.ddb_field_delta_depth(), None)
+    _resource[Constants.ddb_field_modified_date()] = _resource.pop(Constants.ddb_field_latest_modified_date())
+    return _resource
+
+
+def newer_than_latest(modified_date):
+    """
+    Returns the condition arguments of a write of a latest item that only replaces an older
+    one, so versions written out of order or by concurrent requests never move it back.
+    """
+    return {
+        'ConditionExpression': 'attribute_not_exists(#identifier) OR #latestModifiedDate < :modifiedDate',
+        'ExpressionAttributeNames': {
+            '#identifier': Constants.ddb_field_identifier(),
+            '#latestModifiedDate': Constants.ddb_field_latest_modified_date()
+        },
+        'ExpressionAttributeValues': {':modifiedDate': modified_date}
+    }
+
+
+def is_latest_item(item):
+    """Tells whether an item is the latest item of a resource rather than a version"""
+    return item.get(Constants.ddb_field_modified_date()) == Constants.ddb_latest_version_sort_key()
+
+
+def now():
+    """Returns the current time as an RFC3339 modified date"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def error_code(error):
+    """Returns the Dynamo DB error code of a ClientError"""
+    return error.response.get('Error', {}).get('Code')
+
+
+def cancellation_reasons(error):
+    """Returns the cancellation reason codes of a cancelled transaction, or None for other errors"""
+    if not isinstance(error, ClientError) or error_code(error) != Constants.ddb_error_transaction_canceled():
+        return None
+    return [_reason.get('Code') for _reason in error.response.get('CancellationReasons', [])]
@@ -0,0 +1,176 @@
+"""
+Conversion of Dynamo DB wire format items, as returned by the low-level client,
+straight to JSON, without building Python values of every nested attribute first
+"""
+
+import base64
+
+from simplejson import RawJSON
+from simplejson.encoder import encode_basestring_ascii
+
+from . import metrics
+
+
+def _dumps_string(data, chunks):
+    chunks.append(encode_basestring_ascii(data))
+
+
+def _dumps_number(data, chunks):
+    # Numbers travel as decimal strings, which are valid JSON numbers as they are.
+    chunks.append(data)
+
+
+def _dumps_binary(data, chunks):
+    chunks.append('"%s"' % base64.b64encode(data).decode('ascii'))
+
+
+def _dumps_bool(data, chunks):
+    chunks.append('true' if data else 'false')
+
+
+def _dumps_null(data, chunks):
+    chunks.append('null')
+
+
+def _dumps_map(data, chunks):
+    chunks.append('{')
+    _first = True
+    for _name, _value in data.items():
+        if not _first:
+            chunks.append(', ')
+        _first = False
+        chunks.append(encode_basestring_ascii(_name))
+        chunks.append(': ')
+        _dumps_value(_value, chunks)
+    chunks.append('}')
+
+
+def _dumps_list(data, chunks):
+    chunks.append('[')
+    _first = True
+    for _value in data:
+        if not _first:
+            chunks.append(', ')
+        _first = False
+        _dumps_value(_value, chunks)
+    chunks.append(']')
+
+
+def _dumps_set(dumps_element):
+    def _dumps(data, chunks):
+        chunks.append('[')
+        _first = True
+        for _element in data:
+            if not _first:
+                chunks.append(', ')
+            _first = False
+            dumps_element(_element, chunks)
+        chunks.append(']')
+    return _dumps
+
+
+_DUMPS = {
+    'S': _dumps_string,
+    'N': _dumps_number,
+    'B': _dumps_binary,
+    'BOOL': _dumps_bool,
+    'NULL': _dumps_null,
+    'M': _dumps_map,
+    'L': _dumps_list,
+    'SS': _dumps_set(_dumps_string),
+    'NS': _dumps_set(_dumps_number),
+    'BS': _dumps_set(_dumps_binary)
+}
+
+
+def _dumps_value(value, chunks):
+    for _type, _data in value.items():
+        _DUMPS[_type](_data, chunks)
+
+
+def dumps(value):
+    """
+    Serializes one wire format attribute value to JSON in a single pass. The output
+    equals simplejson.dumps of the deserialized value, except that sets become arrays
+    and binaries base64 strings, which simplejson can not serialize at all.
+    """
+    _chunks = []
+    _dumps_value(value, _chunks)
+    return ''.join(_chunks)
+
+
+def dumps_item(item):
+    """Serializes a wire format item to a JSON object"""
+    _chunks = []
+    _dumps_map(item, _chunks)
+    return ''.join(_chunks)
+
+
+def to_wire(value):
+    """Returns the wire format of a Python value"""
+    from boto3.dynamodb.types import TypeSerializer
+    return TypeSerializer().serialize(value)
+
+
+def from_wire(value):
+    """Returns the Python value of a wire format attribute value"""
+    from boto3.dynamodb.types import TypeDeserializer
+    return TypeDeserializer().deserialize(value)
+
+
+def to_wire_item(item):
+    """Returns the wire format of an item or key given as a dict of Python values"""
+    return {_name: to_wire(_value) for _name, _value in item.items()}
+
+
+def from_wire_item(item):
+    """Returns an item or key in wire format as a dict of Python values"""
+    return {_name: from_wire(_value) for _name, _value in item.items()}
+
+
+def query_arguments(table_name, query):
+    """Converts the keyword arguments of Table.query to those of a low-level client query"""
+    from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+    _query = dict(query, TableName=table_name)
+    _names = dict(_query.get('ExpressionAttributeNames') or {})
+    _values = dict(_query.get('ExpressionAttributeValues') or {})
+    # One builder numbers the placeholders of both expressions apart.
+    _builder = ConditionExpressionBuilder()
+    for _argument, _is_key_condition in (('KeyConditionExpression', True), ('FilterExpression', False)):
+        _condition = _query.get(_argument)
+        if isinstance(_condition, ConditionBase):
+            _expression = _builder.build_expression(_condition, is_key_condition=_is_key_condition)
+            _query[_argument] = _expression.condition_expression
+            _names.update(_expression.attribute_name_placeholders)
+            _values.update(_expression.attribute_value_placeholders)
+    if _names:
+        _query['ExpressionAttributeNames'] = _names
+    if _values:
+        _query['ExpressionAttributeValues'] = to_wire_item(_values)
+    if _query.get('ExclusiveStartKey') is not None:
+        _query['ExclusiveStartKey'] = to_wire_item(_query['ExclusiveStartKey'])
+    return _query
+
+
+class WireItem(RawJSON):
+    """
+    An item in wire format that simplejson embeds in its output as it is. Its
+    attributes read like those of a deserialized item.
+    """
+
+    def __init__(self, item):
+        with metrics.timer(metrics.METRIC_SERIALIZE):
+            super().__init__(dumps_item(item))
+        self.item = item
+
+    def __getitem__(self, name):
+        return from_wire(self.item[name])
+
+    def __contains__(self, name):
+        return name in self.item
+
+    def get(self, name, default=None):
+        """Returns the Python value of an attribute, or default if the item does not have it"""
+        if name not in self.item:
+            return default
+        return self[name]
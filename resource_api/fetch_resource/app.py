@@ -1,31 +1,57 @@
 import http
 import os
 
+from resource_api.common import lifecycle, metrics
+from resource_api.common.blobs import BlobStore
+from resource_api.common.cache import LRUCache
 from resource_api.common.constants import Constants
-from resource_api.common.dynamo import DynamoDB
 from resource_api.common.helpers import response
 
 from resource_api.fetch_resource.main.RequestHandler import RequestHandler
 
 
-_dynamodb = None
+def build_cache():
+    """
+    Returns the read cache shared by invocations of this container, or None when
+    FETCH_CACHE_TTL_SECONDS is not a positive number.
+    """
+    ttl_seconds = float(os.environ.get(Constants.env_var_fetch_cache_ttl_seconds(), 0))
+    if ttl_seconds <= 0:
+        return None
+    max_bytes = int(os.environ.get(Constants.env_var_fetch_cache_max_bytes(),
+                                   Constants.fetch_cache_default_max_bytes()))
+    return LRUCache(max_bytes, ttl_seconds)
 
 
-def handler(event, context):
+def cache():
+    """Returns the read cache of this container, built once per container"""
+    return lifecycle.instance(__name__ + '.cache', build_cache)
+
+
+def evict(identifier):
     """
-    Handler method for insert resource function.
+    Removes identifier from the read cache of this container. The resource router calls
+    it after writes, which in monolith mode run in the container that serves the reads.
     """
+    _cache = cache()
+    if _cache is not None:
+        _cache.invalidate(identifier)
+
 
-    global _dynamodb
-    if _dynamodb is None:
-        try:
-            ddb = DynamoDB()
-            _dynamodb = ddb.connect(os.environ[Constants.env_var_region()])
-        except Exception as e:
-            return response(http.HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+def build_request_handler():
+    """Returns the request handler, built once per container"""
+    return RequestHandler(lifecycle.dynamodb(), cache(), lifecycle.client(),
+                          BlobStore.from_environment(os.environ, lifecycle.s3))
+
+
+@metrics.instrumented
+def handler(event, context):
+    """
+    Handler method for fetch resource function.
+    """
 
     try:
-        request_handler = RequestHandler(_dynamodb)
+        request_handler = lifecycle.instance(__name__, build_request_handler)
     except Exception as e:
         return response(http.HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
     return request_handler.handler(event, context)
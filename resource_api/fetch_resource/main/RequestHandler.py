@@ -1,34 +1,335 @@
 import http
-import simplejson as json
 import os
+from typing import TYPE_CHECKING
 
-from boto3.dynamodb.conditions import Key
-from boto3_type_annotations.dynamodb import Table
+from resource_api.common import metrics
 from resource_api.common.http_constants import HttpConstants
 from resource_api.common.constants import Constants
+from resource_api.common.blobs import rehydrate_items
+from resource_api.common.codec import dumps
+from resource_api.common.deltas import is_delta, reconstruct
 
-from resource_api.common.helpers import response
+from resource_api.common.helpers import response, encode_cursor, decode_cursor, serialize_page, header, etag, \
+    etag_matches_any, parse_etags, parse_rfc3339, http_date, parse_http_date, projection, project, extend_projection, \
+    parse_page_size
+from resource_api.common.retention import not_expired_filter
+from resource_api.common.versions import latest_key, resource_from_latest_item
+from resource_api.common.wire import WireItem, from_wire_item, to_wire_item, query_arguments
+
+if TYPE_CHECKING:
+    from boto3_type_annotations.dynamodb import Table
 
 
 class RequestHandler:
 
-    def __init__(self, dynamodb=None):
+    def __init__(self, dynamodb=None, cache=None, client=None, blob_store=None):
 
         self.dynamodb = dynamodb
+        self.cache = cache
+        self.client = client
+        self.blob_store = blob_store
 
         self.table_name = os.environ.get(Constants.env_var_table_name())
-        self.table: Table = self.dynamodb.Table(self.table_name)
+        self.table: 'Table' = self.dynamodb.Table(self.table_name)
 
-    def __retrieve_resource(self, uuid):
-        _ddb_response = self.table.query(
-            KeyConditionExpression=Key(Constants.ddb_field_identifier()).eq(uuid),
-            ScanIndexForward=False
-        )
+    def __query(self, **query):
+        """
+        Queries the table, or the low-level client when there is one. Its items stay in
+        wire format and serialize to JSON without a round trip through Python values.
+        """
+        if self.client is None:
+            return self.table.query(**query)
+        _ddb_response = self.client.query(**query_arguments(self.table_name, query))
+        _ddb_response[Constants.ddb_response_attribute_name_items()] = [
+            WireItem(_item) for _item in _ddb_response[Constants.ddb_response_attribute_name_items()]]
+        _last_evaluated_key = _ddb_response.get(Constants.ddb_response_attribute_name_last_evaluated_key())
+        if _last_evaluated_key is not None:
+            _ddb_response[Constants.ddb_response_attribute_name_last_evaluated_key()] = from_wire_item(
+                _last_evaluated_key)
         return _ddb_response
 
+    @staticmethod
+    def __version_projection(projected):
+        """
+        Returns the projection for versions, which also tells delta encoded ones apart and
+        keeps the keys of offloaded attributes
+        """
+        return extend_projection(projected, Constants.ddb_field_version_base(), Constants.ddb_field_offloaded())
+
+    def __reconstruct(self, uuid, items, projected=None):
+        """
+        Replaces the delta encoded versions among items, read newest first, with the versions
+        they encode. Versions are read, newest first, until every delta reaches the version its
+        versionBase names, which need not be the next older one, as a version written out of
+        order is stored in full between a delta and its base. Without a projection the items
+        already hold the newer part of the chains and only older versions are read; with one,
+        the versions are read again in full and projected afterwards. Versions whose chain is
+        incomplete are left out.
+        """
+        if not any(is_delta(_item) for _item in items):
+            return items
+        from boto3.dynamodb.conditions import Key
+        _items = [from_wire_item(_item.item) if isinstance(_item, WireItem) else _item for _item in items]
+        _modified_dates = [_item[Constants.ddb_field_modified_date()] for _item in _items]
+        _upper = _modified_dates[-1] if projected is None else _modified_dates[0]
+        _chain = list(_items) if projected is None else []
+        _query = {
+            'KeyConditionExpression': Key(Constants.ddb_field_identifier()).eq(uuid) & Key(
+                Constants.ddb_field_modified_date()).between(Constants.ddb_version_sort_key_lower_bound(), _upper),
+            'ScanIndexForward': False,
+            'Limit': Constants.delta_chain_page_size()
+        }
+        _versions = reconstruct(_chain)
+        while not all(_modified_date in _versions for _modified_date in _modified_dates):
+            _ddb_response = self.table.query(**_query)
+            _chain.extend(_item for _item in _ddb_response[Constants.ddb_response_attribute_name_items()]
+                          if projected is not None or _item[Constants.ddb_field_modified_date()] != _upper)
+            _versions = reconstruct(_chain)
+            _last_evaluated_key = _ddb_response.get(Constants.ddb_response_attribute_name_last_evaluated_key())
+            if _last_evaluated_key is None:
+                break
+            _query['ExclusiveStartKey'] = _last_evaluated_key
+        return [_versions[_modified_date] if projected is None else project(_versions[_modified_date], projected)
+                for _modified_date in _modified_dates if _modified_date in _versions]
+
+    def __retrieve_resource(self, uuid, projected=None, link=False):
+        """
+        Reads every version of a resource, following LastEvaluatedKey so histories
+        larger than one 1 MB Dynamo DB page are not truncated. Versions past their time to
+        live, which Dynamo DB deletes within days, are left out.
+        """
+        from boto3.dynamodb.conditions import Key
+        _query = {
+            'KeyConditionExpression': Key(Constants.ddb_field_identifier()).eq(uuid) & Key(
+                Constants.ddb_field_modified_date()).gte(Constants.ddb_version_sort_key_lower_bound()),
+            'FilterExpression': not_expired_filter(),
+            'ScanIndexForward': False
+        }
+        _projection = self.__version_projection(projected)
+        _query.update(_projection)
+        _items = []
+        while True:
+            _ddb_response = self.__query(**_query)
+            _items.extend(_ddb_response[Constants.ddb_response_attribute_name_items()])
+            _last_evaluated_key = _ddb_response.get(Constants.ddb_response_attribute_name_last_evaluated_key())
+            if _last_evaluated_key is None:
+                break
+            _query['ExclusiveStartKey'] = _last_evaluated_key
+        _items = self.__reconstruct(uuid, _items, _projection or None)
+        _items = rehydrate_items(self.blob_store, _items, projected, link)
+        return {
+            Constants.ddb_response_attribute_name_items(): _items,
+            Constants.ddb_response_attribute_name_count(): len(_items)
+        }
+
+    @staticmethod
+    def __latest_projection(projected):
+        """Returns the projection for a latest item, which holds the modified date of its version elsewhere"""
+        return extend_projection(projected, Constants.ddb_field_latest_modified_date(), Constants.ddb_field_offloaded())
+
+    def __get_latest_version(self, uuid, projected=None):
+        """
+        Reads the latest item of a resource with one GetItem and returns the version it holds,
+        or None if the resource has no latest item
+        """
+        _projection = self.__latest_projection(projected)
+        if self.client is None:
+            _item = self.table.get_item(Key=latest_key(uuid), **_projection).get('Item')
+            return None if _item is None else resource_from_latest_item(_item)
+        _item = self.client.get_item(TableName=self.table_name, Key=to_wire_item(latest_key(uuid)),
+                                     **_projection).get('Item')
+        return None if _item is None else WireItem(resource_from_latest_item(_item))
+
+    def __retrieve_latest_resource(self, uuid, projected=None, link=False):
+        """
+        Reads only the newest version of a resource, from its latest item. Resources written
+        before latest items existed fall back to a descending query limited to one item.
+        Either way it costs a single item of read capacity no matter how many versions the
+        resource has, unless the newest version is delta encoded and its chain is read too.
+        """
+        from boto3.dynamodb.conditions import Key
+        _version = self.__get_latest_version(uuid, projected)
+        if _version is not None:
+            _items = [_version]
+        else:
+            _ddb_response = self.__query(
+                KeyConditionExpression=Key(Constants.ddb_field_identifier()).eq(uuid),
+                ScanIndexForward=False,
+                Limit=1,
+                **self.__version_projection(projected)
+            )
+            _items = self.__reconstruct(uuid, _ddb_response[Constants.ddb_response_attribute_name_items()],
+                                        projected)
+        _items = rehydrate_items(self.blob_store, _items, projected, link)
+        return {
+            Constants.ddb_response_attribute_name_items(): _items,
+            Constants.ddb_response_attribute_name_count(): len(_items)
+        }
+
+    def __retrieve_versions(self, uuid, page_size, exclusive_start_key, modified_from, modified_to, projected=None):
+        """
+        Reads one page of versions, newest first, optionally bounded by modifiedDate. Expired
+        versions are filtered out after the page is read, so a page may come back short.
+        """
+        from boto3.dynamodb.conditions import Key
+        # The lower bound keeps the latest item out of the listing.
+        _lower_bound = max(modified_from or '', Constants.ddb_version_sort_key_lower_bound())
+        _modified_date = Key(Constants.ddb_field_modified_date())
+        if modified_to is not None:
+            _modified_date_condition = _modified_date.between(_lower_bound, modified_to)
+        else:
+            _modified_date_condition = _modified_date.gte(_lower_bound)
+        _key_condition = Key(Constants.ddb_field_identifier()).eq(uuid) & _modified_date_condition
+
+        _query = {
+            'KeyConditionExpression': _key_condition,
+            'FilterExpression': not_expired_filter(),
+            'ScanIndexForward': False,
+            'Limit': page_size
+        }
+        _query.update(self.__version_projection(projected))
+        if exclusive_start_key is not None:
+            _query['ExclusiveStartKey'] = exclusive_start_key
+        return self.__query(**_query)
+
+    @staticmethod
+    def __query_parameters(event):
+        return event.get(Constants.event_query_string_parameters()) or {}
+
+    @staticmethod
+    def __projection(event):
+        """Returns the projection query arguments for the fields query parameter, if given"""
+        _fields = RequestHandler.__query_parameters(event).get(Constants.event_query_parameter_fields())
+        if not _fields:
+            return None
+        return projection(_fields)
+
+    @staticmethod
+    def __wants_history(event):
+        _history = RequestHandler.__query_parameters(event).get(Constants.event_query_parameter_history())
+        return _history is not None and _history.lower() == 'true'
+
+    @staticmethod
+    def __wants_links(event):
+        _blobs = RequestHandler.__query_parameters(event).get(Constants.event_query_parameter_blobs())
+        return _blobs is not None and _blobs.lower() == Constants.blobs_link()
+
+    @staticmethod
+    def __wants_versions(event):
+        _path = event.get(Constants.event_resource()) or event.get(Constants.event_path()) or ''
+        return _path.endswith(Constants.resource_path_versions())
+
+    @staticmethod
+    def __cache_headers(modified_date, projected):
+        try:
+            _max_age = int(os.environ.get(Constants.env_var_cache_max_age(), Constants.cache_default_max_age()))
+        except ValueError:
+            _max_age = Constants.cache_default_max_age()
+        _headers = {
+            # Projections are other representations of the same version, hence a weak tag.
+            HttpConstants.http_header_etag(): ('W/' if projected else '') + etag(modified_date),
+            HttpConstants.http_header_cache_control(): 'public, max-age=%d' % _max_age
+        }
+        _last_modified = parse_rfc3339(modified_date)
+        if _last_modified is not None:
+            _headers[HttpConstants.http_header_last_modified()] = http_date(_last_modified)
+        return _headers
+
+    @staticmethod
+    def __not_modified(event, modified_date):
+        """Evaluates If-None-Match, or If-Modified-Since when there is no If-None-Match"""
+        _if_none_match = header(event, HttpConstants.http_header_if_none_match())
+        if _if_none_match is not None:
+            return etag_matches_any(_if_none_match, modified_date)
+        _if_modified_since = parse_http_date(header(event, HttpConstants.http_header_if_modified_since()) or '')
+        _last_modified = parse_rfc3339(modified_date)
+        if _if_modified_since is None or _last_modified is None:
+            return False
+        # HTTP dates have whole second precision.
+        return _last_modified.replace(microsecond=0) <= _if_modified_since
+
+    @staticmethod
+    def __client_has_newer(event, modified_date):
+        """Tells whether If-None-Match names a version newer than the given one"""
+        _if_none_match = header(event, HttpConstants.http_header_if_none_match())
+        _cached_date = parse_rfc3339(modified_date)
+        if _if_none_match is None or _cached_date is None:
+            return False
+        for _seen_date in parse_etags(_if_none_match.replace('W/', '')) or []:
+            _seen_date = parse_rfc3339(_seen_date)
+            if _seen_date is not None and _seen_date > _cached_date:
+                return True
+        return False
+
+    def __latest_body(self, event, identifier, projected, link):
+        """
+        Returns the modified date and serialized body of the latest version, from the cache
+        when it holds an entry that the client has not already seen superseded. Projected
+        reads and reads linking offloaded attributes bypass the cache.
+        """
+        _cache = self.cache if projected is None and not link else None
+        if _cache is not None:
+            _cached = _cache.get(identifier)
+            if _cached is not None and not self.__client_has_newer(event, _cached[0]):
+                metrics.count(metrics.METRIC_CACHE_HITS)
+                return _cached
+            metrics.count(metrics.METRIC_CACHE_MISSES)
+            if _cached is not None:
+                _cache.invalidate(identifier)
+
+        _ddb_response = self.__retrieve_latest_resource(identifier, projected, link)
+        _items = _ddb_response[Constants.ddb_response_attribute_name_items()]
+        if len(_items) == 0:
+            return None, dumps(_ddb_response)
+        _latest = (_items[0][Constants.ddb_field_modified_date()], dumps(_ddb_response))
+        if _cache is not None:
+            _cache.put(identifier, _latest, len(_latest[1]))
+        return _latest
+
+    def __handle_latest(self, event, identifier, projected, link):
+        _modified_date, _body = self.__latest_body(event, identifier, projected, link)
+        if _modified_date is None:
+            return response(http.HTTPStatus.NOT_FOUND, _body, event=event)
+        _headers = self.__cache_headers(_modified_date, projected is not None or link)
+        if self.__not_modified(event, _modified_date):
+            return response(http.HTTPStatus.NOT_MODIFIED, '', _headers, event)
+        return response(http.HTTPStatus.OK, _body, _headers, event)
+
+    def __handle_versions(self, event, identifier, projected, link):
+        _query_parameters = self.__query_parameters(event)
+        try:
+            _page_size = parse_page_size(_query_parameters.get(Constants.event_query_parameter_page_size()),
+                                         Constants.versions_default_page_size(), Constants.versions_max_page_size())
+            _exclusive_start_key = None
+            _cursor = _query_parameters.get(Constants.event_query_parameter_cursor())
+            if _cursor:
+                _exclusive_start_key = decode_cursor(_cursor)
+                if _exclusive_start_key.get(Constants.ddb_field_identifier()) != identifier:
+                    raise ValueError(Constants.error_invalid_cursor())
+        except ValueError as e:
+            return response(http.HTTPStatus.BAD_REQUEST, str(e))
+
+        _ddb_response = self.__retrieve_versions(identifier, _page_size, _exclusive_start_key,
+                                                 _query_parameters.get(Constants.event_query_parameter_modified_from()),
+                                                 _query_parameters.get(Constants.event_query_parameter_modified_to()),
+                                                 projected)
+        _items = self.__reconstruct(identifier, _ddb_response[Constants.ddb_response_attribute_name_items()],
+                                    self.__version_projection(projected) or None)
+        _items = rehydrate_items(self.blob_store, _items, projected, link)
+        _last_evaluated_key = _ddb_response.get(Constants.ddb_response_attribute_name_last_evaluated_key())
+        if len(_items) == 0 and _exclusive_start_key is None and _last_evaluated_key is None:
+            return response(http.HTTPStatus.NOT_FOUND, serialize_page(_items, None), event=event)
+        _next_cursor = encode_cursor(_last_evaluated_key)
+        return response(http.HTTPStatus.OK, serialize_page(_items, _next_cursor), event=event)
+
     def handler(self, event, context):
         """
         Request handler method for fetch resource function.
+        Returns the latest version of the resource, honouring conditional request headers,
+        every version when the query parameter history=true is given, or one page of
+        versions for /{identifier}/versions. fields=a,b.c limits the returned attributes.
+        Offloaded attributes are loaded back from the blob store, or with blobs=link
+        returned as presigned URLs in the offloaded map.
         """
         if event is None or Constants.event_path_parameters() not in event:
             return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
@@ -40,8 +341,17 @@ class RequestHandler:
         _http_method = event[Constants.event_http_method()]
 
         if _http_method == HttpConstants.http_method_get() and _identifier:
-            _ddb_response = self.__retrieve_resource(_identifier)
+            try:
+                _projected = self.__projection(event)
+            except ValueError as e:
+                return response(http.HTTPStatus.BAD_REQUEST, str(e))
+            _link = self.__wants_links(event)
+            if self.__wants_versions(event):
+                return self.__handle_versions(event, _identifier, _projected, _link)
+            if not self.__wants_history(event):
+                return self.__handle_latest(event, _identifier, _projected, _link)
+            _ddb_response = self.__retrieve_resource(_identifier, _projected, _link)
             if len(_ddb_response[Constants.ddb_response_attribute_name_items()]) == 0:
-                return response(http.HTTPStatus.NOT_FOUND, json.dumps(_ddb_response))
-            return response(http.HTTPStatus.OK, json.dumps(_ddb_response))
+                return response(http.HTTPStatus.NOT_FOUND, dumps(_ddb_response), event=event)
+            return response(http.HTTPStatus.OK, dumps(_ddb_response), event=event)
         return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
@@ -1,51 +1,243 @@
+import asyncio
 import http
-import simplejson as json
-from simplejson import JSONDecodeError
 import os
+from typing import TYPE_CHECKING
 
-from boto3_type_annotations.dynamodb import Table
+from botocore.exceptions import ClientError
+from resource_api.common.async_dynamo import AsyncDynamoDB, chunks, gather, run
 from resource_api.common.http_constants import HttpConstants
 from resource_api.common.constants import Constants
-from resource_api.common.helpers import response
+from resource_api.common.codec import dumps, loads, JSONDecodeError
+from resource_api.common.helpers import response, header
+from resource_api.common.versions import latest_item, newer_than_latest, cancellation_reasons, error_code
+
+if TYPE_CHECKING:
+    from boto3_type_annotations.dynamodb import Table
 
 
 class RequestHandler:
 
-    def __init__(self, dynamodb=None):
+    def __init__(self, dynamodb=None, blob_store=None):
 
         self.dynamodb = dynamodb
+        self.blob_store = blob_store
 
         self.table_name = os.environ.get(Constants.env_var_table_name())
-        self.table: Table = self.dynamodb.Table(self.table_name)
+        self.table: 'Table' = self.dynamodb.Table(self.table_name)
+        self.client = self.dynamodb.meta.client
+        self.async_dynamodb = AsyncDynamoDB(self.dynamodb.meta.client, self.table_name)
 
     def get_table_connection(self):
         return self.table
 
+    def __offload(self, resource):
+        """Returns the item to write for a resource, with its large attributes offloaded when there is a blob store"""
+        if self.blob_store is None:
+            return resource
+        return self.blob_store.offload(resource)
+
     def insert_resource(self, resource):
-        ddb_response = self.table.put_item(
+        """
+        Writes a resource together with its latest item in one transaction. A version older
+        than the one the latest item holds, as when history is imported, is written alone.
+        Large attributes are offloaded to the blob store first.
+        """
+        resource = self.__offload(resource)
+        try:
+            return self.client.transact_write_items(TransactItems=[
+                {
+                    'Put': dict(newer_than_latest(resource[Constants.ddb_field_modified_date()]),
+                                TableName=self.table_name,
+                                Item=latest_item(resource))
+                },
+                {
+                    'Put': {
+                        'TableName': self.table_name,
+                        'Item': resource
+                    }
+                }
+            ])
+        except ClientError as e:
+            reasons = cancellation_reasons(e)
+            if reasons is None or reasons[0] != Constants.ddb_error_conditional_check_failed():
+                raise
+        return self.table.put_item(
             Item=resource
         )
-        return ddb_response
+
+    @staticmethod
+    def __resource_key(resource):
+        if not isinstance(resource, dict):
+            return None
+        identifier = resource.get(Constants.ddb_field_identifier())
+        modified_date = resource.get(Constants.ddb_field_modified_date())
+        if not isinstance(identifier, str) or not identifier \
+                or not isinstance(modified_date, str) or not modified_date:
+            return None
+        return identifier, modified_date
+
+    async def __write_chunk(self, chunk, results):
+        """
+        Writes up to 25 (index, resource) pairs with BatchWriteItem, retrying unprocessed
+        items with exponential backoff, and records the outcome of each in results.
+        """
+        pending = {RequestHandler.__resource_key(resource): index for index, resource in chunk}
+        request_items = [{'PutRequest': {'Item': resource}} for _, resource in chunk]
+        for attempt in range(Constants.ddb_batch_max_attempts()):
+            if attempt > 0:
+                await asyncio.sleep(Constants.ddb_batch_backoff_seconds() * 2 ** (attempt - 1))
+            ddb_response = await self.async_dynamodb.call('batch_write_item',
+                                                          RequestItems={self.table_name: request_items})
+            request_items = ddb_response.get(Constants.ddb_response_attribute_name_unprocessed_items(),
+                                             {}).get(self.table_name, [])
+            unprocessed = {RequestHandler.__resource_key(request['PutRequest']['Item']) for request in request_items}
+            for key, index in list(pending.items()):
+                if key not in unprocessed:
+                    results[index] = (http.HTTPStatus.CREATED, None)
+                    del pending[key]
+            if not request_items:
+                return
+        for index in pending.values():
+            results[index] = (http.HTTPStatus.SERVICE_UNAVAILABLE, Constants.error_unprocessed_resource())
+
+    async def __write_individually(self, chunk, results):
+        """Falls back to one put per item so a single invalid item does not fail its whole chunk"""
+        async def write(index, resource):
+            try:
+                await self.async_dynamodb.put_item(resource)
+                results[index] = (http.HTTPStatus.CREATED, None)
+            except ClientError as e:
+                results[index] = (http.HTTPStatus.BAD_REQUEST, str(e))
+        await asyncio.gather(*[write(index, resource) for index, resource in chunk])
+
+    async def __write(self, chunk, results):
+        try:
+            await self.__write_chunk(chunk, results)
+        except ClientError as e:
+            if error_code(e) != Constants.ddb_error_validation():
+                raise
+            await self.__write_individually(chunk, results)
+
+    async def __write_latest(self, index, resource, results):
+        """
+        Replaces the latest item of a resource unless it already holds a newer version. A
+        resource whose latest item could not be written is reported unprocessed; writing
+        it again is safe, as the version is overwritten with itself.
+        """
+        try:
+            await self.async_dynamodb.put_item(latest_item(resource),
+                                               **newer_than_latest(resource[Constants.ddb_field_modified_date()]))
+        except ClientError as e:
+            if error_code(e) != Constants.ddb_error_conditional_check_failed_exception():
+                results[index] = (http.HTTPStatus.SERVICE_UNAVAILABLE, Constants.error_unprocessed_resource())
+
+    async def __offload_one(self, index, resource, results):
+        """
+        Offloads the large attributes of a resource on a worker thread and returns the
+        (index, item) pair to write, or None when the blob store failed, which reports the
+        resource unprocessed
+        """
+        try:
+            item = await asyncio.get_running_loop().run_in_executor(self.async_dynamodb.executor,
+                                                                    self.__offload, resource)
+        except ClientError:
+            results[index] = (http.HTTPStatus.SERVICE_UNAVAILABLE, Constants.error_unprocessed_resource())
+            return None
+        return index, item
+
+    async def __insert(self, valid, results):
+        """
+        BatchWriteItem can neither condition nor transact its writes, so the versions are
+        written first and the latest item of each resource follows, pointing at the newest
+        version written. It never points at a version that does not exist. Large attributes
+        are offloaded to the blob store before, concurrently.
+        """
+        if self.blob_store is not None:
+            valid = [pair for pair in await gather(*[self.__offload_one(index, resource, results)
+                                                     for index, resource in valid]) if pair is not None]
+        await gather(*[self.__write(chunk, results) for chunk in chunks(valid, Constants.ddb_batch_write_max_items())])
+        newest = {}
+        for index, resource in valid:
+            if results[index][0] != http.HTTPStatus.CREATED:
+                continue
+            identifier, modified_date = self.__resource_key(resource)
+            if identifier not in newest or newest[identifier][1][Constants.ddb_field_modified_date()] < modified_date:
+                newest[identifier] = (index, resource)
+        await gather(*[self.__write_latest(index, resource, results) for index, resource in newest.values()])
+
+    def insert_resources(self, resources):
+        """
+        Writes many resources in concurrent chunks of 25 with BatchWriteItem, then their latest
+        items, and returns one (status, error) tuple per resource, in request order.
+        """
+        results = [None] * len(resources)
+        valid = []
+        seen = set()
+        for index, resource in enumerate(resources):
+            key = self.__resource_key(resource)
+            if key is None:
+                results[index] = (http.HTTPStatus.BAD_REQUEST, Constants.error_invalid_resource())
+            elif key in seen:
+                results[index] = (http.HTTPStatus.BAD_REQUEST, Constants.error_duplicate_resource())
+            else:
+                seen.add(key)
+                valid.append((index, resource))
+
+        run(self.__insert(valid, results))
+        return results
+
+    @staticmethod
+    def __parse_body(event):
+        body = event[Constants.event_body()]
+        content_type = header(event, HttpConstants.http_header_content_type()) or ''
+        if content_type.split(';')[0].strip().lower() == HttpConstants.media_type_ndjson():
+            return [loads(line) for line in body.splitlines() if line.strip()]
+        return loads(body)
+
+    def __bulk_response(self, event, resources):
+        results = self.insert_resources(resources)
+        created = 0
+        body = []
+        for resource, (status, error) in zip(resources, results):
+            result = {Constants.response_status_code(): status}
+            if isinstance(resource, dict) and Constants.ddb_field_identifier() in resource:
+                result[Constants.ddb_field_identifier()] = resource[Constants.ddb_field_identifier()]
+            if error is not None:
+                result[Constants.response_attribute_name_error()] = error
+            else:
+                created += 1
+            body.append(result)
+        status_code = http.HTTPStatus.CREATED if created == len(resources) else http.HTTPStatus.MULTI_STATUS
+        return response(status_code, dumps({
+            Constants.response_attribute_name_results(): body,
+            Constants.ddb_response_attribute_name_count(): created
+        }), event=event)
 
     def handler(self, event, context):
         """
         Request handler method for insert resource function.
+        A JSON array or newline delimited JSON body inserts every resource in it.
         """
 
         if event is None:
             return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
 
         try:
-            body = event[Constants.event_body()]
-            print(body)
-            body_as_json = json.loads(body)
+            body_as_json = self.__parse_body(event)
         except JSONDecodeError as e:
             return response(http.HTTPStatus.BAD_REQUEST, str(e))
 
         http_method = event[Constants.event_http_method()]
 
+        if http_method == HttpConstants.http_method_post() and isinstance(body_as_json, list):
+            if len(body_as_json) == 0:
+                return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
+            return self.__bulk_response(event, body_as_json)
+
         if http_method == HttpConstants.http_method_post() and body_as_json is not None:
+            if self.__resource_key(body_as_json) is None:
+                return response(http.HTTPStatus.BAD_REQUEST, Constants.error_invalid_resource())
             ddb_response = self.insert_resource(body_as_json)
-            return response(http.HTTPStatus.CREATED, json.dumps(ddb_response))
+            return response(http.HTTPStatus.CREATED, dumps(ddb_response))
 
         return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
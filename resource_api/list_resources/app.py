@@ -0,0 +1,26 @@
+import http
+import os
+
+from resource_api.common import lifecycle, metrics
+from resource_api.common.blobs import BlobStore
+from resource_api.common.helpers import response
+
+from resource_api.list_resources.main.RequestHandler import RequestHandler
+
+
+def build_request_handler():
+    """Returns the request handler, built once per container"""
+    return RequestHandler(lifecycle.dynamodb(), lifecycle.client(), BlobStore.from_environment(os.environ, lifecycle.s3))
+
+
+@metrics.instrumented
+def handler(event, context):
+    """
+    Handler method for list resources function.
+    """
+
+    try:
+        request_handler = lifecycle.instance(__name__, build_request_handler)
+    except Exception as e:
+        return response(http.HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+    return request_handler.handler(event, context)
@@ -0,0 +1,126 @@
+import http
+import os
+from typing import TYPE_CHECKING
+
+from resource_api.common.blobs import rehydrate_items
+from resource_api.common.constants import Constants
+from resource_api.common.helpers import response, encode_cursor, decode_cursor, serialize_page, projection, \
+    extend_projection, parse_page_size
+from resource_api.common.http_constants import HttpConstants
+from resource_api.common.versions import resource_from_latest_item
+from resource_api.common.wire import WireItem, from_wire_item, query_arguments
+
+if TYPE_CHECKING:
+    from boto3_type_annotations.dynamodb import Table
+
+# The index and its hash key attribute for every path parameter a listing is keyed by.
+INDEXES = {
+    Constants.event_path_parameter_owner(): (Constants.ddb_index_owner(), Constants.ddb_field_owner()),
+    Constants.event_path_parameter_status(): (Constants.ddb_index_status(), Constants.ddb_field_status())
+}
+
+
+class RequestHandler:
+
+    def __init__(self, dynamodb=None, client=None, blob_store=None):
+
+        self.dynamodb = dynamodb
+        self.client = client
+        self.blob_store = blob_store
+
+        self.table_name = os.environ.get(Constants.env_var_table_name())
+        self.table: 'Table' = self.dynamodb.Table(self.table_name)
+
+    def __query(self, **query):
+        """
+        Queries the table, or the low-level client when there is one. Its items stay in
+        wire format and serialize to JSON without a round trip through Python values.
+        """
+        if self.client is None:
+            return self.table.query(**query)
+        _ddb_response = self.client.query(**query_arguments(self.table_name, query))
+        _ddb_response[Constants.ddb_response_attribute_name_items()] = [
+            WireItem(resource_from_latest_item(_item))
+            for _item in _ddb_response[Constants.ddb_response_attribute_name_items()]]
+        _last_evaluated_key = _ddb_response.get(Constants.ddb_response_attribute_name_last_evaluated_key())
+        if _last_evaluated_key is not None:
+            _ddb_response[Constants.ddb_response_attribute_name_last_evaluated_key()] = from_wire_item(
+                _last_evaluated_key)
+        return _ddb_response
+
+    def list_resources(self, index_name, field, value, page_size, exclusive_start_key=None, modified_from=None,
+                       modified_to=None, projected=None, link=False):
+        """
+        Reads one page of the latest versions of the resources whose field has the given value,
+        newest first, optionally bounded by modifiedDate, and returns them with the
+        LastEvaluatedKey of the page. The index holds latest items only, so a page reads no
+        superseded versions. It is eventually consistent: a modification may take a moment to
+        show in a listing.
+        """
+        from boto3.dynamodb.conditions import Key
+        _key_condition = Key(field).eq(value)
+        _modified_date = Key(Constants.ddb_field_latest_modified_date())
+        if modified_from is not None and modified_to is not None:
+            _key_condition = _key_condition & _modified_date.between(modified_from, modified_to)
+        elif modified_from is not None:
+            _key_condition = _key_condition & _modified_date.gte(modified_from)
+        elif modified_to is not None:
+            _key_condition = _key_condition & _modified_date.lte(modified_to)
+
+        _query = {
+            'IndexName': index_name,
+            'KeyConditionExpression': _key_condition,
+            'ScanIndexForward': False,
+            'Limit': page_size
+        }
+        _query.update(extend_projection(projected, Constants.ddb_field_latest_modified_date(),
+                                        Constants.ddb_field_offloaded()))
+        if exclusive_start_key is not None:
+            _query['ExclusiveStartKey'] = exclusive_start_key
+        _ddb_response = self.__query(**_query)
+        _items = _ddb_response[Constants.ddb_response_attribute_name_items()]
+        if self.client is None:
+            _items = [resource_from_latest_item(_item) for _item in _items]
+        return rehydrate_items(self.blob_store, _items, projected, link), _ddb_response.get(
+            Constants.ddb_response_attribute_name_last_evaluated_key())
+
+    def handler(self, event, context):
+        """
+        Request handler method for list resources function.
+        Returns one page of the latest versions of the resources of an owner, for
+        /owner/{owner}, or with a status, for /status/{status}, newest first. pageSize and
+        cursor page through them, from and to bound their modifiedDate, fields=a,b.c limits
+        the returned attributes and blobs=link returns offloaded attributes as URLs.
+        """
+        if event is None or not event.get(Constants.event_path_parameters()):
+            return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
+
+        _path_parameters = event[Constants.event_path_parameters()]
+        _keys = [_name for _name in INDEXES if _path_parameters.get(_name)]
+        if len(_keys) != 1 or event.get(Constants.event_http_method()) != HttpConstants.http_method_get():
+            return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
+
+        _index_name, _field = INDEXES[_keys[0]]
+        _value = _path_parameters[_keys[0]]
+        _query_parameters = event.get(Constants.event_query_string_parameters()) or {}
+        try:
+            _page_size = parse_page_size(_query_parameters.get(Constants.event_query_parameter_page_size()),
+                                         Constants.list_default_page_size(), Constants.list_max_page_size())
+            _exclusive_start_key = None
+            _cursor = _query_parameters.get(Constants.event_query_parameter_cursor())
+            if _cursor:
+                _exclusive_start_key = decode_cursor(_cursor)
+                if _exclusive_start_key.get(_field) != _value:
+                    raise ValueError(Constants.error_invalid_cursor())
+            _fields = _query_parameters.get(Constants.event_query_parameter_fields())
+            _projected = projection(_fields) if _fields else None
+        except ValueError as e:
+            return response(http.HTTPStatus.BAD_REQUEST, str(e))
+
+        _blobs = _query_parameters.get(Constants.event_query_parameter_blobs())
+        _items, _last_evaluated_key = self.list_resources(
+            _index_name, _field, _value, _page_size, _exclusive_start_key,
+            _query_parameters.get(Constants.event_query_parameter_modified_from()),
+            _query_parameters.get(Constants.event_query_parameter_modified_to()),
+            _projected, _blobs is not None and _blobs.lower() == Constants.blobs_link())
+        return response(http.HTTPStatus.OK, serialize_page(_items, encode_cursor(_last_evaluated_key)), event=event)
@@ -1,19 +1,29 @@
 import http
 import os
 
+from resource_api.common import lifecycle, metrics
+from resource_api.common.blobs import BlobStore
 from resource_api.common.constants import Constants
-from resource_api.common.dynamo import DynamoDB
-from resource_api.common.helpers import response
+from resource_api.common.deltas import DeltaEncoding
+from resource_api.common.helpers import response, decode_event
+from resource_api.common.retention import Retention
 
 from resource_api.modify_resource.main.RequestHandler import RequestHandler
 
-_dynamodb = None
 
+def build_request_handler():
+    """Returns the request handler, built once per container"""
+    return RequestHandler(lifecycle.dynamodb(), Retention.from_environment(os.environ),
+                          DeltaEncoding.from_environment(os.environ),
+                          BlobStore.from_environment(os.environ, lifecycle.s3))
 
+
+@metrics.instrumented
 def handler(event, context):
     """
     Handler method for modify resource function.
     """
+    event = decode_event(event)
     if event is None:
         return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
     if event is None or Constants.event_body() not in event or Constants.event_http_method() not in event:
@@ -21,23 +31,9 @@ def handler(event, context):
     if event[Constants.event_body()] is None or len(event[Constants.event_body()]) is 0:
         return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
 
-    global _dynamodb
-    if _dynamodb is None:
-        try:
-            ddb = DynamoDB()
-            _dynamodb = ddb.connect(os.environ[Constants.env_var_region()])
-        except Exception as e:
-            return response(http.HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
-
     try:
-        request_handler = RequestHandler(_dynamodb)
+        request_handler = lifecycle.instance(__name__, build_request_handler)
     except Exception as e:
         return response(http.HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
     return request_handler.handler(event, context)
 
-
-def clear_dynamodb():
-    """
-    Clear the global dynamodb instance.
-    """
-    globals()['_dynamodb'] = None
@@ -1,38 +1,425 @@
 import http
-import simplejson as json
 import os
-from simplejson import JSONDecodeError
+import time
+from typing import TYPE_CHECKING
 
-from boto3.dynamodb.conditions import Key
-from boto3_type_annotations.dynamodb import Table
+from botocore.exceptions import ClientError
 from resource_api.common.constants import Constants
+from resource_api.common.codec import dumps, loads, JSONDecodeError
+from resource_api.common.deltas import delta_item, is_delta
 from resource_api.common.http_constants import HttpConstants
-from resource_api.common.helpers import response
+from resource_api.common.helpers import response, header, etag, parse_etags
+from resource_api.common.json_patch import apply, update_builder
+from resource_api.common.versions import latest_item, latest_key, resource_from_latest_item, cancellation_reasons, \
+    error_code, now, Conflict, PreconditionFailed
+
+if TYPE_CHECKING:
+    from boto3_type_annotations.dynamodb import Table
 
 
 class RequestHandler:
 
-    def __init__(self, dynamodb=None):
+    def __init__(self, dynamodb=None, retention=None, delta_encoding=None, blob_store=None):
 
         self.dynamodb = dynamodb
+        self.retention = retention
+        self.delta_encoding = delta_encoding
+        self.blob_store = blob_store
 
         self.table_name = os.environ.get(Constants.env_var_table_name())
-        self.table: Table = self.dynamodb.Table(self.table_name)
+        self.table: 'Table' = self.dynamodb.Table(self.table_name)
+        self.client = self.dynamodb.meta.client
+
+    def __latest_version_date(self, identifier):
+        """
+        Returns the modified date of the newest version, for resources written before they had
+        a latest item, or None if the resource does not exist. Reads one key.
+        """
+        from boto3.dynamodb.conditions import Key
+        ddb_response = self.table.query(
+            KeyConditionExpression=Key(Constants.ddb_field_identifier()).eq(identifier),
+            ProjectionExpression='#modifiedDate',
+            ExpressionAttributeNames={'#modifiedDate': Constants.ddb_field_modified_date()},
+            ScanIndexForward=False,
+            Limit=1)
+        items = ddb_response[Constants.ddb_response_attribute_name_items()]
+        if len(items) == 0:
+            return None
+        return items[0][Constants.ddb_field_modified_date()]
+
+    def __depth(self, latest, modified_date):
+        """Returns the delta depth of a new version superseding the given latest item, 0 when stored in full"""
+        if self.delta_encoding is None:
+            return 0
+        return self.delta_encoding.depth(latest, modified_date)
+
+    def __version_item(self, version, latest, depth):
+        """Returns the item storing a version, delta encoded against the latest item's version if depth says so"""
+        if depth == 0:
+            return version
+        return delta_item(version, resource_from_latest_item(latest))
+
+    def __write_version(self, modified_resource, latest_exists, expected_modified_dates, latest=None):
+        """
+        Writes the new version and replaces the latest item in one transaction. The latest
+        item is conditioned to exist (or, for resources without one yet, to not exist), which
+        makes the existence check part of the write instead of a separate read, and to hold a
+        version no newer than the new one, so it never moves back. When expected modified
+        dates are given, the latest item must also still point at one of them. With delta
+        encoding, the version is stored as its difference to the given latest item.
+        """
+        modified_date = modified_resource[Constants.ddb_field_modified_date()]
+        depth = self.__depth(latest, modified_date)
+        new_latest_item = latest_item(modified_resource)
+        if self.delta_encoding is not None:
+            new_latest_item[Constants.ddb_field_delta_depth()] = depth
+        names = {'#identifier': Constants.ddb_field_identifier()}
+        values = {}
+        if not latest_exists:
+            condition = 'attribute_not_exists(#identifier)'
+        else:
+            names['#latestModifiedDate'] = Constants.ddb_field_latest_modified_date()
+            values[':modifiedDate'] = modified_date
+            condition = 'attribute_exists(#identifier) AND #latestModifiedDate <= :modifiedDate'
+            if expected_modified_dates is not None:
+                expected = {':expected%d' % index: expected_modified_date
+                            for index, expected_modified_date in enumerate(expected_modified_dates)}
+                values.update(expected)
+                condition += ' AND #latestModifiedDate IN (%s)' % ', '.join(sorted(expected))
+        latest_put = {
+            'TableName': self.table_name,
+            'Item': new_latest_item,
+            'ConditionExpression': condition,
+            'ExpressionAttributeNames': names
+        }
+        if values:
+            latest_put['ExpressionAttributeValues'] = values
+        return self.client.transact_write_items(TransactItems=[
+            {
+                'Put': latest_put
+            },
+            {
+                'Put': {
+                    'TableName': self.table_name,
+                    'Item': self.__version_item(modified_resource, latest, depth)
+                }
+            }
+        ])
+
+    def __write_superseded_version(self, modified_resource):
+        """
+        Writes a version older than the one the latest item holds into the history only, in
+        full, already stamped to expire when superseded versions have a maximum age
+        """
+        version = dict(modified_resource)
+        if self.__expires_superseded():
+            version[Constants.ddb_field_expires_at()] = self.retention.expires_at(time.time())
+        return self.table.put_item(Item=version)
+
+    def __latest_modified_date(self, identifier):
+        """Returns the modified date of the version the latest item of a resource holds, or None without one"""
+        item = self.table.get_item(Key=latest_key(identifier), ConsistentRead=True,
+                                   ProjectionExpression='#latestModifiedDate',
+                                   ExpressionAttributeNames={
+                                       '#latestModifiedDate': Constants.ddb_field_latest_modified_date()
+                                   }).get('Item')
+        return None if item is None else item[Constants.ddb_field_latest_modified_date()]
+
+    def __latest(self, identifier):
+        """
+        Returns the latest item of a resource, or None if there is none. Only the modified date
+        of its version is read, unless versions are delta encoded against it.
+        """
+        if self.delta_encoding is not None:
+            return self.__read_latest_item(identifier)
+        return self.table.get_item(Key=latest_key(identifier), ConsistentRead=True,
+                                   ProjectionExpression='#latestModifiedDate',
+                                   ExpressionAttributeNames={
+                                       '#latestModifiedDate': Constants.ddb_field_latest_modified_date()
+                                   }).get('Item')
+
+    def __expire(self, identifier, modified_date):
+        """Stamps the time to live of a superseded version, unless it no longer exists"""
+        try:
+            self.table.update_item(Key={
+                Constants.ddb_field_identifier(): identifier,
+                Constants.ddb_field_modified_date(): modified_date
+            }, UpdateExpression='SET #expiresAt = :expiresAt', ConditionExpression='attribute_exists(#identifier)',
+                ExpressionAttributeNames={
+                    '#identifier': Constants.ddb_field_identifier(),
+                    '#expiresAt': Constants.ddb_field_expires_at()
+                }, ExpressionAttributeValues={':expiresAt': self.retention.expires_at(time.time())})
+        except ClientError as e:
+            if error_code(e) != Constants.ddb_error_conditional_check_failed_exception():
+                raise
+
+    def __expire_chain(self, identifier, modified_date):
+        """
+        Stamps the expiry of the versions before a full version, back to and including the
+        full version their deltas apply to, so a delta never outlives its base
+        """
+        from boto3.dynamodb.conditions import Key
+        items = self.table.query(
+            KeyConditionExpression=Key(Constants.ddb_field_identifier()).eq(identifier) & Key(
+                Constants.ddb_field_modified_date()).between(Constants.ddb_version_sort_key_lower_bound(),
+                                                             modified_date),
+            ProjectionExpression='#modifiedDate, #versionBase',
+            ExpressionAttributeNames={
+                '#modifiedDate': Constants.ddb_field_modified_date(),
+                '#versionBase': Constants.ddb_field_version_base()
+            },
+            ScanIndexForward=False,
+            Limit=self.delta_encoding.snapshot_interval + 1)[Constants.ddb_response_attribute_name_items()]
+        for item in items:
+            if item[Constants.ddb_field_modified_date()] == modified_date:
+                continue
+            self.__expire(identifier, item[Constants.ddb_field_modified_date()])
+            if not is_delta(item):
+                break
+
+    def __expire_superseded(self, identifier, latest, modified_date):
+        """
+        Stamps the expiry of the version a new one supersedes. Delta encoded versions expire
+        a whole chain at a time, once the full version that follows the chain is superseded.
+        """
+        superseded = latest[Constants.ddb_field_latest_modified_date()]
+        if self.delta_encoding is not None:
+            if int(latest.get(Constants.ddb_field_delta_depth(), 0)) == 0:
+                self.__expire_chain(identifier, superseded)
+        # Rewriting the version the latest item holds supersedes nothing.
+        elif superseded != modified_date:
+            self.__expire(identifier, superseded)
+
+    def __superseding(self, identifier, expected_modified_dates, write, modified_date=None):
+        """
+        Runs write, given the modified dates the new version may supersede and the latest item,
+        pinned to the version the latest item holds, then stamps the expiry of that version when
+        superseded versions have a maximum age. When another modification comes in between, the
+        latest item is read again. Resources without a latest item get one from write, and the
+        version it then supersedes is left to the compaction job.
+        """
+        for attempt in range(Constants.supersede_max_attempts()):
+            latest = self.__latest(identifier)
+            if latest is None:
+                return write(expected_modified_dates, None)
+            superseded = latest[Constants.ddb_field_latest_modified_date()]
+            if expected_modified_dates is not None and superseded not in expected_modified_dates:
+                raise PreconditionFailed(Constants.error_precondition_failed())
+            try:
+                result = write([superseded], latest)
+            except PreconditionFailed:
+                continue
+            # A version older than the latest one supersedes nothing.
+            if self.__expires_superseded() and (modified_date is None or modified_date >= superseded):
+                self.__expire_superseded(identifier, latest, modified_date)
+            return result
+        raise PreconditionFailed(Constants.error_precondition_failed())
+
+    def __expires_superseded(self):
+        return self.retention is not None and self.retention.max_age is not None
+
+    def __pinned(self):
+        """Tells whether modifications need the latest item before they write"""
+        return self.__expires_superseded() or self.delta_encoding is not None
+
+    def modify_resource(self, modified_resource, expected_modified_dates=None):
+        """
+        Writes a new version of a resource. expected_modified_dates, parsed from If-Match,
+        makes the write fail with PreconditionFailed unless the latest version is one of them.
+        With a maximum age of superseded versions, the version it replaces is stamped to expire.
+        With delta encoding, the version is stored as its difference to the one it replaces.
+        Large attributes are offloaded to the blob store first.
+        """
+        if self.blob_store is not None:
+            modified_resource = self.blob_store.offload(modified_resource)
+        if self.__pinned():
+            return self.__superseding(
+                modified_resource[Constants.event_identifier()], expected_modified_dates,
+                lambda expected, latest: self.__modify_resource(modified_resource, expected, latest),
+                modified_resource[Constants.ddb_field_modified_date()])
+        return self.__modify_resource(modified_resource, expected_modified_dates)
 
-    def modify_resource(self, modified_resource):
+    def __modify_resource(self, modified_resource, expected_modified_dates, latest=None):
+        identifier = modified_resource[Constants.event_identifier()]
+        modified_date = modified_resource[Constants.ddb_field_modified_date()]
+        if expected_modified_dates is not None and len(expected_modified_dates) == 0:
+            raise PreconditionFailed(Constants.error_precondition_failed())
+        latest_exists = True
+        for attempt in range(Constants.supersede_max_attempts()):
+            try:
+                return self.__write_version(modified_resource, latest_exists, expected_modified_dates,
+                                            latest if latest_exists else None)
+            except ClientError as e:
+                reasons = cancellation_reasons(e)
+                if reasons is None or reasons[0] != Constants.ddb_error_conditional_check_failed():
+                    raise
+            latest_modified_date = self.__latest_modified_date(identifier)
+            # Resources written before latest items existed get one on their first modification.
+            latest_exists = latest_modified_date is not None
+            if not latest_exists:
+                latest_modified_date = self.__latest_version_date(identifier)
+                if latest_modified_date is None:
+                    raise ValueError('Resource with identifier ' + identifier + ' not found')
+            if expected_modified_dates is not None and latest_modified_date not in expected_modified_dates:
+                raise PreconditionFailed(Constants.error_precondition_failed())
+            if latest_modified_date > modified_date:
+                return self.__write_superseded_version(modified_resource)
+        raise PreconditionFailed(Constants.error_precondition_failed())
+
+    def __read_latest_item(self, identifier):
+        return self.table.get_item(Key=latest_key(identifier), ConsistentRead=True).get('Item')
+
+    def __create_latest_item(self, identifier):
+        """Creates the latest item of a resource written before latest items existed"""
+        from boto3.dynamodb.conditions import Key
         ddb_response = self.table.query(
-            KeyConditionExpression=Key(Constants.ddb_field_identifier()).eq(
-                modified_resource[Constants.event_identifier()]))
+            KeyConditionExpression=Key(Constants.ddb_field_identifier()).eq(identifier) & Key(
+                Constants.ddb_field_modified_date()).gte(Constants.ddb_version_sort_key_lower_bound()),
+            ScanIndexForward=False,
+            Limit=1)
+        items = ddb_response[Constants.ddb_response_attribute_name_items()]
+        if len(items) == 0:
+            raise ValueError('Resource with identifier ' + identifier + ' not found')
+        try:
+            self.table.put_item(Item=latest_item(items[0]),
+                                ConditionExpression='attribute_not_exists(#identifier)',
+                                ExpressionAttributeNames={'#identifier': Constants.ddb_field_identifier()})
+        except ClientError as e:
+            # Another request created it first.
+            if error_code(e) != Constants.ddb_error_conditional_check_failed_exception():
+                raise
 
-        if len(ddb_response[Constants.ddb_response_attribute_name_items()]) == 0:
-            raise ValueError('Resource with identifier ' + modified_resource[Constants.event_identifier()] + ' not found')
+    def patch_resource(self, identifier, operations, expected_modified_dates=None):
+        """
+        Applies a JSON Patch to the latest version of a resource, read from its latest item,
+        then updates the latest item, which also stamps a new modified date, and stores the
+        result as a new version in one transaction. Only the patch travels to Dynamo DB for the
+        latest item, not the whole document. With a maximum age of superseded versions, the
+        version it replaces is stamped to expire. With delta encoding, the version is stored as
+        its difference to the one it replaces. A patch of an attribute that may be offloaded to
+        the blob store is written like a PUT instead, and the version returned has its
+        offloaded attributes loaded back.
+        """
+        if self.__touches_offloadable(operations):
+            return self.__patch_offloaded(identifier, operations, expected_modified_dates)
+        if self.__pinned():
+            version = self.__superseding(identifier, expected_modified_dates,
+                                         lambda expected, latest: self.__patch_resource(identifier, operations,
+                                                                                        expected, latest))
+        else:
+            version = self.__patch_resource(identifier, operations, expected_modified_dates)
+        if self.blob_store is not None:
+            return self.blob_store.rehydrate(version)
+        return version
 
-        ddb_response = self.table.put_item(Item=modified_resource)
-        return ddb_response
+    def __touches_offloadable(self, operations):
+        """Tells whether a patch targets an attribute that is offloaded to the blob store when large"""
+        if self.blob_store is None or not isinstance(operations, list):
+            return False
+        for operation in operations:
+            path = operation.get('path') if isinstance(operation, dict) else None
+            if isinstance(path, str) and path.startswith('/') \
+                    and path[1:].split('/')[0] in Constants.blob_offloaded_fields():
+                return True
+        return False
+
+    def __patch_offloaded(self, identifier, operations, expected_modified_dates):
+        """
+        Applies a JSON Patch to the latest version read in full, with its offloaded attributes
+        loaded back, and writes the result like a PUT pinned to that version, which offloads
+        the patched attributes again by their new content. When another modification comes in
+        between, the latest version is read and patched again.
+        """
+        for attempt in range(Constants.supersede_max_attempts()):
+            latest = self.__read_latest_item(identifier)
+            if latest is None:
+                self.__create_latest_item(identifier)
+                latest = self.__read_latest_item(identifier)
+            superseded = latest[Constants.ddb_field_latest_modified_date()]
+            if expected_modified_dates is not None and superseded not in expected_modified_dates:
+                raise PreconditionFailed(Constants.error_precondition_failed())
+            version = apply(self.blob_store.rehydrate(resource_from_latest_item(latest)), operations)
+            version[Constants.ddb_field_modified_date()] = now()
+            try:
+                self.modify_resource(version, [superseded])
+            except PreconditionFailed:
+                continue
+            return version
+        raise PreconditionFailed(Constants.error_precondition_failed())
+
+    def __patch_resource(self, identifier, operations, expected_modified_dates, latest=None):
+        if expected_modified_dates is not None and len(expected_modified_dates) == 0:
+            raise PreconditionFailed(Constants.error_precondition_failed())
+        # With delta encoding, the latest item the modification is pinned to is read in full already.
+        if self.delta_encoding is None:
+            latest = None
+        for attempt in range(Constants.supersede_max_attempts()):
+            if latest is None:
+                latest = self.__read_latest_item(identifier)
+            if latest is None:
+                self.__create_latest_item(identifier)
+                latest = self.__read_latest_item(identifier)
+            if expected_modified_dates is not None \
+                    and latest[Constants.ddb_field_latest_modified_date()] not in expected_modified_dates:
+                raise PreconditionFailed(Constants.error_precondition_failed())
+            document = resource_from_latest_item(latest)
+            version = apply(document, operations)
+            version[Constants.ddb_field_modified_date()] = now()
+            try:
+                self.__write_patch(identifier, operations, document, version, latest)
+                return version
+            except ClientError as e:
+                if error_code(e) == Constants.ddb_error_validation():
+                    raise ValueError(e.response['Error'].get('Message'))
+                reasons = cancellation_reasons(e)
+                if reasons is None or reasons[0] != Constants.ddb_error_conditional_check_failed():
+                    raise
+            latest = None
+        raise Conflict(Constants.error_patch_conflict())
+
+    def __write_patch(self, identifier, operations, document, version, latest):
+        """
+        Applies a JSON Patch to the latest item and writes the patched version in one
+        transaction. The update is conditioned on the latest item still holding the version
+        the patch was applied to in Python, so both writes hold the same content.
+        """
+        modified_date = version[Constants.ddb_field_modified_date()]
+        depth = self.__depth(latest, modified_date)
+        builder = update_builder(operations, document)
+        latest_modified_date = builder.name(Constants.ddb_field_latest_modified_date())
+        builder.set_actions.append('%s = %s' % (latest_modified_date, builder.value(modified_date)))
+        if self.delta_encoding is not None:
+            builder.set_actions.append('%s = %s' % (builder.name(Constants.ddb_field_delta_depth()),
+                                                    builder.value(depth)))
+        builder.conditions.insert(0, '%s = %s' % (latest_modified_date, builder.value(
+            latest[Constants.ddb_field_latest_modified_date()])))
+        latest_update = dict(builder.arguments(), TableName=self.table_name, Key=latest_key(identifier))
+        return self.client.transact_write_items(TransactItems=[
+            {
+                'Update': latest_update
+            },
+            {
+                'Put': {
+                    'TableName': self.table_name,
+                    'Item': self.__version_item(version, latest, depth)
+                }
+            }
+        ])
+
+    @staticmethod
+    def __is_resource(body):
+        """Tells whether a PUT body is a resource with an identifier and a modified date"""
+        if not isinstance(body, dict):
+            return False
+        identifier = body.get(Constants.ddb_field_identifier())
+        modified_date = body.get(Constants.ddb_field_modified_date())
+        return isinstance(identifier, str) and identifier != '' \
+            and isinstance(modified_date, str) and modified_date != ''
 
     def handler(self, event, context):
         """
         Request handler method for modify resource function.
+        PUT replaces the resource with a new version; PATCH applies a JSON Patch to the latest one.
         """
         if event is None or Constants.event_path_parameters() not in event:
             return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
@@ -41,7 +428,7 @@ class RequestHandler:
             return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
 
         try:
-            body = json.loads(event[Constants.event_body()])
+            body = loads(event[Constants.event_body()])
         except JSONDecodeError as e:
             return response(http.HTTPStatus.BAD_REQUEST, str(e))
 
@@ -49,10 +436,33 @@ class RequestHandler:
         http_method = event[Constants.event_http_method()]
 
         if http_method == HttpConstants.http_method_put() and body is not None:
+            if not RequestHandler.__is_resource(body):
+                return response(http.HTTPStatus.BAD_REQUEST, Constants.error_invalid_resource())
+            if_match = header(event, HttpConstants.http_header_if_match())
+            expected_modified_dates = parse_etags(if_match) if if_match is not None else None
             try:
-                ddb_response = self.modify_resource(body)
+                ddb_response = self.modify_resource(body, expected_modified_dates)
                 ddb_response[Constants.event_identifier()] = identifier
-                return response(http.HTTPStatus.OK, json.dumps(ddb_response))
+                return response(http.HTTPStatus.OK, dumps(ddb_response), {
+                    HttpConstants.http_header_etag(): etag(body[Constants.ddb_field_modified_date()])
+                })
+            except PreconditionFailed as e:
+                return response(http.HTTPStatus.PRECONDITION_FAILED, str(e))
+            except ValueError as e:
+                return response(http.HTTPStatus.BAD_REQUEST, str(e))
+
+        if http_method == HttpConstants.http_method_patch() and body is not None:
+            if_match = header(event, HttpConstants.http_header_if_match())
+            expected_modified_dates = parse_etags(if_match) if if_match is not None else None
+            try:
+                version = self.patch_resource(identifier, body, expected_modified_dates)
+                return response(http.HTTPStatus.OK, dumps(version), {
+                    HttpConstants.http_header_etag(): etag(version[Constants.ddb_field_modified_date()])
+                }, event)
+            except PreconditionFailed as e:
+                return response(http.HTTPStatus.PRECONDITION_FAILED, str(e))
+            except Conflict as e:
+                return response(http.HTTPStatus.CONFLICT, str(e))
             except ValueError as e:
                 return response(http.HTTPStatus.BAD_REQUEST, str(e))
 
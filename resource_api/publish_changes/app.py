@@ -0,0 +1,17 @@
+from resource_api.common import lifecycle, metrics
+
+from resource_api.publish_changes.main.RequestHandler import RequestHandler
+
+
+def build_request_handler():
+    """Returns the request handler, built once per container"""
+    return RequestHandler(lifecycle.sns())
+
+
+@metrics.instrumented
+def handler(event, context):
+    """
+    Handler method for publish changes function. Errors are raised rather than returned,
+    so Lambda retries the batch.
+    """
+    return lifecycle.instance(__name__, build_request_handler).handler(event, context)
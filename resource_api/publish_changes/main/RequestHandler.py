@@ -0,0 +1,76 @@
+import os
+
+from botocore.exceptions import ClientError
+
+from resource_api.common.async_dynamo import chunks
+from resource_api.common.changes import coalesce
+from resource_api.common.codec import dumps
+from resource_api.common.constants import Constants
+
+
+class RequestHandler:
+
+    def __init__(self, sns=None, topic_arn=None):
+
+        self.sns = sns
+        self.topic_arn = topic_arn or os.environ.get(Constants.env_var_change_topic_arn())
+        if not self.topic_arn:
+            raise ValueError('Environment variable %s is not set' % Constants.env_var_change_topic_arn())
+        # A FIFO topic delivers the notifications of each resource in order, and drops duplicates.
+        self.fifo = self.topic_arn.endswith('.fifo')
+
+    def __entry(self, index, notification):
+        _entry = {
+            'Id': str(index),
+            'Message': dumps(notification)
+        }
+        _changed = notification[Constants.change_attribute_changed_fields()]
+        if _changed:
+            # Lets a subscription filter on the attributes it cares about.
+            _entry['MessageAttributes'] = {Constants.change_attribute_changed_fields(): {
+                'DataType': 'String.Array',
+                'StringValue': dumps(_changed)
+            }}
+        if self.fifo:
+            _entry['MessageGroupId'] = notification[Constants.ddb_field_identifier()]
+            _entry['MessageDeduplicationId'] = '%s/%s' % (notification[Constants.ddb_field_identifier()],
+                                                        notification[Constants.ddb_field_modified_date()])
+        return _entry
+
+    def publish(self, changes):
+        """
+        Publishes the notifications of changes to the topic, as many per PublishBatch as it
+        takes, and returns the changes whose notification was not published
+        """
+        _pending = [(_change, _change.notification()) for _change in changes]
+        _pending = [(_change, _notification) for _change, _notification in _pending if _notification is not None]
+        _failed = []
+        for _batch in chunks(_pending, Constants.sns_publish_batch_max_entries()):
+            try:
+                _sns_response = self.sns.publish_batch(TopicArn=self.topic_arn, PublishBatchRequestEntries=[
+                    self.__entry(_index, _notification) for _index, (_, _notification) in enumerate(_batch)])
+            except ClientError as e:
+                print('Publishing %d change notifications failed: %s' % (len(_batch), e))
+                _failed.extend(_change for _change, _ in _batch)
+                continue
+            for _failure in _sns_response.get('Failed', []):
+                print('Publishing the change notification of %s failed: %s' % (
+                    _batch[int(_failure['Id'])][0].identifier, _failure.get('Message')))
+                _failed.append(_batch[int(_failure['Id'])][0])
+        return _failed
+
+    def handler(self, event, context):
+        """
+        Request handler method for publish changes function.
+        Publishes one notification per resource inserted or modified in a batch of stream
+        records. When some are not published, the response names the first record of the
+        earliest of them, from which Lambda retries the batch; the notifications published
+        meanwhile are published again, so consumers receive every change at least once.
+        """
+        _changes = coalesce((event or {}).get(Constants.stream_records()) or [])
+        _failed = self.publish(_changes)
+        _failures = []
+        if _failed:
+            _failures.append({Constants.response_attribute_name_item_identifier(): min(
+                (_change.sequence_number for _change in _failed), key=int)})
+        return {Constants.response_attribute_name_batch_item_failures(): _failures}
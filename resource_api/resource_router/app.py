@@ -0,0 +1,80 @@
+import http
+
+from resource_api.common.constants import Constants
+from resource_api.common.helpers import response
+from resource_api.common.http_constants import HttpConstants
+
+from resource_api.batch_fetch_resource import app as batch_fetch_resource
+from resource_api.fetch_resource import app as fetch_resource
+from resource_api.insert_resource import app as insert_resource
+from resource_api.list_resources import app as list_resources
+from resource_api.modify_resource import app as modify_resource
+
+# The handler of every method and resource path template of the API. The handlers build
+# their request handlers once per container on the same Dynamo DB connections.
+ROUTES = {
+    (HttpConstants.http_method_post(), Constants.resource_path_root()): insert_resource.handler,
+    (HttpConstants.http_method_post(), Constants.resource_path_bulk()): insert_resource.handler,
+    (HttpConstants.http_method_post(), Constants.resource_path_batch()): batch_fetch_resource.handler,
+    (HttpConstants.http_method_get(), Constants.resource_path_identifier()): fetch_resource.handler,
+    (HttpConstants.http_method_get(), Constants.resource_path_identifier_versions()): fetch_resource.handler,
+    (HttpConstants.http_method_get(), Constants.resource_path_owner()): list_resources.handler,
+    (HttpConstants.http_method_get(), Constants.resource_path_status()): list_resources.handler,
+    (HttpConstants.http_method_put(), Constants.resource_path_identifier()): modify_resource.handler,
+    (HttpConstants.http_method_patch(), Constants.resource_path_identifier()): modify_resource.handler
+}
+
+# The routes that change the latest version of an identifier, after which the fetch
+# cache shared by the container must not serve the version it holds for it.
+WRITES = {
+    (HttpConstants.http_method_put(), Constants.resource_path_identifier()),
+    (HttpConstants.http_method_patch(), Constants.resource_path_identifier())
+}
+
+
+def resource_path(event):
+    """
+    Returns the resource path template of an event. API Gateway gives it as resource;
+    without it the template is derived from the path and path parameters, ignoring any
+    base path of a custom domain.
+    """
+    if event.get(Constants.event_resource()):
+        return event[Constants.event_resource()]
+    _path = (event.get(Constants.event_path()) or '').rstrip('/')
+    _path_parameters = event.get(Constants.event_path_parameters()) or {}
+    if Constants.event_path_parameter_identifier() in _path_parameters:
+        if _path.endswith(Constants.resource_path_versions()):
+            return Constants.resource_path_identifier_versions()
+        return Constants.resource_path_identifier()
+    if Constants.event_path_parameter_owner() in _path_parameters:
+        return Constants.resource_path_owner()
+    if Constants.event_path_parameter_status() in _path_parameters:
+        return Constants.resource_path_status()
+    for _template in (Constants.resource_path_bulk(), Constants.resource_path_batch()):
+        if _path.endswith(_template):
+            return _template
+    return Constants.resource_path_root()
+
+
+def handler(event, context):
+    """
+    Handler method for the resource router function, which serves every resource
+    operation from one function in monolith mode.
+    """
+    if event is None or Constants.event_http_method() not in event:
+        return response(http.HTTPStatus.BAD_REQUEST, Constants.error_insufficient_parameters())
+
+    _method = event[Constants.event_http_method()]
+    _resource_path = resource_path(event)
+    _handler = ROUTES.get((_method, _resource_path))
+    if _handler is None:
+        _known_path = any(_path == _resource_path for _, _path in ROUTES)
+        return response(http.HTTPStatus.METHOD_NOT_ALLOWED if _known_path else http.HTTPStatus.NOT_FOUND,
+                        Constants.error_unsupported_operation() % (_method, _resource_path))
+    _response = _handler(event, context)
+    if (_method, _resource_path) in WRITES:
+        _identifier = (event.get(Constants.event_path_parameters()) or {}).get(
+            Constants.event_path_parameter_identifier())
+        if _identifier is not None:
+            fetch_resource.evict(_identifier)
+    return _response
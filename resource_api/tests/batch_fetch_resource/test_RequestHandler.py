@@ -0,0 +1,285 @@
+import http
+import simplejson as json
+import os
+import sys
+import unittest
+from unittest import mock
+
+import boto3
+from moto import mock_dynamodb2, mock_s3
+
+from resource_api.common import lifecycle
+from resource_api.common.constants import Constants
+from resource_api.common.http_constants import HttpConstants
+from resource_api.tests.test_constants import TestConstants
+
+testdir = os.path.dirname(__file__)
+srcdir = '../'
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+
+def remove_mock_database(dynamodb):
+    dynamodb.Table(os.environ[Constants.env_var_table_name()]).delete()
+
+
+def generate_mock_event(http_method, identifiers):
+    return {
+        Constants.event_http_method(): http_method,
+        Constants.event_body(): json.dumps({Constants.event_body_identifiers(): identifiers})
+    }
+
+
+@mock_dynamodb2
+class TestHandlerCase(unittest.TestCase):
+    EXISTING_RESOURCE_IDENTIFIERS = ['ebf20333-35a5-4a06-9c58-68ea688a9a8b', '4d96e658-c2e0-4f23-9f1d-ccae0c770ecd']
+    UNKNOWN_RESOURCE_IDENTIFIER = 'fbf20333-35a5-4a06-9c58-68ea688a9a8b'
+
+    def setUp(self):
+        """Mocked AWS Credentials for moto."""
+        os.environ[TestConstants.env_var_aws_access_key_id()] = 'testing'
+        os.environ[TestConstants.env_var_aws_secret_access_key()] = 'testing'
+        os.environ[TestConstants.env_var_aws_security_token()] = 'testing'
+        os.environ[TestConstants.env_var_aws_session_token()] = 'testing'
+
+    def tearDown(self):
+        pass
+
+    def setup_mock_database(self, region, table_name):
+        dynamodb = boto3.resource('dynamodb', region_name=region)
+        table_connection = dynamodb.create_table(TableName=table_name,
+                                                 KeySchema=[{'AttributeName': 'identifier', 'KeyType': 'HASH'},
+                                                            {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                                                 AttributeDefinitions=[
+                                                     {'AttributeName': 'identifier', 'AttributeType': 'S'},
+                                                     {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+                                                 ProvisionedThroughput={'ReadCapacityUnits': 1,
+                                                                        'WriteCapacityUnits': 1})
+        for identifier in self.EXISTING_RESOURCE_IDENTIFIERS:
+            for modified_date in ['2019-11-02T08:46:14.464755+00:00', '2019-11-03T08:46:14.464755+00:00']:
+                table_connection.put_item(
+                    Item={
+                        'identifier': identifier,
+                        'modifiedDate': modified_date,
+                        'createdDate': '2019-11-02T08:46:14.464755+00:00',
+                        'entityDescription': {
+                            'titles': {
+                                'no': 'En tittel'
+                            }
+                        },
+                        'fileSet': {
+                            'files': [{'size': 1024}]
+                        },
+                        'owner': 'owner@unit.no'
+                    }
+                )
+
+        return dynamodb
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_batch_fetch_resources(self):
+        from resource_api.batch_fetch_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        request_handler = RequestHandler(dynamodb)
+        identifiers = self.EXISTING_RESOURCE_IDENTIFIERS + [self.UNKNOWN_RESOURCE_IDENTIFIER]
+        event = generate_mock_event(HttpConstants.http_method_post(), identifiers)
+
+        handler_response = request_handler.handler(event, None)
+
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        body = json.loads(handler_response[Constants.response_body()])
+        self.assertEqual(body[Constants.ddb_response_attribute_name_count()], 2, 'Count is not 2')
+        self.assertEqual([item[Constants.ddb_field_identifier()]
+                          for item in body[Constants.ddb_response_attribute_name_items()]],
+                         self.EXISTING_RESOURCE_IDENTIFIERS, 'Resources not returned in request order')
+        for item in body[Constants.ddb_response_attribute_name_items()]:
+            self.assertEqual(item[Constants.ddb_field_modified_date()], '2019-11-03T08:46:14.464755+00:00',
+                             'Did not return the latest version')
+            self.assertEqual(item['fileSet']['files'][0]['size'], 1024, 'Numbers not deserialized')
+        self.assertEqual(body[Constants.response_attribute_name_not_found()], [self.UNKNOWN_RESOURCE_IDENTIFIER],
+                         'Unknown identifier not reported')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_batch_fetch_resources_low_level_client(self):
+        from resource_api.batch_fetch_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        identifiers = self.EXISTING_RESOURCE_IDENTIFIERS + [self.UNKNOWN_RESOURCE_IDENTIFIER]
+        event = generate_mock_event(HttpConstants.http_method_post(), identifiers)
+
+        expected_response = RequestHandler(dynamodb).handler(event, None)
+        handler_response = RequestHandler(dynamodb, boto3.client('dynamodb', region_name='eu-west-1')).handler(
+            event, None)
+
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        self.assertEqual(json.loads(handler_response[Constants.response_body()], use_decimal=True),
+                         json.loads(expected_response[Constants.response_body()], use_decimal=True),
+                         'Body differs from the one serialized through the Service Resource')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_batch_fetch_resources_from_latest_items(self):
+        from resource_api.batch_fetch_resource.main.RequestHandler import RequestHandler
+        from resource_api.common.versions import latest_item
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        version = {
+            'identifier': self.EXISTING_RESOURCE_IDENTIFIERS[0],
+            'modifiedDate': '2019-11-04T08:46:14.464755+00:00',
+            'owner': 'owner@unit.no'
+        }
+        dynamodb.Table('testing').put_item(Item=version)
+        dynamodb.Table('testing').put_item(Item=latest_item(version))
+        identifiers = self.EXISTING_RESOURCE_IDENTIFIERS + [self.UNKNOWN_RESOURCE_IDENTIFIER]
+        event = generate_mock_event(HttpConstants.http_method_post(), identifiers)
+        client = boto3.client('dynamodb', region_name='eu-west-1')
+
+        for request_handler in (RequestHandler(dynamodb), RequestHandler(dynamodb, client)):
+            query = request_handler.client.query
+            queried = []
+
+            def counting_query(**kwargs):
+                queried.append(kwargs)
+                return query(**kwargs)
+
+            with mock.patch.object(request_handler.client, 'query', side_effect=counting_query):
+                handler_response = request_handler.handler(event, None)
+
+            body = json.loads(handler_response[Constants.response_body()])
+            self.assertEqual(body[Constants.ddb_response_attribute_name_items()][0], version,
+                             'Latest item not returned as the version it holds')
+            self.assertEqual(body[Constants.ddb_response_attribute_name_items()][1][
+                                 Constants.ddb_field_modified_date()], '2019-11-03T08:46:14.464755+00:00',
+                             'Resource without latest item not queried')
+            self.assertEqual(body[Constants.response_attribute_name_not_found()], [self.UNKNOWN_RESOURCE_IDENTIFIER],
+                             'Unknown identifier not reported')
+            self.assertEqual(len(queried), 2, 'Resource with latest item queried')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_batch_fetch_resources_delta_encoded(self):
+        from resource_api.batch_fetch_resource.main.RequestHandler import RequestHandler
+        from resource_api.common.deltas import delta_item
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        table = dynamodb.Table('testing')
+        previous = table.get_item(Key={'identifier': self.EXISTING_RESOURCE_IDENTIFIERS[0],
+                                       'modifiedDate': '2019-11-03T08:46:14.464755+00:00'})['Item']
+        versions = []
+        for day in (4, 5):
+            version = json.loads(json.dumps(previous), use_decimal=True)
+            version['modifiedDate'] = '2019-11-0%dT08:46:14.464755+00:00' % day
+            version['entityDescription']['titles']['no'] = 'Tittel %d' % day
+            table.put_item(Item=delta_item(version, previous))
+            versions.append(version)
+            previous = version
+        event = generate_mock_event(HttpConstants.http_method_post(), self.EXISTING_RESOURCE_IDENTIFIERS)
+
+        for request_handler in (RequestHandler(dynamodb),
+                                RequestHandler(dynamodb, boto3.client('dynamodb', region_name='eu-west-1'))):
+            body = json.loads(request_handler.handler(event, None)[Constants.response_body()], use_decimal=True)
+            self.assertEqual(body[Constants.ddb_response_attribute_name_items()][0], versions[-1],
+                             'Delta encoded newest version not reconstructed')
+            self.assertEqual(body[Constants.ddb_response_attribute_name_items()][1][
+                                 Constants.ddb_field_modified_date()], '2019-11-03T08:46:14.464755+00:00')
+
+        table.delete_item(Key={'identifier': self.EXISTING_RESOURCE_IDENTIFIERS[0],
+                               'modifiedDate': '2019-11-03T08:46:14.464755+00:00'})
+        body = json.loads(RequestHandler(dynamodb).handler(event, None)[Constants.response_body()])
+        self.assertEqual(body[Constants.response_attribute_name_not_found()], [self.EXISTING_RESOURCE_IDENTIFIERS[0]],
+                         'Version with an incomplete chain returned')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    @mock.patch.dict(os.environ, {TestConstants.env_var_aws_request_checksum_calculation(): 'when_required'})
+    def test_handler_batch_fetch_resources_offloaded(self):
+        from resource_api.batch_fetch_resource.main.RequestHandler import RequestHandler
+        from resource_api.common.blobs import BlobStore
+        from resource_api.common.versions import latest_item
+        with mock_s3():
+            s3 = boto3.client('s3', region_name='eu-west-1')
+            s3.create_bucket(Bucket='blobs', CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'})
+            blob_store = BlobStore(s3, 'blobs', 100)
+            dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+            version = {
+                'identifier': self.EXISTING_RESOURCE_IDENTIFIERS[0],
+                'modifiedDate': '2019-11-04T08:46:14.464755+00:00',
+                'entityDescription': {'abstract': 'x' * 200},
+                'owner': 'owner@unit.no'
+            }
+            item = blob_store.offload(version)
+            dynamodb.Table('testing').put_item(Item=item)
+            dynamodb.Table('testing').put_item(Item=latest_item(item))
+            event = generate_mock_event(HttpConstants.http_method_post(), self.EXISTING_RESOURCE_IDENTIFIERS)
+
+            for request_handler in (RequestHandler(dynamodb, blob_store=blob_store),
+                                    RequestHandler(dynamodb, boto3.client('dynamodb', region_name='eu-west-1'),
+                                                   blob_store)):
+                body = json.loads(request_handler.handler(event, None)[Constants.response_body()])
+                self.assertEqual(body[Constants.ddb_response_attribute_name_items()][0], version,
+                                 'Offloaded attribute not loaded')
+                self.assertEqual(body[Constants.ddb_response_attribute_name_items()][1]['entityDescription'],
+                                 {'titles': {'no': 'En tittel'}})
+            remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_batch_fetch_invalid_identifiers(self):
+        from resource_api.batch_fetch_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        request_handler = RequestHandler(dynamodb)
+        too_many = [self.UNKNOWN_RESOURCE_IDENTIFIER] * (Constants.batch_fetch_max_identifiers() + 1)
+
+        for identifiers in ([], too_many, [1], 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'):
+            event = generate_mock_event(HttpConstants.http_method_post(), identifiers)
+            handler_response = request_handler.handler(event, None)
+            self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
+                             'HTTP Status code not 400')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_unknown_http_method_in_event(self):
+        from resource_api.batch_fetch_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        request_handler = RequestHandler(dynamodb)
+        event = generate_mock_event('INVALID_HTTP_METHOD', self.EXISTING_RESOURCE_IDENTIFIERS)
+        handler_response = request_handler.handler(event, None)
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_app(self):
+        from resource_api.batch_fetch_resource import app
+        lifecycle.reset()
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        event = generate_mock_event(HttpConstants.http_method_post(), self.EXISTING_RESOURCE_IDENTIFIERS)
+        handler_response = app.handler(event, None)
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_app_missing_event(self):
+        from resource_api.batch_fetch_resource import app
+        handler_response = app.handler(None, None)
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_app_missing_env_table(self):
+        del os.environ['TABLE_NAME']
+        from resource_api.batch_fetch_resource import app
+        lifecycle.reset()
+        event = generate_mock_event(HttpConstants.http_method_post(), self.EXISTING_RESOURCE_IDENTIFIERS)
+        handler_response = app.handler(event, None)
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.INTERNAL_SERVER_ERROR,
+                         'HTTP Status code not 500')
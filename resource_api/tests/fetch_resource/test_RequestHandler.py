@@ -1,3 +1,5 @@
+import base64
+import gzip
 import os
 import sys
 import simplejson as json
@@ -7,9 +9,10 @@ import http
 import unittest
 
 import boto3
-from moto import mock_dynamodb2
+from moto import mock_dynamodb2, mock_s3
 
 from resource_api.common.http_constants import HttpConstants
+from resource_api.common import lifecycle
 from resource_api.common.constants import Constants
 from resource_api.tests.test_constants import TestConstants
 
@@ -104,7 +107,7 @@ class TestHandlerCase(unittest.TestCase):
             Constants.event_http_method(): HttpConstants.http_method_get(),
             Constants.event_path_parameters(): {Constants.event_path_parameter_identifier(): self.EXISTING_RESOURCE_IDENTIFIER},
         }
-        app._dynamodb = None
+        lifecycle.reset()
         _handler_response = app.handler(_event, None)
         self.assertEqual(_handler_response[Constants.response_status_code()], http.HTTPStatus.INTERNAL_SERVER_ERROR,
                          'HTTP Status code not 500')
@@ -114,6 +117,7 @@ class TestHandlerCase(unittest.TestCase):
     def test_app_missing_env_table(self):
         del os.environ['TABLE_NAME']
         from resource_api.fetch_resource import app
+        lifecycle.reset()
         _event = {
             Constants.event_http_method(): HttpConstants.http_method_get(),
             Constants.event_path_parameters(): {Constants.event_path_parameter_identifier(): ''},
@@ -210,3 +214,535 @@ class TestHandlerCase(unittest.TestCase):
         self.assertEqual(_handler_retrieve_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
                          'HTTP Status code not 400')
         remove_mock_database(_dynamodb)
+
+    def add_mock_versions(self, dynamodb, table_name, modified_dates):
+        _table_connection = dynamodb.Table(table_name)
+        for _modified_date in modified_dates:
+            _table_connection.put_item(
+                Item={
+                    'identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+                    'modifiedDate': _modified_date,
+                    'createdDate': '2019-10-24T12:57:02.655994Z',
+                    'entityDescription': {
+                        'titles': {
+                            'no': 'En tittel ' + _modified_date
+                        }
+                    }
+                }
+            )
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_resource_returns_latest_version_only(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        self.add_mock_versions(_dynamodb, 'testing', ['2019-10-25T12:57:02.655994Z', '2019-10-26T12:57:02.655994Z'])
+        _request_handler = RequestHandler(_dynamodb)
+
+        _event = {
+            Constants.event_http_method(): HttpConstants.http_method_get(),
+            Constants.event_path_parameters(): {Constants.event_path_parameter_identifier(): self.EXISTING_RESOURCE_IDENTIFIER}
+        }
+
+        _handler_retrieve_response = _request_handler.handler(_event, None)
+
+        self.assertEqual(_handler_retrieve_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        _body = json.loads(_handler_retrieve_response[Constants.response_body()])
+        self.assertEqual(_body[Constants.ddb_response_attribute_name_count()], 1, 'Count is not 1')
+        self.assertEqual(_body[Constants.ddb_response_attribute_name_items()][0][Constants.ddb_field_modified_date()],
+                         '2019-10-26T12:57:02.655994Z', 'Did not return the latest version')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_resource_history(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        self.add_mock_versions(_dynamodb, 'testing', ['2019-10-25T12:57:02.655994Z', '2019-10-26T12:57:02.655994Z'])
+        _request_handler = RequestHandler(_dynamodb)
+
+        _event = {
+            Constants.event_http_method(): HttpConstants.http_method_get(),
+            Constants.event_path_parameters(): {Constants.event_path_parameter_identifier(): self.EXISTING_RESOURCE_IDENTIFIER},
+            Constants.event_query_string_parameters(): {Constants.event_query_parameter_history(): 'true'}
+        }
+
+        _handler_retrieve_response = _request_handler.handler(_event, None)
+
+        self.assertEqual(_handler_retrieve_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        _body = json.loads(_handler_retrieve_response[Constants.response_body()])
+        self.assertEqual(_body[Constants.ddb_response_attribute_name_count()], 3, 'Count is not 3')
+        remove_mock_database(_dynamodb)
+
+    def versions_event(self, query_string_parameters):
+        return {
+            Constants.event_http_method(): HttpConstants.http_method_get(),
+            Constants.event_resource(): '/{identifier}/versions',
+            Constants.event_path_parameters(): {Constants.event_path_parameter_identifier(): self.EXISTING_RESOURCE_IDENTIFIER},
+            Constants.event_query_string_parameters(): query_string_parameters
+        }
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_versions_paginated(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        self.add_mock_versions(_dynamodb, 'testing', ['2019-10-25T12:57:02.655994Z', '2019-10-26T12:57:02.655994Z'])
+        _request_handler = RequestHandler(_dynamodb)
+
+        _first_response = _request_handler.handler(self.versions_event({Constants.event_query_parameter_page_size(): '2'}), None)
+        self.assertEqual(_first_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        _first_page = json.loads(_first_response[Constants.response_body()])
+        self.assertEqual(_first_page[Constants.ddb_response_attribute_name_count()], 2, 'Count is not 2')
+        self.assertIsNotNone(_first_page[Constants.response_attribute_name_cursor()], 'Cursor missing')
+
+        _second_response = _request_handler.handler(self.versions_event({
+            Constants.event_query_parameter_page_size(): '2',
+            Constants.event_query_parameter_cursor(): _first_page[Constants.response_attribute_name_cursor()]
+        }), None)
+        _second_page = json.loads(_second_response[Constants.response_body()])
+        self.assertEqual(_second_page[Constants.ddb_response_attribute_name_count()], 1, 'Count is not 1')
+        self.assertEqual(_second_page[Constants.ddb_response_attribute_name_items()][0][Constants.ddb_field_modified_date()],
+                         '2019-10-24T12:57:02.655994Z', 'Did not return the oldest version last')
+        self.assertIsNone(_second_page[Constants.response_attribute_name_cursor()], 'Cursor not empty on last page')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_versions_modified_date_range(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        self.add_mock_versions(_dynamodb, 'testing', ['2019-10-25T12:57:02.655994Z', '2019-10-26T12:57:02.655994Z'])
+        _request_handler = RequestHandler(_dynamodb)
+
+        _handler_response = _request_handler.handler(self.versions_event({
+            Constants.event_query_parameter_modified_from(): '2019-10-25T00:00:00Z',
+            Constants.event_query_parameter_modified_to(): '2019-10-25T23:59:59Z'
+        }), None)
+        _page = json.loads(_handler_response[Constants.response_body()])
+        self.assertEqual(_page[Constants.ddb_response_attribute_name_count()], 1, 'Count is not 1')
+        self.assertEqual(_page[Constants.ddb_response_attribute_name_items()][0][Constants.ddb_field_modified_date()],
+                         '2019-10-25T12:57:02.655994Z', 'Did not filter on modified date')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_versions_invalid_parameters(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        _request_handler = RequestHandler(_dynamodb)
+
+        for _query_string_parameters in ({Constants.event_query_parameter_page_size(): 'many'},
+                                         {Constants.event_query_parameter_page_size(): '0'},
+                                         {Constants.event_query_parameter_cursor(): 'not a cursor'}):
+            _handler_response = _request_handler.handler(self.versions_event(_query_string_parameters), None)
+            self.assertEqual(_handler_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
+                             'HTTP Status code not 400')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_resource_history_excludes_latest_item(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        from resource_api.common.versions import latest_item
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        _dynamodb.Table('testing').put_item(Item=latest_item({
+            'identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+            'modifiedDate': '2019-10-24T12:57:02.655994Z'
+        }))
+        _request_handler = RequestHandler(_dynamodb)
+
+        for _event in ({
+            Constants.event_http_method(): HttpConstants.http_method_get(),
+            Constants.event_path_parameters(): {Constants.event_path_parameter_identifier(): self.EXISTING_RESOURCE_IDENTIFIER},
+            Constants.event_query_string_parameters(): {Constants.event_query_parameter_history(): 'true'}
+        }, self.versions_event({Constants.event_query_parameter_modified_to(): '2019-12-31T00:00:00Z'})):
+            _handler_retrieve_response = _request_handler.handler(_event, None)
+            _body = json.loads(_handler_retrieve_response[Constants.response_body()])
+            self.assertEqual(_body[Constants.ddb_response_attribute_name_count()], 1, 'Latest item listed as version')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_resource_history_excludes_expired_versions(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        self.add_mock_versions(_dynamodb, 'testing', ['2019-10-25T12:57:02.655994Z', '2019-10-26T12:57:02.655994Z'])
+        for _modified_date, _expires_at in (('2019-10-24T12:57:02.655994Z', 1), ('2019-10-25T12:57:02.655994Z',
+                                                                                 4102444800)):
+            _dynamodb.Table('testing').update_item(
+                Key={'identifier': self.EXISTING_RESOURCE_IDENTIFIER, 'modifiedDate': _modified_date},
+                UpdateExpression='SET expiresAt = :expiresAt', ExpressionAttributeValues={':expiresAt': _expires_at})
+        _history_event = self.conditional_event({})
+        _history_event[Constants.event_query_string_parameters()] = {Constants.event_query_parameter_history(): 'true'}
+
+        for _request_handler in (RequestHandler(_dynamodb),
+                                 RequestHandler(_dynamodb, client=boto3.client('dynamodb', region_name='eu-west-1'))):
+            for _event in (_history_event, self.versions_event({})):
+                _handler_retrieve_response = _request_handler.handler(_event, None)
+                _items = json.loads(_handler_retrieve_response[Constants.response_body()])[
+                    Constants.ddb_response_attribute_name_items()]
+                self.assertEqual([_item[Constants.ddb_field_modified_date()] for _item in _items],
+                                 ['2019-10-26T12:57:02.655994Z', '2019-10-25T12:57:02.655994Z'],
+                                 'Expired version listed')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_resource_history_delta_encoded(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        from resource_api.common.deltas import delta_item
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        _table = _dynamodb.Table('testing')
+        _versions = [_table.get_item(Key={'identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+                                          'modifiedDate': '2019-10-24T12:57:02.655994Z'})['Item']]
+        for _day in range(25, 29):
+            _version = json.loads(json.dumps(_versions[-1]))
+            _version['modifiedDate'] = '2019-10-%dT12:57:02.655994Z' % _day
+            _version['entityDescription']['titles']['en'] = 'Title %d' % _day
+            _table.put_item(Item=_version if _day == 27 else delta_item(_version, _versions[-1]))
+            _versions.append(_version)
+        _expected = [json.loads(json.dumps(_version)) for _version in reversed(_versions)]
+        _history_event = self.conditional_event({})
+        _history_event[Constants.event_query_string_parameters()] = {Constants.event_query_parameter_history(): 'true'}
+        _fields_event = self.conditional_event({})
+        _fields_event[Constants.event_query_string_parameters()] = {
+            Constants.event_query_parameter_history(): 'true',
+            Constants.event_query_parameter_fields(): 'entityDescription.titles'
+        }
+
+        for _request_handler in (RequestHandler(_dynamodb),
+                                 RequestHandler(_dynamodb, client=boto3.client('dynamodb', region_name='eu-west-1'))):
+            _items = json.loads(_request_handler.handler(_history_event, None)[Constants.response_body()])[
+                Constants.ddb_response_attribute_name_items()]
+            self.assertEqual(_items, _expected, 'Versions not reconstructed')
+            _items = json.loads(_request_handler.handler(self.conditional_event({}), None)[
+                Constants.response_body()])[Constants.ddb_response_attribute_name_items()]
+            self.assertEqual(_items, _expected[:1], 'Newest version not reconstructed')
+            _items = json.loads(_request_handler.handler(_fields_event, None)[Constants.response_body()])[
+                Constants.ddb_response_attribute_name_items()]
+            self.assertEqual(_items, [{'identifier': _version['identifier'], 'modifiedDate': _version['modifiedDate'],
+                                       'entityDescription': {'titles': _version['entityDescription']['titles']}}
+                                      for _version in _expected], 'Versions not reconstructed and projected')
+            _first_page = json.loads(_request_handler.handler(self.versions_event({
+                Constants.event_query_parameter_page_size(): '2'
+            }), None)[Constants.response_body()])
+            _second_page = json.loads(_request_handler.handler(self.versions_event({
+                Constants.event_query_parameter_page_size(): '2',
+                Constants.event_query_parameter_cursor(): _first_page[Constants.response_attribute_name_cursor()]
+            }), None)[Constants.response_body()])
+            self.assertEqual(_second_page[Constants.ddb_response_attribute_name_items()], _expected[2:4],
+                             'Versions not reconstructed from the full version before the page')
+
+        _table.delete_item(Key={'identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+                                'modifiedDate': '2019-10-24T12:57:02.655994Z'})
+        _items = json.loads(RequestHandler(_dynamodb).handler(_history_event, None)[Constants.response_body()])[
+            Constants.ddb_response_attribute_name_items()]
+        self.assertEqual([_item['modifiedDate'] for _item in _items],
+                         ['2019-10-28T12:57:02.655994Z', '2019-10-27T12:57:02.655994Z'],
+                         'Versions listed without the full version they apply to')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_versions_delta_base_behind_version_written_out_of_order(self):
+        from resource_api.common.deltas import delta_item
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        _table = _dynamodb.Table('testing')
+        _base = _table.get_item(Key={'identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+                                     'modifiedDate': '2019-10-24T12:57:02.655994Z'})['Item']
+        _newer = dict(json.loads(json.dumps(_base)), modifiedDate='2019-10-26T12:57:02.655994Z', status='Published')
+        _older = dict(json.loads(json.dumps(_base)), modifiedDate='2019-10-25T12:57:02.655994Z', status='Draft')
+        # The newer version applies to the base, and the older one, written after it, is stored in full.
+        _table.put_item(Item=delta_item(_newer, _base))
+        _table.put_item(Item=_older)
+
+        # Reading a version at a time, the full version written out of order comes before the base.
+        with mock.patch.object(Constants, 'delta_chain_page_size', return_value=1):
+            self.assert_versions_reconstructed(_dynamodb, _newer)
+        remove_mock_database(_dynamodb)
+
+    def assert_versions_reconstructed(self, dynamodb, newer):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        for _request_handler in (RequestHandler(dynamodb),
+                                 RequestHandler(dynamodb, client=boto3.client('dynamodb', region_name='eu-west-1'))):
+            for _query_string_parameters in ({Constants.event_query_parameter_page_size(): '1'},
+                                             {Constants.event_query_parameter_page_size(): '1',
+                                              Constants.event_query_parameter_fields(): 'status'}):
+                _items = json.loads(_request_handler.handler(self.versions_event(_query_string_parameters), None)[
+                    Constants.response_body()])[Constants.ddb_response_attribute_name_items()]
+                self.assertEqual([(_item['modifiedDate'], _item['status']) for _item in _items],
+                                 [(newer['modifiedDate'], 'Published')],
+                                 'Delta not reconstructed past a full version written out of order')
+
+    def conditional_event(self, headers):
+        return {
+            Constants.event_http_method(): HttpConstants.http_method_get(),
+            Constants.event_path_parameters(): {Constants.event_path_parameter_identifier(): self.EXISTING_RESOURCE_IDENTIFIER},
+            Constants.event_headers(): headers
+        }
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    @mock.patch.dict(os.environ, {'CACHE_MAX_AGE': '30'})
+    def test_handler_retrieve_resource_cache_headers(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        _request_handler = RequestHandler(_dynamodb)
+
+        _handler_retrieve_response = _request_handler.handler(self.conditional_event({}), None)
+
+        _headers = _handler_retrieve_response[Constants.response_headers()]
+        self.assertEqual(_headers[HttpConstants.http_header_etag()], '"2019-10-24T12:57:02.655994Z"', 'Unexpected ETag')
+        self.assertEqual(_headers[HttpConstants.http_header_last_modified()], 'Thu, 24 Oct 2019 12:57:02 GMT',
+                         'Unexpected Last-Modified')
+        self.assertEqual(_headers[HttpConstants.http_header_cache_control()], 'public, max-age=30',
+                         'Unexpected Cache-Control')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_resource_not_modified(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        _request_handler = RequestHandler(_dynamodb)
+
+        for _headers in ({'if-none-match': '"2019-10-24T12:57:02.655994Z"'},
+                         {'If-None-Match': 'W/"2019-10-24T12:57:02.655994Z", "other"'},
+                         {'If-Modified-Since': 'Thu, 24 Oct 2019 12:57:02 GMT'}):
+            _handler_retrieve_response = _request_handler.handler(self.conditional_event(_headers), None)
+            self.assertEqual(_handler_retrieve_response[Constants.response_status_code()], http.HTTPStatus.NOT_MODIFIED,
+                             'HTTP Status code not 304')
+            self.assertEqual(_handler_retrieve_response[Constants.response_body()], '', 'Body not empty')
+
+        for _headers in ({'If-None-Match': '"2019-10-23T12:57:02.655994Z"'},
+                         {'If-Modified-Since': 'Thu, 24 Oct 2019 12:57:01 GMT'},
+                         {'If-None-Match': '"other"', 'If-Modified-Since': 'Thu, 24 Oct 2019 12:57:02 GMT'}):
+            _handler_retrieve_response = _request_handler.handler(self.conditional_event(_headers), None)
+            self.assertEqual(_handler_retrieve_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                             'HTTP Status code not 200')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_resource_from_cache(self):
+        from resource_api.common.cache import LRUCache
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        _cache = LRUCache(1024 * 1024, 60)
+        _request_handler = RequestHandler(_dynamodb, _cache)
+
+        _first_response = _request_handler.handler(self.conditional_event({}), None)
+        self.add_mock_versions(_dynamodb, 'testing', ['2019-10-25T12:57:02.655994Z'])
+        with mock.patch.object(_request_handler.table, 'query') as _query:
+            _second_response = _request_handler.handler(self.conditional_event({}), None)
+            _query.assert_not_called()
+        self.assertEqual(_second_response[Constants.response_body()], _first_response[Constants.response_body()],
+                         'Cached body differs')
+        self.assertEqual(_cache.statistics()['hits'], 1, 'Cache not hit')
+
+        _newer_response = _request_handler.handler(
+            self.conditional_event({'If-None-Match': '"2019-10-25T12:57:02.655994Z"'}), None)
+        self.assertEqual(_newer_response[Constants.response_status_code()], http.HTTPStatus.NOT_MODIFIED,
+                         'Entry older than the client\'s version was not invalidated')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_resource_fields(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        _request_handler = RequestHandler(_dynamodb)
+
+        for _event in (self.conditional_event({}), self.versions_event({})):
+            _event[Constants.event_query_string_parameters()] = {
+                Constants.event_query_parameter_fields(): 'createdDate,entityDescription.titles'
+            }
+            _handler_retrieve_response = _request_handler.handler(_event, None)
+            self.assertEqual(_handler_retrieve_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                             'HTTP Status code not 200')
+            _item = json.loads(_handler_retrieve_response[Constants.response_body()])[
+                Constants.ddb_response_attribute_name_items()][0]
+            self.assertEqual(_item, {
+                'identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+                'modifiedDate': '2019-10-24T12:57:02.655994Z',
+                'createdDate': '2019-10-24T12:57:02.655994Z',
+                'entityDescription': {'titles': {'no': 'En tittel'}}
+            }, 'Unexpected projection')
+
+        _event = self.conditional_event({})
+        _event[Constants.event_query_string_parameters()] = {Constants.event_query_parameter_fields(): 'a b'}
+        _handler_retrieve_response = _request_handler.handler(_event, None)
+        self.assertEqual(_handler_retrieve_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_resource_low_level_client(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        self.add_mock_versions(_dynamodb, 'testing', ['2019-10-25T12:57:02.655994Z', '2019-10-26T12:57:02.655994Z'])
+        _resource_handler = RequestHandler(_dynamodb)
+        _client_handler = RequestHandler(_dynamodb, client=boto3.client('dynamodb', region_name='eu-west-1'))
+
+        _history_event = self.conditional_event({})
+        _history_event[Constants.event_query_string_parameters()] = {Constants.event_query_parameter_history(): 'true'}
+        _fields_event = self.conditional_event({})
+        _fields_event[Constants.event_query_string_parameters()] = {
+            Constants.event_query_parameter_fields(): 'createdDate,entityDescription.titles'
+        }
+        _first_page = _resource_handler.handler(self.versions_event({'pageSize': '1'}), None)
+        _cursor = json.loads(_first_page[Constants.response_body()])[Constants.response_attribute_name_cursor()]
+        for _event in (self.conditional_event({}), _history_event, _fields_event,
+                       self.versions_event({'pageSize': '1'}), self.versions_event({'pageSize': '1', 'cursor': _cursor})):
+            _expected = _resource_handler.handler(_event, None)
+            _actual = _client_handler.handler(_event, None)
+            self.assertEqual(_actual[Constants.response_status_code()], _expected[Constants.response_status_code()],
+                             'HTTP Status code differs')
+            self.assertEqual(json.loads(_actual[Constants.response_body()], use_decimal=True),
+                             json.loads(_expected[Constants.response_body()], use_decimal=True),
+                             'Body differs from the one serialized through the Service Resource')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_retrieve_resource_from_latest_item(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        from resource_api.common.versions import latest_item
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        _version = {
+            'identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+            'modifiedDate': '2019-10-26T12:57:02.655994Z',
+            'createdDate': '2019-10-24T12:57:02.655994Z',
+            'entityDescription': {'titles': {'no': 'En nyere tittel'}}
+        }
+        _dynamodb.Table('testing').put_item(Item=_version)
+        _dynamodb.Table('testing').put_item(Item=latest_item(_version))
+        _client = boto3.client('dynamodb', region_name='eu-west-1')
+        _fields_event = self.conditional_event({})
+        _fields_event[Constants.event_query_string_parameters()] = {
+            Constants.event_query_parameter_fields(): 'entityDescription'
+        }
+
+        for _request_handler in (RequestHandler(_dynamodb), RequestHandler(_dynamodb, client=_client)):
+            for _event, _expected in ((self.conditional_event({}), _version), (_fields_event, {
+                'identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+                'modifiedDate': '2019-10-26T12:57:02.655994Z',
+                'entityDescription': {'titles': {'no': 'En nyere tittel'}}
+            })):
+                with mock.patch.object(_request_handler.table, 'query', side_effect=AssertionError('Queried')), \
+                        mock.patch.object(_client, 'query', side_effect=AssertionError('Queried')):
+                    _handler_retrieve_response = _request_handler.handler(_event, None)
+                self.assertEqual(_handler_retrieve_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                                 'HTTP Status code not 200')
+                self.assertEqual(_handler_retrieve_response[Constants.response_headers()]['ETag'].lstrip('W/'),
+                                 '"2019-10-26T12:57:02.655994Z"', 'Entity tag is not the modified date of the version')
+                _body = json.loads(_handler_retrieve_response[Constants.response_body()])
+                self.assertEqual(_body, {
+                    Constants.ddb_response_attribute_name_items(): [_expected],
+                    Constants.ddb_response_attribute_name_count(): 1
+                }, 'Latest item not returned as the version it holds')
+        remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    @mock.patch.dict(os.environ, {TestConstants.env_var_aws_request_checksum_calculation(): 'when_required'})
+    def test_handler_retrieve_resource_offloaded(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        from resource_api.common.blobs import BlobStore
+        from resource_api.common.versions import latest_item
+        with mock_s3():
+            _s3 = boto3.client('s3', region_name='eu-west-1')
+            _s3.create_bucket(Bucket='blobs', CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'})
+            _blob_store = BlobStore(_s3, 'blobs', 100)
+            _dynamodb = self.setup_mock_database('eu-west-1',
+                                                 'testing')
+            _version = {
+                'identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+                'modifiedDate': '2019-10-26T12:57:02.655994Z',
+                'status': 'Published',
+                'entityDescription': {'titles': {'no': 'En nyere tittel'}, 'abstract': 'x' * 200},
+                'fileSet': {'files': []}
+            }
+            _item = _blob_store.offload(_version)
+            _dynamodb.Table('testing').put_item(Item=_item)
+            _dynamodb.Table('testing').put_item(Item=latest_item(_item))
+
+            def event(**query_string_parameters):
+                _event = self.conditional_event({})
+                _event[Constants.event_query_string_parameters()] = query_string_parameters
+                return _event
+
+            def items(request_handler, _event):
+                _handler_response = request_handler.handler(_event, None)
+                self.assertEqual(_handler_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                                 'HTTP Status code not 200')
+                return json.loads(_handler_response[Constants.response_body()])[
+                    Constants.ddb_response_attribute_name_items()]
+
+            for _request_handler in (RequestHandler(_dynamodb, blob_store=_blob_store),
+                                     RequestHandler(_dynamodb, client=boto3.client('dynamodb', region_name='eu-west-1'),
+                                                    blob_store=_blob_store)):
+                self.assertEqual(items(_request_handler, event()), [_version], 'Offloaded attribute not loaded')
+                self.assertEqual(items(_request_handler, event(history='true'))[0], _version,
+                                 'Offloaded attribute not loaded in the history')
+                self.assertEqual(items(_request_handler, event(fields='entityDescription.titles')), [{
+                    'identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+                    'modifiedDate': '2019-10-26T12:57:02.655994Z',
+                    'entityDescription': {'titles': {'no': 'En nyere tittel'}}
+                }], 'Offloaded attribute not loaded and projected')
+                with mock.patch.object(_blob_store, 'load', side_effect=AssertionError('Loaded')):
+                    self.assertEqual(items(_request_handler, event(fields='status')), [{
+                        'identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+                        'modifiedDate': '2019-10-26T12:57:02.655994Z',
+                        'status': 'Published'
+                    }], 'Projection without offloaded attributes not returned')
+                    _linked = items(_request_handler, event(blobs='link'))[0]
+                self.assertNotIn('entityDescription', _linked, 'Offloaded attribute loaded instead of linked')
+                self.assertEqual(_linked['fileSet'], _version['fileSet'])
+                self.assertIn(_item['offloaded']['entityDescription'], _linked['offloaded']['entityDescription'],
+                              'Offloaded attribute not linked')
+            remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    @mock.patch.dict(os.environ, {'COMPRESSION_MIN_BYTES': '0'})
+    def test_handler_retrieve_resource_compressed(self):
+        from resource_api.fetch_resource.main.RequestHandler import RequestHandler
+        _dynamodb = self.setup_mock_database('eu-west-1',
+                                             'testing')
+        self.add_mock_versions(_dynamodb, 'testing', ['2019-10-25T12:57:02.655994Z', '2019-10-26T12:57:02.655994Z'])
+        _request_handler = RequestHandler(_dynamodb)
+
+        _event = self.conditional_event({})
+        _event[Constants.event_query_string_parameters()] = {Constants.event_query_parameter_history(): 'true'}
+        _expected_body = _request_handler.handler(_event, None)[Constants.response_body()]
+        _event[Constants.event_headers()] = {'Accept-Encoding': 'gzip, deflate'}
+        _handler_retrieve_response = _request_handler.handler(_event, None)
+
+        self.assertEqual(_handler_retrieve_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        self.assertTrue(_handler_retrieve_response[Constants.response_is_base64_encoded()], 'Body not compressed')
+        self.assertEqual(_handler_retrieve_response[Constants.response_headers()]['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(base64.b64decode(_handler_retrieve_response[Constants.response_body()]))
+                         .decode('utf-8'), _expected_body, 'Compressed body differs')
+        remove_mock_database(_dynamodb)
@@ -6,11 +6,13 @@ import unittest
 from unittest import mock
 
 import boto3
-from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.conditions import Attr, Key
 from resource_api.common.http_constants import HttpConstants
+from resource_api.common import lifecycle
 from resource_api.common.constants import Constants
 from resource_api.tests.test_constants import TestConstants
-from moto import mock_dynamodb2
+from botocore.exceptions import ClientError
+from moto import mock_dynamodb2, mock_s3
 
 testdir = os.path.dirname(__file__)
 srcdir = '../'
@@ -183,7 +185,8 @@ class TestHandlerCase(unittest.TestCase):
         resource_identifier = resource_inserted[Constants.event_identifier()]
 
         query_results = request_handler.get_table_connection().query(
-            KeyConditionExpression=Key(Constants.ddb_field_identifier()).eq(resource_identifier),
+            KeyConditionExpression=Key(Constants.ddb_field_identifier()).eq(resource_identifier) & Key(
+                Constants.ddb_field_modified_date()).gte(Constants.ddb_version_sort_key_lower_bound()),
             ScanIndexForward=True
         )
 
@@ -239,7 +242,7 @@ class TestHandlerCase(unittest.TestCase):
     def test_app_missing_env_region(self):
         del os.environ['REGION']
         from resource_api.insert_resource import app
-        app.clear_dynamodb()
+        lifecycle.reset()
         _event = {
             Constants.event_http_method(): HttpConstants.http_method_post(),
             Constants.event_body(): "{}"
@@ -253,7 +256,7 @@ class TestHandlerCase(unittest.TestCase):
     def test_app_missing_env_table(self):
         del os.environ['TABLE_NAME']
         from resource_api.insert_resource import app
-        app.clear_dynamodb()
+        lifecycle.reset()
         _event = {
             Constants.event_http_method(): HttpConstants.http_method_post(),
             Constants.event_body(): "{}"
@@ -276,3 +279,201 @@ class TestHandlerCase(unittest.TestCase):
         self.assertEqual(_handler_insert_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
                          'HTTP Status code not 400')
         remove_mock_database(_dynamodb)
+
+    def generate_mock_resources(self, count):
+        resources = []
+        for index in range(count):
+            resource = self.generate_mock_resource()
+            resource['identifier'] = '4d96e658-c2e0-4f23-9f1d-%012d' % index
+            resources.append(resource)
+        return resources
+
+    def count_resources(self, request_handler):
+        return request_handler.get_table_connection().scan(
+            Select='COUNT',
+            FilterExpression=Attr(Constants.ddb_field_modified_date()).gte(Constants.ddb_version_sort_key_lower_bound())
+        )[Constants.ddb_response_attribute_name_count()]
+
+    def read_latest_item(self, request_handler, identifier):
+        from resource_api.common.versions import latest_key
+        return request_handler.get_table_connection().get_item(Key=latest_key(identifier)).get('Item')
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_bulk_insert_json_array(self):
+        from resource_api.insert_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        resources = self.generate_mock_resources(60)
+        event = generate_mock_event(HttpConstants.http_method_post(), resources)
+
+        handler_response = request_handler.handler(event, None)
+
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.CREATED,
+                         'HTTP Status code not 201')
+        body = json.loads(handler_response[Constants.response_body()])
+        self.assertEqual(body[Constants.ddb_response_attribute_name_count()], 60, 'Count is not 60')
+        self.assertEqual(self.count_resources(request_handler), 61, 'Resources not persisted')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_bulk_insert_ndjson_reports_per_item_results(self):
+        from resource_api.insert_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        resources = self.generate_mock_resources(2)
+        resources.append(resources[0])
+        resources.append({'status': 'New'})
+        event = {
+            Constants.event_http_method(): HttpConstants.http_method_post(),
+            Constants.event_headers(): {'content-type': HttpConstants.media_type_ndjson()},
+            Constants.event_body(): '\n'.join(json.dumps(resource) for resource in resources) + '\n'
+        }
+
+        handler_response = request_handler.handler(event, None)
+
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.MULTI_STATUS,
+                         'HTTP Status code not 207')
+        body = json.loads(handler_response[Constants.response_body()])
+        self.assertEqual([result[Constants.response_status_code()]
+                          for result in body[Constants.response_attribute_name_results()]],
+                         [http.HTTPStatus.CREATED, http.HTTPStatus.CREATED,
+                          http.HTTPStatus.BAD_REQUEST, http.HTTPStatus.BAD_REQUEST],
+                         'Unexpected per-item results')
+        self.assertEqual(body[Constants.ddb_response_attribute_name_count()], 2, 'Count is not 2')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    @mock.patch('asyncio.sleep')
+    def test_insert_resources_retries_unprocessed_items(self, _sleep):
+        from resource_api.insert_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        resources = self.generate_mock_resources(3)
+        batch_write_item = dynamodb.meta.client.batch_write_item
+        calls = []
+
+        def throttled_batch_write_item(RequestItems):
+            calls.append(RequestItems)
+            if len(calls) > 1:
+                return batch_write_item(RequestItems=RequestItems)
+            requests = RequestItems['testing']
+            batch_write_item(RequestItems={'testing': requests[:1]})
+            return {Constants.ddb_response_attribute_name_unprocessed_items(): {'testing': requests[1:]}}
+
+        with mock.patch.object(dynamodb.meta.client, 'batch_write_item', side_effect=throttled_batch_write_item):
+            results = request_handler.insert_resources(resources)
+
+        self.assertEqual(results, [(http.HTTPStatus.CREATED, None)] * 3, 'Unprocessed items not retried')
+        self.assertEqual(len(calls[1]['testing']), 2, 'Retry did not only send unprocessed items')
+        self.assertEqual(self.count_resources(request_handler), 4, 'Resources not persisted')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_insert_resource_maintains_latest_item(self):
+        from resource_api.insert_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource()
+        older = dict(resource, modifiedDate='2019-01-29T14:32:43.770Z')
+
+        request_handler.insert_resource(resource)
+        request_handler.insert_resource(older)
+
+        latest = self.read_latest_item(request_handler, resource[Constants.ddb_field_identifier()])
+        self.assertEqual(latest[Constants.ddb_field_latest_modified_date()],
+                         resource[Constants.ddb_field_modified_date()], 'Latest item moved back to an older version')
+        self.assertEqual(latest[Constants.ddb_field_entity_description()],
+                         resource[Constants.ddb_field_entity_description()], 'Latest item does not copy the version')
+        self.assertEqual(self.count_resources(request_handler), 3, 'Older version not written')
+
+        invalid = request_handler.handler(generate_mock_event(HttpConstants.http_method_post(), {'status': 'New'}),
+                                          None)
+        self.assertEqual(invalid[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_insert_resources_maintains_latest_items(self):
+        from resource_api.insert_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        resources = self.generate_mock_resources(2)
+        newer = dict(resources[0], modifiedDate='2021-01-29T14:32:43.770Z')
+        request_handler.insert_resource(newer)
+        older = dict(resources[1], modifiedDate='2019-01-29T14:32:43.770Z')
+
+        results = request_handler.insert_resources(resources + [older])
+
+        self.assertEqual(results, [(http.HTTPStatus.CREATED, None)] * 3)
+        latest = self.read_latest_item(request_handler, resources[0][Constants.ddb_field_identifier()])
+        self.assertEqual(latest[Constants.ddb_field_latest_modified_date()], newer[Constants.ddb_field_modified_date()],
+                         'Latest item moved back to an older version')
+        latest = self.read_latest_item(request_handler, resources[1][Constants.ddb_field_identifier()])
+        self.assertEqual(latest[Constants.ddb_field_latest_modified_date()],
+                         resources[1][Constants.ddb_field_modified_date()], 'Latest item not the newest version')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    @mock.patch.dict(os.environ, {TestConstants.env_var_aws_request_checksum_calculation(): 'when_required'})
+    def test_insert_resources_offloads_large_attributes(self):
+        from resource_api.insert_resource.main.RequestHandler import RequestHandler
+        from resource_api.common.blobs import BlobStore
+        with mock_s3():
+            s3 = boto3.client('s3', region_name='eu-west-1')
+            s3.create_bucket(Bucket='blobs', CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'})
+            dynamodb = self.setup_mock_database('eu-west-1',
+                                                'testing')
+            request_handler = RequestHandler(dynamodb, BlobStore(s3, 'blobs', 500))
+            resources = self.generate_mock_resources(4)
+            for resource in resources[:3]:
+                resource['entityDescription']['abstract'] = 'x' * 500
+
+            request_handler.insert_resource(resources[0])
+            results = request_handler.insert_resources(resources[1:])
+
+            self.assertEqual(results, [(http.HTTPStatus.CREATED, None)] * 3)
+            for resource in resources:
+                item = request_handler.get_table_connection().get_item(Key={
+                    Constants.ddb_field_identifier(): resource[Constants.ddb_field_identifier()],
+                    Constants.ddb_field_modified_date(): resource[Constants.ddb_field_modified_date()]
+                })['Item']
+                large = 'abstract' in resource['entityDescription']
+                self.assertEqual('entityDescription' in item, not large, 'Attribute offloaded by size')
+                self.assertEqual(Constants.ddb_field_offloaded() in self.read_latest_item(
+                    request_handler, resource[Constants.ddb_field_identifier()]), large, 'Latest item not offloaded')
+            self.assertEqual(s3.list_objects_v2(Bucket='blobs')['KeyCount'], 1, 'Equal attributes not shared')
+
+            failing = self.generate_mock_resources(2)
+            failing[0]['entityDescription']['abstract'] = 'y' * 500
+            for resource in failing:
+                resource[Constants.ddb_field_identifier()] += '-failing'
+            with mock.patch.object(s3, 'put_object', side_effect=ClientError({'Error': {'Code': 'SlowDown'}},
+                                                                             'PutObject')):
+                results = request_handler.insert_resources(failing)
+            self.assertEqual(results, [(http.HTTPStatus.SERVICE_UNAVAILABLE, Constants.error_unprocessed_resource()),
+                                       (http.HTTPStatus.CREATED, None)], 'Failed offload not reported unprocessed')
+            remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_bulk_insert_empty_array(self):
+        from resource_api.insert_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        event = generate_mock_event(HttpConstants.http_method_post(), [])
+        handler_response = request_handler.handler(event, None)
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        remove_mock_database(dynamodb)
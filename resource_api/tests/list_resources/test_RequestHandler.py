@@ -0,0 +1,246 @@
+import http
+import simplejson as json
+import os
+import unittest
+from unittest import mock
+
+import boto3
+from moto import mock_dynamodb2, mock_s3
+
+from resource_api.common import lifecycle
+from resource_api.common.constants import Constants
+from resource_api.common.http_constants import HttpConstants
+from resource_api.common.versions import latest_item
+from resource_api.tests.test_constants import TestConstants
+from tools.create_indexes import attribute_definitions, global_secondary_indexes
+
+OWNER = 'owner@unit.no'
+OTHER_OWNER = 'other@unit.no'
+IDENTIFIERS = ['ebf20333-35a5-4a06-9c58-68ea688a9a8b', '4d96e658-c2e0-4f23-9f1d-ccae0c770ecd',
+               'fbf20333-35a5-4a06-9c58-68ea688a9a8b']
+MODIFIED_DATES = ['2019-11-0%dT08:46:14.464755+00:00' % _day for _day in range(1, 4)]
+
+
+def remove_mock_database(dynamodb):
+    dynamodb.Table(os.environ[Constants.env_var_table_name()]).delete()
+
+
+def generate_mock_event(query_parameters=None, owner=OWNER, status=None, http_method=None):
+    _path_parameters = {}
+    if owner is not None:
+        _path_parameters[Constants.event_path_parameter_owner()] = owner
+    if status is not None:
+        _path_parameters[Constants.event_path_parameter_status()] = status
+    return {
+        Constants.event_http_method(): http_method or HttpConstants.http_method_get(),
+        Constants.event_path_parameters(): _path_parameters,
+        Constants.event_query_string_parameters(): query_parameters
+    }
+
+
+def version(identifier, modified_date, owner=OWNER, status='New'):
+    return {
+        'identifier': identifier,
+        'modifiedDate': modified_date,
+        'createdDate': MODIFIED_DATES[0],
+        'owner': owner,
+        'status': status,
+        'entityDescription': {'titles': {'no': 'Tittel %s' % modified_date}}
+    }
+
+
+def body(handler_response):
+    return json.loads(handler_response[Constants.response_body()])
+
+
+def identifiers(page):
+    return [_item['identifier'] for _item in page[Constants.ddb_response_attribute_name_items()]]
+
+
+@mock_dynamodb2
+class TestHandlerCase(unittest.TestCase):
+
+    def setUp(self):
+        """Mocked AWS Credentials for moto."""
+        os.environ[TestConstants.env_var_aws_access_key_id()] = 'testing'
+        os.environ[TestConstants.env_var_aws_secret_access_key()] = 'testing'
+        os.environ[TestConstants.env_var_aws_security_token()] = 'testing'
+        os.environ[TestConstants.env_var_aws_session_token()] = 'testing'
+        lifecycle.reset()
+
+    def tearDown(self):
+        lifecycle.reset()
+
+    def setup_mock_database(self, region, table_name):
+        """
+        Writes i versions of the i-th resource of the owner, last modified on the i-th day, and
+        its latest item, Published for all but the first, and the latest item of another owner
+        """
+        dynamodb = boto3.resource('dynamodb', region_name=region)
+        _throughput = {'ReadCapacityUnits': 1, 'WriteCapacityUnits': 1}
+        table = dynamodb.create_table(TableName=table_name,
+                                      KeySchema=[{'AttributeName': 'identifier', 'KeyType': 'HASH'},
+                                                 {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                                      AttributeDefinitions=[
+                                          {'AttributeName': 'identifier', 'AttributeType': 'S'},
+                                          {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}
+                                      ] + attribute_definitions(),
+                                      GlobalSecondaryIndexes=global_secondary_indexes(_throughput),
+                                      ProvisionedThroughput=_throughput)
+        for _index, _identifier in enumerate(IDENTIFIERS):
+            for _modified_date in MODIFIED_DATES[:_index + 1]:
+                table.put_item(Item=version(_identifier, _modified_date))
+            table.put_item(Item=latest_item(version(_identifier, MODIFIED_DATES[_index],
+                                                    status='Published' if _index else 'New')))
+        table.put_item(Item=latest_item(version('5d96e658-c2e0-4f23-9f1d-ccae0c770ecd', MODIFIED_DATES[0],
+                                                owner=OTHER_OWNER)))
+        return dynamodb
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_app(self):
+        from resource_api.list_resources import app
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        handler_response = app.handler(generate_mock_event(), None)
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_list_by_owner_returns_latest_versions_only(self):
+        from resource_api.list_resources.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        handler_response = RequestHandler(dynamodb).handler(generate_mock_event(), None)
+
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        _page = body(handler_response)
+        _items = _page[Constants.ddb_response_attribute_name_items()]
+        self.assertEqual([(_item['identifier'], _item['modifiedDate']) for _item in _items],
+                         list(reversed(list(zip(IDENTIFIERS, MODIFIED_DATES)))),
+                         'Not the latest version of each resource of the owner, newest first')
+        for _item in _items:
+            self.assertNotIn(Constants.ddb_field_latest_modified_date(), _item, 'Latest item bookkeeping returned')
+        self.assertIsNone(_page[Constants.response_attribute_name_cursor()], 'Cursor not empty on last page')
+
+        handler_response = RequestHandler(dynamodb).handler(generate_mock_event(owner='nobody@unit.no'), None)
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'Empty listing not 200')
+        self.assertEqual(body(handler_response)[Constants.ddb_response_attribute_name_count()], 0)
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_list_paginated(self):
+        from resource_api.list_resources.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        request_handler = RequestHandler(dynamodb)
+
+        _identifiers = []
+        _query_parameters = {Constants.event_query_parameter_page_size(): '2'}
+        while True:
+            _page = body(request_handler.handler(generate_mock_event(_query_parameters), None))
+            _identifiers.extend(_item['identifier'] for _item in _page[Constants.ddb_response_attribute_name_items()])
+            _cursor = _page[Constants.response_attribute_name_cursor()]
+            if _cursor is None:
+                break
+            _query_parameters = {Constants.event_query_parameter_page_size(): '2',
+                                 Constants.event_query_parameter_cursor(): _cursor}
+        self.assertEqual(_identifiers, list(reversed(IDENTIFIERS)), 'Pages do not cover the listing once')
+
+        handler_response = request_handler.handler(generate_mock_event(_query_parameters, owner=OTHER_OWNER), None)
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
+                         'Cursor of another owner accepted')
+        self.assertEqual(handler_response[Constants.response_body()], Constants.error_invalid_cursor())
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_list_modified_date_range_and_fields(self):
+        from resource_api.list_resources.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        request_handler = RequestHandler(dynamodb)
+
+        _page = body(request_handler.handler(generate_mock_event({
+            Constants.event_query_parameter_modified_from(): MODIFIED_DATES[1],
+            Constants.event_query_parameter_fields(): 'identifier,entityDescription.titles'
+        }), None))
+        self.assertEqual(_page[Constants.ddb_response_attribute_name_items()], [
+            {'identifier': _identifier, 'modifiedDate': _modified_date,
+             'entityDescription': {'titles': {'no': 'Tittel %s' % _modified_date}}}
+            for _identifier, _modified_date in list(zip(IDENTIFIERS, MODIFIED_DATES))[:0:-1]
+        ], 'Not the projected latest versions modified from the lower bound')
+
+        _page = body(request_handler.handler(generate_mock_event({
+            Constants.event_query_parameter_modified_to(): MODIFIED_DATES[1]
+        }), None))
+        self.assertEqual([_item['identifier'] for _item in _page[Constants.ddb_response_attribute_name_items()]],
+                         [IDENTIFIERS[1], IDENTIFIERS[0]], 'Not the latest versions modified up to the upper bound')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_list_by_status_low_level_client(self):
+        from resource_api.list_resources.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        client = boto3.client('dynamodb', region_name='eu-west-1')
+        event = generate_mock_event({Constants.event_query_parameter_page_size(): '1'}, owner=None,
+                                    status='Published')
+
+        for request_handler in (RequestHandler(dynamodb), RequestHandler(dynamodb, client)):
+            _first_page = body(request_handler.handler(event, None))
+            self.assertEqual(identifiers(_first_page), [IDENTIFIERS[2]])
+            _second_page = body(request_handler.handler(generate_mock_event({
+                Constants.event_query_parameter_page_size(): '1',
+                Constants.event_query_parameter_cursor(): _first_page[Constants.response_attribute_name_cursor()]
+            }, owner=None, status='Published'), None))
+            self.assertEqual(identifiers(_second_page), [IDENTIFIERS[1]])
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_list_invalid_parameters(self):
+        from resource_api.list_resources.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        request_handler = RequestHandler(dynamodb)
+
+        for _event in [None, generate_mock_event(owner=None), generate_mock_event(status='New'),
+                       generate_mock_event(http_method=HttpConstants.http_method_post()),
+                       generate_mock_event({Constants.event_query_parameter_page_size(): '0'}),
+                       generate_mock_event({Constants.event_query_parameter_page_size(): '101'}),
+                       generate_mock_event({Constants.event_query_parameter_cursor(): 'not a cursor'})]:
+            handler_response = request_handler.handler(_event, None)
+            self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
+                             'Invalid request not 400: %s' % _event)
+        remove_mock_database(dynamodb)
+
+    @mock_s3
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_list_offloaded(self):
+        from resource_api.common.blobs import BlobStore
+        from resource_api.list_resources.main.RequestHandler import RequestHandler
+        os.environ[TestConstants.env_var_aws_request_checksum_calculation()] = 'when_required'
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        s3 = boto3.client('s3', region_name='eu-west-1')
+        s3.create_bucket(Bucket='blobs', CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'})
+        blob_store = BlobStore(s3, 'blobs', 10)
+        resource = version(IDENTIFIERS[0], MODIFIED_DATES[0])
+        dynamodb.Table('testing').put_item(Item=latest_item(blob_store.offload(resource)))
+        event = generate_mock_event({Constants.event_query_parameter_modified_to(): MODIFIED_DATES[0]})
+
+        _items = body(RequestHandler(dynamodb, blob_store=blob_store).handler(event, None))[
+            Constants.ddb_response_attribute_name_items()]
+        self.assertEqual(_items, [resource], 'Offloaded attribute not loaded back')
+
+        event[Constants.event_query_string_parameters()][Constants.event_query_parameter_blobs()] = 'link'
+        _items = body(RequestHandler(dynamodb, blob_store=blob_store).handler(event, None))[
+            Constants.ddb_response_attribute_name_items()]
+        self.assertNotIn('entityDescription', _items[0])
+        self.assertIn('Expires=', _items[0][Constants.ddb_field_offloaded()]['entityDescription'])
+        remove_mock_database(dynamodb)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,14 +2,18 @@ import http
 import simplejson as json
 import os
 import sys
+import time
 import unittest
+from datetime import timedelta
 from unittest import mock
 
 import boto3
-from moto import mock_dynamodb2
+from moto import mock_dynamodb2, mock_s3
 
+from resource_api.common import lifecycle
 from resource_api.common.constants import Constants
 from resource_api.common.http_constants import HttpConstants
+from resource_api.common.versions import latest_key
 from resource_api.tests.test_constants import TestConstants
 
 testdir = os.path.dirname(__file__)
@@ -209,7 +213,7 @@ class TestHandlerCase(unittest.TestCase):
     def test_app_missing_env_region(self):
         del os.environ['REGION']
         from resource_api.modify_resource import app
-        app.clear_dynamodb()
+        lifecycle.reset()
         resource = self.generate_mock_resource()
         _event = generate_mock_event(HttpConstants.http_method_put(), resource)
         _handler_response = app.handler(_event, None)
@@ -221,7 +225,7 @@ class TestHandlerCase(unittest.TestCase):
     def test_app_missing_env_table(self):
         del os.environ['TABLE_NAME']
         from resource_api.modify_resource import app
-        app.clear_dynamodb()
+        lifecycle.reset()
         resource = self.generate_mock_resource()
         _event = generate_mock_event(HttpConstants.http_method_put(), resource)
 
@@ -261,3 +265,434 @@ class TestHandlerCase(unittest.TestCase):
         self.assertEqual(_handler_modify_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
                          'HTTP Status code not 400')
         remove_mock_database(_dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_modify_resource_maintains_latest_item(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource()
+        request_handler.modify_resource(resource)
+
+        latest = dynamodb.Table('testing').get_item(Key=latest_key(self.EXISTING_RESOURCE_IDENTIFIER))['Item']
+        self.assertEqual(latest[Constants.ddb_field_latest_modified_date()], resource['modifiedDate'],
+                         'Latest item does not point at the new version')
+
+        resource['modifiedDate'] = '2020-01-30T14:32:43.770Z'
+        resource['status'] = 'Published'
+        with mock.patch.object(request_handler.table, 'query') as query:
+            request_handler.modify_resource(resource)
+            query.assert_not_called()
+
+        latest = dynamodb.Table('testing').get_item(Key=latest_key(self.EXISTING_RESOURCE_IDENTIFIER))['Item']
+        self.assertEqual(latest['status'], 'Published', 'Latest item not replaced')
+        self.assertEqual(latest[Constants.ddb_field_latest_modified_date()], '2020-01-30T14:32:43.770Z',
+                         'Latest item does not point at the new version')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_modify_resource_missing_modified_date(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        for body in ({'identifier': self.EXISTING_RESOURCE_IDENTIFIER},
+                     {'identifier': self.EXISTING_RESOURCE_IDENTIFIER, 'modifiedDate': ''}):
+            handler_modify_response = request_handler.handler(
+                generate_mock_event(HttpConstants.http_method_put(), body), None)
+            self.assertEqual(handler_modify_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
+                             'HTTP Status code not 400')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_modify_resource_older_version_keeps_latest_item(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource()
+        request_handler.modify_resource(resource)
+
+        older = dict(resource, modifiedDate='2020-01-28T14:32:43.770Z', status='Published')
+        handler_modify_response = request_handler.handler(
+            generate_mock_event(HttpConstants.http_method_put(), older), None)
+        self.assertEqual(handler_modify_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+
+        latest = dynamodb.Table('testing').get_item(Key=latest_key(self.EXISTING_RESOURCE_IDENTIFIER))['Item']
+        self.assertEqual(latest[Constants.ddb_field_latest_modified_date()], resource['modifiedDate'],
+                         'Latest item moved back to an older version')
+        self.assertEqual(latest['status'], resource['status'], 'Latest item replaced by an older version')
+        versions = dynamodb.Table('testing').query(
+            KeyConditionExpression='identifier = :identifier AND modifiedDate >= :lower',
+            ExpressionAttributeValues={':identifier': self.EXISTING_RESOURCE_IDENTIFIER, ':lower': '0'})['Items']
+        self.assertEqual(sorted(version['modifiedDate'] for version in versions),
+                         ['2019-11-02T08:46:14.464755+00:00', older['modifiedDate'], resource['modifiedDate']],
+                         'Older version not written to the history')
+        remove_mock_database(dynamodb)
+
+    def generate_if_match_event(self, resource, if_match):
+        event = generate_mock_event(HttpConstants.http_method_put(), resource)
+        event[Constants.event_headers()] = {HttpConstants.http_header_if_match(): if_match}
+        return event
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_modify_resource_if_match(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource()
+
+        stale_response = request_handler.handler(
+            self.generate_if_match_event(resource, '"2019-01-01T00:00:00.000000+00:00"'), None)
+        self.assertEqual(stale_response[Constants.response_status_code()], http.HTTPStatus.PRECONDITION_FAILED,
+                         'HTTP Status code not 412')
+
+        first_response = request_handler.handler(
+            self.generate_if_match_event(resource, '"2019-11-02T08:46:14.464755+00:00"'), None)
+        self.assertEqual(first_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        current_etag = first_response[Constants.response_headers()][HttpConstants.http_header_etag()]
+        self.assertEqual(current_etag, '"2020-01-29T14:32:43.770Z"', 'ETag not derived from modifiedDate')
+
+        resource['modifiedDate'] = '2020-01-30T14:32:43.770Z'
+        second_response = request_handler.handler(self.generate_if_match_event(resource, current_etag), None)
+        self.assertEqual(second_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+
+        resource['modifiedDate'] = '2020-01-31T14:32:43.770Z'
+        conflicting_response = request_handler.handler(self.generate_if_match_event(resource, current_etag), None)
+        self.assertEqual(conflicting_response[Constants.response_status_code()], http.HTTPStatus.PRECONDITION_FAILED,
+                         'HTTP Status code not 412')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_modify_resource_if_match_weak_or_any(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource()
+
+        weak_response = request_handler.handler(
+            self.generate_if_match_event(resource, 'W/"2019-11-02T08:46:14.464755+00:00"'), None)
+        self.assertEqual(weak_response[Constants.response_status_code()], http.HTTPStatus.PRECONDITION_FAILED,
+                         'HTTP Status code not 412')
+
+        any_response = request_handler.handler(self.generate_if_match_event(resource, '*'), None)
+        self.assertEqual(any_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        remove_mock_database(dynamodb)
+
+    def generate_patch_event(self, operations, if_match=None):
+        event = {
+            Constants.event_http_method(): HttpConstants.http_method_patch(),
+            Constants.event_body(): json.dumps(operations),
+            Constants.event_path_parameters(): {
+                Constants.event_path_parameter_identifier(): self.EXISTING_RESOURCE_IDENTIFIER
+            }
+        }
+        if if_match is not None:
+            event[Constants.event_headers()] = {HttpConstants.http_header_if_match(): if_match}
+        return event
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_patch_resource(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        operations = [
+            {'op': 'test', 'path': '/owner', 'value': 'owner@unit.no'},
+            {'op': 'replace', 'path': '/entityDescription/titles/no', 'value': 'Ny tittel'},
+            {'op': 'add', 'path': '/status', 'value': 'Published'},
+            {'op': 'remove', 'path': '/fileSet'}
+        ]
+
+        handler_response = request_handler.handler(
+            self.generate_patch_event(operations, '"2019-11-02T08:46:14.464755+00:00"'), None)
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        version = json.loads(handler_response[Constants.response_body()])
+        self.assertEqual(handler_response[Constants.response_headers()][HttpConstants.http_header_etag()],
+                         '"%s"' % version['modifiedDate'], 'ETag not derived from modifiedDate')
+
+        versions = dynamodb.Table('testing').query(
+            KeyConditionExpression='identifier = :identifier AND modifiedDate >= :lower',
+            ExpressionAttributeValues={':identifier': self.EXISTING_RESOURCE_IDENTIFIER, ':lower': '0'})['Items']
+        self.assertEqual(len(versions), 2, 'Patch did not add a version')
+        patched = versions[-1]
+        self.assertEqual(patched['entityDescription']['titles']['no'], 'Ny tittel', 'Title not replaced')
+        self.assertEqual(patched['status'], 'Published', 'Status not added')
+        self.assertNotIn('fileSet', patched, 'fileSet not removed')
+        self.assertEqual(patched['createdDate'], '2019-11-02T08:46:14.464755+00:00', 'createdDate changed')
+        self.assertNotIn(Constants.ddb_field_latest_modified_date(), patched, 'Version holds latest item fields')
+
+        stale_response = request_handler.handler(
+            self.generate_patch_event(operations, '"2019-11-02T08:46:14.464755+00:00"'), None)
+        self.assertEqual(stale_response[Constants.response_status_code()], http.HTTPStatus.PRECONDITION_FAILED,
+                         'HTTP Status code not 412')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_patch_resource_inserts_into_list(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        resource = self.generate_mock_resource()
+        contributors = [dict(resource['entityDescription']['contributors'][0], sequence=sequence)
+                        for sequence in (0, 2)]
+        resource['entityDescription']['contributors'] = contributors
+        request_handler.modify_resource(resource)
+
+        handler_response = request_handler.handler(self.generate_patch_event([
+            {'op': 'add', 'path': '/entityDescription/contributors/1', 'value': {'name': 'Navn', 'sequence': 1}}
+        ]), None)
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                         'HTTP Status code not 200')
+        latest = dynamodb.Table('testing').get_item(Key=latest_key(self.EXISTING_RESOURCE_IDENTIFIER))['Item']
+        self.assertEqual([contributor['sequence'] for contributor in latest['entityDescription']['contributors']],
+                         [0, 1, 2], 'Contributor not inserted into the middle of the list')
+        self.assertEqual(latest['entityDescription']['titles'], resource['entityDescription']['titles'])
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_patch_resource_writes_in_one_transaction(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        request_handler.modify_resource(self.generate_mock_resource())
+        transact_write_items = request_handler.client.transact_write_items
+        calls = []
+
+        def modified_in_between(**arguments):
+            calls.append(arguments)
+            if len(calls) == 1:
+                request_handler.modify_resource(dict(self.generate_mock_resource(), status='Draft',
+                                                     modifiedDate='2020-01-30T14:32:43.770Z'))
+            return transact_write_items(**arguments)
+
+        with mock.patch.object(request_handler.client, 'transact_write_items', side_effect=modified_in_between), \
+                mock.patch.object(request_handler.table, 'put_item') as put_item, \
+                mock.patch.object(request_handler.table, 'update_item') as update_item:
+            version = request_handler.patch_resource(self.EXISTING_RESOURCE_IDENTIFIER,
+                                                     [{'op': 'replace', 'path': '/owner', 'value': 'other@unit.no'}])
+            put_item.assert_not_called()
+            update_item.assert_not_called()
+        self.assertEqual(len(calls), 3, 'Patch not retried on the modification in between')
+        self.assertEqual([list(item) for item in calls[2]['TransactItems']], [['Update'], ['Put']],
+                         'Latest item and version not written in one transaction')
+        self.assertEqual(version['status'], 'Draft', 'Patch not applied to the modification in between')
+        latest = dynamodb.Table('testing').get_item(Key=latest_key(self.EXISTING_RESOURCE_IDENTIFIER))['Item']
+        self.assertEqual(latest['owner'], 'other@unit.no', 'Latest item not patched')
+        self.assertEqual(latest[Constants.ddb_field_latest_modified_date()], version['modifiedDate'])
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_patch_resource_failed_operation(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+
+        failed_test_response = request_handler.handler(
+            self.generate_patch_event([{'op': 'test', 'path': '/owner', 'value': 'someone@unit.no'}]), None)
+        self.assertEqual(failed_test_response[Constants.response_status_code()], http.HTTPStatus.CONFLICT,
+                         'HTTP Status code not 409')
+
+        protected_response = request_handler.handler(
+            self.generate_patch_event([{'op': 'replace', 'path': '/identifier', 'value': 'other'}]), None)
+        self.assertEqual(protected_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_handler_patch_unknown_resource(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb)
+        event = self.generate_patch_event([{'op': 'add', 'path': '/status', 'value': 'Published'}])
+        event[Constants.event_path_parameters()][Constants.event_path_parameter_identifier()] = 'unknown'
+
+        handler_response = request_handler.handler(event, None)
+        self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST,
+                         'HTTP Status code not 400')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_modify_resource_stamps_expiry_of_superseded_version(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        from resource_api.common.retention import Retention
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb, Retention(max_age=timedelta(days=30)))
+        resource = self.generate_mock_resource()
+        request_handler.modify_resource(resource)
+        resource['modifiedDate'] = '2020-01-30T14:32:43.770Z'
+        request_handler.modify_resource(resource)
+        stale_response = request_handler.handler(
+            self.generate_if_match_event(resource, '"2020-01-29T14:32:43.770Z"'), None)
+        self.assertEqual(stale_response[Constants.response_status_code()], http.HTTPStatus.PRECONDITION_FAILED,
+                         'HTTP Status code not 412')
+        patched = request_handler.patch_resource(self.EXISTING_RESOURCE_IDENTIFIER,
+                                                 [{'op': 'add', 'path': '/status', 'value': 'Published'}])
+
+        versions = dynamodb.Table('testing').query(
+            KeyConditionExpression='identifier = :identifier AND modifiedDate >= :lower',
+            ExpressionAttributeValues={':identifier': self.EXISTING_RESOURCE_IDENTIFIER, ':lower': '0'})['Items']
+        expires_at = {version['modifiedDate']: version.get(Constants.ddb_field_expires_at()) for version in versions}
+        self.assertIsNone(expires_at['2019-11-02T08:46:14.464755+00:00'],
+                          'Version superseded while creating the latest item was stamped')
+        for superseded in ('2020-01-29T14:32:43.770Z', '2020-01-30T14:32:43.770Z'):
+            self.assertAlmostEqual(int(expires_at[superseded]), time.time() + timedelta(days=30).total_seconds(),
+                                   delta=60, msg='Superseded version not stamped to expire')
+        self.assertIsNone(expires_at[patched['modifiedDate']], 'Latest version stamped to expire')
+        latest = dynamodb.Table('testing').get_item(Key=latest_key(self.EXISTING_RESOURCE_IDENTIFIER))['Item']
+        self.assertNotIn(Constants.ddb_field_expires_at(), latest, 'Latest item stamped to expire')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_modify_resource_delta_encoded(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        from resource_api.common.deltas import DeltaEncoding, is_delta, reconstruct
+        from resource_api.common.retention import Retention
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb, Retention(max_age=timedelta(days=30)), DeltaEncoding(3))
+        expected = {}
+        resource = self.generate_mock_resource()
+        for modified_date in ('2020-01-29T14:32:43.770Z', '2020-01-30T14:32:43.770Z', None,
+                              '2099-01-01T00:00:00.000Z', '2099-01-02T00:00:00.000Z'):
+            if modified_date is None:
+                resource = request_handler.patch_resource(self.EXISTING_RESOURCE_IDENTIFIER,
+                                                          [{'op': 'add', 'path': '/status', 'value': 'Published'}])
+            else:
+                resource = dict(resource, modifiedDate=modified_date)
+                resource['entityDescription'] = dict(resource['entityDescription'], mainTitle=modified_date)
+                request_handler.modify_resource(resource)
+            expected[resource['modifiedDate']] = json.loads(json.dumps(resource))
+
+        items = dynamodb.Table('testing').query(
+            KeyConditionExpression='identifier = :identifier AND modifiedDate >= :lower',
+            ExpressionAttributeValues={':identifier': self.EXISTING_RESOURCE_IDENTIFIER, ':lower': '0'})['Items']
+        self.assertEqual([is_delta(item) for item in items], [False, False, True, True, False, True],
+                         'Versions not delta encoded between snapshots')
+        versions = reconstruct(items)
+        for modified_date, resource in expected.items():
+            version = dict(versions[modified_date])
+            version.pop(Constants.ddb_field_expires_at(), None)
+            self.assertEqual(json.loads(json.dumps(version)), resource, 'Version not reconstructed')
+        expired = [item['modifiedDate'] for item in items if Constants.ddb_field_expires_at() in item]
+        self.assertEqual(expired, [item['modifiedDate'] for item in items[:4]],
+                         'Chains before the superseded full version not stamped to expire')
+        latest = dynamodb.Table('testing').get_item(Key=latest_key(self.EXISTING_RESOURCE_IDENTIFIER))['Item']
+        self.assertEqual(latest[Constants.ddb_field_delta_depth()], 1, 'Latest item does not count deltas')
+        self.assertNotIn(Constants.ddb_field_delta_depth(), request_handler.patch_resource(
+            self.EXISTING_RESOURCE_IDENTIFIER, [{'op': 'remove', 'path': '/status'}]), 'Version holds delta depth')
+        remove_mock_database(dynamodb)
+
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    def test_modify_resource_older_version_delta_encoded(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        from resource_api.common.deltas import DeltaEncoding, is_delta, reconstruct
+        from resource_api.common.retention import Retention
+        dynamodb = self.setup_mock_database('eu-west-1',
+                                            'testing')
+        request_handler = RequestHandler(dynamodb, Retention(max_age=timedelta(days=30)), DeltaEncoding(3))
+        resource = self.generate_mock_resource()
+        request_handler.modify_resource(resource)
+        newer = dict(resource, modifiedDate='2020-01-31T14:32:43.770Z', status='Published')
+        request_handler.modify_resource(newer)
+        older = dict(resource, modifiedDate='2020-01-30T14:32:43.770Z', status='Draft')
+        request_handler.modify_resource(older)
+
+        items = dynamodb.Table('testing').query(
+            KeyConditionExpression='identifier = :identifier AND modifiedDate >= :lower',
+            ExpressionAttributeValues={':identifier': self.EXISTING_RESOURCE_IDENTIFIER, ':lower': '0'})['Items']
+        self.assertEqual([is_delta(item) for item in items], [False, False, False, True],
+                         'Older version not written in full')
+        self.assertNotIn(Constants.ddb_field_expires_at(), items[3], 'Latest version stamped to expire')
+        self.assertIn(Constants.ddb_field_expires_at(), items[2], 'Older version not stamped to expire')
+        versions = reconstruct(items)
+        self.assertEqual(versions[newer['modifiedDate']]['status'], 'Published',
+                         'Delta not reconstructed past an older version')
+        self.assertEqual(versions[older['modifiedDate']]['status'], 'Draft')
+        latest = dynamodb.Table('testing').get_item(Key=latest_key(self.EXISTING_RESOURCE_IDENTIFIER))['Item']
+        self.assertEqual(latest[Constants.ddb_field_latest_modified_date()], newer['modifiedDate'],
+                         'Latest item moved back to an older version')
+        remove_mock_database(dynamodb)
+
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    @mock.patch.dict(os.environ, {TestConstants.env_var_aws_request_checksum_calculation(): 'when_required'})
+    def test_modify_resource_offloads_large_attributes(self):
+        from resource_api.modify_resource.main.RequestHandler import RequestHandler
+        from resource_api.common.blobs import BlobStore
+        with mock_s3():
+            s3 = boto3.client('s3', region_name='eu-west-1')
+            s3.create_bucket(Bucket='blobs', CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'})
+            dynamodb = self.setup_mock_database('eu-west-1',
+                                                'testing')
+            request_handler = RequestHandler(dynamodb, blob_store=BlobStore(s3, 'blobs', 100))
+            resource = dict(self.generate_mock_resource(), identifier=self.EXISTING_RESOURCE_IDENTIFIER)
+            resource['entityDescription']['abstract'] = 'x' * 200
+            request_handler.modify_resource(resource)
+
+            def versions():
+                return dynamodb.Table('testing').query(
+                    KeyConditionExpression='identifier = :identifier AND modifiedDate >= :lower',
+                    ExpressionAttributeValues={':identifier': self.EXISTING_RESOURCE_IDENTIFIER,
+                                               ':lower': '0'})['Items']
+
+            put = versions()[-1]
+            self.assertNotIn('entityDescription', put, 'Large attribute kept in the version')
+            self.assertIn('entityDescription', put[Constants.ddb_field_offloaded()])
+            latest = dynamodb.Table('testing').get_item(Key=latest_key(self.EXISTING_RESOURCE_IDENTIFIER))['Item']
+            self.assertEqual(latest[Constants.ddb_field_offloaded()], put[Constants.ddb_field_offloaded()])
+
+            handler_response = request_handler.handler(self.generate_patch_event(
+                [{'op': 'replace', 'path': '/entityDescription/titles/en', 'value': 'A new title'}]), None)
+            self.assertEqual(handler_response[Constants.response_status_code()], http.HTTPStatus.OK,
+                             'HTTP Status code not 200')
+            version = json.loads(handler_response[Constants.response_body()])
+            self.assertEqual(version['entityDescription']['titles']['en'], 'A new title',
+                             'Offloaded attribute not patched')
+            self.assertNotIn(Constants.ddb_field_offloaded(), version, 'Offloaded attribute not loaded back')
+            patched = versions()[-1]
+            self.assertEqual(patched['modifiedDate'], version['modifiedDate'])
+            self.assertNotEqual(patched[Constants.ddb_field_offloaded()], put[Constants.ddb_field_offloaded()],
+                                'Patched attribute not offloaded again')
+
+            version = request_handler.patch_resource(self.EXISTING_RESOURCE_IDENTIFIER,
+                                                     [{'op': 'add', 'path': '/status', 'value': 'Published'}])
+            self.assertEqual(version['entityDescription']['titles']['en'], 'A new title',
+                             'Offloaded attribute not loaded')
+            self.assertEqual(versions()[-1][Constants.ddb_field_offloaded()], patched[Constants.ddb_field_offloaded()],
+                             'Unchanged attribute not shared')
+            self.assertEqual(s3.list_objects_v2(Bucket='blobs')['KeyCount'], 2)
+
+            conflict_response = request_handler.handler(self.generate_patch_event(
+                [{'op': 'test', 'path': '/entityDescription/titles/en', 'value': 'Toward unique identifiers'}]), None)
+            self.assertEqual(conflict_response[Constants.response_status_code()], http.HTTPStatus.CONFLICT,
+                             'HTTP Status code not 409')
+            remove_mock_database(dynamodb)
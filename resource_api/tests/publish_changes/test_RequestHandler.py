@@ -0,0 +1,138 @@
+import os
+import unittest
+from unittest import mock
+
+import boto3
+import simplejson as json
+from botocore.exceptions import ClientError
+from moto import mock_sns, mock_sqs
+
+from resource_api.common import lifecycle
+from resource_api.common.constants import Constants
+from resource_api.common.versions import latest_item
+from resource_api.tests.test_changes import IDENTIFIER, MODIFIED_DATES, modification, record, version
+from resource_api.tests.test_constants import TestConstants
+
+
+def stream_event(records):
+    return {Constants.stream_records(): records}
+
+
+def insertions(count):
+    """Returns the records of inserting count resources, two records each"""
+    _records = []
+    for _index in range(count):
+        _version = version('ebf20333-35a5-4a06-9c58-%012d' % _index, MODIFIED_DATES[0])
+        _records.extend([record(100 + 2 * _index, _version), record(101 + 2 * _index, latest_item(_version))])
+    return _records
+
+
+@mock_sns
+@mock_sqs
+class TestHandlerCase(unittest.TestCase):
+
+    def setUp(self):
+        """Mocked AWS Credentials for moto."""
+        os.environ[TestConstants.env_var_aws_access_key_id()] = 'testing'
+        os.environ[TestConstants.env_var_aws_secret_access_key()] = 'testing'
+        os.environ[TestConstants.env_var_aws_security_token()] = 'testing'
+        os.environ[TestConstants.env_var_aws_session_token()] = 'testing'
+        lifecycle.reset()
+        self.sns = boto3.client('sns', region_name='eu-west-1')
+        self.sqs = boto3.client('sqs', region_name='eu-west-1')
+        self.topic_arn = self.sns.create_topic(Name='changes')['TopicArn']
+        self.queue_url = self.sqs.create_queue(QueueName='indexer')['QueueUrl']
+        _queue_arn = self.sqs.get_queue_attributes(QueueUrl=self.queue_url, AttributeNames=['QueueArn'])[
+            'Attributes']['QueueArn']
+        self.sns.subscribe(TopicArn=self.topic_arn, Protocol='sqs', Endpoint=_queue_arn,
+                           Attributes={'RawMessageDelivery': 'true'})
+
+    def tearDown(self):
+        lifecycle.reset()
+
+    def received(self):
+        _notifications = []
+        while True:
+            _messages = self.sqs.receive_message(QueueUrl=self.queue_url, MaxNumberOfMessages=10).get('Messages', [])
+            if not _messages:
+                return _notifications
+            for _message in _messages:
+                _notifications.append(json.loads(_message['Body']))
+                self.sqs.delete_message(QueueUrl=self.queue_url, ReceiptHandle=_message['ReceiptHandle'])
+
+    def test_app(self):
+        from resource_api.publish_changes import app
+        with mock.patch.dict(os.environ, {'REGION': 'eu-west-1', 'CHANGE_TOPIC_ARN': self.topic_arn}):
+            _response = app.handler(stream_event(insertions(1)), None)
+        self.assertEqual(_response, {'batchItemFailures': []})
+        self.assertEqual(len(self.received()), 1)
+
+    def test_app_missing_env_topic(self):
+        from resource_api.publish_changes import app
+        with mock.patch.dict(os.environ, {'REGION': 'eu-west-1'}):
+            os.environ.pop(Constants.env_var_change_topic_arn(), None)
+            with self.assertRaises(ValueError):
+                app.handler(stream_event(insertions(1)), None)
+
+    def test_handler_publishes_coalesced_changes(self):
+        from resource_api.publish_changes.main.RequestHandler import RequestHandler
+        _versions = [version(IDENTIFIER, MODIFIED_DATES[_index], _status)
+                     for _index, _status in enumerate(['New', 'Published', 'Published'])]
+        _versions[2]['entityDescription'] = {'titles': {'no': 'Ny tittel'}}
+        _records = modification(200, _versions[0], _versions[1]) + modification(202, _versions[1], _versions[2])
+
+        _response = RequestHandler(self.sns, self.topic_arn).handler(stream_event(insertions(12) + _records), None)
+        self.assertEqual(_response, {'batchItemFailures': []})
+        _notifications = self.received()
+        self.assertEqual(len(_notifications), 13, 'Not one notification per resource')
+        self.assertIn({
+            'identifier': IDENTIFIER,
+            'modifiedDate': MODIFIED_DATES[2],
+            'previousModifiedDate': MODIFIED_DATES[0],
+            'changedFields': ['entityDescription', 'status']
+        }, _notifications)
+
+    def test_handler_ignores_versions_and_removals(self):
+        from resource_api.publish_changes.main.RequestHandler import RequestHandler
+        _version = version(IDENTIFIER, MODIFIED_DATES[0])
+        _records = [record(100, _version), record(101, _version, _version, 'REMOVE')]
+        for _event in (stream_event(_records), stream_event([]), None):
+            self.assertEqual(RequestHandler(self.sns, self.topic_arn).handler(_event, None),
+                             {'batchItemFailures': []})
+        self.assertEqual(self.received(), [])
+
+    def test_handler_reports_first_failed_record(self):
+        from resource_api.publish_changes.main.RequestHandler import RequestHandler
+        _request_handler = RequestHandler(self.sns, self.topic_arn)
+        _publish_batch = self.sns.publish_batch
+        _calls = []
+
+        def publish_batch(**arguments):
+            _calls.append(arguments)
+            if len(_calls) == 1:
+                return _publish_batch(**arguments)
+            if len(_calls) == 2:
+                raise ClientError({'Error': {'Code': 'Throttling', 'Message': 'Rate exceeded'}}, 'PublishBatch')
+            return {'Successful': [], 'Failed': [{'Id': '0', 'Code': 'InternalError', 'Message': 'failed'}]}
+
+        with mock.patch.object(self.sns, 'publish_batch', side_effect=publish_batch):
+            _response = _request_handler.handler(stream_event(insertions(25)), None)
+        self.assertEqual(len(_calls), 3, 'Notifications not published ten at a time')
+        self.assertEqual(_response, {'batchItemFailures': [{'itemIdentifier': '121'}]},
+                         'Not the first record of the earliest failed notification')
+        self.assertEqual(len(self.received()), 10)
+
+    def test_handler_fifo_topic(self):
+        from resource_api.publish_changes.main.RequestHandler import RequestHandler
+        _topic_arn = self.topic_arn + '.fifo'
+        _sns = mock.Mock()
+        _sns.publish_batch.return_value = {'Successful': [], 'Failed': []}
+        RequestHandler(_sns, _topic_arn).handler(stream_event(insertions(1)), None)
+        _entry = _sns.publish_batch.call_args[1]['PublishBatchRequestEntries'][0]
+        self.assertEqual(_entry['MessageGroupId'], 'ebf20333-35a5-4a06-9c58-000000000000')
+        self.assertEqual(_entry['MessageDeduplicationId'], 'ebf20333-35a5-4a06-9c58-000000000000/%s'
+                         % MODIFIED_DATES[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
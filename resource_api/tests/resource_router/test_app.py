@@ -0,0 +1,195 @@
+import http
+import simplejson as json
+import os
+import unittest
+from unittest import mock
+
+import boto3
+from moto import mock_dynamodb2
+
+from resource_api.common import lifecycle
+from resource_api.common.constants import Constants
+from resource_api.common.http_constants import HttpConstants
+from resource_api.tests.test_constants import TestConstants
+from tools.create_indexes import attribute_definitions, global_secondary_indexes
+
+
+def remove_mock_database(dynamodb):
+    dynamodb.Table(os.environ[Constants.env_var_table_name()]).delete()
+
+
+def generate_mock_event(http_method, resource, identifier=None, body=None):
+    event = {
+        Constants.event_http_method(): http_method,
+        Constants.event_resource(): resource
+    }
+    if identifier is not None:
+        event[Constants.event_path_parameters()] = {Constants.event_path_parameter_identifier(): identifier}
+    if body is not None:
+        event[Constants.event_body()] = json.dumps(body)
+    return event
+
+
+class TestRouteCase(unittest.TestCase):
+
+    def test_resource_path_from_resource(self):
+        from resource_api.resource_router import app
+        self.assertEqual(app.resource_path({Constants.event_resource(): '/{identifier}/versions'}),
+                         Constants.resource_path_identifier_versions())
+
+    def test_resource_path_from_path(self):
+        from resource_api.resource_router import app
+        _identifier = {Constants.event_path_parameter_identifier(): 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'}
+        for _event, _expected in [
+            ({Constants.event_path(): '/'}, Constants.resource_path_root()),
+            ({Constants.event_path(): '/resource/'}, Constants.resource_path_root()),
+            ({Constants.event_path(): '/resource/bulk'}, Constants.resource_path_bulk()),
+            ({Constants.event_path(): '/batch'}, Constants.resource_path_batch()),
+            ({Constants.event_path(): '/resource/ebf20333-35a5-4a06-9c58-68ea688a9a8b',
+              Constants.event_path_parameters(): _identifier}, Constants.resource_path_identifier()),
+            ({Constants.event_path(): '/ebf20333-35a5-4a06-9c58-68ea688a9a8b/versions',
+              Constants.event_path_parameters(): _identifier}, Constants.resource_path_identifier_versions()),
+            ({Constants.event_path(): '/owner/owner@unit',
+              Constants.event_path_parameters(): {Constants.event_path_parameter_owner(): 'owner@unit'}},
+             Constants.resource_path_owner()),
+            ({Constants.event_path(): '/status/Published',
+              Constants.event_path_parameters(): {Constants.event_path_parameter_status(): 'Published'}},
+             Constants.resource_path_status())
+        ]:
+            self.assertEqual(app.resource_path(_event), _expected)
+
+    def test_handler_dispatches_on_method_and_resource(self):
+        from resource_api.resource_router import app
+        for _method, _resource in app.ROUTES:
+            _routes = {_key: mock.Mock(return_value=_key) for _key in app.ROUTES}
+            with mock.patch.dict(app.ROUTES, _routes):
+                _event = generate_mock_event(_method, _resource)
+                self.assertEqual(app.handler(_event, None), (_method, _resource))
+                _routes[(_method, _resource)].assert_called_once_with(_event, None)
+
+    def test_handler_unsupported_operation(self):
+        from resource_api.resource_router import app
+        _response = app.handler(generate_mock_event(HttpConstants.http_method_put(), '/batch'), None)
+        self.assertEqual(_response[Constants.response_status_code()], http.HTTPStatus.METHOD_NOT_ALLOWED)
+        self.assertEqual(_response[Constants.event_body()],
+                         Constants.error_unsupported_operation() % ('PUT', '/batch'))
+
+        _response = app.handler(generate_mock_event(HttpConstants.http_method_get(), '/unknown'), None)
+        self.assertEqual(_response[Constants.response_status_code()], http.HTTPStatus.NOT_FOUND)
+
+    def test_handler_missing_event(self):
+        from resource_api.resource_router import app
+        for _event in [None, {Constants.event_resource(): '/'}]:
+            _response = app.handler(_event, None)
+            self.assertEqual(_response[Constants.response_status_code()], http.HTTPStatus.BAD_REQUEST)
+
+
+@mock_dynamodb2
+class TestHandlerCase(unittest.TestCase):
+    RESOURCE_IDENTIFIER = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+
+    def setUp(self):
+        """Mocked AWS Credentials for moto."""
+        os.environ[TestConstants.env_var_aws_access_key_id()] = 'testing'
+        os.environ[TestConstants.env_var_aws_secret_access_key()] = 'testing'
+        os.environ[TestConstants.env_var_aws_security_token()] = 'testing'
+        os.environ[TestConstants.env_var_aws_session_token()] = 'testing'
+        lifecycle.reset()
+
+    def tearDown(self):
+        lifecycle.reset()
+
+    def setup_mock_database(self, region, table_name):
+        dynamodb = boto3.resource('dynamodb', region_name=region)
+        _throughput = {'ReadCapacityUnits': 1, 'WriteCapacityUnits': 1}
+        dynamodb.create_table(TableName=table_name,
+                              KeySchema=[{'AttributeName': 'identifier', 'KeyType': 'HASH'},
+                                         {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                              AttributeDefinitions=[
+                                  {'AttributeName': 'identifier', 'AttributeType': 'S'},
+                                  {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}
+                              ] + attribute_definitions(),
+                              GlobalSecondaryIndexes=global_secondary_indexes(_throughput),
+                              ProvisionedThroughput=_throughput)
+        return dynamodb
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    @mock.patch.dict(os.environ, {'DDB_FAST_PATH': 'true'})
+    def test_operations_share_one_container(self):
+        from resource_api.common.dynamo import DynamoDB
+        from resource_api.resource_router import app
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        _resource = {
+            'identifier': self.RESOURCE_IDENTIFIER,
+            'modifiedDate': '2019-11-02T08:46:14.464755+00:00',
+            'createdDate': '2019-11-02T08:46:14.464755+00:00',
+            'owner': 'owner@unit.no',
+            'status': 'New'
+        }
+
+        with mock.patch.object(DynamoDB, 'connect', autospec=True, side_effect=DynamoDB.connect) as _connect:
+            _response = app.handler(generate_mock_event(HttpConstants.http_method_post(), '/', body=_resource), None)
+            self.assertEqual(_response[Constants.response_status_code()], http.HTTPStatus.CREATED)
+
+            _patch = [{'op': 'replace', 'path': '/status', 'value': 'Published'}]
+            _response = app.handler(generate_mock_event(HttpConstants.http_method_patch(), '/{identifier}',
+                                                        self.RESOURCE_IDENTIFIER, _patch), None)
+            self.assertEqual(_response[Constants.response_status_code()], http.HTTPStatus.OK)
+
+            _response = app.handler(generate_mock_event(HttpConstants.http_method_get(), '/{identifier}',
+                                                        self.RESOURCE_IDENTIFIER), None)
+            self.assertEqual(_response[Constants.response_status_code()], http.HTTPStatus.OK)
+            self.assertIn('Published', _response[Constants.event_body()])
+
+            _response = app.handler(generate_mock_event(HttpConstants.http_method_post(), '/batch',
+                                                        body={'identifiers': [self.RESOURCE_IDENTIFIER]}), None)
+            self.assertEqual(_response[Constants.response_status_code()], http.HTTPStatus.OK)
+
+            _event = generate_mock_event(HttpConstants.http_method_get(), '/status/{status}')
+            _event[Constants.event_path_parameters()] = {Constants.event_path_parameter_status(): 'Published'}
+            _response = app.handler(_event, None)
+            self.assertEqual(_response[Constants.response_status_code()], http.HTTPStatus.OK)
+            self.assertIn(self.RESOURCE_IDENTIFIER, _response[Constants.event_body()])
+
+            self.assertEqual(_connect.call_count, 1, 'Operations did not share the Dynamo DB connection')
+        remove_mock_database(dynamodb)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    @mock.patch.dict(os.environ, {'FETCH_CACHE_TTL_SECONDS': '60'})
+    def test_writes_evict_the_fetch_cache(self):
+        from resource_api.resource_router import app
+        dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        _resource = {
+            'identifier': self.RESOURCE_IDENTIFIER,
+            'modifiedDate': '2019-11-02T08:46:14.464755+00:00',
+            'createdDate': '2019-11-02T08:46:14.464755+00:00',
+            'owner': 'owner@unit.no',
+            'status': 'New'
+        }
+        _get = generate_mock_event(HttpConstants.http_method_get(), '/{identifier}', self.RESOURCE_IDENTIFIER)
+
+        _response = app.handler(generate_mock_event(HttpConstants.http_method_post(), '/', body=_resource), None)
+        self.assertEqual(_response[Constants.response_status_code()], http.HTTPStatus.CREATED)
+        _response = app.handler(_get, None)
+        self.assertIn('New', _response[Constants.event_body()])
+
+        _resource.update({'modifiedDate': '2019-11-03T08:46:14.464755+00:00', 'status': 'Published'})
+        _response = app.handler(generate_mock_event(HttpConstants.http_method_put(), '/{identifier}',
+                                                    self.RESOURCE_IDENTIFIER, _resource), None)
+        self.assertEqual(_response[Constants.response_status_code()], http.HTTPStatus.OK)
+        _response = app.handler(_get, None)
+        self.assertIn('Published', _response[Constants.event_body()])
+
+        _patch = [{'op': 'replace', 'path': '/status', 'value': 'Unpublished'}]
+        _response = app.handler(generate_mock_event(HttpConstants.http_method_patch(), '/{identifier}',
+                                                    self.RESOURCE_IDENTIFIER, _patch), None)
+        self.assertEqual(_response[Constants.response_status_code()], http.HTTPStatus.OK)
+        _response = app.handler(_get, None)
+        self.assertIn('Unpublished', _response[Constants.event_body()])
+        remove_mock_database(dynamodb)
+
+
+if __name__ == '__main__':
+    unittest.main()
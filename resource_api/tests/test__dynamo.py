@@ -17,3 +17,9 @@ class TestDynamo(TestCase):
 
         _dynamo = ddb.connect('eu-west-1')
         self.assertTrue(isinstance(_dynamo, ServiceResource), 'Type was not DDB')
+
+    def test_validate_region_names(self):
+        for region in ['eu-west-1', 'eu-north-1', 'us-gov-west-1', 'cn-northwest-1', 'ap-southeast-3']:
+            self.assertEqual(dynamo.DynamoDB._validate_region(region), region)
+        for region in [None, '', 'eu-west', 'EU-WEST-1', 'eu-west-1 ', 'eu-west-1/../']:
+            self.assertRaises(ValueError, dynamo.DynamoDB._validate_region, region)
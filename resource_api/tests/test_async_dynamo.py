@@ -0,0 +1,153 @@
+import importlib.util
+import os
+import time
+import unittest
+from unittest import mock
+
+import boto3
+from moto import mock_dynamodb2
+
+from resource_api.common.async_dynamo import AsyncDynamoDB, gather, run
+from resource_api.tests.test_constants import TestConstants
+
+IDENTIFIERS = ['%08d-35a5-4a06-9c58-68ea688a9a8b' % _index for _index in range(120)]
+
+
+def create_table(dynamodb, table_name):
+    return dynamodb.create_table(TableName=table_name,
+                                 KeySchema=[{'AttributeName': 'identifier', 'KeyType': 'HASH'},
+                                            {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                                 AttributeDefinitions=[
+                                     {'AttributeName': 'identifier', 'AttributeType': 'S'},
+                                     {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+                                 ProvisionedThroughput={'ReadCapacityUnits': 1,
+                                                        'WriteCapacityUnits': 1})
+
+
+def generate_items(identifiers, versions=1):
+    return [{
+        'identifier': _identifier,
+        'modifiedDate': '2019-11-%02dT08:46:14.464755+00:00' % (_version + 1),
+        'owner': 'owner@unit.no'
+    } for _identifier in identifiers for _version in range(versions)]
+
+
+class AsyncDynamoDBCases:
+    """Cases run against every Dynamo DB stand-in; dynamodb is the Service Resource to use"""
+
+    dynamodb = None
+
+    def setUp(self):
+        create_table(self.dynamodb, 'testing')
+        self.async_dynamodb = AsyncDynamoDB(self.dynamodb.meta.client, 'testing')
+
+    def tearDown(self):
+        self.dynamodb.Table('testing').delete()
+
+    def test_put_and_get_item(self):
+        _item = generate_items(IDENTIFIERS[:1])[0]
+        run(self.async_dynamodb.put_item(_item))
+        _key = {'identifier': _item['identifier'], 'modifiedDate': _item['modifiedDate']}
+        self.assertEqual(run(self.async_dynamodb.get_item(_key)), _item)
+        self.assertIsNone(run(self.async_dynamodb.get_item(dict(_key, identifier=IDENTIFIERS[1]))))
+
+    def test_query_all_follows_pages(self):
+        _items = generate_items(IDENTIFIERS[:1], versions=5)
+        run(self.async_dynamodb.batch_put(_items))
+        _queried = run(self.async_dynamodb.query_all(KeyConditionExpression='identifier = :identifier',
+                                                     ExpressionAttributeValues={':identifier': IDENTIFIERS[0]},
+                                                     Limit=2))
+        self.assertEqual(_queried, _items)
+
+    def test_batch_put_and_batch_get_in_chunks(self):
+        _items = generate_items(IDENTIFIERS)
+        self.assertEqual(run(self.async_dynamodb.batch_put(_items)), [])
+        _keys = [{'identifier': _item['identifier'], 'modifiedDate': _item['modifiedDate']} for _item in _items]
+        _found, _unprocessed = run(self.async_dynamodb.batch_get(_keys))
+        self.assertEqual(_unprocessed, [])
+        self.assertEqual(sorted(_found, key=lambda _item: _item['identifier']), _items)
+
+    def test_gather_overlaps_calls(self):
+        run(self.async_dynamodb.batch_put(generate_items(IDENTIFIERS[:8])))
+        _get_item = self.dynamodb.meta.client.get_item
+
+        def slow_get_item(**kwargs):
+            time.sleep(0.1)
+            return _get_item(**kwargs)
+
+        _keys = [{'identifier': _identifier, 'modifiedDate': '2019-11-01T08:46:14.464755+00:00'}
+                 for _identifier in IDENTIFIERS[:8]]
+        with mock.patch.object(self.dynamodb.meta.client, 'get_item', side_effect=slow_get_item):
+            _start = time.perf_counter()
+            _items = run(gather(*[self.async_dynamodb.get_item(_key) for _key in _keys]))
+            _seconds = time.perf_counter() - _start
+        self.assertEqual([_item['identifier'] for _item in _items], IDENTIFIERS[:8])
+        self.assertLess(_seconds, 0.4, 'Calls did not overlap')
+
+
+class TestAsyncDynamoDB(AsyncDynamoDBCases, unittest.TestCase):
+
+    def setUp(self):
+        """Mocked AWS Credentials for moto."""
+        os.environ[TestConstants.env_var_aws_access_key_id()] = 'testing'
+        os.environ[TestConstants.env_var_aws_secret_access_key()] = 'testing'
+        os.environ[TestConstants.env_var_aws_security_token()] = 'testing'
+        os.environ[TestConstants.env_var_aws_session_token()] = 'testing'
+        self.mock = mock_dynamodb2()
+        self.mock.start()
+        self.dynamodb = boto3.resource('dynamodb', region_name='eu-west-1')
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        self.mock.stop()
+
+    @mock.patch('asyncio.sleep')
+    def test_batch_get_retries_unprocessed_keys(self, _sleep):
+        run(self.async_dynamodb.batch_put(generate_items(IDENTIFIERS[:3])))
+        _keys = [{'identifier': _identifier, 'modifiedDate': '2019-11-01T08:46:14.464755+00:00'}
+                 for _identifier in IDENTIFIERS[:3]]
+        _batch_get_item = self.dynamodb.meta.client.batch_get_item
+        _calls = []
+
+        def throttled_batch_get_item(RequestItems):
+            _calls.append(RequestItems)
+            if len(_calls) > 1:
+                return _batch_get_item(RequestItems=RequestItems)
+            _response = _batch_get_item(RequestItems={'testing': {'Keys': RequestItems['testing']['Keys'][:1]}})
+            _response['UnprocessedKeys'] = {'testing': {'Keys': RequestItems['testing']['Keys'][1:]}}
+            return _response
+
+        with mock.patch.object(self.dynamodb.meta.client, 'batch_get_item', side_effect=throttled_batch_get_item):
+            _found, _unprocessed = run(self.async_dynamodb.batch_get(_keys))
+        self.assertEqual(len(_found), 3, 'Unprocessed keys not retried')
+        self.assertEqual(_unprocessed, [])
+        self.assertEqual(len(_calls[1]['testing']['Keys']), 2, 'Retry did not only send unprocessed keys')
+
+
+@unittest.skipUnless(importlib.util.find_spec('flask'), 'moto server needs moto[server]')
+class TestAsyncDynamoDBServer(AsyncDynamoDBCases, unittest.TestCase):
+    """Runs the cases over HTTP against moto in server mode, where calls really overlap on the connection pool"""
+
+    server = None
+
+    @classmethod
+    def setUpClass(cls):
+        from moto.server import ThreadedMotoServer
+        cls.server = ThreadedMotoServer(port=0)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        _host, _port = self.server._server.server_address
+        self.dynamodb = boto3.session.Session().resource(
+            'dynamodb', region_name='eu-west-1', endpoint_url='http://%s:%d' % (_host, _port),
+            aws_access_key_id='testing', aws_secret_access_key='testing')
+        super().setUp()
+
+
+if __name__ == '__main__':
+    unittest.main()
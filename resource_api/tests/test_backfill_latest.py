@@ -0,0 +1,76 @@
+import os
+import unittest
+
+import boto3
+from moto import mock_dynamodb2
+
+from resource_api.common.constants import Constants
+from resource_api.common.versions import latest_item, latest_key
+from resource_api.tests.test_constants import TestConstants
+from tools.backfill_latest import backfill
+
+WITHOUT_LATEST_ITEM = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+LATEST_ITEM_BEHIND = '4d96e658-c2e0-4f23-9f1d-ccae0c770ecd'
+LATEST_ITEM_CURRENT = 'fbf20333-35a5-4a06-9c58-68ea688a9a8b'
+MODIFIED_DATES = ['2019-11-0%dT08:46:14.464755+00:00' % _day for _day in range(1, 4)]
+
+
+def version(identifier, modified_date):
+    return {
+        'identifier': identifier,
+        'modifiedDate': modified_date,
+        'entityDescription': {'titles': {'no': 'Tittel %s' % modified_date}}
+    }
+
+
+class TestBackfillLatest(unittest.TestCase):
+
+    def setUp(self):
+        """Mocked AWS Credentials for moto."""
+        os.environ[TestConstants.env_var_aws_access_key_id()] = 'testing'
+        os.environ[TestConstants.env_var_aws_secret_access_key()] = 'testing'
+        os.environ[TestConstants.env_var_aws_security_token()] = 'testing'
+        os.environ[TestConstants.env_var_aws_session_token()] = 'testing'
+        self.mock = mock_dynamodb2()
+        self.mock.start()
+        self.dynamodb = boto3.resource('dynamodb', region_name='eu-west-1')
+        self.table = self.dynamodb.create_table(TableName='testing',
+                                                KeySchema=[{'AttributeName': 'identifier', 'KeyType': 'HASH'},
+                                                           {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                                                AttributeDefinitions=[
+                                                    {'AttributeName': 'identifier', 'AttributeType': 'S'},
+                                                    {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+                                                ProvisionedThroughput={'ReadCapacityUnits': 1,
+                                                                       'WriteCapacityUnits': 1})
+        for _identifier in (WITHOUT_LATEST_ITEM, LATEST_ITEM_BEHIND, LATEST_ITEM_CURRENT):
+            for _modified_date in MODIFIED_DATES:
+                self.table.put_item(Item=version(_identifier, _modified_date))
+        self.table.put_item(Item=latest_item(version(LATEST_ITEM_BEHIND, MODIFIED_DATES[0])))
+        self.table.put_item(Item=latest_item(version(LATEST_ITEM_CURRENT, MODIFIED_DATES[-1])))
+
+    def tearDown(self):
+        self.mock.stop()
+
+    def latest_modified_date(self, identifier):
+        _item = self.table.get_item(Key=latest_key(identifier)).get('Item')
+        return None if _item is None else _item[Constants.ddb_field_latest_modified_date()]
+
+    def test_dry_run(self):
+        self.assertEqual(backfill(self.dynamodb, 'testing', dry_run=True),
+                         {'resources': 3, 'behind': 2, 'written': 0})
+        self.assertIsNone(self.latest_modified_date(WITHOUT_LATEST_ITEM), 'Dry run wrote a latest item')
+
+    def test_backfill(self):
+        self.assertEqual(backfill(self.dynamodb, 'testing'), {'resources': 3, 'behind': 2, 'written': 2})
+        for _identifier in (WITHOUT_LATEST_ITEM, LATEST_ITEM_BEHIND, LATEST_ITEM_CURRENT):
+            self.assertEqual(self.latest_modified_date(_identifier), MODIFIED_DATES[-1],
+                             'Latest item does not hold the newest version')
+        _item = self.table.get_item(Key=latest_key(WITHOUT_LATEST_ITEM))['Item']
+        self.assertEqual(_item['entityDescription'], version(WITHOUT_LATEST_ITEM, MODIFIED_DATES[-1])[
+            'entityDescription'], 'Latest item does not copy the version')
+        self.assertEqual(backfill(self.dynamodb, 'testing'), {'resources': 3, 'behind': 0, 'written': 0},
+                         'Second run was not harmless')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import gzip
+import os
+from unittest import TestCase
+
+import boto3
+import simplejson as json
+from moto import mock_s3
+
+from resource_api.common.blobs import BlobStore
+from resource_api.common.constants import Constants
+from resource_api.tests.test_constants import TestConstants
+
+BUCKET = 'blobs'
+
+
+def generate_resource(titles):
+    return {
+        'identifier': 'ebf20333-35a5-4a06-9c58-68ea688a9a8b',
+        'modifiedDate': '2020-01-29T14:32:43.770Z',
+        'status': 'New',
+        'entityDescription': {'titles': {'no': 'x' * titles}},
+        'fileSet': {'files': []}
+    }
+
+
+@mock_s3
+class TestBlobs(TestCase):
+
+    def setUp(self):
+        os.environ[TestConstants.env_var_aws_access_key_id()] = 'testing'
+        os.environ[TestConstants.env_var_aws_secret_access_key()] = 'testing'
+        os.environ[TestConstants.env_var_aws_request_checksum_calculation()] = 'when_required'
+        self.s3 = boto3.client('s3', region_name='eu-west-1')
+        self.s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'})
+
+    def test_from_environment(self):
+        self.assertIsNone(BlobStore.from_environment({}, lambda: self.s3))
+        blob_store = BlobStore.from_environment({
+            Constants.env_var_blob_bucket(): BUCKET,
+            Constants.env_var_blob_min_bytes(): '100'
+        }, lambda: self.s3)
+        self.assertEqual((blob_store.bucket, blob_store.min_bytes), (BUCKET, 100))
+
+    def test_offload_and_rehydrate(self):
+        blob_store = BlobStore(self.s3, BUCKET, 100)
+        resource = generate_resource(200)
+        item = blob_store.offload(dict(resource, offloaded={'fileSet': 'blobs/other'}))
+        self.assertNotIn('entityDescription', item, 'Large attribute kept in the item')
+        self.assertEqual(item['fileSet'], resource['fileSet'], 'Small attribute offloaded')
+        self.assertEqual(list(item['offloaded']), ['entityDescription'], 'Offloaded map sent by the client kept')
+        key = item['offloaded']['entityDescription']
+        stored = self.s3.get_object(Bucket=BUCKET, Key=key)
+        self.assertEqual(stored['ContentEncoding'].split(',')[0], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(stored['Body'].read())), resource['entityDescription'])
+
+        self.assertEqual(blob_store.offload(dict(resource, modifiedDate='2020-01-30T14:32:43.770Z'))['offloaded'],
+                         item['offloaded'], 'Unchanged attribute not shared')
+        self.assertNotEqual(blob_store.offload(generate_resource(201))['offloaded'], item['offloaded'])
+        self.assertEqual(self.s3.list_objects_v2(Bucket=BUCKET)['KeyCount'], 2)
+
+        self.assertEqual(blob_store.rehydrate(item), resource)
+        self.assertEqual(BlobStore(self.s3, BUCKET, 100).rehydrate(item), resource, 'Not loaded from the bucket')
+        self.assertNotIn('entityDescription', blob_store.rehydrate(item, {'status'}), 'Unselected attribute loaded')
+        self.assertEqual(blob_store.rehydrate(resource), resource)
+
+    def test_link(self):
+        blob_store = BlobStore(self.s3, BUCKET, 100)
+        item = blob_store.offload(generate_resource(200))
+        url = blob_store.link(item)['offloaded']['entityDescription']
+        self.assertIn(item['offloaded']['entityDescription'], url)
+        self.assertIn('Expires=', url)
+        self.assertEqual(blob_store.link(item, {'status'})['offloaded'], {})
@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+from resource_api.common.cache import LRUCache
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCache(TestCase):
+    def test_get_and_put(self):
+        cache = LRUCache(100, 10)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', 'value', 5)
+        self.assertEqual(cache.get('a'), 'value')
+        self.assertEqual(cache.statistics()['hits'], 1)
+        self.assertEqual(cache.statistics()['misses'], 1)
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = LRUCache(100, 10, clock)
+        cache.put('a', 'value', 5)
+        clock.now = 10.0
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.statistics()['bytes'], 0)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = LRUCache(10, 10)
+        cache.put('a', 'a', 4)
+        cache.put('b', 'b', 4)
+        cache.get('a')
+        cache.put('c', 'c', 4)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'a')
+        self.assertEqual(cache.get('c'), 'c')
+        self.assertEqual(cache.statistics()['evictions'], 1)
+        self.assertEqual(cache.statistics()['bytes'], 8)
+
+    def test_oversized_values_are_not_cached(self):
+        cache = LRUCache(10, 10)
+        cache.put('a', 'a', 11)
+        self.assertIsNone(cache.get('a'))
+
+    def test_invalidate(self):
+        cache = LRUCache(10, 10)
+        cache.put('a', 'a', 4)
+        cache.put('a', 'b', 4)
+        self.assertEqual(cache.statistics()['bytes'], 4)
+        cache.invalidate('a')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.statistics()['bytes'], 0)
@@ -0,0 +1,102 @@
+import unittest
+
+from resource_api.common.changes import changed_fields, coalesce
+from resource_api.common.versions import latest_item
+from resource_api.common.wire import to_wire_item
+
+IDENTIFIER = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+OTHER_IDENTIFIER = '4d96e658-c2e0-4f23-9f1d-ccae0c770ecd'
+MODIFIED_DATES = ['2019-11-0%dT08:46:14.464755+00:00' % _day for _day in range(1, 5)]
+
+
+def version(identifier, modified_date, status='New', title='Tittel'):
+    return {
+        'identifier': identifier,
+        'modifiedDate': modified_date,
+        'status': status,
+        'entityDescription': {'titles': {'no': title}}
+    }
+
+
+def record(sequence_number, item, old_item=None, event_name=None):
+    """Returns a synthetic stream record of the write of an item, as a stream with new and old images carries"""
+    _stream_record = {
+        'Keys': to_wire_item({'identifier': item['identifier'], 'modifiedDate': item['modifiedDate']}),
+        'NewImage': to_wire_item(item),
+        'SequenceNumber': str(sequence_number),
+        'StreamViewType': 'NEW_AND_OLD_IMAGES'
+    }
+    if old_item is not None:
+        _stream_record['OldImage'] = to_wire_item(old_item)
+    return {
+        'eventID': str(sequence_number),
+        'eventName': event_name or ('INSERT' if old_item is None else 'MODIFY'),
+        'eventSource': 'aws:dynamodb',
+        'dynamodb': _stream_record
+    }
+
+
+def modification(sequence_number, old_version, new_version):
+    """Returns the records of a modification: the new version and the replaced latest item"""
+    return [record(sequence_number, new_version),
+            record(sequence_number + 1, latest_item(new_version), latest_item(old_version))]
+
+
+class TestChanges(unittest.TestCase):
+
+    def test_changed_fields(self):
+        _old = to_wire_item(latest_item(version(IDENTIFIER, MODIFIED_DATES[0])))
+        self.assertEqual(changed_fields(_old, _old), [])
+        self.assertEqual(changed_fields(None, _old), ['entityDescription', 'status'])
+        _new = to_wire_item(dict(latest_item(version(IDENTIFIER, MODIFIED_DATES[1], 'Published')), deltaDepth=1))
+        self.assertEqual(changed_fields(_old, _new), ['status'], 'Bookkeeping attributes reported changed')
+        _new = to_wire_item(dict(latest_item(version(IDENTIFIER, MODIFIED_DATES[1])), owner='owner@unit.no'))
+        del _new['status']
+        self.assertEqual(changed_fields(_old, _new), ['owner', 'status'])
+
+    def test_changed_fields_offloaded(self):
+        _item = latest_item(version(IDENTIFIER, MODIFIED_DATES[0]))
+        del _item['entityDescription']
+        _old = to_wire_item(dict(_item, offloaded={'entityDescription': 'blobs/a'}))
+        self.assertEqual(changed_fields(_old, to_wire_item(dict(_item, offloaded={'entityDescription': 'blobs/a'}))),
+                         [], 'Offloaded attribute with the same content reported changed')
+        self.assertEqual(changed_fields(_old, to_wire_item(dict(_item, offloaded={'entityDescription': 'blobs/b'}))),
+                         ['entityDescription'])
+
+    def test_coalesce(self):
+        _versions = [version(IDENTIFIER, MODIFIED_DATES[0]),
+                     version(IDENTIFIER, MODIFIED_DATES[1], 'Published'),
+                     version(IDENTIFIER, MODIFIED_DATES[2], 'Published', 'Ny tittel')]
+        _other = version(OTHER_IDENTIFIER, MODIFIED_DATES[0])
+        _records = (modification(100, _versions[0], _versions[1])
+                    + [record(102, _other), record(103, latest_item(_other))]
+                    + modification(104, _versions[1], _versions[2])
+                    + [record(106, _versions[0], _versions[0], 'REMOVE')])
+
+        _changes = coalesce(_records)
+        self.assertEqual([_change.identifier for _change in _changes], [IDENTIFIER, OTHER_IDENTIFIER])
+        self.assertEqual([_change.sequence_number for _change in _changes], ['101', '103'])
+        self.assertEqual([_change.notification() for _change in _changes], [{
+            'identifier': IDENTIFIER,
+            'modifiedDate': MODIFIED_DATES[2],
+            'previousModifiedDate': MODIFIED_DATES[0],
+            'changedFields': ['entityDescription', 'status']
+        }, {
+            'identifier': OTHER_IDENTIFIER,
+            'modifiedDate': MODIFIED_DATES[0],
+            'previousModifiedDate': None,
+            'changedFields': ['entityDescription', 'status']
+        }])
+
+    def test_coalesce_unchanged(self):
+        _versions = [version(IDENTIFIER, MODIFIED_DATES[0]), version(IDENTIFIER, MODIFIED_DATES[1], 'Published'),
+                     version(IDENTIFIER, MODIFIED_DATES[2])]
+        _records = [record(100, latest_item(_versions[0]), latest_item(_versions[0]))]
+        self.assertIsNone(coalesce(_records)[0].notification(), 'Rewrite of the same version notified')
+        _records = (modification(100, _versions[0], _versions[1]) + modification(102, _versions[1], _versions[2]))
+        self.assertEqual(coalesce(_records)[0].notification()['changedFields'], [],
+                         'Changes undone within a batch reported')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+from decimal import Decimal
+from unittest import TestCase, mock
+
+import simplejson as json
+
+from resource_api.common import codec
+
+DOCUMENT = {
+    'title': 'Tittel med æøå og "sitat"',
+    'size': Decimal('1024'),
+    'precise': Decimal('3.1415926535897932384626433832795028841'),
+    'large': 2 ** 70,
+    'empty': None,
+    'published': True,
+    'contributors': [{'sequence': Decimal('1')}, json.RawJSON('{"raw": 1.50}')]
+}
+
+
+class TestCodec(TestCase):
+    def assertRoundTrips(self):
+        self.assertEqual(codec.loads(codec.dumps(DOCUMENT)), codec.loads(json.dumps(DOCUMENT)))
+
+    def test_dumps_keeps_values(self):
+        self.assertRoundTrips()
+
+    def test_dumps_without_orjson_fragment(self):
+        with mock.patch.object(codec, '_FRAGMENT', None):
+            self.assertRoundTrips()
+            self.assertEqual(codec.dumps({'size': Decimal('1024')}).replace(' ', ''), '{"size":1024}')
+
+    def test_dumps_without_orjson(self):
+        with mock.patch.object(codec, 'orjson', None):
+            self.assertEqual(codec.encoder(), 'simplejson')
+            self.assertEqual(codec.dumps(DOCUMENT), json.dumps(DOCUMENT))
+
+    def test_loads_decimals(self):
+        value = codec.loads('{"ratio": 0.1000000000000000000000000000000000001, "count": 2}')
+        self.assertEqual(value['ratio'], Decimal('0.1000000000000000000000000000000000001'))
+        self.assertEqual(value['count'], 2)
+        self.assertRaises(codec.JSONDecodeError, codec.loads, '{')
@@ -21,4 +21,9 @@ class TestConstants:
     @staticmethod
     def env_var_aws_secret_access_key():
         """Returns the key name for aws secret access key environment variable"""
-        return 'AWS_SECRET_ACCESS_KEY'
\ No newline at end of file
+        return 'AWS_SECRET_ACCESS_KEY'
+
+    @staticmethod
+    def env_var_aws_request_checksum_calculation():
+        """Returns the key name for the environment variable keeping botocore from sending aws-chunked uploads to moto"""
+        return 'AWS_REQUEST_CHECKSUM_CALCULATION'
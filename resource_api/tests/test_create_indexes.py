@@ -0,0 +1,57 @@
+import os
+import unittest
+
+import boto3
+from moto import mock_dynamodb2
+
+from resource_api.common.constants import Constants
+from resource_api.tests.test_constants import TestConstants
+from tools.create_indexes import create_indexes
+
+
+class TestCreateIndexes(unittest.TestCase):
+
+    def setUp(self):
+        """Mocked AWS Credentials for moto."""
+        os.environ[TestConstants.env_var_aws_access_key_id()] = 'testing'
+        os.environ[TestConstants.env_var_aws_secret_access_key()] = 'testing'
+        os.environ[TestConstants.env_var_aws_security_token()] = 'testing'
+        os.environ[TestConstants.env_var_aws_session_token()] = 'testing'
+        self.mock = mock_dynamodb2()
+        self.mock.start()
+        self.client = boto3.client('dynamodb', region_name='eu-west-1')
+        self.client.create_table(TableName='testing',
+                                 KeySchema=[{'AttributeName': 'identifier', 'KeyType': 'HASH'},
+                                            {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                                 AttributeDefinitions=[
+                                     {'AttributeName': 'identifier', 'AttributeType': 'S'},
+                                     {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+                                 ProvisionedThroughput={'ReadCapacityUnits': 1,
+                                                        'WriteCapacityUnits': 1})
+
+    def tearDown(self):
+        self.mock.stop()
+
+    def test_dry_run(self):
+        self.assertEqual(create_indexes(self.client, 'testing', dry_run=True), {
+            'existing': [],
+            'missing': [Constants.ddb_index_owner(), Constants.ddb_index_status()],
+            'created': None
+        })
+        self.assertFalse(self.client.describe_table(TableName='testing')['Table'].get('GlobalSecondaryIndexes'))
+
+    def test_create_indexes_one_at_a_time(self):
+        self.assertEqual(create_indexes(self.client, 'testing')['created'], Constants.ddb_index_owner())
+        self.assertEqual(create_indexes(self.client, 'testing'), {
+            'existing': [Constants.ddb_index_owner()],
+            'missing': [Constants.ddb_index_status()],
+            'created': Constants.ddb_index_status()
+        })
+        self.assertIsNone(create_indexes(self.client, 'testing')['created'], 'Existing index created again')
+        _index = self.client.describe_table(TableName='testing')['Table']['GlobalSecondaryIndexes'][0]
+        self.assertEqual([_key['AttributeName'] for _key in _index['KeySchema']],
+                         [Constants.ddb_field_owner(), Constants.ddb_field_latest_modified_date()])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+from decimal import Decimal
+from unittest import TestCase
+
+from resource_api.common.constants import Constants
+from resource_api.common.deltas import DeltaEncoding, delta_item, diff, is_delta, patch, reconstruct
+
+IDENTIFIER = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+
+
+def version(modified_date, **attributes):
+    _version = {'identifier': IDENTIFIER, 'modifiedDate': modified_date, 'owner': 'owner@unit.no'}
+    _version.update(attributes)
+    return _version
+
+
+class TestDeltas(TestCase):
+
+    def test_diff_and_patch(self):
+        old = {
+            'status': 'New',
+            'a/b': 1,
+            'entityDescription': {'titles': {'no': 'En tittel'}, 'tags': ['a', 'b', 'c']},
+            'fileSet': {'files': [{'name': 'a.pdf'}]},
+            'public': True
+        }
+        new = {
+            'status': 'Published',
+            'a/b': Decimal(1),
+            'entityDescription': {'titles': {'no': 'En tittel', 'en': 'A title'}, 'tags': ['a', 'x']},
+            'fileSet': {'files': [{'name': 'a.pdf'}, {'name': 'b.pdf'}]},
+            'public': 1
+        }
+        operations = diff(old, new)
+        self.assertEqual(operations, [
+            {'op': 'replace', 'path': '/status', 'value': 'Published'},
+            {'op': 'add', 'path': '/entityDescription/titles/en', 'value': 'A title'},
+            {'op': 'replace', 'path': '/entityDescription/tags/1', 'value': 'x'},
+            {'op': 'remove', 'path': '/entityDescription/tags/2'},
+            {'op': 'add', 'path': '/fileSet/files/-', 'value': {'name': 'b.pdf'}},
+            {'op': 'replace', 'path': '/public', 'value': 1}
+        ])
+        self.assertEqual(patch(old, operations), new)
+        self.assertEqual(old['entityDescription']['tags'], ['a', 'b', 'c'], 'Patch changed the document')
+        self.assertEqual(diff(new, new), [])
+        self.assertEqual(patch(new, diff(new, old)), old)
+
+    def test_depth(self):
+        self.assertIsNone(DeltaEncoding.from_environment({}))
+        self.assertIsNone(DeltaEncoding.from_environment({Constants.env_var_versions_snapshot_interval(): '1'}))
+        delta_encoding = DeltaEncoding.from_environment({Constants.env_var_versions_snapshot_interval(): '3'})
+        latest = {'latestModifiedDate': '2020-01-02'}
+        self.assertEqual(delta_encoding.depth(None, '2020-01-03'), 0, 'First version delta encoded')
+        self.assertEqual(delta_encoding.depth(latest, '2020-01-03'), 1)
+        self.assertEqual(delta_encoding.depth(dict(latest, deltaDepth=1), '2020-01-03'), 2)
+        self.assertEqual(delta_encoding.depth(dict(latest, deltaDepth=2), '2020-01-03'), 0, 'Snapshot missing')
+        self.assertEqual(delta_encoding.depth(latest, '2020-01-02'), 0, 'Rewritten version delta encoded')
+        self.assertEqual(delta_encoding.depth(latest, '2020-01-01'), 0, 'Older version delta encoded')
+
+    def test_reconstruct(self):
+        versions = [version('2020-01-01', status='New'),
+                    version('2020-01-02', status='Published', expiresAt=2000000000),
+                    version('2020-01-03', status='Published', title='En tittel')]
+        items = [versions[0], delta_item(versions[1], versions[0]), delta_item(versions[2], versions[1])]
+        items[1]['expiresAt'] = 2000000000
+        self.assertEqual([is_delta(_item) for _item in items], [False, True, True])
+        self.assertNotIn('owner', items[1], 'Delta holds unchanged attributes')
+        self.assertEqual(reconstruct(reversed(items)), {_version['modifiedDate']: _version for _version in versions})
+        self.assertEqual(reconstruct(items[:1] + items[2:]), {'2020-01-01': versions[0]},
+                         'Delta reconstructed without its base')
+        self.assertEqual(reconstruct(items[1:]), {}, 'Delta reconstructed without its base')
@@ -0,0 +1,79 @@
+from unittest import TestCase
+
+from resource_api.common.json_patch import apply, parse_pointer, update_builder
+from resource_api.common.versions import Conflict
+
+
+class TestJsonPatch(TestCase):
+    def test_parse_pointer(self):
+        self.assertEqual(parse_pointer('/entityDescription/titles/no'), ['entityDescription', 'titles', 'no'])
+        self.assertEqual(parse_pointer('/contributors/0/name'), ['contributors', 0, 'name'])
+        self.assertEqual(parse_pointer('/contributors/-'), ['contributors', None])
+        self.assertEqual(parse_pointer('/a~1b/c~0d'), ['a/b', 'c~d'])
+
+    def test_parse_invalid_pointer(self):
+        for pointer in ['', 'owner', '/', '/contributors/-/name', '/modifiedDate', '/identifier', '/expiresAt']:
+            with self.assertRaises(ValueError, msg=pointer):
+                parse_pointer(pointer)
+
+    def test_update_builder(self):
+        arguments = update_builder([
+            {'op': 'test', 'path': '/owner', 'value': 'owner@unit.no'},
+            {'op': 'replace', 'path': '/entityDescription/titles/no', 'value': 'Ny tittel'},
+            {'op': 'add', 'path': '/contributors/-', 'value': {'name': 'Navn'}},
+            {'op': 'remove', 'path': '/fileSet'}
+        ]).arguments()
+        self.assertEqual(arguments['UpdateExpression'],
+                         'SET #p1.#p2.#p3 = :v1, #p4 = list_append(#p4, :v2) REMOVE #p5')
+        self.assertEqual(arguments['ConditionExpression'],
+                         '#p0 = :v0 AND attribute_exists(#p1.#p2.#p3) AND attribute_exists(#p5)')
+        self.assertEqual(arguments['ExpressionAttributeValues'][':v2'], [{'name': 'Navn'}])
+        self.assertEqual(arguments['ExpressionAttributeNames']['#p5'], 'fileSet')
+
+    def test_update_builder_invalid_document(self):
+        for operations in [None, [], {'op': 'add'}, [{'op': 'move', 'path': '/a', 'from': '/b'}],
+                           [{'op': 'add', 'path': '/a'}], [{'op': 'remove', 'path': '/a/-'}]]:
+            with self.assertRaises(ValueError, msg=str(operations)):
+                update_builder(operations)
+
+    def test_update_builder_inserts(self):
+        document = {'owner': 'owner@unit.no', 'tags': ['a', 'c'], 'entityDescription': {'tags': ['x']}}
+        operations = [{'op': 'add', 'path': '/tags/1', 'value': 'b'},
+                      {'op': 'add', 'path': '/tags/-', 'value': 'd'},
+                      {'op': 'add', 'path': '/entityDescription/tags/0', 'value': 'w'},
+                      {'op': 'replace', 'path': '/owner', 'value': 'other@unit.no'}]
+        with self.assertRaises(ValueError):
+            update_builder(operations)
+        arguments = update_builder(operations, document).arguments()
+        self.assertEqual(arguments['UpdateExpression'], 'SET #p0 = :v0, #p1 = :v2, #p2 = :v4')
+        self.assertEqual(arguments['ConditionExpression'], 'attribute_exists(#p0) AND #p1 = :v1 AND #p2 = :v3')
+        self.assertEqual(arguments['ExpressionAttributeNames'], {'#p0': 'owner', '#p1': 'entityDescription',
+                                                                 '#p2': 'tags'})
+        self.assertEqual(arguments['ExpressionAttributeValues'][':v1'], {'tags': ['x']})
+        self.assertEqual(arguments['ExpressionAttributeValues'][':v2'], {'tags': ['w', 'x']})
+        self.assertEqual(arguments['ExpressionAttributeValues'][':v3'], ['a', 'c'])
+        self.assertEqual(arguments['ExpressionAttributeValues'][':v4'], ['a', 'b', 'c', 'd'])
+
+    def test_apply(self):
+        document = {'owner': 'owner@unit.no', 'entityDescription': {'titles': {'no': 'En tittel'}, 'tags': ['a']}}
+        patched = apply(document, [
+            {'op': 'test', 'path': '/owner', 'value': 'owner@unit.no'},
+            {'op': 'replace', 'path': '/entityDescription/titles/no', 'value': 'Ny tittel'},
+            {'op': 'add', 'path': '/entityDescription/tags/-', 'value': 'b'},
+            {'op': 'add', 'path': '/entityDescription/tags/5', 'value': 'c'},
+            {'op': 'remove', 'path': '/owner'}
+        ])
+        self.assertEqual(patched, {'entityDescription': {'titles': {'no': 'Ny tittel'}, 'tags': ['a', 'b', 'c']}})
+        self.assertEqual(document['entityDescription']['tags'], ['a'], 'Patch changed the document')
+        self.assertEqual(apply({'tags': [1, 2, 3]}, [{'op': 'add', 'path': '/tags/0', 'value': 0},
+                                                     {'op': 'add', 'path': '/tags/2', 'value': 1.5}]),
+                         {'tags': [0, 1, 1.5, 2, 3]}, 'Adding at a list index did not insert')
+        for operation in [{'op': 'test', 'path': '/owner', 'value': 'other@unit.no'},
+                          {'op': 'replace', 'path': '/status', 'value': 'New'},
+                          {'op': 'remove', 'path': '/entityDescription/tags/1'}]:
+            with self.assertRaises(Conflict, msg=str(operation)):
+                apply(document, [operation])
+        with self.assertRaises(ValueError):
+            apply(document, [{'op': 'add', 'path': '/fileSet/files', 'value': []}])
+        with self.assertRaises(ValueError):
+            apply(document, [{'op': 'add', 'path': '/offloaded', 'value': {}}])
@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+from unittest import TestCase, mock
+
+from resource_api.common import lifecycle
+from resource_api.common.constants import Constants
+
+
+class TestLifecycle(TestCase):
+    def setUp(self):
+        lifecycle.reset()
+
+    def tearDown(self):
+        lifecycle.reset()
+
+    def test_instance_is_built_once(self):
+        factory = mock.Mock(side_effect=[object(), object()])
+        first = lifecycle.instance('key', factory)
+        self.assertIs(lifecycle.instance('key', factory), first)
+        self.assertEqual(factory.call_count, 1)
+
+        lifecycle.reset()
+        self.assertIsNot(lifecycle.instance('key', factory), first)
+
+    def test_failed_instance_is_not_kept(self):
+        factory = mock.Mock(side_effect=[ValueError('first'), 'built'])
+        self.assertRaises(ValueError, lifecycle.instance, 'key', factory)
+        self.assertEqual(lifecycle.instance('key', factory), 'built')
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1', 'DDB_FAST_PATH': 'false'})
+    def test_connections_are_tuned_for_lambda(self):
+        dynamodb = lifecycle.dynamodb()
+        self.assertIs(lifecycle.dynamodb(), dynamodb)
+        config = dynamodb.meta.client.meta.config
+        self.assertEqual(config.max_pool_connections, Constants.ddb_max_pool_connections())
+        self.assertEqual(config.read_timeout, Constants.ddb_read_timeout_seconds())
+        self.assertEqual(config.retries['mode'], Constants.ddb_retry_mode())
+        self.assertIsNone(lifecycle.client())
+
+        with mock.patch.dict(os.environ, {'DDB_FAST_PATH': 'true'}):
+            self.assertIs(lifecycle.client(), lifecycle.client())
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    def test_s3_has_its_own_config(self):
+        config = lifecycle.s3().meta.config
+        self.assertIs(lifecycle.s3(), lifecycle.s3())
+        self.assertEqual(config.read_timeout, Constants.blob_read_timeout_seconds())
+        self.assertEqual(config.connect_timeout, Constants.blob_connect_timeout_seconds())
+        self.assertGreater(config.read_timeout, Constants.ddb_read_timeout_seconds())
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    def test_sns_has_its_own_config(self):
+        config = lifecycle.sns().meta.config
+        self.assertIs(lifecycle.sns(), lifecycle.sns())
+        self.assertEqual(config.read_timeout, Constants.sns_read_timeout_seconds())
+        self.assertEqual(config.connect_timeout, Constants.sns_connect_timeout_seconds())
+        self.assertEqual(config.retries['total_max_attempts'], Constants.sns_max_attempts())
+
+    def test_apps_import_boto3_lazily(self):
+        apps = ['resource_api.%s.app' % name for name in ('fetch_resource', 'modify_resource', 'list_resources',
+                                                          'insert_resource', 'batch_fetch_resource')]
+        script = 'import sys\nimport %s\nprint(sorted(name for name in sys.modules if name.startswith("boto3")))' \
+                 % ', '.join(apps)
+        output = subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True).stdout
+        self.assertEqual(output.strip(), '[]', 'boto3 imported before the first request')
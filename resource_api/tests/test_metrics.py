@@ -0,0 +1,157 @@
+import contextlib
+import io
+import os
+import unittest
+from unittest import mock
+
+import boto3
+import simplejson as json
+from moto import mock_dynamodb2
+
+from resource_api.common import lifecycle, metrics
+from resource_api.common.constants import Constants
+from resource_api.common.http_constants import HttpConstants
+from resource_api.tests.test_constants import TestConstants
+
+RESOURCE_IDENTIFIER = 'ebf20333-35a5-4a06-9c58-68ea688a9a8b'
+
+
+def invoke(handler, event):
+    """Returns the response of the handler and the log lines it wrote"""
+    _stdout = io.StringIO()
+    with contextlib.redirect_stdout(_stdout):
+        _response = handler(event, None)
+    return _response, [json.loads(_line) for _line in _stdout.getvalue().splitlines()]
+
+
+class TestConsumedCapacity(unittest.TestCase):
+
+    def test_consumed_capacity(self):
+        self.assertEqual(metrics.consumed_capacity('Query', {}), (0.0, 0.0))
+        self.assertEqual(metrics.consumed_capacity('Query', {'ConsumedCapacity': {'CapacityUnits': 0.5}}),
+                         (0.5, 0.0))
+        self.assertEqual(metrics.consumed_capacity('PutItem', {'ConsumedCapacity': {'CapacityUnits': 2.0}}),
+                         (0.0, 2.0))
+        self.assertEqual(metrics.consumed_capacity('BatchGetItem', {'ConsumedCapacity': [
+            {'TableName': 'testing', 'CapacityUnits': 1.0}, {'TableName': 'testing', 'CapacityUnits': 1.5}]}),
+                         (2.5, 0.0))
+        self.assertEqual(metrics.consumed_capacity('TransactWriteItems', {'ConsumedCapacity': [
+            {'CapacityUnits': 4.0, 'ReadCapacityUnits': 1.0, 'WriteCapacityUnits': 3.0}]}), (1.0, 3.0))
+
+
+@mock_dynamodb2
+class TestInstrumentedHandler(unittest.TestCase):
+
+    def setUp(self):
+        """Mocked AWS Credentials for moto."""
+        os.environ[TestConstants.env_var_aws_access_key_id()] = 'testing'
+        os.environ[TestConstants.env_var_aws_secret_access_key()] = 'testing'
+        os.environ[TestConstants.env_var_aws_security_token()] = 'testing'
+        os.environ[TestConstants.env_var_aws_session_token()] = 'testing'
+        lifecycle.reset()
+
+    def tearDown(self):
+        lifecycle.reset()
+
+    def setup_mock_database(self, region, table_name):
+        dynamodb = boto3.resource('dynamodb', region_name=region)
+        dynamodb.create_table(TableName=table_name,
+                              KeySchema=[{'AttributeName': 'identifier', 'KeyType': 'HASH'},
+                                         {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                              AttributeDefinitions=[
+                                  {'AttributeName': 'identifier', 'AttributeType': 'S'},
+                                  {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+                              ProvisionedThroughput={'ReadCapacityUnits': 1,
+                                                     'WriteCapacityUnits': 1})
+        return dynamodb
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    @mock.patch.dict(os.environ, {'METRICS_ENABLED': 'true'})
+    def test_one_line_per_request(self):
+        from resource_api.insert_resource import app as insert_app
+        from resource_api.fetch_resource import app as fetch_app
+        self.setup_mock_database('eu-west-1', 'testing')
+        _body = json.dumps({
+            'identifier': RESOURCE_IDENTIFIER,
+            'modifiedDate': '2019-11-02T08:46:14.464755+00:00',
+            'owner': 'owner@unit.no'
+        })
+        _response, _lines = invoke(insert_app.handler, {
+            Constants.event_http_method(): HttpConstants.http_method_post(),
+            Constants.event_body(): _body
+        })
+        self.assertEqual(len(_lines), 1, 'Expected one log line per request')
+        _line = _lines[0]
+        self.assertEqual(_line['Function'], 'insert_resource')
+        self.assertEqual(_line['StatusCode'], _response[Constants.response_status_code()])
+        self.assertEqual(_line[metrics.METRIC_REQUEST_BYTES], len(_body))
+        self.assertEqual(_line[metrics.METRIC_RESPONSE_BYTES], len(_response[Constants.response_body()]))
+        self.assertGreaterEqual(_line[metrics.METRIC_DYNAMODB_CALLS], 1)
+        self.assertGreater(_line[metrics.METRIC_DYNAMODB], 0)
+        self.assertGreater(_line[metrics.METRIC_PARSE], 0)
+        self.assertGreater(_line[metrics.METRIC_SERIALIZE], 0)
+        self.assertGreaterEqual(_line[metrics.METRIC_DURATION], _line[metrics.METRIC_DYNAMODB])
+        _names = {_metric['Name'] for _metric in _line['_aws']['CloudWatchMetrics'][0]['Metrics']}
+        self.assertIn(metrics.METRIC_COLD_START, _names)
+        self.assertEqual(_line['_aws']['CloudWatchMetrics'][0]['Namespace'], Constants.metrics_default_namespace())
+
+        _response, _lines = invoke(fetch_app.handler, {
+            Constants.event_http_method(): HttpConstants.http_method_get(),
+            Constants.event_path_parameters(): {Constants.event_path_parameter_identifier(): RESOURCE_IDENTIFIER}
+        })
+        self.assertEqual(len(_lines), 1, 'Expected one log line per request')
+        self.assertEqual(_lines[0]['Function'], 'fetch_resource')
+        self.assertEqual(_lines[0][metrics.METRIC_COLD_START], 0, 'Second request of the container is warm')
+        self.assertGreaterEqual(_lines[0][metrics.METRIC_DYNAMODB_CALLS], 1)
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    @mock.patch.dict(os.environ, {'METRICS_ENABLED': 'true'})
+    @mock.patch.dict(os.environ, {'FETCH_CACHE_TTL_SECONDS': '60'})
+    def test_fetch_cache_hits_and_misses(self):
+        from resource_api.fetch_resource import app
+        _dynamodb = self.setup_mock_database('eu-west-1', 'testing')
+        _dynamodb.Table('testing').put_item(Item={
+            'identifier': RESOURCE_IDENTIFIER,
+            'modifiedDate': '2019-11-02T08:46:14.464755+00:00'
+        })
+        _event = {
+            Constants.event_http_method(): HttpConstants.http_method_get(),
+            Constants.event_path_parameters(): {Constants.event_path_parameter_identifier(): RESOURCE_IDENTIFIER}
+        }
+        _lines = [invoke(app.handler, _event)[1] for _ in range(2)]
+        self.assertEqual([len(_request_lines) for _request_lines in _lines], [1, 1],
+                         'Expected one log line per request')
+        self.assertEqual(_lines[0][0][metrics.METRIC_CACHE_MISSES], 1)
+        self.assertNotIn(metrics.METRIC_CACHE_HITS, _lines[0][0])
+        self.assertEqual(_lines[1][0][metrics.METRIC_CACHE_HITS], 1)
+        self.assertNotIn(metrics.METRIC_CACHE_MISSES, _lines[1][0])
+
+    @mock.patch.dict(os.environ, {'METRICS_ENABLED': 'true'})
+    def test_stream_event(self):
+        _handler = metrics.instrumented(mock.Mock(__module__='resource_api.publish_changes.app',
+                                                  return_value={'batchItemFailures': []}))
+        _response, _lines = invoke(_handler, {'Records': []})
+        self.assertEqual(len(_lines), 1, 'Expected one log line per batch')
+        self.assertEqual(_lines[0]['Function'], 'publish_changes')
+        self.assertIsNone(_lines[0]['StatusCode'])
+
+    @mock.patch.dict(os.environ, {'REGION': 'eu-west-1'})
+    @mock.patch.dict(os.environ, {'TABLE_NAME': 'testing'})
+    @mock.patch.dict(os.environ, {'METRICS_ENABLED': 'false'})
+    def test_disabled(self):
+        from resource_api.fetch_resource import app
+        self.setup_mock_database('eu-west-1', 'testing')
+        _response, _lines = invoke(app.handler, {
+            Constants.event_http_method(): HttpConstants.http_method_get(),
+            Constants.event_path_parameters(): {Constants.event_path_parameter_identifier(): RESOURCE_IDENTIFIER}
+        })
+        self.assertEqual(_lines, [])
+        _params = {}
+        metrics._provide_client_params(_params, mock.Mock(), {})
+        self.assertEqual(_params, {}, 'ReturnConsumedCapacity asked for outside an instrumented request')
+
+
+if __name__ == '__main__':
+    unittest.main()
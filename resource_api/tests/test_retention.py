@@ -0,0 +1,147 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import simplejson as json
+from moto import mock_dynamodb2
+
+from resource_api.common.constants import Constants
+from resource_api.common.retention import Retention, is_expired
+from resource_api.common.versions import latest_item, latest_key
+from resource_api.tests.test_constants import TestConstants
+from tools.compact_versions import compact, removable
+
+IDENTIFIERS = ['ebf20333-35a5-4a06-9c58-68ea688a9a8b', '4d96e658-c2e0-4f23-9f1d-ccae0c770ecd']
+MODIFIED_DATES = ['2020-01-%02dT08:46:14.464755+00:00' % _day for _day in (10, 5, 3, 1)]
+NOW = datetime(2020, 1, 7, tzinfo=timezone.utc).timestamp()
+
+
+class TestRetention(unittest.TestCase):
+
+    def test_max_count(self):
+        self.assertEqual(Retention(max_count=2).superseded(MODIFIED_DATES, NOW), MODIFIED_DATES[2:])
+        self.assertEqual(Retention(max_count=1).superseded(MODIFIED_DATES[:1], NOW), [],
+                         'Newest version past retention')
+
+    def test_max_age_counts_from_superseding_version(self):
+        # Superseded on the 10th, 5th and 3rd; a day later only the latter two have expired by the 7th.
+        self.assertEqual(Retention(max_age=timedelta(days=1)).superseded(MODIFIED_DATES, NOW), MODIFIED_DATES[2:])
+        self.assertEqual(Retention(max_age=timedelta(days=30)).superseded(MODIFIED_DATES, NOW), [])
+        self.assertEqual(Retention(max_age=timedelta(days=1)).expires_at(NOW), NOW + 86400)
+
+    def test_from_environment(self):
+        self.assertIsNone(Retention.from_environment({}))
+        self.assertIsNone(Retention.from_environment({Constants.env_var_versions_max_count(): '0'}))
+        _retention = Retention.from_environment({Constants.env_var_versions_max_count(): '10',
+                                                 Constants.env_var_versions_max_age_days(): '0.5'})
+        self.assertEqual(_retention.max_count, 10)
+        self.assertEqual(_retention.max_age, timedelta(hours=12))
+
+    def test_is_expired(self):
+        self.assertFalse(is_expired({}, NOW))
+        self.assertTrue(is_expired({Constants.ddb_field_expires_at(): NOW}, NOW))
+        self.assertFalse(is_expired({Constants.ddb_field_expires_at(): NOW + 1}, NOW))
+
+
+class TestCompactVersions(unittest.TestCase):
+
+    def setUp(self):
+        """Mocked AWS Credentials for moto."""
+        os.environ[TestConstants.env_var_aws_access_key_id()] = 'testing'
+        os.environ[TestConstants.env_var_aws_secret_access_key()] = 'testing'
+        os.environ[TestConstants.env_var_aws_security_token()] = 'testing'
+        os.environ[TestConstants.env_var_aws_session_token()] = 'testing'
+        self.mock = mock_dynamodb2()
+        self.mock.start()
+        self.directory = tempfile.mkdtemp()
+        self.dynamodb = boto3.resource('dynamodb', region_name='eu-west-1')
+        self.table = self.dynamodb.create_table(TableName='testing',
+                                                KeySchema=[{'AttributeName': 'identifier', 'KeyType': 'HASH'},
+                                                           {'AttributeName': 'modifiedDate', 'KeyType': 'RANGE'}],
+                                                AttributeDefinitions=[
+                                                    {'AttributeName': 'identifier', 'AttributeType': 'S'},
+                                                    {'AttributeName': 'modifiedDate', 'AttributeType': 'S'}],
+                                                ProvisionedThroughput={'ReadCapacityUnits': 1,
+                                                                       'WriteCapacityUnits': 1})
+        for _identifier in IDENTIFIERS:
+            for _modified_date in MODIFIED_DATES:
+                self.table.put_item(Item={'identifier': _identifier, 'modifiedDate': _modified_date,
+                                          'status': 'New'})
+            self.table.put_item(Item=latest_item({'identifier': _identifier, 'modifiedDate': MODIFIED_DATES[0]}))
+        # Already past its time to live, which Dynamo DB deletes at no cost.
+        self.table.update_item(Key={'identifier': IDENTIFIERS[1], 'modifiedDate': MODIFIED_DATES[-1]},
+                               UpdateExpression='SET expiresAt = :expiresAt',
+                               ExpressionAttributeValues={':expiresAt': int(NOW) - 1})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        self.mock.stop()
+
+    def modified_dates(self, identifier):
+        return [_item['modifiedDate'] for _item in self.table.query(
+            KeyConditionExpression='identifier = :identifier AND modifiedDate >= :lower',
+            ExpressionAttributeValues={':identifier': identifier, ':lower': '0'},
+            ScanIndexForward=False)['Items']]
+
+    def test_dry_run(self):
+        self.assertEqual(compact(self.dynamodb, 'testing', Retention(max_count=2), dry_run=True, now=NOW), {
+            'resources': 2, 'versions': 7, 'pastRetention': 3, 'archived': 0, 'deleted': 0, 'unprocessed': 0
+        })
+        self.assertEqual(self.modified_dates(IDENTIFIERS[0]), MODIFIED_DATES, 'Dry run deleted versions')
+
+    def test_compact_and_archive(self):
+        _archive = os.path.join(self.directory, 'versions.ndjson.gz')
+        self.assertEqual(compact(self.dynamodb, 'testing', Retention(max_count=2), archive_path=_archive,
+                                 batch_size=2, now=NOW), {
+            'resources': 2, 'versions': 7, 'pastRetention': 3, 'archived': 3, 'deleted': 3, 'unprocessed': 0
+        })
+        self.assertEqual(self.modified_dates(IDENTIFIERS[0]), MODIFIED_DATES[:2])
+        self.assertEqual(self.modified_dates(IDENTIFIERS[1]), MODIFIED_DATES[:2] + MODIFIED_DATES[-1:],
+                         'Version past its time to live deleted by the job')
+        self.assertIn('Item', self.table.get_item(Key=latest_key(IDENTIFIERS[0])), 'Latest item deleted')
+        with gzip.open(_archive, 'rt', encoding='utf-8') as _lines:
+            _archived = [json.loads(_line) for _line in _lines]
+        self.assertEqual(sorted((_item['identifier'], _item['modifiedDate']) for _item in _archived),
+                         sorted([(IDENTIFIERS[0], MODIFIED_DATES[2]), (IDENTIFIERS[0], MODIFIED_DATES[3]),
+                                 (IDENTIFIERS[1], MODIFIED_DATES[2])]), 'Archive does not hold the deleted versions')
+        self.assertEqual(_archived[0]['status'], 'New', 'Archive does not hold whole versions')
+
+    def test_keeps_versions_deltas_apply_to(self):
+        _bases = dict(zip(MODIFIED_DATES, (MODIFIED_DATES[1], MODIFIED_DATES[2], None, None)))
+        self.assertEqual(removable(MODIFIED_DATES, _bases, MODIFIED_DATES[1:]), [MODIFIED_DATES[3]])
+        self.assertEqual(removable(MODIFIED_DATES, _bases, MODIFIED_DATES[3:]), [MODIFIED_DATES[3]])
+        self.table.update_item(Key={'identifier': IDENTIFIERS[0], 'modifiedDate': MODIFIED_DATES[0]},
+                               UpdateExpression='SET versionBase = :versionBase',
+                               ExpressionAttributeValues={':versionBase': MODIFIED_DATES[1]})
+        self.assertEqual(compact(self.dynamodb, 'testing', Retention(max_count=1), now=NOW)['deleted'], 4)
+        self.assertEqual(self.modified_dates(IDENTIFIERS[0]), MODIFIED_DATES[:2],
+                         'Version a kept delta applies to deleted')
+
+    def test_keeps_base_behind_version_written_out_of_order(self):
+        from resource_api.common.deltas import delta_item, reconstruct
+        _identifier = 'a1b2c3d4-35a5-4a06-9c58-68ea688a9a8b'
+        _base, _older, _delta = [{'identifier': _identifier, 'modifiedDate': _modified_date, 'status': _status}
+                                 for _modified_date, _status in ((MODIFIED_DATES[3], 'New'),
+                                                                 (MODIFIED_DATES[2], 'Draft'),
+                                                                 (MODIFIED_DATES[1], 'Published'))]
+        # The delta applies to the base, and the version written after it, with an older date, is stored in full.
+        for _item in (_base, delta_item(_delta, _base), _older, latest_item(_delta)):
+            self.table.put_item(Item=_item)
+        self.assertEqual(removable(MODIFIED_DATES[1:], {MODIFIED_DATES[1]: MODIFIED_DATES[3], MODIFIED_DATES[2]: None,
+                                                        MODIFIED_DATES[3]: None}, MODIFIED_DATES[3:]), [])
+
+        compact(self.dynamodb, 'testing', Retention(max_count=2), now=NOW)
+        self.assertEqual(self.modified_dates(_identifier), MODIFIED_DATES[1:],
+                         'Version a kept delta applies to deleted')
+        _versions = reconstruct(self.table.query(
+            KeyConditionExpression='identifier = :identifier AND modifiedDate >= :lower',
+            ExpressionAttributeValues={':identifier': _identifier, ':lower': '0'})['Items'])
+        self.assertEqual(_versions[MODIFIED_DATES[1]]['status'], 'Published', 'Delta no longer reconstructed')
+
+
+if __name__ == '__main__':
+    unittest.main()
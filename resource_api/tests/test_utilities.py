@@ -1,3 +1,5 @@
+import base64
+import gzip
 import http
 import os
 import sys
@@ -11,7 +13,8 @@ import unittest
 
 from resource_api.common.constants import Constants
 from resource_api.common.http_constants import HttpConstants
-from resource_api.common.helpers import response
+from resource_api.common.helpers import response, encode_cursor, decode_cursor, etag, parse_etags, parse_rfc3339, \
+    projection, project, accepted_encoding, decode_event
 
 class TestHandlerCase(unittest.TestCase):
 
@@ -32,4 +35,81 @@ class TestHandlerCase(unittest.TestCase):
         self.assertEqual(
             _response[Constants.response_headers()][HttpConstants.http_header_access_control_allow_origin()],
             '*'
-        )
\ No newline at end of file
+        )
+        self.assertEqual(
+            _response[Constants.response_headers()][HttpConstants.http_header_access_control_expose_headers()],
+            'ETag,Last-Modified'
+        )
+
+    def test_helper_cursor_round_trip(self):
+        _last_evaluated_key = {'identifier': 'ebf20333-35a5-4a06-9c58-68ea688a9a8b',
+                               'modifiedDate': '2019-10-24T12:57:02.655994Z'}
+        self.assertEqual(decode_cursor(encode_cursor(_last_evaluated_key)), _last_evaluated_key)
+        self.assertIsNone(encode_cursor(None))
+
+    def test_helper_decode_invalid_cursor(self):
+        self.assertRaisesRegex(ValueError, Constants.error_invalid_cursor(), decode_cursor, '###')
+        self.assertRaisesRegex(ValueError, Constants.error_invalid_cursor(), decode_cursor, encode_cursor([1]))
+
+    def test_helper_parse_etags(self):
+        self.assertIsNone(parse_etags('*'))
+        self.assertEqual(parse_etags(etag('2019-10-24T12:57:02.655994Z')), ['2019-10-24T12:57:02.655994Z'])
+        self.assertEqual(parse_etags('"a", W/"b", "c"'), ['a', 'c'])
+
+    def test_helper_parse_rfc3339(self):
+        self.assertEqual(parse_rfc3339('2020-01-29T14:32:43.770Z').isoformat(), '2020-01-29T14:32:43.770000+00:00')
+        self.assertEqual(parse_rfc3339('2019-11-02T08:46:14+01:00').isoformat(), '2019-11-02T08:46:14+01:00')
+        self.assertIsNone(parse_rfc3339('yesterday'))
+
+    def test_helper_projection(self):
+        _projection = projection('status, entityDescription.titles,entityDescription,identifier')
+        self.assertEqual(_projection['ProjectionExpression'], '#f0, #f1, #f2, #f3')
+        self.assertEqual(_projection['ExpressionAttributeNames'],
+                         {'#f0': 'identifier', '#f1': 'modifiedDate', '#f2': 'status', '#f3': 'entityDescription'})
+        self.assertRaisesRegex(ValueError, 'Invalid fields', projection, 'entityDescription.titles[0]')
+        self.assertRaisesRegex(ValueError, 'Invalid fields', projection, ','.join('f%d' % i for i in range(21)))
+
+    def test_helper_project(self):
+        _item = {'identifier': 'a', 'modifiedDate': 'b', 'status': None, 'owner': 'owner@unit.no',
+                 'entityDescription': {'titles': {'no': 'En tittel'}, 'date': {'year': '2020'}}}
+        self.assertEqual(project(_item, projection('status,entityDescription.titles,fileSet.files')), {
+            'identifier': 'a', 'modifiedDate': 'b', 'status': None, 'entityDescription': {'titles': {'no': 'En tittel'}}
+        })
+
+    def test_helper_accepted_encoding(self):
+        self.assertEqual(accepted_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(accepted_encoding('gzip;q=1.0, br;q=0.5'), 'gzip')
+        self.assertEqual(accepted_encoding('br;q=0, *'), 'gzip')
+        self.assertEqual(accepted_encoding('GZIP'), 'gzip')
+        self.assertIsNone(accepted_encoding('identity'))
+        self.assertIsNone(accepted_encoding('gzip;q=0'))
+        self.assertIsNone(accepted_encoding(None))
+        with mock.patch('resource_api.common.helpers.brotli', None):
+            self.assertEqual(accepted_encoding('gzip, deflate, br'), 'gzip')
+            self.assertIsNone(accepted_encoding('br'))
+
+    @mock.patch.dict(os.environ, {'COMPRESSION_MIN_BYTES': '1024'})
+    def test_helper_response_compressed(self):
+        _body = '{"Items": [%s]}' % ', '.join(['{"title": "En tittel"}'] * 100)
+        _event = {Constants.event_headers(): {'accept-encoding': 'gzip'}}
+        _response = response(http.HTTPStatus.OK, _body, {'ETag': '"a"'}, _event)
+        self.assertTrue(_response[Constants.response_is_base64_encoded()])
+        self.assertEqual(_response[Constants.response_headers()][HttpConstants.http_header_content_encoding()], 'gzip')
+        self.assertEqual(_response[Constants.response_headers()][HttpConstants.http_header_vary()], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(base64.b64decode(_response[Constants.response_body()])).decode('utf-8'), _body)
+
+        _small = response(http.HTTPStatus.OK, '{"Items": []}', None, _event)
+        self.assertEqual(_small[Constants.response_body()], '{"Items": []}')
+        self.assertNotIn(Constants.response_is_base64_encoded(), _small)
+
+        _uncompressed = response(http.HTTPStatus.OK, _body, None, {Constants.event_headers(): {}})
+        self.assertEqual(_uncompressed[Constants.response_body()], _body)
+        self.assertNotIn(HttpConstants.http_header_content_encoding(), _uncompressed[Constants.response_headers()])
+
+    def test_helper_decode_event(self):
+        _event = {Constants.event_body(): base64.b64encode('{"title": "æøå"}'.encode('utf-8')).decode('ascii'),
+                  Constants.event_is_base64_encoded(): True}
+        self.assertEqual(decode_event(_event)[Constants.event_body()], '{"title": "æøå"}')
+        self.assertIsNone(decode_event(None))
+        _plain = {Constants.event_body(): '{}', Constants.event_is_base64_encoded(): False}
+        self.assertIs(decode_event(_plain), _plain)
@@ -0,0 +1,52 @@
+from decimal import Decimal
+from unittest import TestCase
+
+import simplejson as json
+from boto3.dynamodb.types import TypeSerializer
+
+from resource_api.common import wire
+
+
+class TestWire(TestCase):
+    def test_dumps_item_matches_simplejson(self):
+        item = {
+            'identifier': 'ebf20333-35a5-4a06-9c58-68ea688a9a8b',
+            'title': 'Tittel med "sitat", æøå og \\ og \n',
+            'size': Decimal('1024'),
+            'ratio': Decimal('-0.125'),
+            'large': Decimal('1E+30'),
+            'published': True,
+            'embargo': None,
+            'contributors': [{'name': 'Navn', 'sequence': Decimal('1')}, []],
+            'fileSet': {'files': [], 'empty': {}}
+        }
+        serializer = TypeSerializer()
+        wire_item = {name: serializer.serialize(value) for name, value in item.items()}
+        self.assertEqual(wire.dumps_item(wire_item), json.dumps(item))
+
+    def test_dumps_sets_and_binaries(self):
+        self.assertEqual(wire.dumps({'SS': ['a', 'b']}), '["a", "b"]')
+        self.assertEqual(wire.dumps({'NS': ['1', '2.5']}), '[1, 2.5]')
+        self.assertEqual(wire.dumps({'B': b'\x00\xff'}), '"AP8="')
+        self.assertEqual(wire.dumps({'BS': [b'a']}), '["YQ=="]')
+
+    def test_wire_item(self):
+        item = wire.WireItem({'identifier': {'S': 'a'}, 'count': {'N': '2'}})
+        self.assertEqual(json.dumps({'Items': [item]}), '{"Items": [{"identifier": "a", "count": 2}]}')
+        self.assertEqual(item['identifier'], 'a')
+        self.assertEqual(item.get('count'), Decimal('2'))
+        self.assertIsNone(item.get('missing'))
+
+    def test_query_arguments(self):
+        from boto3.dynamodb.conditions import Key
+        arguments = wire.query_arguments('table', {
+            'KeyConditionExpression': Key('identifier').eq('a'),
+            'ExpressionAttributeNames': {'#f0': 'owner'},
+            'ProjectionExpression': '#f0',
+            'ExclusiveStartKey': {'identifier': 'a', 'modifiedDate': 'b'}
+        })
+        self.assertEqual(arguments['TableName'], 'table')
+        self.assertEqual(arguments['KeyConditionExpression'], '#n0 = :v0')
+        self.assertEqual(arguments['ExpressionAttributeNames'], {'#f0': 'owner', '#n0': 'identifier'})
+        self.assertEqual(arguments['ExpressionAttributeValues'], {':v0': {'S': 'a'}})
+        self.assertEqual(arguments['ExclusiveStartKey'], {'identifier': {'S': 'a'}, 'modifiedDate': {'S': 'b'}})
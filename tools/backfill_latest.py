@@ -0,0 +1,109 @@
+"""
+Gives every resource written before latest items existed its latest item, and repairs
+latest items left behind a newer version, as when a bulk insert could not write one. The
+keys of the table are scanned in parallel segments; then the newest version of each
+resource that needs it is read and copied into its latest item, on the same condition the
+handlers write with, so a latest item a request moved ahead meanwhile is left alone.
+
+    python -m tools.backfill_latest --table <table name> --region eu-west-1 [--dry-run]
+
+A scan is charged for every item it reads in full, whatever it projects. Run it once,
+after the handlers that maintain latest items are deployed; running it again is harmless.
+"""
+
+import argparse
+
+import boto3
+import simplejson as json
+from botocore.exceptions import ClientError
+
+from resource_api.common.async_dynamo import AsyncDynamoDB, gather, run
+from resource_api.common.constants import Constants
+from resource_api.common.deltas import is_delta
+from resource_api.common.versions import is_latest_item, latest_item, newer_than_latest, error_code
+from tools.scan import scan
+
+SEGMENTS = 4
+
+
+def newest_versions(async_dynamodb, segments):
+    """
+    Scans the keys of the table and returns the modified date of the newest version of every
+    resource, and the one its latest item holds
+    """
+    _newest = {}
+    _latest = {}
+
+    def visit(item):
+        _identifier = item[Constants.ddb_field_identifier()]
+        if is_latest_item(item):
+            _latest[_identifier] = item[Constants.ddb_field_latest_modified_date()]
+        elif item[Constants.ddb_field_modified_date()] > _newest.get(_identifier, ''):
+            _newest[_identifier] = item[Constants.ddb_field_modified_date()]
+
+    run(scan(async_dynamodb, segments, [Constants.ddb_field_identifier(), Constants.ddb_field_modified_date(),
+                                        Constants.ddb_field_latest_modified_date()], visit))
+    return _newest, _latest
+
+
+def behind(newest, latest):
+    """Returns the newest modified date of every resource whose latest item is missing or holds an older version"""
+    return {_identifier: _modified_date for _identifier, _modified_date in newest.items()
+            if latest.get(_identifier, '') < _modified_date}
+
+
+async def write_latest_item(async_dynamodb, identifier, modified_date):
+    """
+    Copies a version into the latest item of its resource and tells whether it was written.
+    Delta encoded versions are written together with their latest item, which is left alone.
+    """
+    _version = await async_dynamodb.get_item({
+        Constants.ddb_field_identifier(): identifier,
+        Constants.ddb_field_modified_date(): modified_date
+    }, ConsistentRead=True)
+    if _version is None or is_delta(_version):
+        return False
+    try:
+        await async_dynamodb.put_item(latest_item(_version), **newer_than_latest(modified_date))
+    except ClientError as e:
+        if error_code(e) != Constants.ddb_error_conditional_check_failed_exception():
+            raise
+        return False
+    return True
+
+
+def backfill(dynamodb, table_name, segments=SEGMENTS, dry_run=False):
+    """
+    Writes the missing and outdated latest items of a table, given a Dynamo DB Service
+    Resource, and returns the number of resources, of latest items found missing or behind
+    and of latest items written
+    """
+    _async_dynamodb = AsyncDynamoDB(dynamodb.meta.client, table_name)
+    _newest, _latest = newest_versions(_async_dynamodb, segments)
+    _behind = behind(_newest, _latest)
+    _written = 0
+    if not dry_run:
+        _results = run(gather(*[write_latest_item(_async_dynamodb, _identifier, _modified_date)
+                                for _identifier, _modified_date in _behind.items()]))
+        _written = sum(_results)
+    return {
+        'resources': len(_newest),
+        'behind': len(_behind),
+        'written': _written
+    }
+
+
+def main():
+    _parser = argparse.ArgumentParser(description='Writes the latest item of every resource that lacks one')
+    _parser.add_argument('--table', required=True, help='name of the resource table')
+    _parser.add_argument('--region', required=True, help='AWS region of the table')
+    _parser.add_argument('--endpoint', default=None, help='DynamoDB endpoint, such as DynamoDB Local')
+    _parser.add_argument('--segments', type=int, default=SEGMENTS, help='parallel scan segments')
+    _parser.add_argument('--dry-run', action='store_true', help='only count the latest items to write')
+    _arguments = _parser.parse_args()
+    _dynamodb = boto3.resource('dynamodb', region_name=_arguments.region, endpoint_url=_arguments.endpoint)
+    print(json.dumps(backfill(_dynamodb, _arguments.table, _arguments.segments, _arguments.dry_run)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""
+Removes the versions past retention, as configured for the modify function with
+VERSIONS_MAX_COUNT and VERSIONS_MAX_AGE_DAYS (see resource_api/common/retention.py), in
+batches. That covers the versions beyond the maximum count of each resource, which no
+write stamps, and the versions superseded before a maximum age was configured. With
+--archive, removed versions are first appended to a newline delimited JSON file, gzip
+compressed when its name ends in .gz. Versions whose time to live has passed are left to
+Dynamo DB, which deletes them without charging write capacity. Past retention or not, the
+versions that kept delta encoded versions apply to are kept, so whole chains are removed
+and archived, from the full version they start with.
+
+    python -m tools.compact_versions --table <table name> --region eu-west-1 \
+        [--max-count 50] [--max-age-days 365] [--archive versions.ndjson.gz] [--enable-ttl] [--dry-run]
+
+A scan is charged for every item it reads in full, whatever it projects, and a delete for
+the size of the item deleted.
+"""
+
+import argparse
+import gzip
+import os
+import time
+from datetime import timedelta
+
+import boto3
+import simplejson as json
+
+from resource_api.common.async_dynamo import AsyncDynamoDB, chunks, run
+from resource_api.common.codec import dumps
+from resource_api.common.constants import Constants
+from resource_api.common.retention import Retention, is_expired
+from resource_api.common.versions import is_latest_item
+from tools.scan import scan
+
+SEGMENTS = 4
+BATCH_SIZE = 1000
+
+
+def versions_by_resource(async_dynamodb, segments, now):
+    """
+    Scans the keys of the table and returns the live versions of every resource, as the
+    modified date of the version each delta encoded one applies to, or None for a full
+    version, by modified date
+    """
+    _versions = {}
+
+    def visit(item):
+        if is_latest_item(item) or is_expired(item, now):
+            return
+        _versions.setdefault(item[Constants.ddb_field_identifier()], {})[
+            item[Constants.ddb_field_modified_date()]] = item.get(Constants.ddb_field_version_base())
+
+    run(scan(async_dynamodb, segments, [Constants.ddb_field_identifier(), Constants.ddb_field_modified_date(),
+                                        Constants.ddb_field_expires_at(), Constants.ddb_field_version_base()],
+             visit))
+    return _versions
+
+
+def removable(modified_dates, bases, superseded):
+    """
+    Returns the superseded modified dates, given every modified date of one resource newest
+    first and the version base of each, less those of versions a kept delta applies to. A
+    base need not be the next older version, as a version written out of order is stored
+    in full between a delta and its base.
+    """
+    _superseded = set(superseded)
+    _removable = []
+    _needed = set()
+    for _modified_date in modified_dates:
+        if _modified_date in _superseded and _modified_date not in _needed:
+            _removable.append(_modified_date)
+        elif bases[_modified_date] is not None:
+            _needed.add(bases[_modified_date])
+    return _removable
+
+
+def past_retention(versions, retention, now):
+    """Returns the keys of the versions past retention, given the versions of every resource"""
+    _keys = []
+    for _identifier, _bases in versions.items():
+        _modified_dates = sorted(_bases, reverse=True)
+        for _modified_date in removable(_modified_dates, _bases,
+                                        retention.superseded(_modified_dates, now)):
+            _keys.append({
+                Constants.ddb_field_identifier(): _identifier,
+                Constants.ddb_field_modified_date(): _modified_date
+            })
+    return _keys
+
+
+async def archive_and_delete(async_dynamodb, keys, archive):
+    """
+    Deletes a batch of versions, appending them to the archive first when there is one.
+    Versions that could not be read for the archive are kept. Returns the number of versions
+    archived and the keys left unprocessed.
+    """
+    _unprocessed = []
+    _archived = 0
+    if archive is not None:
+        _items, _unprocessed = await async_dynamodb.batch_get(keys, ConsistentRead=True)
+        for _item in _items:
+            archive.write(dumps(_item) + '\n')
+        archive.flush()
+        _archived = len(_items)
+        _kept = {(_key[Constants.ddb_field_identifier()], _key[Constants.ddb_field_modified_date()])
+                 for _key in _unprocessed}
+        keys = [_key for _key in keys if (_key[Constants.ddb_field_identifier()],
+                                          _key[Constants.ddb_field_modified_date()]) not in _kept]
+    _unprocessed.extend(await async_dynamodb.batch_delete(keys))
+    return _archived, _unprocessed
+
+
+def open_archive(path):
+    """Opens an archive file for appending, gzip compressed when its name ends in .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'at', encoding='utf-8')
+    return open(path, 'a', encoding='utf-8')
+
+
+def compact(dynamodb, table_name, retention, segments=SEGMENTS, archive_path=None, batch_size=BATCH_SIZE,
+            dry_run=False, now=None):
+    """
+    Removes the versions past retention from a table, given a Dynamo DB Service Resource, and
+    returns the number of resources, of live versions, of versions past retention, of versions
+    archived and deleted, and of versions left unprocessed
+    """
+    _now = time.time() if now is None else now
+    _async_dynamodb = AsyncDynamoDB(dynamodb.meta.client, table_name)
+    _versions = versions_by_resource(_async_dynamodb, segments, _now)
+    _keys = past_retention(_versions, retention, _now)
+    _counts = {
+        'resources': len(_versions),
+        'versions': sum(len(_modified_dates) for _modified_dates in _versions.values()),
+        'pastRetention': len(_keys),
+        'archived': 0,
+        'deleted': 0,
+        'unprocessed': 0
+    }
+    if dry_run:
+        return _counts
+    _archive = open_archive(archive_path) if archive_path else None
+    try:
+        for _batch in chunks(_keys, batch_size):
+            _archived, _unprocessed = run(archive_and_delete(_async_dynamodb, _batch, _archive))
+            _counts['archived'] += _archived
+            _counts['deleted'] += len(_batch) - len(_unprocessed)
+            _counts['unprocessed'] += len(_unprocessed)
+    finally:
+        if _archive is not None:
+            _archive.close()
+    return _counts
+
+
+def enable_ttl(client, table_name):
+    """Makes Dynamo DB delete versions once the time to live stamped on them passes"""
+    _description = client.describe_time_to_live(TableName=table_name)['TimeToLiveDescription']
+    if _description.get('TimeToLiveStatus') in ('ENABLED', 'ENABLING'):
+        return
+    client.update_time_to_live(TableName=table_name, TimeToLiveSpecification={
+        'Enabled': True,
+        'AttributeName': Constants.ddb_field_expires_at()
+    })
+
+
+def main():
+    _parser = argparse.ArgumentParser(description='Removes the versions past retention')
+    _parser.add_argument('--table', required=True, help='name of the resource table')
+    _parser.add_argument('--region', required=True, help='AWS region of the table')
+    _parser.add_argument('--endpoint', default=None, help='DynamoDB endpoint, such as DynamoDB Local')
+    _parser.add_argument('--max-count', type=int,
+                         default=int(os.environ.get(Constants.env_var_versions_max_count()) or 0),
+                         help='versions kept per resource, %s by default' % Constants.env_var_versions_max_count())
+    _parser.add_argument('--max-age-days', type=float,
+                         default=float(os.environ.get(Constants.env_var_versions_max_age_days()) or 0),
+                         help='days superseded versions are kept, %s by default'
+                              % Constants.env_var_versions_max_age_days())
+    _parser.add_argument('--archive', default=None, help='newline delimited JSON file to append removed versions to')
+    _parser.add_argument('--segments', type=int, default=SEGMENTS, help='parallel scan segments')
+    _parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='versions archived and deleted at once')
+    _parser.add_argument('--enable-ttl', action='store_true', help='enable time to live on %s first'
+                                                                   % Constants.ddb_field_expires_at())
+    _parser.add_argument('--dry-run', action='store_true', help='only count the versions past retention')
+    _arguments = _parser.parse_args()
+    if _arguments.max_count <= 0 and _arguments.max_age_days <= 0:
+        _parser.error('no retention given')
+    _retention = Retention(timedelta(days=_arguments.max_age_days) if _arguments.max_age_days > 0 else None,
+                           _arguments.max_count if _arguments.max_count > 0 else None)
+    _dynamodb = boto3.resource('dynamodb', region_name=_arguments.region, endpoint_url=_arguments.endpoint)
+    if _arguments.enable_ttl and not _arguments.dry_run:
+        enable_ttl(_dynamodb.meta.client, _arguments.table)
+    print(json.dumps(compact(_dynamodb, _arguments.table, _retention, _arguments.segments, _arguments.archive,
+                             _arguments.batch_size, _arguments.dry_run)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Creates the global secondary indexes the listings by owner and by status query, on a table
+that lacks them. Each is keyed by its attribute and the latestModifiedDate only latest items
+hold, so the indexes are sparse: they hold the latest version of every resource and no
+superseded versions, and latest items written before they existed are indexed as they are
+created. Dynamo DB creates one index at a time, so run it again, once the first index is
+active, to create the second.
+
+    python -m tools.create_indexes --table <table name> --region eu-west-1 [--dry-run]
+
+An index projects all attributes, so a listing reads no item back from the table, and
+every write of a latest item is charged once more for each index it appears in.
+"""
+
+import argparse
+
+import boto3
+import simplejson as json
+
+from resource_api.common.constants import Constants
+
+INDEXED_FIELDS = [
+    (Constants.ddb_index_owner(), Constants.ddb_field_owner()),
+    (Constants.ddb_index_status(), Constants.ddb_field_status())
+]
+
+
+def global_secondary_indexes(provisioned_throughput=None):
+    """Returns the definitions of the indexes, with the given provisioned throughput for a provisioned table"""
+    _indexes = []
+    for _index_name, _field in INDEXED_FIELDS:
+        _index = {
+            'IndexName': _index_name,
+            'KeySchema': [{'AttributeName': _field, 'KeyType': 'HASH'},
+                          {'AttributeName': Constants.ddb_field_latest_modified_date(), 'KeyType': 'RANGE'}],
+            'Projection': {'ProjectionType': 'ALL'}
+        }
+        if provisioned_throughput is not None:
+            _index['ProvisionedThroughput'] = provisioned_throughput
+        _indexes.append(_index)
+    return _indexes
+
+
+def attribute_definitions():
+    """Returns the definitions of the attributes the indexes are keyed by"""
+    return [{'AttributeName': _name, 'AttributeType': 'S'} for _name in
+            [_field for _, _field in INDEXED_FIELDS] + [Constants.ddb_field_latest_modified_date()]]
+
+
+def create_indexes(client, table_name, dry_run=False):
+    """
+    Creates the first index missing from a table, given a Dynamo DB client, and returns the
+    names of the indexes it has, of those missing and of the one created
+    """
+    _table = client.describe_table(TableName=table_name)['Table']
+    _existing = [_index['IndexName'] for _index in _table.get('GlobalSecondaryIndexes', [])]
+    _throughput = None
+    if _table.get('BillingModeSummary', {}).get('BillingMode') != 'PAY_PER_REQUEST':
+        _table_throughput = _table['ProvisionedThroughput']
+        _throughput = {'ReadCapacityUnits': _table_throughput['ReadCapacityUnits'],
+                       'WriteCapacityUnits': _table_throughput['WriteCapacityUnits']}
+    _missing = [_index for _index in global_secondary_indexes(_throughput) if _index['IndexName'] not in _existing]
+    _created = None
+    if _missing and not dry_run:
+        client.update_table(TableName=table_name, AttributeDefinitions=attribute_definitions(),
+                            GlobalSecondaryIndexUpdates=[{'Create': _missing[0]}])
+        _created = _missing[0]['IndexName']
+    return {
+        'existing': _existing,
+        'missing': [_index['IndexName'] for _index in _missing],
+        'created': _created
+    }
+
+
+def main():
+    _parser = argparse.ArgumentParser(description='Creates the indexes of the listings by owner and by status')
+    _parser.add_argument('--table', required=True, help='name of the resource table')
+    _parser.add_argument('--region', required=True, help='AWS region of the table')
+    _parser.add_argument('--endpoint', default=None, help='DynamoDB endpoint, such as DynamoDB Local')
+    _parser.add_argument('--dry-run', action='store_true', help='only list the missing indexes')
+    _arguments = _parser.parse_args()
+    _client = boto3.client('dynamodb', region_name=_arguments.region, endpoint_url=_arguments.endpoint)
+    print(json.dumps(create_indexes(_client, _arguments.table, _arguments.dry_run)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""Parallel scans of the resource table for the offline tools"""
+
+from resource_api.common.async_dynamo import gather
+from resource_api.common.constants import Constants
+
+
+async def scan_segment(async_dynamodb, segment, segments, attributes, visit):
+    """Scans one segment of the table, projected to the given top level attributes, and calls visit with every item"""
+    _arguments = {
+        'TableName': async_dynamodb.table_name,
+        'Segment': segment,
+        'TotalSegments': segments,
+        'ProjectionExpression': ', '.join('#a%d' % _index for _index in range(len(attributes))),
+        'ExpressionAttributeNames': {'#a%d' % _index: _attribute for _index, _attribute in enumerate(attributes)}
+    }
+    while True:
+        _ddb_response = await async_dynamodb.call('scan', **_arguments)
+        for _item in _ddb_response[Constants.ddb_response_attribute_name_items()]:
+            visit(_item)
+        _last_evaluated_key = _ddb_response.get(Constants.ddb_response_attribute_name_last_evaluated_key())
+        if _last_evaluated_key is None:
+            return
+        _arguments['ExclusiveStartKey'] = _last_evaluated_key
+
+
+async def scan(async_dynamodb, segments, attributes, visit):
+    """
+    Scans the whole table in concurrent segments. visit runs on the event loop, one item at
+    a time, so it can collect into shared structures without locking.
+    """
+    await gather(*[scan_segment(async_dynamodb, _segment, segments, attributes, visit)
+                   for _segment in range(segments)])